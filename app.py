@@ -3,9 +3,15 @@
 from flask import Flask
 from google.google_api import google_bp
 from tools.global_handle_exception.exception_handler import register_error_handlers
+from tools.metrics.metrics import register_metrics
+from tools.tracing.tracing import register_tracing
+from tools.profiling.profiler import register_profiling
 
 app = Flask(__name__)
 register_error_handlers(app)
+register_metrics(app)
+register_tracing(app)
+register_profiling(app)
 
 app.register_blueprint(google_bp)
 
@@ -1,34 +1,136 @@
 """Test for purrf"""
 
+import gzip
 import http.client
+import threading
 from unittest import TestCase, main
 from unittest.mock import patch
 
 from app import app
+from google.result_cache import result_cache
 
 
 FETCH_HISTORY_MESSAGES_API = "/api/chat/spaces/messages"
+EXPORT_MESSAGES_API = "/api/chat/messages/export"
+QUERY_MESSAGES_API = "/api/chat/messages/query"
+PULL_MESSAGES_API = "/api/chat/spaces/pull"
+COMPACT_MESSAGES_API = "/api/chat/messages/compact"
 
 
 class TestAppRoutes(TestCase):
     def setUp(self):
         self.client = app.test_client()
         app.testing = True
+        result_cache.clear()
 
-    @patch("google.google_api.executor.submit")
+    @patch("google.google_api._start_background", return_value=True)
     @patch("google.google_api.fetch_history_messages")
-    def test_history_messages_integration(self, mock_fetch, mock_submit):
+    def test_history_messages_integration(self, mock_fetch, mock_start):
         response = self.client.get(FETCH_HISTORY_MESSAGES_API)
 
         self.assertEqual(response.status_code, http.client.ACCEPTED)
 
-        mock_submit.assert_called_once_with(mock_fetch)
+        mock_start.assert_called_once_with("fetch_history_messages", mock_fetch)
 
-    @patch("google.google_api.executor.submit", side_effect=Exception())
-    def test_history_messages_error(self, mock_submit):
+    @patch("google.google_api._start_background", return_value=False)
+    def test_history_messages_already_running(self, _):
+        response = self.client.get(FETCH_HISTORY_MESSAGES_API)
+
+        self.assertEqual(response.status_code, http.client.CONFLICT)
+
+    @patch("google.google_api._start_background", return_value=True)
+    def test_metrics_endpoint(self, _):
+        self.client.get(FETCH_HISTORY_MESSAGES_API)
+
+        response = self.client.get("/metrics")
+
+        self.assertEqual(response.status_code, http.client.OK)
+        self.assertIn(f'route="{FETCH_HISTORY_MESSAGES_API}"'.encode(), response.data)
+
+    @patch("google.google_api._start_background", side_effect=Exception())
+    def test_history_messages_error(self, mock_start):
         response = self.client.get(FETCH_HISTORY_MESSAGES_API)
         self.assertEqual(response.status_code, http.client.INTERNAL_SERVER_ERROR)
 
+    @patch.dict("google.google_api._background_threads", clear=True)
+    @patch("google.google_api.run_compactor")
+    def test_compact_runs_once_on_its_own_thread(self, mock_compact):
+        started, stop_event = threading.Semaphore(0), threading.Event()
+        self.addCleanup(stop_event.set)
+        mock_compact.side_effect = lambda: started.release() or stop_event.wait()
+
+        first = self.client.get(COMPACT_MESSAGES_API)
+        second = self.client.get(COMPACT_MESSAGES_API)
+
+        self.assertTrue(started.acquire(timeout=5))
+        self.assertEqual(first.status_code, http.client.ACCEPTED)
+        self.assertEqual(second.status_code, http.client.CONFLICT)
+        mock_compact.assert_called_once()
+
+    @patch.dict("google.google_api._background_threads", clear=True)
+    @patch("google.google_api.pull_messages")
+    def test_pull_runs_once_per_subscription(self, mock_pull):
+        started, stop_event = threading.Semaphore(0), threading.Event()
+        self.addCleanup(stop_event.set)
+        mock_pull.side_effect = lambda *args: started.release() or stop_event.wait()
+
+        responses = [
+            self.client.get(f"{PULL_MESSAGES_API}?project_id=p&subscription_id={sub}")
+            for sub in ("s1", "s1", "s2")
+        ]
+
+        self.assertEqual(
+            [response.status_code for response in responses],
+            [http.client.ACCEPTED, http.client.CONFLICT, http.client.ACCEPTED],
+        )
+        self.assertTrue(started.acquire(timeout=5))
+        self.assertTrue(started.acquire(timeout=5))
+        self.assertEqual(mock_pull.call_count, 2)
+
+    @patch("google.google_api.get_export_keys")
+    @patch("google.google_api.iter_export_records")
+    def test_export_messages_streams_gzipped_ndjson(self, mock_records, _):
+        mock_records.return_value = iter([{"n": 1}, {"n": 2}])
+
+        response = self.client.get(f"{EXPORT_MESSAGES_API}?space_id=space1&gzip=true")
+
+        self.assertEqual(response.status_code, http.client.OK)
+        self.assertTrue(response.is_streamed)
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.data), b'{"n": 1}\n{"n": 2}\n')
+
+    def test_export_messages_requires_scope(self):
+        response = self.client.get(EXPORT_MESSAGES_API)
+        self.assertEqual(response.status_code, http.client.BAD_REQUEST)
+
+    @patch("google.result_cache.get_versions", return_value=(1,))
+    @patch("google.google_api.query_messages")
+    def test_query_messages(self, mock_query, _):
+        mock_query.return_value = [{"create_time": 1.0}], "1.0:1"
+
+        response = self.client.get(
+            f"{QUERY_MESSAGES_API}?ldap=ldap1&limit=1&cursor=0.5:2"
+        )
+
+        self.assertEqual(response.status_code, http.client.OK)
+        self.assertEqual(
+            response.get_json(),
+            {"messages": [{"create_time": 1.0}], "next_cursor": "1.0:1"},
+        )
+        mock_query.assert_called_once_with(
+            None, "ldap1", None, None, limit=1, cursor="0.5:2"
+        )
+
+    @patch("google.result_cache.get_versions", return_value=(1, 2))
+    @patch("google.google_api.get_analytics_cache")
+    def test_analytics_is_versioned_by_its_filters(self, mock_cache, mock_versions):
+        mock_cache.return_value.get_member_summary.return_value = {"count": 1}
+
+        response = self.client.get("/api/chat/analytics?ldap=ldap1&space_id=space1")
+
+        self.assertEqual(response.status_code, http.client.OK)
+        mock_versions.assert_called_once_with(["spaces/space1", "ldap:ldap1"])
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,50 @@
+"""ASGI entry point serving the purrf API with uvicorn."""
+
+from a2wsgi import WSGIMiddleware
+from app import app
+from tools.metrics.metrics import track_executor
+import argparse
+import os
+import uvicorn
+
+ASGI_THREADS = "ASGI_THREADS"
+DEFAULT_ASGI_THREADS = 64
+DEFAULT_HOST = "0.0.0.0"
+DEFAULT_PORT = 5001
+
+
+def create_asgi_app(wsgi_application, threads=DEFAULT_ASGI_THREADS):
+    """
+    Wraps a WSGI application to be served by an ASGI server from a thread pool.
+
+    The application stays a WSGI application: every request holds one of the `threads`
+    worker threads until it completes, including while it waits on Google or Redis.
+    The wrapper is `a2wsgi.WSGIMiddleware`, and the queue depth of its thread pool is
+    exported on `/metrics`.
+
+    Args:
+        wsgi_application (callable): The WSGI application, e.g. the Flask app.
+        threads (int): The maximum number of requests served at the same time.
+
+    Returns:
+        callable: The ASGI application.
+    """
+    asgi_application = WSGIMiddleware(wsgi_application, workers=threads)
+    track_executor("asgi", asgi_application.executor)
+    return asgi_application
+
+
+asgi_app = create_asgi_app(app, int(os.environ.get(ASGI_THREADS, DEFAULT_ASGI_THREADS)))
+
+
+def main(argv=None):
+    """Command line entry point running the ASGI application with uvicorn."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args(argv)
+    uvicorn.run(asgi_app, host=args.host, port=args.port, lifespan="on")
+
+
+if __name__ == "__main__":
+    main()
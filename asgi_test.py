@@ -0,0 +1,87 @@
+"""Test for the purrf ASGI entry point"""
+
+import asyncio
+import http.client
+import json
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from asgi import create_asgi_app
+from app import app
+from google.result_cache import result_cache
+from prometheus_client import REGISTRY
+
+
+async def call_asgi(asgi_app, scope, messages):
+    """Runs one ASGI call, returning the messages it sent."""
+    received = list(messages)
+    sent = []
+
+    async def receive():
+        return received.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    await asgi_app(scope, receive, send)
+    return sent
+
+
+class TestAsgi(TestCase):
+    def setUp(self):
+        self.asgi_app = create_asgi_app(app, threads=4)
+        result_cache.clear()
+
+    def test_executors_are_tracked(self):
+        depth = REGISTRY.get_sample_value(
+            "purrf_executor_queue_depth", {"executor": "asgi"}
+        )
+
+        self.assertEqual(depth, 0)
+
+    def test_lifespan(self):
+        sent = asyncio.run(
+            call_asgi(
+                self.asgi_app,
+                {"type": "lifespan"},
+                [{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}],
+            )
+        )
+
+        self.assertEqual(
+            [message["type"] for message in sent],
+            ["lifespan.startup.complete", "lifespan.shutdown.complete"],
+        )
+
+    @patch("google.result_cache.get_versions", return_value=(1,))
+    @patch("google.google_api.count_active_spaces", return_value=2)
+    @patch("google.google_api.count_active_members", return_value=3)
+    def test_async_view(self, *_):
+        scope = {
+            "type": "http",
+            "http_version": "1.1",
+            "method": "GET",
+            "path": "/api/chat/active",
+            "query_string": b"start_date=2024-05-01&end_date=2024-05-07",
+            "headers": [],
+        }
+
+        sent = asyncio.run(
+            call_asgi(self.asgi_app, scope, [{"type": "http.request", "body": b""}])
+        )
+
+        self.assertEqual(sent[0]["status"], http.client.OK)
+        body = b"".join(message.get("body", b"") for message in sent[1:])
+        self.assertEqual(
+            json.loads(body),
+            {
+                "start_date": "2024-05-01",
+                "end_date": "2024-05-07",
+                "active_members": 3,
+                "active_spaces": 2,
+            },
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""Runs paged Google API list calls as concurrent asyncio streams."""
+
+from google.authentication_utils import GoogleClientFactory
+from tools.log.logger import setup_logger
+from tools.metrics.metrics import GOOGLE_API_PAGE_SECONDS
+from tools.tracing.tracing import get_tracer
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import contextvars
+import logging
+import os
+from google.constants import (
+    FETCH_CONCURRENCY,
+    PAGINATED_STREAMS_INFO_MSG,
+)
+
+setup_logger()
+tracer = get_tracer(__name__)
+
+
+def get_fetch_concurrency():
+    """
+    Returns the concurrency of the asynchronous pagination mode.
+
+    The mode is enabled by setting the `CHAT_FETCH_CONCURRENCY` environment variable to
+    the number of pages that may be in flight at once.
+
+    Returns:
+        int: The number of concurrent page requests, or None if the mode is disabled.
+
+    Raises:
+        ValueError: If the environment variable is not an integer.
+    """
+    concurrency = int(os.environ.get(FETCH_CONCURRENCY) or 0)
+    return concurrency if concurrency > 0 else None
+
+
+def _execute_page(request, http=None):
+    """Executes one page request, recording its latency under its API method."""
+    method = getattr(request, "methodId", None) or "unknown"
+    with (
+        tracer.start_as_current_span(
+            "google_api.page", attributes={"google_api.method": str(method)}
+        ) as span,
+        GOOGLE_API_PAGE_SECONDS.labels(method=method).time(),
+    ):
+        response = request.execute(http=http) if http else request.execute()
+        span.set_attribute(
+            "page.item_count",
+            sum(len(value) for value in response.values() if isinstance(value, list)),
+        )
+        span.set_attribute("page.has_next", bool(response.get("nextPageToken")))
+        return response
+
+
+class AsyncPaginator:
+    """
+    Fetches the pages of many paged list requests concurrently.
+
+    A stream is described by a `make_request(page_token)` callable returning the
+    googleapiclient request of one page. Each stream executes its requests over its own
+    authorized transport from `GoogleClientFactory`, since httplib2 transports are not
+    thread-safe, on a thread pool sized to the concurrency, so the blocking HTTP calls
+    never run on the event loop. As soon as a page arrives, the request of the next one
+    is started, so it is in flight while the current page is processed. The pool is
+    shared by every stream and bounds the number of requests in flight.
+    """
+
+    def __init__(self, concurrency):
+        """
+        Args:
+            concurrency (int): The maximum number of page requests in flight.
+        """
+        self._executor = ThreadPoolExecutor(
+            max_workers=concurrency, thread_name_prefix="paginator"
+        )
+
+    async def _execute(self, request, http):
+        """Executes a page request on the thread pool, in the current trace context."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor,
+            contextvars.copy_context().run,
+            _execute_page,
+            request,
+            http,
+        )
+
+    async def iter_pages(self, make_request):
+        """
+        Iterates over the pages of one stream, prefetching the next page.
+
+        Args:
+            make_request (callable): Returns the request of the page of a page token,
+                None for the first page.
+
+        Yields:
+            dict: The API responses, in page order.
+
+        Raises:
+            googleapiclient.errors.HttpError: If an error occurs during the API call.
+            ValueError: If no valid credentials are available.
+        """
+        http = GoogleClientFactory().create_authorized_http()
+        pending = asyncio.ensure_future(self._execute(make_request(None), http))
+        try:
+            while pending:
+                response = await pending
+                page_token = response.get("nextPageToken")
+                pending = (
+                    asyncio.ensure_future(self._execute(make_request(page_token), http))
+                    if page_token
+                    else None
+                )
+                yield response
+        finally:
+            if pending:
+                pending.cancel()
+
+    async def collect(self, key, make_request, on_page=None):
+        """
+        Collects every page of one stream.
+
+        Args:
+            key: The identifier of the stream passed to `on_page`.
+            make_request (callable): Returns the request of the page of a page token.
+            on_page (callable, optional): Called with (key, response) for each page, on
+                the event loop thread, so it is never called concurrently.
+
+        Returns:
+            list: The API responses, in page order.
+        """
+        pages = []
+        with tracer.start_as_current_span(
+            "google_api.stream", attributes={"stream.key": str(key)}
+        ) as span:
+            async for response in self.iter_pages(make_request):
+                if on_page:
+                    on_page(key, response)
+                pages.append(response)
+            span.set_attribute("page.count", len(pages))
+        return pages
+
+    async def collect_all(self, make_requests, on_page=None):
+        """
+        Collects every page of many streams concurrently.
+
+        Args:
+            make_requests (dict): A mapping of stream keys to `make_request` callables.
+            on_page (callable, optional): Called with (key, response) for each page.
+
+        Returns:
+            dict: A mapping of stream keys to their API responses, in page order.
+        """
+        keys = list(make_requests)
+        results = await asyncio.gather(
+            *(self.collect(key, make_requests[key], on_page) for key in keys)
+        )
+        return dict(zip(keys, results))
+
+    def close(self):
+        """Shuts the thread pool down."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def fetch_all_pages(make_requests, concurrency, on_page=None):
+    """
+    Collects every page of many paged list requests from synchronous code.
+
+    The pages are collected on a private event loop, so this must not be called from a
+    thread that is already running one, e.g. an `async def` view, where `asyncio.run`
+    raises `RuntimeError`. Async code awaits `AsyncPaginator.collect_all` instead.
+
+    Args:
+        make_requests (dict): A mapping of stream keys to `make_request(page_token)`
+            callables returning googleapiclient requests.
+        concurrency (int): The maximum number of page requests in flight.
+        on_page (callable, optional): Called with (key, response) for each page.
+
+    Returns:
+        dict: A mapping of stream keys to their API responses, in page order.
+
+    Raises:
+        googleapiclient.errors.HttpError: If an error occurs during an API call.
+    """
+    paginator = AsyncPaginator(concurrency)
+    try:
+        pages = asyncio.run(paginator.collect_all(make_requests, on_page))
+    finally:
+        paginator.close()
+    logging.info(
+        PAGINATED_STREAMS_INFO_MSG.format(
+            stream_count=len(pages),
+            page_count=sum(len(responses) for responses in pages.values()),
+            concurrency=concurrency,
+        )
+    )
+    return pages
+
+
+def iter_pages(make_request):
+    """
+    Iterates over the pages of a paged list request.
+
+    Pages are requested one at a time with blocking `.execute()` calls and yielded as
+    they arrive, so a caller may stop early and never holds more than one page. A
+    single stream gains nothing from an `AsyncPaginator`, which is only used by
+    `fetch_all_pages` to run many streams concurrently.
+
+    Args:
+        make_request (callable): Returns the request of the page of a page token, None
+            for the first page.
+
+    Yields:
+        dict: The API responses, in page order.
+
+    Raises:
+        googleapiclient.errors.HttpError: If an error occurs during the API call.
+    """
+    page_token = None
+    while True:
+        response = _execute_page(make_request(page_token))
+        yield response
+        page_token = response.get("nextPageToken")
+        if not page_token:
+            return
@@ -1,4 +1,5 @@
 from googleapiclient.discovery import build
+from google_auth_httplib2 import AuthorizedHttp
 from google.auth import default
 from google.cloud.pubsub_v1 import SubscriberClient
 from google.oauth2.service_account import Credentials as ServiceAccountCredentials
@@ -18,6 +19,7 @@ from google.constants import (
     NO_CREDENTIALS_ERROR_MSG,
     SCOPES_LIST,
 )
+import httplib2
 import logging
 import os
 
@@ -194,3 +196,24 @@ class GoogleClientFactory:
         if self._workspaceevents_client is None:
             self._workspaceevents_client = self._create_client("workspaceevents", "v1")
         return self._workspaceevents_client
+
+    def create_authorized_http(self):
+        """Creates a new authorized HTTP transport.
+
+        googleapiclient clients share a single httplib2 transport that is not
+        thread-safe. Requests executed concurrently from worker threads must each pass
+        their own transport, e.g.
+        `request.execute(http=factory.create_authorized_http())`.
+
+        Returns:
+            google_auth_httplib2.AuthorizedHttp: An HTTP transport authorized with the
+            application credentials.
+
+        Raises:
+            ValueError: If no valid credentials are available.
+        """
+
+        credentials = self._get_credentials()
+        if credentials is None:
+            raise ValueError(NO_CREDENTIALS_ERROR_MSG)
+        return AuthorizedHttp(credentials, http=httplib2.Http())
@@ -14,6 +14,7 @@ from google.constants import (
     RETRIEVED_PEOPLE_INFO_MSG,
 )
 from google.authentication_utils import GoogleClientFactory
+from google.async_paginator import iter_pages
 
 setup_logger()
 
@@ -42,28 +43,21 @@ def get_chat_spaces(space_type, page_size):
         raise ValueError(NO_CLIENT_ERROR_MSG.format(client_name=CHAT_API_NAME))
 
     space_display_names = {}
-    page_token = None
-
-    while True:
-        response = (
-            client_chat.spaces()
-            .list(
-                pageSize=page_size,
-                filter=f'space_type = "{space_type}"',
-                pageToken=page_token,
-            )
-            .execute()
+
+    def list_spaces(page_token):
+        return client_chat.spaces().list(
+            pageSize=page_size,
+            filter=f'space_type = "{space_type}"',
+            pageToken=page_token,
         )
+
+    for response in iter_pages(list_spaces):
         spaces = response.get("spaces", [])
         for space in spaces:
             space_id = space.get("name").split("/")[1]
             display_name = space.get("displayName")
             space_display_names[space_id] = display_name
 
-        page_token = response.get("nextPageToken")
-        if not page_token:
-            break
-
     logging.info(
         RETRIEVED_SPACES_INFO_MSG.format(
             count=len(space_display_names), space_type=space_type
@@ -101,23 +95,18 @@ def list_directory_all_people_ldap():
 
     directory_people = []
     formatted_people = {}
-    page_token = None
-    while True:
-        response = (
-            client_people.people()
-            .listDirectoryPeople(
-                readMask="emailAddresses",
-                pageSize=DEFAULT_PAGE_SIZE,
-                sources=["DIRECTORY_SOURCE_TYPE_DOMAIN_PROFILE"],
-                pageToken=page_token,
-            )
-            .execute()
+
+    def list_people(page_token):
+        return client_people.people().listDirectoryPeople(
+            readMask="emailAddresses",
+            pageSize=DEFAULT_PAGE_SIZE,
+            sources=["DIRECTORY_SOURCE_TYPE_DOMAIN_PROFILE"],
+            pageToken=page_token,
         )
+
+    for response in iter_pages(list_people):
         people = response.get("people", [])
         directory_people.extend(people)
-        page_token = response.get("nextPageToken")
-        if not page_token:
-            break
     for person in directory_people:
         emailAddresses_data = person.get("emailAddresses")[0]
         id = emailAddresses_data.get("metadata", {}).get("source", {}).get("id", {})
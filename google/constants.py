@@ -17,6 +17,35 @@ DEFAULT_PAGE_SIZE = 1000
 
 MESSAGE_TYPE_CREATE = "create"
 
+EVENT_TYPE_MESSAGE_CREATED = "google.workspace.chat.message.v1.created"
+EVENT_TYPE_MESSAGE_DELETED = "google.workspace.chat.message.v1.deleted"
+CHAT_MESSAGE_EVENT_TYPES = [EVENT_TYPE_MESSAGE_CREATED, EVENT_TYPE_MESSAGE_DELETED]
+CE_TYPE_ATTRIBUTE = "ce-type"
+CE_SUBJECT_ATTRIBUTE = "ce-subject"
+CE_TIME_ATTRIBUTE = "ce-time"
+SHARD_ATTRIBUTE = "shard"
+SHARD_SUBSCRIPTION_ID_FORMAT = "{subscription_id}-shard-{shard}"
+DEFAULT_HASH_RING_REPLICAS = 100
+
+DEFAULT_SUBSCRIBE_MAX_WORKERS = 10
+DEFAULT_SUBSCRIBE_REQUESTS_PER_SECOND = 20
+WORKSPACE_EVENTS_TARGET_RESOURCE_FORMAT = "//chat.googleapis.com/spaces/{space_id}"
+PUBSUB_TOPIC_PATH_FORMAT = "projects/{project_id}/topics/{topic_id}"
+
+DEFAULT_RENEW_BEFORE_SECONDS = 30 * 60
+DEFAULT_RENEWAL_INTERVAL_SECONDS = 5 * 60
+DEFAULT_RENEWAL_BATCH_SIZE = 100
+RENEWAL_TTL = "0s"
+
+DEFAULT_HEARTBEAT_TOLERANCE_SECONDS = 60
+
+DEFAULT_SUBSCRIBER_MAX_MESSAGES = 1000
+DEFAULT_SUBSCRIBER_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_SUBSCRIBER_BATCH_SIZE = 500
+DEFAULT_SUBSCRIBER_FLUSH_INTERVAL_SECONDS = 1.0
+
+DEFAULT_BACKFILL_BATCH_SIZE = 500
+
 CREDENTIALS_SUCCESS_MSG = "Credentials retrieved successfully. Project ID: {project_id}"
 NO_CREDENTIALS_ERROR_MSG = "No valid credentials provided."
 USING_CREDENTIALS_MSG = "Using Credentials type: {credentials_type}"
@@ -36,3 +65,92 @@ SENDER_LDAP_NOT_FOUND_DEBUG_MSG = (
 STORED_MESSAGES_INFO_MSG = (
     "{stored_count} out of {total_count} messages stored in Redis successfully."
 )
+
+SUBSCRIBER_STARTED_INFO_MSG = (
+    "Listening for messages on {subscription_path} "
+    "(max_messages={max_messages}, max_bytes={max_bytes})."
+)
+SUBSCRIBER_STOPPED_INFO_MSG = "Stopped listening for messages on {subscription_path}."
+UNSUPPORTED_EVENT_DEBUG_MSG = "Skipping unsupported event type: {event_type}"
+INVALID_EVENT_ERROR_MSG = "Dropping undecodable Pub/Sub message {message_id}: {error}"
+DEDUP_CHECK_ERROR_MSG = "Dedup check failed for event {event_key}: {error}"
+COMMITTED_BATCH_INFO_MSG = (
+    "Committed {count} events to Redis and acknowledged {acked} Pub/Sub messages."
+)
+COMMIT_BATCH_ERROR_MSG = (
+    "Failed to commit {count} events to Redis, messages will be redelivered: {error}"
+)
+
+TOPIC_EXISTS_INFO_MSG = "Topic already exists, reusing it: {topic_path}"
+SUBSCRIPTION_EXISTS_INFO_MSG = (
+    "Subscription already exists, reusing it: {subscription_path}"
+)
+WORKSPACE_SUBSCRIPTION_EXISTS_DEBUG_MSG = (
+    "Workspace Events subscription already exists for space {space_id}."
+)
+WORKSPACE_SUBSCRIPTION_FAILED_ERROR_MSG = (
+    "Failed to create Workspace Events subscription for space {space_id}: {error}"
+)
+BULK_SUBSCRIBE_INFO_MSG = (
+    "Bulk subscribe finished: {created} created, {skipped} skipped, {failed} failed."
+)
+
+RECONCILED_SUBSCRIPTIONS_INFO_MSG = (
+    "Reconciled Workspace Events subscriptions: {live} live, {lapsed} lapsed, "
+    "{stale} stale."
+)
+RENEWED_SUBSCRIPTIONS_INFO_MSG = (
+    "Renewal batch finished: {renewed} renewed, {recreated} recreated, "
+    "{pending} pending, {failed} failed."
+)
+RENEW_SUBSCRIPTION_FAILED_ERROR_MSG = (
+    "Failed to renew Workspace Events subscription {name}: {error}"
+)
+RENEWAL_PASS_FAILED_ERROR_MSG = (
+    "Subscription renewal pass failed, retrying in {interval} seconds: {error}"
+)
+
+WATERMARK_UPDATE_ERROR_MSG = "Failed to update subscriber watermarks: {error}"
+NO_GAPS_INFO_MSG = "No ingestion gaps found across {count} spaces."
+GAP_FOUND_INFO_MSG = (
+    "Catching up space {space_id} between {start_time} and {end_time}: "
+    "{stored_count} of {total_count} messages stored."
+)
+
+RELAY_PUBLISH_ERROR_MSG = "Failed to relay Pub/Sub message {message_id}: {error}"
+RELAY_STARTED_INFO_MSG = (
+    "Relaying {subscription_path} to {num_shards} shards of {topic_path}."
+)
+WORKERS_STARTED_INFO_MSG = "Started subscriber workers for shards {shards}."
+
+DEFAULT_RESTORE_BATCH_SIZE = 1000
+DEFAULT_RESTORE_WORKERS = 4
+INVALID_RESTORE_LINE_DEBUG_MSG = (
+    "Skipping invalid NDJSON line at byte {offset}: {error}"
+)
+RESTORED_MESSAGES_INFO_MSG = (
+    "Restored {restored} messages from {path}, skipped {skipped}, "
+    "in {seconds:.1f}s ({rate:.0f} messages/s)."
+)
+
+ARCHIVE_DIR = "CHAT_ARCHIVE_DIR"
+ARCHIVE_INDEX_FILE = "index.ndjson"
+ARCHIVE_SEGMENT_FILE_FORMAT = "segment-{number:06d}.zlog"
+DEFAULT_ARCHIVE_SEGMENT_BYTES = 64 * 1024 * 1024
+DEFAULT_ARCHIVE_COMPRESSION_LEVEL = 6
+ARCHIVED_PAGE_DEBUG_MSG = (
+    "Archived a page of {count} messages of space {space_id} to {segment}."
+)
+REPLAYED_ARCHIVE_INFO_MSG = (
+    "Replayed {replayed} archived messages from {directory}, skipped {skipped}."
+)
+
+DEFAULT_RESULT_CACHE_SIZE = 1024
+DEFAULT_RESULT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_RESULT_CACHE_TTL_SECONDS = 60
+
+FETCH_CONCURRENCY = "CHAT_FETCH_CONCURRENCY"
+PAGINATED_STREAMS_INFO_MSG = (
+    "Fetched {page_count} pages of {stream_count} streams "
+    "with {concurrency} concurrent requests."
+)
@@ -1,12 +1,24 @@
 from google.authentication_utils import GoogleClientFactory
+from google.async_paginator import fetch_all_pages, get_fetch_concurrency, iter_pages
 from google.chat_utils import get_chat_spaces, list_directory_all_people_ldap
-from redis_dal.redis_utils import store_messages
-from tools.log.logger import setup_logger
+from google.page_archive import PageArchive
+from redis_dal.redis_utils import store_messages_batch
+from redis_dal.watermarks import update_backfill_watermarks
+from tools.log.logger import LazyMessage, setup_logger
+from tools.metrics.metrics import MESSAGES_FETCHED, SKIPPED_SENDERS
+from tools.tracing.tracing import get_tracer
+from tools.profiling.profiler import profiled
+from opentelemetry import trace
+from datetime import datetime, timezone
 import logging
+import os
+import time
 from google.constants import (
+    ARCHIVE_DIR,
     NO_CLIENT_ERROR_MSG,
     CHAT_API_NAME,
     DEFAULT_PAGE_SIZE,
+    DEFAULT_BACKFILL_BATCH_SIZE,
     FETCHING_MESSAGES_INFO_MSG,
     FETCHED_MESSAGES_INFO_MSG,
     DEFAULT_SPACE_TYPE,
@@ -17,14 +29,50 @@ from google.constants import (
 )
 
 setup_logger()
+tracer = get_tracer(__name__)
 
 
-def fetch_messages_by_spaces_id(space_id):
+def _format_filter_time(timestamp):
+    """Formats an epoch timestamp as an RFC 3339 time for the Chat API filter."""
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat()
+
+
+def _get_list_messages(client_chat, space_id, start_time=None, end_time=None):
+    """Returns a `make_request(page_token)` callable listing the messages of a space."""
+    list_kwargs = {}
+    time_filters = []
+    if start_time is not None:
+        time_filters.append(f'createTime > "{_format_filter_time(start_time)}"')
+    if end_time is not None:
+        time_filters.append(f'createTime < "{_format_filter_time(end_time)}"')
+    if time_filters:
+        list_kwargs["filter"] = " AND ".join(time_filters)
+
+    def list_messages(page_token):
+        return (
+            client_chat
+            .spaces()
+            .messages()
+            .list(
+                parent=f"spaces/{space_id}",
+                pageSize=DEFAULT_PAGE_SIZE,
+                pageToken=page_token,
+                **list_kwargs,
+            )
+        )
+
+    return list_messages
+
+
+@tracer.start_as_current_span("fetch_space_messages")
+def fetch_messages_by_spaces_id(space_id, start_time=None, end_time=None, archive=None):
     """
     Retrieves messages from a specific Google Chat space.
 
     This function fetches all messages from a given Google Chat space using the provided chat client.
-    It handles pagination to retrieve all messages.
+    It handles pagination to retrieve all messages. When a time window is given, only
+    messages created inside it are requested, through the `createTime` filter. When an
+    archive is given, every raw page is also appended to it before being processed.
 
     Steps:
     1.  Validates the provided chat client.
@@ -34,6 +82,11 @@ def fetch_messages_by_spaces_id(space_id):
 
     Args:
         space_id (str): The ID of the Google Chat space to fetch messages from.
+        start_time (float, optional): Only fetch messages created after this epoch
+            timestamp.
+        end_time (float, optional): Only fetch messages created before this epoch
+            timestamp.
+        archive (PageArchive, optional): The archive the raw pages are written to.
 
     Returns:
         list: A list of message objects (dict) retrieved from the chat space.
@@ -49,29 +102,89 @@ def fetch_messages_by_spaces_id(space_id):
         raise ValueError(NO_CLIENT_ERROR_MSG.format(client_name=CHAT_API_NAME))
 
     logging.info(FETCHING_MESSAGES_INFO_MSG.format(space_id=space_id))
+    list_messages = _get_list_messages(client_chat, space_id, start_time, end_time)
+    span = trace.get_current_span()
+    span.set_attributes({"space_id": space_id, "page_size": DEFAULT_PAGE_SIZE})
+
     result = []
-    page_token = None
-    while True:
-        response = (
-            client_chat.spaces()
-            .messages()
-            .list(
-                parent=f"spaces/{space_id}",
-                pageSize=DEFAULT_PAGE_SIZE,
-                pageToken=page_token,
-            )
-            .execute()
-        )
+    for response in iter_pages(list_messages):
+        if archive:
+            archive.append_page(space_id, response)
         messages = response.get("messages", [])
         result.extend(messages)
-        page_token = response.get("nextPageToken")
-        if not page_token:
-            break
+        MESSAGES_FETCHED.labels(source="chat_api").inc(len(messages))
+    span.set_attribute("message_count", len(result))
     logging.info(FETCHED_MESSAGES_INFO_MSG.format(count=len(result), space_id=space_id))
     return result
 
 
-def fetch_history_messages():
+@tracer.start_as_current_span("fetch_spaces_messages")
+def fetch_messages_by_spaces_ids(
+    space_ids, concurrency, start_time=None, end_time=None, archive=None
+):
+    """
+    Retrieves the messages of many Google Chat spaces concurrently.
+
+    Every space is one paged stream of an `AsyncPaginator`, so up to `concurrency` pages
+    of different spaces are in flight at once and the next page of each space is
+    requested while the current one is processed.
+
+    Args:
+        space_ids (list): The IDs of the Google Chat spaces to fetch messages from.
+        concurrency (int): The maximum number of page requests in flight.
+        start_time (float, optional): Only fetch messages created after this epoch
+            timestamp.
+        end_time (float, optional): Only fetch messages created before this epoch
+            timestamp.
+        archive (PageArchive, optional): The archive the raw pages are written to.
+
+    Returns:
+        dict: A mapping of space IDs to their message objects (dict).
+
+    Raises:
+        googleapiclient.errors.HttpError: If an error occurs during an API call.
+        ValueError: If no valid chat client provided.
+    """
+    client_chat = GoogleClientFactory().create_chat_client()
+    if not client_chat:
+        raise ValueError(NO_CLIENT_ERROR_MSG.format(client_name=CHAT_API_NAME))
+
+    trace.get_current_span().set_attributes({
+        "space_count": len(space_ids),
+        "page_size": DEFAULT_PAGE_SIZE,
+        "concurrency": concurrency,
+    })
+    on_page = archive.append_page if archive else None
+    pages = fetch_all_pages(
+        {
+            space_id: _get_list_messages(client_chat, space_id, start_time, end_time)
+            for space_id in space_ids
+        },
+        concurrency,
+        on_page,
+    )
+    result = {}
+    for space_id, responses in pages.items():
+        result[space_id] = [
+            message
+            for response in responses
+            for message in response.get("messages", [])
+        ]
+        MESSAGES_FETCHED.labels(source="chat_api").inc(len(result[space_id]))
+        logging.info(
+            FETCHED_MESSAGES_INFO_MSG.format(
+                count=len(result[space_id]), space_id=space_id
+            )
+        )
+    trace.get_current_span().set_attribute(
+        "message_count", sum(len(messages) for messages in result.values())
+    )
+    return result
+
+
+@tracer.start_as_current_span("backfill")
+@profiled("backfill")
+def fetch_history_messages(archive_dir=None):
     """
     Processes chat spaces by fetching messages and storing them in Redis.
 
@@ -83,43 +196,87 @@ def fetch_history_messages():
     5.  Processes each message:
         a.  Extracts the sender ID and retrieves the corresponding LDAP.
         b.  Skips messages if the sender's LDAP is not found, indicating an external account.
-        c.  Stores the message in Redis using the 'store_messages' function.
+        c.  Stores the message in Redis with 'store_messages_batch', in chunks of
+            `DEFAULT_BACKFILL_BATCH_SIZE` messages per pipeline.
     6.  Logs the number of messages fetched and successfully stored.
+    7.  Records, per space, the time its messages were listed as the backfill watermark.
+
+    When an archive directory is given, or set in the `CHAT_ARCHIVE_DIR` environment
+    variable, the raw API pages are also written to a local `PageArchive`, so that
+    later re-ingestions can replay them with `replay_archive` instead of calling the API
+    again.
+
+    When `CHAT_FETCH_CONCURRENCY` is set, the spaces are fetched concurrently by
+    `fetch_messages_by_spaces_ids` instead of one after the other.
+
+    Args:
+        archive_dir (str, optional): The directory of the raw page archive.
 
     Returns:
         None.
     """
     messages = []
+    backfill_watermarks = {}
+    archive_dir = archive_dir or os.environ.get(ARCHIVE_DIR)
+    archive = PageArchive(archive_dir) if archive_dir else None
 
     space_id_list = get_chat_spaces(DEFAULT_SPACE_TYPE, DEFAULT_PAGE_SIZE)
 
-    for space_id in space_id_list.keys():
-        result = fetch_messages_by_spaces_id(space_id)
-        messages.extend(result)
-        logging.debug(
-            FETCHED_MESSAGES_INFO_MSG.format(count=len(result), space_id=space_id)
+    concurrency = get_fetch_concurrency()
+    if concurrency:
+        listed_at = time.time()
+        results = fetch_messages_by_spaces_ids(
+            list(space_id_list), concurrency, archive=archive
         )
+        for space_id, result in results.items():
+            backfill_watermarks[space_id] = listed_at
+            messages.extend(result)
+    else:
+        for space_id in space_id_list.keys():
+            backfill_watermarks[space_id] = time.time()
+            result = fetch_messages_by_spaces_id(space_id, archive=archive)
+            messages.extend(result)
+            logging.debug(
+                LazyMessage(
+                    FETCHED_MESSAGES_INFO_MSG, count=len(result), space_id=space_id
+                )
+            )
 
     logging.info(FETCHED_ALL_MESSAGES_INFO_MSG.format(count=len(messages)))
 
     people_dict = list_directory_all_people_ldap()
 
     stored_count = 0
+    entries = []
     for message in messages:
         sender_id = message.get("sender", {}).get("name").split("/")[1]
         sender_ldap = people_dict.get(sender_id, "")
         if not sender_ldap:
             logging.debug(
-                SENDER_LDAP_NOT_FOUND_DEBUG_MSG.format(
-                    sender_id=sender_id, message=message
+                LazyMessage(
+                    SENDER_LDAP_NOT_FOUND_DEBUG_MSG,
+                    sender_id=sender_id,
+                    message=message,
                 )
             )
             continue
 
-        store_messages(sender_ldap, message, MESSAGE_TYPE_CREATE)
+        entries.append((sender_ldap, message, MESSAGE_TYPE_CREATE))
         stored_count += 1
+        if len(entries) >= DEFAULT_BACKFILL_BATCH_SIZE:
+            store_messages_batch(entries)
+            entries = []
+    if entries:
+        store_messages_batch(entries)
+    SKIPPED_SENDERS.labels(source="backfill").inc(len(messages) - stored_count)
+    trace.get_current_span().set_attributes({
+        "space_count": len(space_id_list),
+        "message_count": len(messages),
+        "stored_count": stored_count,
+    })
     logging.info(
         STORED_MESSAGES_INFO_MSG.format(
             stored_count=stored_count, total_count=len(messages)
         )
     )
+    update_backfill_watermarks(backfill_watermarks)
@@ -0,0 +1,174 @@
+from google.chat_utils import get_chat_spaces, list_directory_all_people_ldap
+from google.fetch_history_chat_message import fetch_messages_by_spaces_id
+from redis_dal.redis_utils import store_messages_batch
+from redis_dal.watermarks import (
+    clear_recorded_gaps,
+    get_watermarks,
+    update_backfill_watermarks,
+)
+from redis_dal.workspace_subscription_store import (
+    get_tracked_workspace_subscriptions,
+)
+from tools.log.logger import setup_logger
+from tools.metrics.metrics import SKIPPED_SENDERS
+from tools.tracing.tracing import get_tracer
+from opentelemetry import trace
+from google.constants import (
+    DEFAULT_PAGE_SIZE,
+    DEFAULT_SPACE_TYPE,
+    DEFAULT_HEARTBEAT_TOLERANCE_SECONDS,
+    MESSAGE_TYPE_CREATE,
+    NO_GAPS_INFO_MSG,
+    GAP_FOUND_INFO_MSG,
+)
+import logging
+import time
+
+setup_logger()
+tracer = get_tracer(__name__)
+
+
+def find_gaps(
+    space_ids, now=None, heartbeat_tolerance=DEFAULT_HEARTBEAT_TOLERANCE_SECONDS
+):
+    """
+    Finds the time ranges in which spaces may have missed real-time events.
+
+    A space is covered up to the larger of its real-time watermark (latest event seen
+    by the subscriber) and its backfill watermark. Real-time ingestion is continuous for
+    the space from the later of the live subscribers' and the space subscription's "live
+    since" timestamps, provided a subscriber heartbeat is fresh and the space has an
+    unexpired Workspace Events subscription. Whatever lies between the covered time and
+    the start of continuous real-time ingestion (or now, if real-time ingestion is down)
+    is a gap.
+
+    The covered time cannot tell an outage that real-time events have since moved past,
+    so subscriber downtimes and lapsed space subscriptions are also recorded as explicit
+    gaps when ingestion resumes, see `redis_dal.watermarks`. Recorded gaps are returned
+    until `reconcile_gaps` has backfilled them.
+
+    Args:
+        space_ids (list): The IDs of the Chat spaces to check.
+        now (float, optional): The current epoch timestamp, defaults to the wall clock.
+        heartbeat_tolerance (float): The maximum age in seconds of the heartbeat of a
+            live subscriber.
+
+    Returns:
+        list: A list of (space_id, start_time, end_time) gaps, where start_time is None
+        for a space that has never been ingested.
+
+    Raises:
+        redis.exceptions.RedisError: If an error occurs during Redis operations.
+    """
+    if not space_ids:
+        return []
+    now = now if now is not None else time.time()
+    watermarks = get_watermarks(space_ids)
+
+    subscription_expiry = {}
+    for _, space_id, _, expire_time in get_tracked_workspace_subscriptions():
+        subscription_expiry[space_id] = max(
+            expire_time, subscription_expiry.get(space_id, 0)
+        )
+
+    live_subscriptions = [
+        subscription
+        for subscription, heartbeat in watermarks["subscriber_heartbeats"].items()
+        if now - heartbeat <= heartbeat_tolerance
+    ]
+    subscriber_live = bool(live_subscriptions)
+    subscriber_live_since = max(
+        (
+            watermarks["subscriber_live_since"].get(subscription) or 0
+            for subscription in live_subscriptions
+        ),
+        default=0,
+    )
+
+    gaps = []
+    for space_id in space_ids:
+        covered = [
+            watermark
+            for watermark in (
+                watermarks["realtime"][space_id],
+                watermarks["backfill"][space_id],
+            )
+            if watermark is not None
+        ]
+        covered_until = max(covered) if covered else None
+
+        live = subscriber_live and subscription_expiry.get(space_id, 0) > now
+        if not live:
+            gaps.append((space_id, covered_until, now))
+            continue
+
+        live_since = max(subscriber_live_since, watermarks["live_since"][space_id] or 0)
+        if covered_until is None or covered_until < live_since:
+            gaps.append((space_id, covered_until, live_since))
+    gaps.extend(gap for gap in watermarks["gaps"] if gap not in gaps)
+    return gaps
+
+
+@tracer.start_as_current_span("reconcile_gaps")
+def reconcile_gaps(
+    space_ids=None, heartbeat_tolerance=DEFAULT_HEARTBEAT_TOLERANCE_SECONDS
+):
+    """
+    Catches up only the spaces and time ranges missed by real-time ingestion.
+
+    Each gap found by `find_gaps` is fetched with a windowed
+    `fetch_messages_by_spaces_id` call, stored in one Redis pipeline, and then recorded
+    as backfilled by raising the space's backfill watermark to the end of the window and
+    forgetting the gap if it was recorded.
+
+    Args:
+        space_ids (list, optional): The IDs of the Chat spaces to check, defaults to all
+            spaces returned by `get_chat_spaces`.
+        heartbeat_tolerance (float): The maximum age in seconds of the heartbeat of a
+            live subscriber.
+
+    Returns:
+        list: The (space_id, start_time, end_time) gaps that were caught up.
+
+    Raises:
+        googleapiclient.errors.HttpError: If an error occurs during the API call.
+        redis.exceptions.RedisError: If an error occurs during Redis operations.
+    """
+    if space_ids is None:
+        space_ids = list(get_chat_spaces(DEFAULT_SPACE_TYPE, DEFAULT_PAGE_SIZE).keys())
+
+    gaps = find_gaps(space_ids, heartbeat_tolerance=heartbeat_tolerance)
+    trace.get_current_span().set_attributes({
+        "space_count": len(space_ids),
+        "gap_count": len(gaps),
+    })
+    if not gaps:
+        logging.info(NO_GAPS_INFO_MSG.format(count=len(space_ids)))
+        return gaps
+
+    people_dict = list_directory_all_people_ldap()
+    for space_id, start_time, end_time in gaps:
+        messages = fetch_messages_by_spaces_id(
+            space_id, start_time=start_time, end_time=end_time
+        )
+        entries = []
+        for message in messages:
+            sender_id = message.get("sender", {}).get("name").split("/")[1]
+            sender_ldap = people_dict.get(sender_id, "")
+            if sender_ldap:
+                entries.append((sender_ldap, message, MESSAGE_TYPE_CREATE))
+        if entries:
+            store_messages_batch(entries)
+        SKIPPED_SENDERS.labels(source="reconcile").inc(len(messages) - len(entries))
+        update_backfill_watermarks({space_id: end_time})
+        clear_recorded_gaps([(space_id, start_time, end_time)])
+        logging.info(
+            GAP_FOUND_INFO_MSG.format(
+                space_id=space_id,
+                start_time=start_time,
+                end_time=end_time,
+                stored_count=len(entries),
+                total_count=len(messages),
+            )
+        )
+    return gaps
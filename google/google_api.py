@@ -1,26 +1,114 @@
 """google chat service"""
 
-from flask import jsonify, Blueprint, request
+from flask import jsonify, Blueprint, Response, request, stream_with_context
 from google.fetch_history_chat_message import fetch_history_messages
-from google.pubsub_publisher import subscribe_chat
+from google.gap_reconciler import reconcile_gaps
+from google.pubsub_publisher import subscribe_chat, subscribe_chat_spaces
+from google.pubsub_subscriber_store import pull_messages
+from google.workspace_subscription_renewal import run_renewal_scheduler
+from redis_dal.retention import run_compactor, set_retention_days
+from redis_dal.leaderboard import get_top_senders
+from redis_dal.active_members import (
+    count_active_members,
+    count_active_spaces,
+    get_default_date_range,
+)
+from redis_dal.activity_summary import get_message_counts
+from redis_dal.message_export import get_export_keys, iter_export_records, iter_ndjson
+from redis_dal.cold_tier import query_messages, tier_messages
+from redis_dal.analytics_cache import get_analytics_cache
+from redis_dal.query_versions import get_version_scopes
+from google.result_cache import cached_response
+from redis_dal.constants import (
+    DEFAULT_ACTIVE_DAYS,
+    DEFAULT_LEADERBOARD_SIZE,
+    DEFAULT_QUERY_LIMIT,
+    DEFAULT_TIER_AGE_DAYS,
+)
+from datetime import date, datetime, timedelta, timezone
+import asyncio
 import http.client
-from concurrent.futures import ThreadPoolExecutor
+import threading
 
 google_bp = Blueprint("google", __name__)
 
-executor = ThreadPoolExecutor(max_workers=5)
+# Background jobs and long-running loops, by name. Each runs on its own daemon thread,
+# so a long backfill or a loop that never returns cannot hold a worker of the thread
+# pool serving the requests.
+_background_threads = {}
+_background_threads_lock = threading.Lock()
+
+
+def _start_background(name, target, *args):
+    """
+    Starts a background job or loop on a daemon thread, unless it is already running.
+
+    Args:
+        name (str): The name of the job, at most one job of a name runs at a time.
+        target (callable): The job function.
+        *args: The arguments of the job function.
+
+    Returns:
+        bool: True if the job was started, False if it is already running.
+    """
+    with _background_threads_lock:
+        thread = _background_threads.get(name)
+        if thread is not None and thread.is_alive():
+            return False
+        thread = threading.Thread(target=target, args=args, name=name, daemon=True)
+        thread.start()
+        _background_threads[name] = thread
+        return True
+
+
+def _get_activity_scopes(args):
+    """Returns the version scopes of an activity summary request."""
+    ldaps = args.get("ldaps")
+    return get_version_scopes(sender_ldaps=ldaps.split(",") if ldaps else None)
+
+
+def _get_query_scopes(args):
+    """Returns the version scopes of a request filtered by "space_id" and "ldap"."""
+    ldap = args.get("ldap")
+    return get_version_scopes(args.get("space_id"), [ldap] if ldap else None)
 
 
 @google_bp.route("/api/chat/spaces/messages")
 def history_messages():
-    """API endpoint to trigger the fetching of messages for all SPACE type chat spaces and store them in Redis asynchronously."""
+    """
+    API endpoint to trigger the fetching of messages for all SPACE type chat spaces and
+    store them in Redis asynchronously.
 
-    executor.submit(fetch_history_messages)
+    The fetch runs on its own thread; 409 is returned if one is already running.
+    """
+
+    if not _start_background("fetch_history_messages", fetch_history_messages):
+        return jsonify({
+            "message": "Message retrieval is already running."
+        }), http.client.CONFLICT
     return jsonify({
         "message": "Message retrieval triggered asynchronously."
     }), http.client.ACCEPTED
 
 
+@google_bp.route("/api/chat/spaces/messages/reconcile")
+def reconcile_messages():
+    """
+    API endpoint to catch up the spaces and time ranges missed by real-time ingestion.
+
+    The reconciliation runs asynchronously on its own thread; 409 is returned if one is
+    already running.
+    """
+
+    if not _start_background("reconcile_gaps", reconcile_gaps):
+        return jsonify({
+            "message": "Gap reconciliation is already running."
+        }), http.client.CONFLICT
+    return jsonify({
+        "message": "Gap reconciliation triggered asynchronously."
+    }), http.client.ACCEPTED
+
+
 @google_bp.route("/api/chat/spaces/subscribe")
 def subscribe():
     """API endpoint to retrieve a list of Google Chat spaces."""
@@ -30,3 +118,259 @@ def subscribe():
     topic_id = request.args.get("topic_id")
     data = subscribe_chat(project_id, space_id, subscription_id, topic_id)
     return jsonify({"spaces": data}), http.client.OK
+
+
+@google_bp.route("/api/chat/spaces/subscribe/bulk")
+def subscribe_bulk():
+    """API endpoint to subscribe to the events of all SPACE type chat spaces."""
+    project_id = request.args.get("project_id")
+    subscription_id = request.args.get("subscription_id")
+    topic_id = request.args.get("topic_id")
+    data = subscribe_chat_spaces(project_id, subscription_id, topic_id)
+    return jsonify(data), http.client.OK
+
+
+@google_bp.route("/api/chat/spaces/pull")
+def pull():
+    """
+    API endpoint to start a streaming-pull subscriber that stores Chat events in Redis.
+
+    The subscriber runs asynchronously on its own thread; 409 is returned if one is
+    already pulling the subscription.
+    """
+    project_id = request.args.get("project_id")
+    subscription_id = request.args.get("subscription_id")
+    if not project_id or not subscription_id:
+        raise ValueError("project_id and subscription_id must be provided.")
+
+    if not _start_background(
+        f"pull:{project_id}/{subscription_id}",
+        pull_messages,
+        project_id,
+        subscription_id,
+    ):
+        return jsonify({
+            "message": "A subscriber is already pulling this subscription."
+        }), http.client.CONFLICT
+    return jsonify({
+        "message": "Message pulling triggered asynchronously."
+    }), http.client.ACCEPTED
+
+
+@google_bp.route("/api/chat/subscriptions/renew")
+def renew_subscriptions():
+    """
+    API endpoint to start the Workspace Events subscription renewal scheduler.
+
+    The scheduler runs asynchronously on its own thread; 409 is returned if it is
+    already running.
+    """
+
+    if not _start_background("renew_subscriptions", run_renewal_scheduler):
+        return jsonify({
+            "message": "Subscription renewal scheduler is already running."
+        }), http.client.CONFLICT
+    return jsonify({
+        "message": "Subscription renewal scheduler started asynchronously."
+    }), http.client.ACCEPTED
+
+
+@google_bp.route("/api/chat/messages/retention")
+def retention():
+    """
+    API endpoint to set the number of days raw messages are kept.
+
+    The retention applies to one space if "space_id" is given, otherwise globally.
+    """
+    days = request.args.get("days")
+    space_id = request.args.get("space_id")
+    set_retention_days(float(days) if days else None, space_id)
+    return jsonify({"space_id": space_id, "days": days}), http.client.OK
+
+
+@google_bp.route("/api/chat/messages/compact")
+def compact():
+    """
+    API endpoint to start the compactor that evicts messages past their retention.
+
+    The compactor runs asynchronously on its own thread; 409 is returned if it is
+    already running.
+    """
+
+    if not _start_background("compact", run_compactor):
+        return jsonify({
+            "message": "Message compactor is already running."
+        }), http.client.CONFLICT
+    return jsonify({
+        "message": "Message compactor started asynchronously."
+    }), http.client.ACCEPTED
+
+
+@google_bp.route("/api/chat/messages/tier")
+def tier():
+    """
+    API endpoint to move messages older than a number of days to the cold tier.
+
+    The messages are moved from Redis asynchronously on their own thread; 409 is
+    returned if a tiering run is already in progress.
+    """
+    days = request.args.get("days", DEFAULT_TIER_AGE_DAYS, type=float)
+
+    if not _start_background("tier_messages", tier_messages, days):
+        return jsonify({
+            "message": "Message tiering is already running."
+        }), http.client.CONFLICT
+    return jsonify({
+        "message": "Message tiering triggered asynchronously."
+    }), http.client.ACCEPTED
+
+
+@google_bp.route("/api/chat/messages/query")
+@cached_response(_get_query_scopes)
+def query():
+    """
+    API endpoint to retrieve the messages of a space and/or member.
+
+    Messages are read from both the Redis and the cold tiers, "limit" at a time; the
+    "next_cursor" of a page is passed as "cursor" to read the next one.
+    """
+    space_id = request.args.get("space_id")
+    sender_ldap = request.args.get("ldap")
+    start_time = request.args.get("start_time", type=datetime.fromisoformat)
+    end_time = request.args.get("end_time", type=datetime.fromisoformat)
+    limit = request.args.get("limit", DEFAULT_QUERY_LIMIT, type=int)
+    records, next_cursor = query_messages(
+        space_id,
+        sender_ldap,
+        start_time,
+        end_time,
+        limit=limit,
+        cursor=request.args.get("cursor"),
+    )
+    return jsonify({"messages": records, "next_cursor": next_cursor}), http.client.OK
+
+
+@google_bp.route("/api/chat/leaderboard")
+@cached_response(lambda args: get_version_scopes(args.get("space_id")))
+def leaderboard():
+    """
+    API endpoint to retrieve the most active senders of a space, or across spaces.
+
+    Senders are ranked over all time, or within a day, week or month with "period".
+    """
+    space_id = request.args.get("space_id")
+    period = request.args.get("period")
+    k = request.args.get("k", DEFAULT_LEADERBOARD_SIZE, type=int)
+    top_senders = get_top_senders(k, space_id, period)
+    return jsonify({
+        "senders": [{"ldap": ldap, "count": count} for ldap, count in top_senders]
+    }), http.client.OK
+
+
+@google_bp.route("/api/chat/active")
+@cached_response(lambda args: get_version_scopes(args.get("space_id")))
+async def active():
+    """
+    API endpoint to estimate the number of distinct active members and spaces.
+
+    Members and spaces active between two UTC days are counted concurrently. Ranges
+    longer than `MAX_ACTIVE_DAYS` days are rejected with 400.
+    """
+    space_id = request.args.get("space_id")
+    start_date, end_date = get_default_date_range(DEFAULT_ACTIVE_DAYS)
+    start_date = request.args.get("start_date", start_date, type=date.fromisoformat)
+    end_date = request.args.get("end_date", end_date, type=date.fromisoformat)
+    counts = [asyncio.to_thread(count_active_members, start_date, end_date, space_id)]
+    if not space_id:
+        counts.append(asyncio.to_thread(count_active_spaces, start_date, end_date))
+    active_members, *active_spaces = await asyncio.gather(*counts)
+    data = {
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "active_members": active_members,
+    }
+    if active_spaces:
+        data["active_spaces"] = active_spaces[0]
+    return jsonify(data), http.client.OK
+
+
+@google_bp.route("/api/chat/activity")
+@cached_response(_get_activity_scopes)
+def activity():
+    """
+    API endpoint to count the messages of members across spaces over a time range.
+
+    Counts are optionally grouped by space and day. Ranges longer than
+    `MAX_ACTIVITY_DAYS` days, or `MAX_ACTIVITY_DAY_BUCKETS` days when grouped by day,
+    are rejected with 400.
+    """
+    ldaps = request.args.get("ldaps")
+    end_time = request.args.get(
+        "end_time", datetime.now(timezone.utc), type=datetime.fromisoformat
+    )
+    start_time = request.args.get(
+        "start_time",
+        end_time - timedelta(days=DEFAULT_ACTIVE_DAYS),
+        type=datetime.fromisoformat,
+    )
+    group_by = request.args.get("group_by")
+    data = get_message_counts(
+        ldaps.split(",") if ldaps else None,
+        start_time,
+        end_time,
+        group_by.split(",") if group_by else (),
+    )
+    return jsonify(data), http.client.OK
+
+
+@google_bp.route("/api/chat/analytics")
+@cached_response(_get_query_scopes)
+def analytics():
+    """
+    API endpoint to retrieve message histograms and percentiles.
+
+    Returns the hour-of-day and day-of-week histograms and the message count
+    percentiles, or the activity summary of one member if "ldap" is given.
+    """
+    ldap = request.args.get("ldap")
+    space_id = request.args.get("space_id")
+    start_time = request.args.get("start_time", type=datetime.fromisoformat)
+    end_time = request.args.get("end_time", type=datetime.fromisoformat)
+    cache = get_analytics_cache()
+    if ldap:
+        data = cache.get_member_summary(ldap, space_id, start_time, end_time)
+    else:
+        data = {
+            "hours": cache.get_hour_histogram(None, space_id, start_time, end_time),
+            "weekdays": cache.get_weekday_histogram(
+                None, space_id, start_time, end_time
+            ),
+            "percentiles": cache.get_count_percentiles(
+                space_id=space_id, start_time=start_time, end_time=end_time
+            ),
+        }
+    return jsonify(data), http.client.OK
+
+
+@google_bp.route("/api/chat/messages/export")
+def export_messages():
+    """
+    API endpoint to stream the stored messages of a space and/or member.
+
+    Messages are streamed as chunked NDJSON, optionally gzipped.
+    """
+    space_id = request.args.get("space_id")
+    sender_ldap = request.args.get("ldap")
+    start_time = request.args.get("start_time", type=datetime.fromisoformat)
+    end_time = request.args.get("end_time", type=datetime.fromisoformat)
+    compress = request.args.get("gzip", "false").lower() in ("1", "true")
+    # Fail before the response starts streaming if the export is not scoped.
+    get_export_keys(space_id, sender_ldap)
+
+    records = iter_export_records(space_id, sender_ldap, start_time, end_time)
+    headers = {"Content-Encoding": "gzip"} if compress else {}
+    return Response(
+        stream_with_context(iter_ndjson(records, compress=compress)),
+        mimetype="application/x-ndjson",
+        headers=headers,
+    )
@@ -0,0 +1,282 @@
+"""Restores NDJSON dumps of Chat messages into Redis."""
+
+from google.chat_utils import list_directory_all_people_ldap
+from redis_dal.directory_cache import load_directory_people, save_directory_people
+from redis_dal.redis_utils import store_messages_batch
+from redis_dal.constants import MESSAGE_TYPE_DELETE
+from tools.log.logger import LazyMessage, setup_logger
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import argparse
+import gzip
+import json
+import logging
+import mmap
+import multiprocessing
+import os
+import time
+from google.constants import (
+    MESSAGE_TYPE_CREATE,
+    DEFAULT_RESTORE_BATCH_SIZE,
+    DEFAULT_RESTORE_WORKERS,
+    INVALID_RESTORE_LINE_DEBUG_MSG,
+    RESTORED_MESSAGES_INFO_MSG,
+)
+
+setup_logger()
+
+
+def resolve_directory(refresh=False):
+    """
+    Returns the directory of sender IDs to LDAP identifiers, from the Redis cache.
+
+    The People API is only called when the cache is empty or a refresh is requested, so
+    repeated restores do not spend API quota.
+
+    Args:
+        refresh (bool): Whether to reload the directory from the People API.
+
+    Returns:
+        dict: A mapping of sender IDs to LDAP identifiers.
+
+    Raises:
+        googleapiclient.errors.HttpError: If an error occurs during the API call.
+        redis.exceptions.RedisError: If an error occurs during Redis operations.
+    """
+    people = {} if refresh else load_directory_people()
+    if not people:
+        people = list_directory_all_people_ldap()
+        save_directory_people(people)
+    return people
+
+
+def _validate_message(message, message_type):
+    """
+    Checks that `store_messages_batch` can apply a message event.
+
+    Raises:
+        ValueError: If a delete has no name, or a created message has no valid
+            createTime or space name.
+    """
+    if message_type == MESSAGE_TYPE_DELETE:
+        if not message.get("name"):
+            raise ValueError("A deleted message must have a name.")
+        return
+    create_time = message.get("createTime")
+    if not isinstance(create_time, str):
+        raise ValueError(f"Invalid createTime {create_time!r}.")
+    datetime.fromisoformat(create_time)
+    space = message.get("space")
+    space_name = space.get("name") if isinstance(space, dict) else ""
+    parts = str(space_name).split("/")
+    if len(parts) < 2 or not parts[1]:
+        raise ValueError(f"Invalid space {space!r}.")
+
+
+def to_store_entry(record, people):
+    """
+    Converts one NDJSON record into a `store_messages_batch` entry.
+
+    Two record shapes are accepted: the records written by the message export, with the
+    stored message under "message" and its "sender_ldap" and "type", and raw Chat API
+    message resources, whose sender is resolved through the directory.
+
+    Args:
+        record (dict): The parsed NDJSON record.
+        people (dict): A mapping of sender IDs to LDAP identifiers.
+
+    Returns:
+        tuple: A (sender_ldap, message, message_type) entry, or None if the sender is
+        not in the directory.
+
+    Raises:
+        ValueError: If the message cannot be stored, e.g. its createTime is not in ISO
+            format or it has no space.
+    """
+    if isinstance(record.get("message"), dict):
+        message = record["message"]
+        message_type = record.get("type") or MESSAGE_TYPE_CREATE
+        sender_ldap = record.get("sender_ldap")
+    else:
+        message, message_type, sender_ldap = record, MESSAGE_TYPE_CREATE, None
+    if not sender_ldap:
+        sender_id = message.get("sender", {}).get("name", "").split("/")[-1]
+        sender_ldap = people.get(sender_id)
+    if not sender_ldap:
+        return None
+    _validate_message(message, message_type)
+    return sender_ldap, message, message_type
+
+
+def split_ranges(path, parts):
+    """
+    Splits a file into at most `parts` byte ranges that start and end on line breaks.
+
+    Args:
+        path (str): The path of the NDJSON file.
+        parts (int): The number of ranges to split into.
+
+    Returns:
+        list: (start, end) byte offsets, end excluded.
+    """
+    size = os.path.getsize(path)
+    if not size:
+        return []
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        ranges = []
+        start = 0
+        for part in range(1, parts + 1):
+            end = size if part == parts else max(start, size * part // parts)
+            if end < size:
+                newline = mm.find(b"\n", end)
+                end = size if newline == -1 else newline + 1
+            if end > start:
+                ranges.append((start, end))
+                start = end
+            if start >= size:
+                break
+    return ranges
+
+
+def _iter_mmap_lines(path, start, end):
+    """Yields (offset, line) for the lines of a byte range of a memory-mapped file."""
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        position = start
+        while position < end:
+            newline = mm.find(b"\n", position, end)
+            line_end = end if newline == -1 else newline
+            yield position, mm[position:line_end]
+            position = line_end + 1
+
+
+def _iter_gzip_lines(path):
+    """Yields (offset, line) for the lines of a gzipped file, offsets uncompressed."""
+    position = 0
+    with gzip.open(path, "rb") as f:
+        for line in f:
+            yield position, line.rstrip(b"\n")
+            position += len(line)
+
+
+def restore_lines(lines, people, batch_size=DEFAULT_RESTORE_BATCH_SIZE):
+    """
+    Stores NDJSON lines in Redis with one pipeline per `batch_size` messages.
+
+    Lines that are not valid JSON, or hold a message that cannot be stored, are logged
+    and counted as skipped, so that one bad record does not abort the restore.
+
+    Args:
+        lines (iterable): (offset, line) pairs.
+        people (dict): A mapping of sender IDs to LDAP identifiers.
+        batch_size (int): The number of messages written per pipeline.
+
+    Returns:
+        tuple: (restored, skipped) message counts.
+
+    Raises:
+        redis.exceptions.RedisError: If an error occurs during Redis operations.
+    """
+    restored = skipped = 0
+    batch = []
+    for offset, line in lines:
+        if not line.strip():
+            continue
+        try:
+            entry = to_store_entry(json.loads(line), people)
+        except (ValueError, AttributeError) as e:
+            logging.debug(
+                LazyMessage(INVALID_RESTORE_LINE_DEBUG_MSG, offset=offset, error=e)
+            )
+            entry = None
+        if entry is None:
+            skipped += 1
+            continue
+        batch.append(entry)
+        if len(batch) >= batch_size:
+            restored += store_messages_batch(batch)
+            batch = []
+    if batch:
+        restored += store_messages_batch(batch)
+    return restored, skipped
+
+
+def _restore_range(path, start, end, people, batch_size):
+    """Worker entry point restoring one byte range of a file."""
+    return restore_lines(_iter_mmap_lines(path, start, end), people, batch_size)
+
+
+def restore_messages(
+    path,
+    workers=DEFAULT_RESTORE_WORKERS,
+    batch_size=DEFAULT_RESTORE_BATCH_SIZE,
+    refresh_directory=False,
+):
+    """
+    Restores an NDJSON dump of Chat messages into Redis.
+
+    Plain files are memory-mapped and split on line breaks into one byte range per
+    worker process, so JSON decoding runs in parallel and only the pages being read are
+    resident. Each worker writes its messages with pipelined `store_messages_batch`
+    calls. Gzipped files (".gz") cannot be split and are restored by a single worker.
+
+    Args:
+        path (str): The path of the NDJSON file.
+        workers (int): The number of worker processes.
+        batch_size (int): The number of messages written per pipeline.
+        refresh_directory (bool): Whether to reload the directory from the People API.
+
+    Returns:
+        dict: The number of "restored" and "skipped" messages.
+
+    Raises:
+        redis.exceptions.RedisError: If an error occurs during Redis operations.
+    """
+    started_at = time.monotonic()
+    people = resolve_directory(refresh_directory)
+
+    if path.endswith(".gz"):
+        results = [restore_lines(_iter_gzip_lines(path), people, batch_size)]
+    elif workers <= 1:
+        results = [
+            _restore_range(path, start, end, people, batch_size)
+            for start, end in split_ranges(path, 1)
+        ]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            futures = [
+                executor.submit(_restore_range, path, start, end, people, batch_size)
+                for start, end in split_ranges(path, workers)
+            ]
+            results = [future.result() for future in futures]
+
+    result = {
+        "restored": sum(restored for restored, _ in results),
+        "skipped": sum(skipped for _, skipped in results),
+    }
+    seconds = time.monotonic() - started_at
+    logging.info(
+        RESTORED_MESSAGES_INFO_MSG.format(
+            path=path,
+            seconds=seconds,
+            rate=result["restored"] / seconds if seconds else 0,
+            **result,
+        )
+    )
+    return result
+
+
+def main(argv=None):
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("path", help="The NDJSON file, optionally gzipped (.gz).")
+    parser.add_argument("--workers", type=int, default=DEFAULT_RESTORE_WORKERS)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_RESTORE_BATCH_SIZE)
+    parser.add_argument("--refresh-directory", action="store_true")
+    args = parser.parse_args(argv)
+    restore_messages(args.path, args.workers, args.batch_size, args.refresh_directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+"""Archives raw Chat API message pages on local disk and replays them into Redis."""
+
+from google.message_restore import resolve_directory, to_store_entry
+from redis_dal.redis_utils import store_messages_batch
+from tools.log.logger import LazyMessage, setup_logger
+from datetime import datetime
+import argparse
+import json
+import logging
+import os
+import re
+import struct
+import threading
+import time
+import zlib
+from google.constants import (
+    ARCHIVE_INDEX_FILE,
+    ARCHIVE_SEGMENT_FILE_FORMAT,
+    DEFAULT_ARCHIVE_SEGMENT_BYTES,
+    DEFAULT_ARCHIVE_COMPRESSION_LEVEL,
+    DEFAULT_RESTORE_BATCH_SIZE,
+    ARCHIVED_PAGE_DEBUG_MSG,
+    REPLAYED_ARCHIVE_INFO_MSG,
+)
+
+setup_logger()
+
+# Every frame of a segment is the big-endian length of its zlib payload, then the
+# payload itself.
+_FRAME_HEADER = struct.Struct(">I")
+_SEGMENT_NUMBER_PATTERN = re.compile(r"segment-(\d+)\.zlog$")
+
+
+def _get_create_time(message):
+    """Returns the createTime of a message as an epoch timestamp, or None."""
+    create_time = message.get("createTime")
+    return datetime.fromisoformat(create_time).timestamp() if create_time else None
+
+
+class PageArchive:
+    """
+    An append-only archive of raw Chat API message pages.
+
+    Pages are written as independently zlib-compressed frames to segment files, which
+    are rotated once they reach `segment_bytes`. Every frame gets a line in the index
+    file with its segment, offset, space and createTime range, so a replay only reads
+    the frames of the spaces and times it asks for. Segments and index are only ever
+    appended to. An archive directory must have a single writing process; threads of
+    that process may share one instance.
+    """
+
+    def __init__(
+        self,
+        directory,
+        segment_bytes=DEFAULT_ARCHIVE_SEGMENT_BYTES,
+        level=DEFAULT_ARCHIVE_COMPRESSION_LEVEL,
+    ):
+        """
+        Opens, creating it if needed, the archive in `directory`.
+
+        Args:
+            directory (str): The directory of the archive.
+            segment_bytes (int): The size in bytes from which a new segment is started.
+            level (int): The zlib compression level, from 1 (fastest) to 9 (smallest).
+        """
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.level = level
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        numbers = [
+            int(match.group(1))
+            for match in map(_SEGMENT_NUMBER_PATTERN.match, os.listdir(directory))
+            if match
+        ]
+        self._segment_number = max(numbers, default=0)
+
+    def _segment_path(self, number):
+        return os.path.join(
+            self.directory, ARCHIVE_SEGMENT_FILE_FORMAT.format(number=number)
+        )
+
+    def append_page(self, space_id, page):
+        """
+        Appends one page of a `spaces.messages.list` response to the archive.
+
+        Args:
+            space_id (str): The ID of the Chat space the page was listed from.
+            page (dict): The raw API response.
+
+        Returns:
+            dict: The index entry of the page.
+        """
+        messages = page.get("messages", [])
+        create_times = [
+            create_time
+            for create_time in map(_get_create_time, messages)
+            if create_time is not None
+        ]
+        payload = zlib.compress(
+            json.dumps(page, ensure_ascii=False).encode("utf-8"), self.level
+        )
+        with self._lock:
+            path = self._segment_path(self._segment_number)
+            if not self._segment_number or (
+                os.path.exists(path) and os.path.getsize(path) >= self.segment_bytes
+            ):
+                self._segment_number += 1
+                path = self._segment_path(self._segment_number)
+            with open(path, "ab") as segment:
+                offset = segment.tell()
+                segment.write(_FRAME_HEADER.pack(len(payload)) + payload)
+            entry = {
+                "segment": os.path.basename(path),
+                "offset": offset,
+                "space_id": space_id,
+                "start_time": min(create_times, default=None),
+                "end_time": max(create_times, default=None),
+                "count": len(messages),
+                "archived_at": time.time(),
+            }
+            with open(os.path.join(self.directory, ARCHIVE_INDEX_FILE), "a") as index:
+                index.write(json.dumps(entry) + "\n")
+        logging.debug(
+            LazyMessage(
+                ARCHIVED_PAGE_DEBUG_MSG,
+                count=len(messages),
+                space_id=space_id,
+                segment=entry["segment"],
+            )
+        )
+        return entry
+
+
+def read_index(directory, space_ids=None, start_time=None, end_time=None):
+    """
+    Returns the index entries of the archived pages matching a space and time filter.
+
+    Args:
+        directory (str): The directory of the archive.
+        space_ids (iterable, optional): Only return pages of these spaces.
+        start_time (float, optional): Only return pages with messages created at or
+            after this epoch timestamp.
+        end_time (float, optional): Only return pages with messages created at or
+            before this epoch timestamp.
+
+    Returns:
+        list: The matching index entries, in the order the pages were archived.
+    """
+    space_ids = set(space_ids) if space_ids is not None else None
+    path = os.path.join(directory, ARCHIVE_INDEX_FILE)
+    if not os.path.exists(path):
+        return []
+    entries = []
+    with open(path) as index:
+        for line in index:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if space_ids is not None and entry["space_id"] not in space_ids:
+                continue
+            if not entry["count"]:
+                continue
+            if start_time is not None and entry["end_time"] is not None:
+                if entry["end_time"] < start_time:
+                    continue
+            if end_time is not None and entry["start_time"] is not None:
+                if entry["start_time"] > end_time:
+                    continue
+            entries.append(entry)
+    return entries
+
+
+def iter_archived_pages(directory, space_ids=None, start_time=None, end_time=None):
+    """
+    Iterates over the archived pages matching a space and time filter.
+
+    Args:
+        directory (str): The directory of the archive.
+        space_ids (iterable, optional): Only read pages of these spaces.
+        start_time (float, optional): Only read pages with messages created at or after
+            this epoch timestamp.
+        end_time (float, optional): Only read pages with messages created at or before
+            this epoch timestamp.
+
+    Yields:
+        tuple: (space_id, page) pairs, in the order the pages were archived.
+
+    Raises:
+        zlib.error: If a frame is corrupted.
+    """
+    segment_name, segment = None, None
+    try:
+        for entry in read_index(directory, space_ids, start_time, end_time):
+            if entry["segment"] != segment_name:
+                if segment:
+                    segment.close()
+                segment_name = entry["segment"]
+                segment = open(os.path.join(directory, segment_name), "rb")
+            segment.seek(entry["offset"])
+            (length,) = _FRAME_HEADER.unpack(segment.read(_FRAME_HEADER.size))
+            page = json.loads(zlib.decompress(segment.read(length)))
+            yield entry["space_id"], page
+    finally:
+        if segment:
+            segment.close()
+
+
+def replay_archive(
+    directory,
+    space_ids=None,
+    start_time=None,
+    end_time=None,
+    batch_size=DEFAULT_RESTORE_BATCH_SIZE,
+    refresh_directory=False,
+):
+    """
+    Stores the archived messages matching a space and time filter in Redis.
+
+    Replaying is how re-ingestion and schema migrations rebuild Redis without calling
+    the Chat API again. Messages are written with pipelined `store_messages_batch`
+    calls, and senders are resolved through the cached directory.
+
+    Args:
+        directory (str): The directory of the archive.
+        space_ids (iterable, optional): Only replay messages of these spaces.
+        start_time (float, optional): Only replay messages created at or after this
+            epoch timestamp.
+        end_time (float, optional): Only replay messages created at or before this
+            epoch timestamp.
+        batch_size (int): The number of messages written per pipeline.
+        refresh_directory (bool): Whether to reload the directory from the People API.
+
+    Returns:
+        dict: The number of "replayed" and "skipped" messages.
+
+    Raises:
+        zlib.error: If a frame is corrupted.
+        redis.exceptions.RedisError: If an error occurs during Redis operations.
+    """
+    people = resolve_directory(refresh_directory)
+    replayed = skipped = 0
+    batch = []
+    for _, page in iter_archived_pages(directory, space_ids, start_time, end_time):
+        for message in page.get("messages", []):
+            create_time = _get_create_time(message)
+            if create_time is not None:
+                if start_time is not None and create_time < start_time:
+                    continue
+                if end_time is not None and create_time > end_time:
+                    continue
+            entry = to_store_entry(message, people)
+            if entry is None:
+                skipped += 1
+                continue
+            batch.append(entry)
+            if len(batch) >= batch_size:
+                replayed += store_messages_batch(batch)
+                batch = []
+    if batch:
+        replayed += store_messages_batch(batch)
+    logging.info(
+        REPLAYED_ARCHIVE_INFO_MSG.format(
+            replayed=replayed, skipped=skipped, directory=directory
+        )
+    )
+    return {"replayed": replayed, "skipped": skipped}
+
+
+def main(argv=None):
+    """Command line entry point replaying an archive into Redis."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("directory", help="The directory of the archive.")
+    parser.add_argument("--space-id", action="append", dest="space_ids")
+    parser.add_argument("--start-time", type=datetime.fromisoformat)
+    parser.add_argument("--end-time", type=datetime.fromisoformat)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_RESTORE_BATCH_SIZE)
+    parser.add_argument("--refresh-directory", action="store_true")
+    args = parser.parse_args(argv)
+    replay_archive(
+        args.directory,
+        args.space_ids,
+        args.start_time.timestamp() if args.start_time else None,
+        args.end_time.timestamp() if args.end_time else None,
+        args.batch_size,
+        args.refresh_directory,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -3,27 +3,53 @@
 # create_workspaces_subscriptions(project_id, topic_id, client, space_id, event_types)
 # create_subscription(project_id, topic_id, subscription_id)
 # subscribe_chat(topic_id, subscription_id, space_id)
+# subscribe_chat_spaces(project_id, subscription_id, topic_id, space_ids)
 
 
-from tools.log.logger import setup_logger
+from tools.log.logger import LazyMessage, setup_logger
+from tools.rate_limiter.rate_limiter import RateLimiter
 from google.authentication_utils import GoogleClientFactory
+from google.chat_utils import get_chat_spaces
+from google.api_core.exceptions import AlreadyExists
 from google.cloud.pubsub_v1.types import Subscription
+from googleapiclient.errors import HttpError
+from redis_dal.workspace_subscription_store import track_workspace_subscriptions
+from google.constants import (
+    CHAT_MESSAGE_EVENT_TYPES,
+    DEFAULT_PAGE_SIZE,
+    DEFAULT_SPACE_TYPE,
+    DEFAULT_SUBSCRIBE_MAX_WORKERS,
+    DEFAULT_SUBSCRIBE_REQUESTS_PER_SECOND,
+    WORKSPACE_EVENTS_TARGET_RESOURCE_FORMAT,
+    PUBSUB_TOPIC_PATH_FORMAT,
+    TOPIC_EXISTS_INFO_MSG,
+    SUBSCRIPTION_EXISTS_INFO_MSG,
+    WORKSPACE_SUBSCRIPTION_EXISTS_DEBUG_MSG,
+    WORKSPACE_SUBSCRIPTION_FAILED_ERROR_MSG,
+    BULK_SUBSCRIBE_INFO_MSG,
+)
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import http.client
 import logging
+import threading
 
 setup_logger()
 
 
 def create_pubsub_topic(project_id, topic_id):
     """
-    Creates a Pub/Sub topic in the specified project.
+    Creates a Pub/Sub topic in the specified project, reusing it if it already exists.
 
     Args:
-        publisher_client (google.cloud.pubsub_v1.PublisherClient): The Publisher client instance.
+        publisher_client (google.cloud.pubsub_v1.PublisherClient): The Publisher client
+            instance.
         project_id (str): The ID of your Google Cloud project.
         topic_id (str): The ID of the topic to create.
 
     Returns:
-        google.cloud.pubsub_v1.types.Topic: The created Topic object.
+        google.cloud.pubsub_v1.types.Topic: The created Topic object, or None if the
+        topic already existed.
 
     Raises:
         ValueError: If project_id or topic_id is empty.
@@ -32,19 +58,27 @@ def create_pubsub_topic(project_id, topic_id):
     if not publisher_client or not project_id or not topic_id:
         raise ValueError("Publisher_client, project_id and topic_id must be provided.")
     topic_path = publisher_client.topic_path(project_id, topic_id)
-    topic = publisher_client.create_topic(name=topic_path)
+    try:
+        topic = publisher_client.create_topic(name=topic_path)
+    except AlreadyExists:
+        logging.info(TOPIC_EXISTS_INFO_MSG.format(topic_path=topic_path))
+        return None
     logging.info(f"Topic created: {topic_path}")
     return topic
 
 
-def create_subscription(project_id, topic_id, subscription_id):
+def create_subscription(project_id, topic_id, subscription_id, filter_expression=None):
     """
     Creates a Google Cloud Pub/Sub subscription for a given topic with no expiration.
 
+    An existing subscription with the same ID is reused.
+
     Args:
         project_id (str): Google Cloud Project ID.
         topic_id (str): The Pub/Sub topic ID to subscribe to.
         subscription_id (str): The subscription ID to be created.
+        filter_expression (str, optional): A Pub/Sub filter on message attributes; only
+            matching messages are delivered to the subscription.
 
     Returns:
         str: The name of the created subscription.
@@ -66,24 +100,37 @@ def create_subscription(project_id, topic_id, subscription_id):
         name=subscription_path, topic=topic_path, expiration_policy=None
     )
 
-    subscriber.create_subscription(
-        request={"name": subscription.name, "topic": subscription.topic}
-    )
+    subscription_request = {"name": subscription.name, "topic": subscription.topic}
+    if filter_expression:
+        subscription_request["filter"] = filter_expression
+
+    try:
+        subscriber.create_subscription(request=subscription_request)
+    except AlreadyExists:
+        logging.info(
+            SUBSCRIPTION_EXISTS_INFO_MSG.format(subscription_path=subscription_path)
+        )
+        return subscription_path
 
     logging.info(f"Subscription created: {subscription_path}")
     return subscription_path
 
 
-def create_workspaces_subscriptions(project_id, topic_id, space_id, event_types):
+def create_workspaces_subscriptions(
+    project_id, topic_id, space_id, event_types, authorized_http=None
+):
     """
     Creates a Google Workspace Events subscription for a specific space.
 
     Args:
         project_id (str): The ID of your Google Cloud project.
         topic_id (str): The Pub/Sub topic ID where events will be published.
-        client (googleapiclient.discovery.Resource): The Google Workspace API client instance.
+        client (googleapiclient.discovery.Resource): The Google Workspace API client
+            instance.
         space_id (str): The ID of the Google Chat space to subscribe to.
         event_types (list): A list of event types to listen for.
+        authorized_http (httplib2.Http, optional): The HTTP transport to execute the
+            request with, required when called concurrently from several threads.
 
     Returns:
         dict: The API response containing the subscription details.
@@ -94,30 +141,93 @@ def create_workspaces_subscriptions(project_id, topic_id, space_id, event_types)
     client = GoogleClientFactory().create_workspaceevents_client()
     if not project_id or not topic_id or not client or not space_id or not event_types:
         raise ValueError(
-            "All parameters (project_id, topic_id, client, space_id, event_types) must be provided."
+            "All parameters (project_id, topic_id, client, space_id, event_types) "
+            "must be provided."
         )
     BODY = {
-        "target_resource": f"//chat.googleapis.com/spaces/{space_id}",
+        "target_resource": WORKSPACE_EVENTS_TARGET_RESOURCE_FORMAT.format(
+            space_id=space_id
+        ),
         "event_types": event_types,
         "notification_endpoint": {
-            "pubsub_topic": f"projects/{project_id}/topics/{topic_id}"
+            "pubsub_topic": PUBSUB_TOPIC_PATH_FORMAT.format(
+                project_id=project_id, topic_id=topic_id
+            )
         },
         "payload_options": {"include_resource": True},
     }
-    response = client.subscriptions().create(body=BODY).execute()
+    response = client.subscriptions().create(body=BODY).execute(http=authorized_http)
     logging.info(
-        f"Creating subscription for space {space_id} with event types {event_types} on topic {topic_id}"
+        f"Creating subscription for space {space_id} with event types {event_types} "
+        f"on topic {topic_id}"
     )
+    if response.get("done") and "response" in response:
+        track_workspace_subscriptions([
+            parse_workspaces_subscription(response["response"])
+        ])
     return response
 
 
+def parse_workspaces_subscription(subscription):
+    """
+    Extracts the fields needed to track a Workspace Events subscription.
+
+    Args:
+        subscription (dict): A Workspace Events subscription resource.
+
+    Returns:
+        tuple: The (name, space_id, pubsub_topic, expire_time) of the subscription,
+        where expire_time is an epoch timestamp in seconds (0 if unknown).
+    """
+    target_prefix = WORKSPACE_EVENTS_TARGET_RESOURCE_FORMAT.format(space_id="")
+    target_resource = subscription.get("targetResource", "")
+    space_id = (
+        target_resource[len(target_prefix) :]
+        if target_resource.startswith(target_prefix)
+        else None
+    )
+    pubsub_topic = subscription.get("notificationEndpoint", {}).get("pubsubTopic")
+    expire_time = subscription.get("expireTime")
+    expire_timestamp = (
+        datetime.fromisoformat(expire_time).timestamp() if expire_time else 0
+    )
+    return subscription.get("name"), space_id, pubsub_topic, expire_timestamp
+
+
+def map_rate_limited(func, items, max_workers, requests_per_second):
+    """
+    Calls a Google API function for many items concurrently under a shared rate limit.
+
+    googleapiclient transports are not thread-safe, so each worker thread gets its own
+    authorized HTTP transport, which is passed to `func` as its second argument.
+
+    Args:
+        func (callable): A function taking (item, http) and returning a result.
+        items (iterable): The items to call `func` with.
+        max_workers (int): The number of concurrent calls.
+        requests_per_second (float): The maximum aggregate call rate.
+
+    Returns:
+        list: The results of `func`, in the order of `items`.
+    """
+    rate_limiter = RateLimiter(requests_per_second)
+    thread_local = threading.local()
+    factory = GoogleClientFactory()
+
+    def call(item):
+        if not hasattr(thread_local, "http"):
+            thread_local.http = factory.create_authorized_http()
+        rate_limiter.acquire()
+        return func(item, thread_local.http)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(call, items))
+
+
 def subscribe_chat(project_id, space_id, subscription_id, topic_id):
-    """Subscribes to Google Chat space events using Pub/Sub and the Workspace Events API."""
+    """Subscribes to Google Chat space events via Pub/Sub and Workspace Events."""
 
-    event_types = [
-        "google.workspace.chat.message.v1.created",
-        "google.workspace.chat.message.v1.deleted",
-    ]
+    event_types = CHAT_MESSAGE_EVENT_TYPES
 
     create_pubsub_topic(project_id, topic_id)
 
@@ -128,3 +238,166 @@ def subscribe_chat(project_id, space_id, subscription_id, topic_id):
     )
 
     return response
+
+
+def list_workspaces_subscriptions(event_types=CHAT_MESSAGE_EVENT_TYPES):
+    """
+    Lists the live Workspace Events subscriptions for the given event types.
+
+    Args:
+        event_types (list): The event types the subscriptions must listen for.
+
+    Returns:
+        list: The Workspace Events subscription resources (dict).
+
+    Raises:
+        googleapiclient.errors.HttpError: If an error occurs during the API call.
+    """
+    client = GoogleClientFactory().create_workspaceevents_client()
+    event_filter = " OR ".join(
+        f'event_types:"{event_type}"' for event_type in event_types
+    )
+
+    subscriptions = []
+    page_token = None
+    while True:
+        response = (
+            client
+            .subscriptions()
+            .list(filter=event_filter, pageToken=page_token)
+            .execute()
+        )
+        subscriptions.extend(response.get("subscriptions", []))
+        page_token = response.get("nextPageToken")
+        if not page_token:
+            break
+    return subscriptions
+
+
+def list_subscribed_space_ids(pubsub_topic=None, event_types=CHAT_MESSAGE_EVENT_TYPES):
+    """
+    Lists the IDs of the Chat spaces that already have a Workspace Events subscription.
+
+    Args:
+        pubsub_topic (str, optional): The full path of the Pub/Sub topic the
+            subscriptions must publish to, defaults to any topic.
+        event_types (list): The event types the subscriptions must listen for.
+
+    Returns:
+        set: The IDs of the subscribed Chat spaces.
+
+    Raises:
+        googleapiclient.errors.HttpError: If an error occurs during the API call.
+    """
+    space_ids = set()
+    for subscription in list_workspaces_subscriptions(event_types):
+        _, space_id, topic, _ = parse_workspaces_subscription(subscription)
+        if space_id and (pubsub_topic is None or topic == pubsub_topic):
+            space_ids.add(space_id)
+    return space_ids
+
+
+def subscribe_chat_spaces(
+    project_id,
+    subscription_id,
+    topic_id,
+    space_ids=None,
+    max_workers=DEFAULT_SUBSCRIBE_MAX_WORKERS,
+    requests_per_second=DEFAULT_SUBSCRIBE_REQUESTS_PER_SECOND,
+):
+    """
+    Subscribes to the events of many Google Chat spaces at once.
+
+    The Pub/Sub topic and subscription are created once and reused if they already
+    exist. Spaces that already have a Workspace Events subscription to the topic are
+    skipped, and the remaining ones are subscribed concurrently, with the aggregate
+    request rate capped by a shared rate limiter. Each worker thread uses its own
+    authorized HTTP transport.
+
+    Args:
+        project_id (str): The ID of your Google Cloud project.
+        subscription_id (str): The Pub/Sub subscription ID to create or reuse.
+        topic_id (str): The Pub/Sub topic ID to create or reuse.
+        space_ids (iterable, optional): The IDs of the spaces to subscribe, defaults to
+            all spaces returned by `get_chat_spaces`.
+        max_workers (int): The number of concurrent subscription requests.
+        requests_per_second (float): The maximum aggregate subscription request rate.
+
+    Returns:
+        dict: The "created", "skipped" and "failed" space IDs. "failed" maps each space
+        ID to its error message.
+
+    Raises:
+        ValueError: If project_id, topic_id or subscription_id is empty.
+    """
+    if not project_id or not topic_id or not subscription_id:
+        raise ValueError(
+            "project_id and topic_id and subscription_id must be provided."
+        )
+
+    if space_ids is None:
+        space_ids = get_chat_spaces(DEFAULT_SPACE_TYPE, DEFAULT_PAGE_SIZE).keys()
+    space_ids = list(space_ids)
+
+    create_pubsub_topic(project_id, topic_id)
+    create_subscription(project_id, topic_id, subscription_id)
+
+    subscribed_space_ids = list_subscribed_space_ids(
+        PUBSUB_TOPIC_PATH_FORMAT.format(project_id=project_id, topic_id=topic_id)
+    )
+    skipped = [space_id for space_id in space_ids if space_id in subscribed_space_ids]
+    pending = [
+        space_id for space_id in space_ids if space_id not in subscribed_space_ids
+    ]
+
+    def subscribe_space(space_id, authorized_http):
+        try:
+            create_workspaces_subscriptions(
+                project_id,
+                topic_id,
+                space_id,
+                CHAT_MESSAGE_EVENT_TYPES,
+                authorized_http=authorized_http,
+            )
+        except HttpError as e:
+            if e.resp.status == http.client.CONFLICT:
+                logging.debug(
+                    LazyMessage(
+                        WORKSPACE_SUBSCRIPTION_EXISTS_DEBUG_MSG, space_id=space_id
+                    )
+                )
+                return space_id, False, None
+            logging.error(
+                WORKSPACE_SUBSCRIPTION_FAILED_ERROR_MSG.format(
+                    space_id=space_id, error=e
+                )
+            )
+            return space_id, False, str(e)
+        except Exception as e:
+            logging.error(
+                WORKSPACE_SUBSCRIPTION_FAILED_ERROR_MSG.format(
+                    space_id=space_id, error=e
+                )
+            )
+            return space_id, False, str(e)
+        return space_id, True, None
+
+    result = {"created": [], "skipped": skipped, "failed": {}}
+    for space_id, created, error in map_rate_limited(
+        subscribe_space, pending, max_workers, requests_per_second
+    ):
+        if error:
+            result["failed"][space_id] = error
+        elif created:
+            result["created"].append(space_id)
+        else:
+            result["skipped"].append(space_id)
+
+    logging.info(
+        BULK_SUBSCRIBE_INFO_MSG.format(
+            created=len(result["created"]),
+            skipped=len(result["skipped"]),
+            failed=len(result["failed"]),
+        )
+    )
+    return result
@@ -1 +1,353 @@
-# Implement pull_messages(subscription_id， project_id)
+"""Streaming-pull subscriber that stores Google Chat events in Redis."""
+
+from google.authentication_utils import GoogleClientFactory
+from google.chat_utils import list_directory_all_people_ldap
+from google.cloud.pubsub_v1.types import FlowControl
+from redis_dal.redis_utils import store_messages_batch
+from redis_dal.message_dedup import MessageDeduplicator
+from redis_dal.watermarks import record_subscriber_heartbeat, update_realtime_watermarks
+from redis_dal.constants import MESSAGE_TYPE_DELETE
+from tools.log.logger import LazyMessage, setup_logger
+from tools.metrics.metrics import SKIPPED_SENDERS
+from tools.profiling.profiler import profiled
+from google.constants import (
+    CE_TYPE_ATTRIBUTE,
+    CE_TIME_ATTRIBUTE,
+    EVENT_TYPE_MESSAGE_CREATED,
+    EVENT_TYPE_MESSAGE_DELETED,
+    MESSAGE_TYPE_CREATE,
+    DEFAULT_SUBSCRIBER_MAX_MESSAGES,
+    DEFAULT_SUBSCRIBER_MAX_BYTES,
+    DEFAULT_SUBSCRIBER_BATCH_SIZE,
+    DEFAULT_SUBSCRIBER_FLUSH_INTERVAL_SECONDS,
+    DEFAULT_HEARTBEAT_TOLERANCE_SECONDS,
+    SENDER_LDAP_NOT_FOUND_DEBUG_MSG,
+    SUBSCRIBER_STARTED_INFO_MSG,
+    SUBSCRIBER_STOPPED_INFO_MSG,
+    UNSUPPORTED_EVENT_DEBUG_MSG,
+    INVALID_EVENT_ERROR_MSG,
+    DEDUP_CHECK_ERROR_MSG,
+    COMMITTED_BATCH_INFO_MSG,
+    COMMIT_BATCH_ERROR_MSG,
+    WATERMARK_UPDATE_ERROR_MSG,
+)
+from datetime import datetime
+import functools
+import json
+import logging
+import threading
+import time
+
+setup_logger()
+
+
+class ChatEventSubscriber:
+    """
+    Consumes Google Chat events from a Pub/Sub subscription and commits them to Redis.
+
+    Messages are received through a streaming pull whose outstanding messages and bytes
+    are bounded by a `FlowControl`. Decoded events are buffered and written to Redis in
+    pipelined batches, either when the buffer reaches `batch_size` or every
+    `flush_interval` seconds. A Pub/Sub message is acknowledged only after the batch
+    that contains it has been committed; if the commit fails the whole batch is nacked
+    and redelivered. Redelivered and duplicate events are dropped by a
+    `MessageDeduplicator` before they are buffered, and events are marked as seen in the
+    transaction that commits them, so a failed or interrupted commit never drops their
+    redelivery. Committed batches raise the per-space real-time watermarks, and the run
+    loop records a heartbeat, which the gap reconciler uses to tell which spaces and
+    time ranges real-time ingestion has covered.
+
+    Attributes:
+        subscription_path (str): The fully qualified Pub/Sub subscription path.
+        flow_control (google.cloud.pubsub_v1.types.FlowControl): The streaming pull
+            limits.
+        batch_size (int): The number of buffered events that triggers a flush.
+        flush_interval (float): The maximum number of seconds an event stays buffered.
+        deduplicator (redis_dal.message_dedup.MessageDeduplicator): The dedup layer.
+    """
+
+    def __init__(
+        self,
+        project_id,
+        subscription_id,
+        max_messages=DEFAULT_SUBSCRIBER_MAX_MESSAGES,
+        max_bytes=DEFAULT_SUBSCRIBER_MAX_BYTES,
+        batch_size=DEFAULT_SUBSCRIBER_BATCH_SIZE,
+        flush_interval=DEFAULT_SUBSCRIBER_FLUSH_INTERVAL_SECONDS,
+        deduplicator=None,
+    ):
+        """
+        Initializes the subscriber.
+
+        Args:
+            project_id (str): The ID of your Google Cloud project.
+            subscription_id (str): The Pub/Sub subscription ID to pull from.
+            max_messages (int): The maximum number of outstanding (unacked) messages.
+            max_bytes (int): The maximum size in bytes of outstanding messages.
+            batch_size (int): The number of buffered events that triggers a flush.
+            flush_interval (float): The maximum number of seconds an event stays
+                buffered.
+            deduplicator (redis_dal.message_dedup.MessageDeduplicator, optional): The
+                dedup layer to use, a new one is created if omitted.
+
+        Raises:
+            ValueError: If project_id or subscription_id is empty.
+        """
+        if not project_id or not subscription_id:
+            raise ValueError("project_id and subscription_id must be provided.")
+
+        self._subscriber = GoogleClientFactory().create_subscriber_client()
+        self.subscription_path = self._subscriber.subscription_path(
+            project_id, subscription_id
+        )
+        self.flow_control = FlowControl(max_messages=max_messages, max_bytes=max_bytes)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.deduplicator = deduplicator or MessageDeduplicator()
+
+        self._people_dict = None
+        self._buffer = []
+        self._buffer_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+    def _resolve_sender_ldap(self, message):
+        """Returns the LDAP of the message sender, or an empty string if unknown."""
+        if self._people_dict is None:
+            self._people_dict = list_directory_all_people_ldap()
+        sender_id = message.get("sender", {}).get("name", "").split("/")[-1]
+        return self._people_dict.get(sender_id, "")
+
+    def decode_event(self, pubsub_message):
+        """
+        Decodes a Pub/Sub message published by the Workspace Events API.
+
+        Args:
+            pubsub_message (google.cloud.pubsub_v1.subscriber.message.Message): The
+                received Pub/Sub message.
+
+        Returns:
+            tuple: A (sender_ldap, message, message_type) entry for
+            `store_messages_batch`, or None if the event should be acknowledged without
+            being stored.
+
+        Raises:
+            ValueError: If the message data is not a valid JSON Chat event.
+        """
+        event_type = pubsub_message.attributes.get(CE_TYPE_ATTRIBUTE)
+        if event_type not in (EVENT_TYPE_MESSAGE_CREATED, EVENT_TYPE_MESSAGE_DELETED):
+            logging.debug(
+                LazyMessage(UNSUPPORTED_EVENT_DEBUG_MSG, event_type=event_type)
+            )
+            return None
+
+        message = json.loads(pubsub_message.data).get("message")
+        if not message or not message.get("name"):
+            raise ValueError("Chat event does not contain a message resource.")
+
+        if event_type == EVENT_TYPE_MESSAGE_DELETED:
+            return None, message, MESSAGE_TYPE_DELETE
+
+        sender_ldap = self._resolve_sender_ldap(message)
+        if not sender_ldap:
+            logging.debug(
+                LazyMessage(
+                    SENDER_LDAP_NOT_FOUND_DEBUG_MSG,
+                    sender_id=message.get("sender", {}).get("name"),
+                    message=message,
+                )
+            )
+            SKIPPED_SENDERS.labels(source="pubsub").inc()
+            return None
+        return sender_ldap, message, MESSAGE_TYPE_CREATE
+
+    def callback(self, pubsub_message):
+        """
+        Buffers a received Pub/Sub message, flushing the buffer once it is full.
+
+        Args:
+            pubsub_message (google.cloud.pubsub_v1.subscriber.message.Message): The
+                received Pub/Sub message.
+        """
+        try:
+            entry = self.decode_event(pubsub_message)
+        except ValueError as e:
+            logging.error(
+                INVALID_EVENT_ERROR_MSG.format(
+                    message_id=pubsub_message.message_id, error=e
+                )
+            )
+            pubsub_message.ack()
+            return
+
+        event_key = None
+        if entry is not None:
+            _, message, message_type = entry
+            event_key = f"{message_type}:{message['name']}"
+            try:
+                is_duplicate = self.deduplicator.is_duplicate(event_key)
+            except Exception as e:
+                logging.error(
+                    DEDUP_CHECK_ERROR_MSG.format(event_key=event_key, error=e)
+                )
+                pubsub_message.nack()
+                return
+            if is_duplicate:
+                pubsub_message.ack()
+                return
+
+        with self._buffer_lock:
+            self._buffer.append((pubsub_message, entry, event_key))
+            is_full = len(self._buffer) >= self.batch_size
+
+        if is_full:
+            self.flush()
+
+    @profiled("subscriber_batch")
+    def flush(self):
+        """
+        Commits the buffered events to Redis and acknowledges their Pub/Sub messages.
+
+        Returns:
+            int: The number of events committed to Redis.
+        """
+        with self._flush_lock:
+            with self._buffer_lock:
+                batch, self._buffer = self._buffer, []
+            if not batch:
+                return 0
+
+            # Events of a space may arrive out of order across the stream; a stable sort
+            # on the CloudEvents time applies them in the order they happened.
+            ordered = sorted(
+                batch,
+                key=lambda item: item[0].attributes.get(CE_TIME_ATTRIBUTE, ""),
+            )
+            entries = [entry for _, entry, _ in ordered if entry is not None]
+            event_keys = [event_key for _, _, event_key in batch if event_key]
+            try:
+                committed_count = (
+                    store_messages_batch(
+                        entries,
+                        queue_commands=functools.partial(
+                            self.deduplicator.queue_mark_seen, event_keys=event_keys
+                        ),
+                    )
+                    if entries
+                    else 0
+                )
+            except Exception as e:
+                logging.error(COMMIT_BATCH_ERROR_MSG.format(count=len(batch), error=e))
+                for pubsub_message, _, _ in batch:
+                    pubsub_message.nack()
+                return 0
+
+            self.deduplicator.remember(event_keys)
+            self._update_watermarks(entries)
+            for pubsub_message, _, _ in batch:
+                pubsub_message.ack()
+            logging.info(
+                COMMITTED_BATCH_INFO_MSG.format(count=committed_count, acked=len(batch))
+            )
+            return committed_count
+
+    def _update_watermarks(self, entries):
+        """Raises the real-time watermarks of the spaces of committed create events."""
+        watermarks = {}
+        for _, message, message_type in entries:
+            if message_type != MESSAGE_TYPE_CREATE:
+                continue
+            space_id = message.get("space", {}).get("name", "").split("/")[-1]
+            timestamp = datetime.fromisoformat(message["createTime"]).timestamp()
+            watermarks[space_id] = max(timestamp, watermarks.get(space_id, 0))
+        try:
+            update_realtime_watermarks(watermarks)
+        except Exception as e:
+            logging.error(WATERMARK_UPDATE_ERROR_MSG.format(error=e))
+
+    def _record_heartbeat(self):
+        """Records that the subscriber is alive, logging instead of failing."""
+        try:
+            record_subscriber_heartbeat(
+                self.subscription_path,
+                time.time(),
+                DEFAULT_HEARTBEAT_TOLERANCE_SECONDS,
+            )
+        except Exception as e:
+            logging.error(WATERMARK_UPDATE_ERROR_MSG.format(error=e))
+
+    def stop(self):
+        """Requests a running `run` loop to stop."""
+        self._stop_event.set()
+
+    def run(self, timeout=None):
+        """
+        Pulls messages until `stop` is called, the timeout elapses or the stream fails.
+
+        Args:
+            timeout (float, optional): The number of seconds to listen for, or None to
+                listen until stopped.
+        """
+        streaming_pull_future = self._subscriber.subscribe(
+            self.subscription_path,
+            callback=self.callback,
+            flow_control=self.flow_control,
+        )
+        logging.info(
+            SUBSCRIBER_STARTED_INFO_MSG.format(
+                subscription_path=self.subscription_path,
+                max_messages=self.flow_control.max_messages,
+                max_bytes=self.flow_control.max_bytes,
+            )
+        )
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        self._record_heartbeat()
+        try:
+            while not self._stop_event.wait(self.flush_interval):
+                self.flush()
+                self._record_heartbeat()
+                if streaming_pull_future.done():
+                    break
+                if deadline is not None and time.monotonic() >= deadline:
+                    break
+        finally:
+            self.flush()
+            streaming_pull_future.cancel()
+            streaming_pull_future.result()
+            self.deduplicator.log_metrics()
+            logging.info(
+                SUBSCRIBER_STOPPED_INFO_MSG.format(
+                    subscription_path=self.subscription_path
+                )
+            )
+
+
+def pull_messages(
+    project_id,
+    subscription_id,
+    max_messages=DEFAULT_SUBSCRIBER_MAX_MESSAGES,
+    max_bytes=DEFAULT_SUBSCRIBER_MAX_BYTES,
+    timeout=None,
+):
+    """
+    Runs a streaming-pull subscriber that stores Google Chat events in Redis.
+
+    Args:
+        project_id (str): The ID of your Google Cloud project.
+        subscription_id (str): The Pub/Sub subscription ID to pull from.
+        max_messages (int): The maximum number of outstanding (unacked) messages.
+        max_bytes (int): The maximum size in bytes of outstanding messages.
+        timeout (float, optional): The number of seconds to listen for, or None to
+            listen until the stream fails.
+
+    Returns:
+        None.
+
+    Raises:
+        ValueError: If project_id or subscription_id is empty.
+    """
+    subscriber = ChatEventSubscriber(
+        project_id, subscription_id, max_messages=max_messages, max_bytes=max_bytes
+    )
+    subscriber.run(timeout=timeout)
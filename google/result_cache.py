@@ -0,0 +1,193 @@
+"""Read-through cache of query endpoint responses, with ETag revalidation."""
+
+from flask import current_app, make_response, request
+from redis_dal.query_versions import get_versions
+from collections import OrderedDict
+import functools
+import hashlib
+import http.client
+import threading
+import time
+from google.constants import (
+    DEFAULT_RESULT_CACHE_SIZE,
+    DEFAULT_RESULT_CACHE_MAX_BYTES,
+    DEFAULT_RESULT_CACHE_TTL_SECONDS,
+)
+
+
+class ResultCache:
+    """
+    A bounded in-process cache of query results with TTL and LRU eviction.
+
+    The cache is bounded both by its number of entries and by the total size of the
+    cached values, so a few large results, such as message query pages, cannot grow it
+    without limit. A value larger than the whole byte budget is not cached.
+
+    Every entry records the versions of the scopes its query depends on, see
+    `redis_dal.query_versions`. A lookup is only a hit if those versions are unchanged,
+    so a write to a space or sender invalidates every cached result that covers it, and
+    the TTL bounds the staleness of queries that depend on the current time.
+
+    Attributes:
+        max_size (int): The maximum number of cached results.
+        max_bytes (int): The maximum total size of the cached results, in bytes.
+        ttl_seconds (float): How long a result is served from the cache.
+        hits (int): The number of lookups answered from the cache.
+        misses (int): The number of lookups that were not.
+    """
+
+    def __init__(
+        self,
+        max_size=DEFAULT_RESULT_CACHE_SIZE,
+        ttl_seconds=DEFAULT_RESULT_CACHE_TTL_SECONDS,
+        max_bytes=DEFAULT_RESULT_CACHE_MAX_BYTES,
+    ):
+        """
+        Initializes an empty cache.
+
+        Args:
+            max_size (int): The maximum number of cached results.
+            ttl_seconds (float): How long a result is served from the cache.
+            max_bytes (int): The maximum total size of the cached results, in bytes.
+        """
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, versions):
+        """
+        Returns the value cached for a key at the given versions.
+
+        Args:
+            key (hashable): The normalized query.
+            versions (tuple): The current versions of the scopes of the query.
+
+        Returns:
+            The cached value, or None if it is missing, expired or stale.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != versions or entry[1] < time.monotonic():
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, key, versions, value, size=0):
+        """
+        Caches a value, evicting the least recently used entries if the cache is full.
+
+        Args:
+            key (hashable): The normalized query.
+            versions (tuple): The versions of the scopes the value was computed at.
+            value: The value to cache.
+            size (int): The size of the value in bytes, counted against `max_bytes`.
+        """
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[3]
+            if size > self.max_bytes:
+                return
+            expires_at = time.monotonic() + self.ttl_seconds
+            self._entries[key] = (versions, expires_at, value, size)
+            self._bytes += size
+            while len(self._entries) > self.max_size or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted[3]
+
+    def clear(self):
+        """Removes every cached entry."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def get_metrics(self):
+        """
+        Returns the hit and miss counters of the cache.
+
+        Returns:
+            dict: The hits, misses, hit rate, number of cached entries and their
+            total size in bytes.
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "size": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+
+result_cache = ResultCache()
+
+
+def normalize_query(path, args):
+    """
+    Returns a cache key for a request that ignores parameter and list order.
+
+    Args:
+        path (str): The request path.
+        args (werkzeug.datastructures.MultiDict): The query parameters.
+
+    Returns:
+        tuple: The path and the sorted (name, value) pairs, with comma-separated values
+        split, stripped and sorted.
+    """
+    params = []
+    for name in sorted(args):
+        for value in args.getlist(name):
+            items = sorted(item.strip() for item in value.split(","))
+            params.append((name, ",".join(items)))
+    return path, tuple(params)
+
+
+def cached_response(get_scopes):
+    """
+    Decorates a JSON query view, sync or async, with the read-through result cache and
+    ETags.
+
+    Successful responses are cached until a write bumps the version of one of the
+    scopes returned by `get_scopes` or the TTL expires. Every response carries a strong
+    ETag of its body, and a request whose `If-None-Match` matches it gets an empty
+    304 Not Modified instead of the body.
+
+    Args:
+        get_scopes (callable): Returns the version scopes of a request from its query
+            parameters, see `redis_dal.query_versions.get_version_scopes`.
+
+    Returns:
+        callable: The decorator.
+    """
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            key = normalize_query(request.path, request.args)
+            versions = get_versions(get_scopes(request.args))
+            cached = result_cache.get(key, versions)
+            if cached is None:
+                response = make_response(current_app.ensure_sync(view)(*args, **kwargs))
+                if response.status_code != http.client.OK:
+                    return response
+                body = response.get_data()
+                cached = (body, response.mimetype, hashlib.sha1(body).hexdigest())
+                result_cache.put(key, versions, cached, len(body))
+            body, mimetype, etag = cached
+            response = make_response(body, http.client.OK)
+            response.mimetype = mimetype
+            response.set_etag(etag)
+            response.headers["Cache-Control"] = "no-cache"
+            return response.make_conditional(request.environ)
+
+        return wrapper
+
+    return decorator
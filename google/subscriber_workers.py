@@ -0,0 +1,310 @@
+"""Horizontally scaled subscriber workers with per-space affinity."""
+
+from google.authentication_utils import GoogleClientFactory
+from google.pubsub_publisher import create_pubsub_topic, create_subscription
+from google.pubsub_subscriber_store import pull_messages
+from google.cloud.pubsub_v1.types import FlowControl
+from tools.log.logger import setup_logger
+from google.constants import (
+    CE_SUBJECT_ATTRIBUTE,
+    SHARD_ATTRIBUTE,
+    SHARD_SUBSCRIPTION_ID_FORMAT,
+    DEFAULT_HASH_RING_REPLICAS,
+    DEFAULT_SUBSCRIBER_MAX_MESSAGES,
+    DEFAULT_SUBSCRIBER_MAX_BYTES,
+    RELAY_PUBLISH_ERROR_MSG,
+    RELAY_STARTED_INFO_MSG,
+    WORKERS_STARTED_INFO_MSG,
+)
+import argparse
+import bisect
+import hashlib
+import json
+import logging
+import multiprocessing
+
+setup_logger()
+
+
+class HashRing:
+    """
+    A consistent hash ring mapping Chat space IDs to shards.
+
+    Every shard is placed on the ring at `replicas` pseudo-random points. A space
+    belongs to the first shard point at or after the hash of its ID, so adding or
+    removing a shard only moves about 1/N of the spaces to a different shard.
+
+    Attributes:
+        num_shards (int): The number of shards on the ring.
+    """
+
+    def __init__(self, num_shards, replicas=DEFAULT_HASH_RING_REPLICAS):
+        """
+        Builds the ring.
+
+        Args:
+            num_shards (int): The number of shards on the ring.
+            replicas (int): The number of points per shard.
+
+        Raises:
+            ValueError: If num_shards is not positive.
+        """
+        if num_shards < 1:
+            raise ValueError("num_shards must be positive.")
+        self.num_shards = num_shards
+        points = sorted(
+            (self._hash(f"{shard}:{replica}"), shard)
+            for shard in range(num_shards)
+            for replica in range(replicas)
+        )
+        self._hashes = [point_hash for point_hash, _ in points]
+        self._shards = [shard for _, shard in points]
+
+    @staticmethod
+    def _hash(key):
+        """Returns a stable 64-bit hash of a string, identical across processes."""
+        return int.from_bytes(hashlib.md5(key.encode("utf-8")).digest()[:8], "big")
+
+    def get_shard(self, space_id):
+        """
+        Returns the shard that owns a space.
+
+        Args:
+            space_id (str): The ID of the Chat space.
+
+        Returns:
+            int: The shard index, between 0 and num_shards - 1.
+        """
+        index = bisect.bisect(self._hashes, self._hash(space_id)) % len(self._hashes)
+        return self._shards[index]
+
+
+def shard_subscription_id(subscription_id, shard):
+    """Returns the ID of the Pub/Sub subscription that delivers one shard."""
+    return SHARD_SUBSCRIPTION_ID_FORMAT.format(
+        subscription_id=subscription_id, shard=shard
+    )
+
+
+def create_shard_subscriptions(project_id, shard_topic_id, subscription_id, num_shards):
+    """
+    Creates the shard topic and one filtered subscription per shard.
+
+    The relay tags every message with its shard in the `shard` attribute, and each shard
+    subscription only receives the messages tagged with its own index, so each space is
+    delivered to exactly one worker.
+
+    Args:
+        project_id (str): The ID of your Google Cloud project.
+        shard_topic_id (str): The ID of the topic the relay publishes to.
+        subscription_id (str): The prefix of the shard subscription IDs.
+        num_shards (int): The number of shards.
+
+    Returns:
+        list: The paths of the shard subscriptions.
+    """
+    create_pubsub_topic(project_id, shard_topic_id)
+    return [
+        create_subscription(
+            project_id,
+            shard_topic_id,
+            shard_subscription_id(subscription_id, shard),
+            filter_expression=f'attributes.{SHARD_ATTRIBUTE} = "{shard}"',
+        )
+        for shard in range(num_shards)
+    ]
+
+
+def get_event_space_id(pubsub_message):
+    """
+    Extracts the Chat space ID of a Workspace Events Pub/Sub message.
+
+    Args:
+        pubsub_message (google.cloud.pubsub_v1.subscriber.message.Message): The
+            received Pub/Sub message.
+
+    Returns:
+        str: The space ID, or an empty string if the message has none.
+    """
+    subject = pubsub_message.attributes.get(CE_SUBJECT_ATTRIBUTE, "")
+    if "/spaces/" in subject:
+        return subject.split("/spaces/")[1].split("/")[0]
+    try:
+        message = json.loads(pubsub_message.data).get("message", {})
+    except ValueError:
+        return ""
+    return message.get("name", "").split("/messages/")[0].split("/")[-1]
+
+
+class SpaceShardRelay:
+    """
+    Fans the Workspace Events subscription out to per-shard subscriptions.
+
+    Messages are pulled from the subscription that receives Workspace Events, tagged
+    with the shard owning their space on the consistent hash ring, and republished to
+    the shard topic with their data and attributes unchanged. A source message is acked
+    only once its republish succeeded.
+
+    Attributes:
+        subscription_path (str): The source Pub/Sub subscription path.
+        topic_path (str): The shard topic path.
+        hash_ring (HashRing): The space to shard mapping.
+    """
+
+    def __init__(
+        self,
+        project_id,
+        subscription_id,
+        shard_topic_id,
+        num_shards,
+        max_messages=DEFAULT_SUBSCRIBER_MAX_MESSAGES,
+        max_bytes=DEFAULT_SUBSCRIBER_MAX_BYTES,
+    ):
+        """
+        Initializes the relay.
+
+        Args:
+            project_id (str): The ID of your Google Cloud project.
+            subscription_id (str): The subscription receiving Workspace Events.
+            shard_topic_id (str): The ID of the topic the relay publishes to.
+            num_shards (int): The number of shards.
+            max_messages (int): The maximum number of outstanding (unacked) messages.
+            max_bytes (int): The maximum size in bytes of outstanding messages.
+        """
+        factory = GoogleClientFactory()
+        self._subscriber = factory.create_subscriber_client()
+        self._publisher = factory.create_publisher_client()
+        self.subscription_path = self._subscriber.subscription_path(
+            project_id, subscription_id
+        )
+        self.topic_path = self._publisher.topic_path(project_id, shard_topic_id)
+        self.hash_ring = HashRing(num_shards)
+        self.flow_control = FlowControl(max_messages=max_messages, max_bytes=max_bytes)
+
+    def callback(self, pubsub_message):
+        """
+        Republishes a received message to the shard owning its space.
+
+        Args:
+            pubsub_message (google.cloud.pubsub_v1.subscriber.message.Message): The
+                received Pub/Sub message.
+        """
+        attributes = dict(pubsub_message.attributes)
+        attributes[SHARD_ATTRIBUTE] = str(
+            self.hash_ring.get_shard(get_event_space_id(pubsub_message))
+        )
+        publish_future = self._publisher.publish(
+            self.topic_path, pubsub_message.data, **attributes
+        )
+
+        def on_published(future):
+            try:
+                future.result()
+            except Exception as e:
+                logging.error(
+                    RELAY_PUBLISH_ERROR_MSG.format(
+                        message_id=pubsub_message.message_id, error=e
+                    )
+                )
+                pubsub_message.nack()
+                return
+            pubsub_message.ack()
+
+        publish_future.add_done_callback(on_published)
+
+    def run(self, timeout=None):
+        """
+        Relays messages until the timeout elapses or the stream fails.
+
+        Args:
+            timeout (float, optional): The number of seconds to relay for, or None to
+                relay until the stream fails.
+        """
+        streaming_pull_future = self._subscriber.subscribe(
+            self.subscription_path,
+            callback=self.callback,
+            flow_control=self.flow_control,
+        )
+        logging.info(
+            RELAY_STARTED_INFO_MSG.format(
+                subscription_path=self.subscription_path,
+                num_shards=self.hash_ring.num_shards,
+                topic_path=self.topic_path,
+            )
+        )
+        try:
+            streaming_pull_future.result(timeout=timeout)
+        except TimeoutError:
+            pass
+        finally:
+            streaming_pull_future.cancel()
+
+
+def run_subscriber_workers(project_id, subscription_id, shards, timeout=None):
+    """
+    Runs one subscriber process per shard on this node and waits for them.
+
+    Each node of a multi-node deployment passes the shards it owns, e.g. node 0 of 2
+    running shards [0, 1] and node 1 running shards [2, 3] for four shards. Processes
+    are spawned rather than forked, since gRPC channels do not survive a fork.
+
+    Args:
+        project_id (str): The ID of your Google Cloud project.
+        subscription_id (str): The prefix of the shard subscription IDs.
+        shards (list): The shard indexes to run on this node.
+        timeout (float, optional): The number of seconds each worker listens for.
+    """
+    context = multiprocessing.get_context("spawn")
+    workers = [
+        context.Process(
+            target=pull_messages,
+            args=(project_id, shard_subscription_id(subscription_id, shard)),
+            kwargs={"timeout": timeout},
+            daemon=True,
+        )
+        for shard in shards
+    ]
+    for worker in workers:
+        worker.start()
+    logging.info(WORKERS_STARTED_INFO_MSG.format(shards=list(shards)))
+    for worker in workers:
+        worker.join()
+
+
+def main(argv=None):
+    """Command line entry point for the relay and the subscriber workers."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("mode", choices=["setup", "relay", "workers"])
+    parser.add_argument("--project-id", required=True)
+    parser.add_argument("--subscription-id", required=True)
+    parser.add_argument("--shard-topic-id")
+    parser.add_argument("--num-shards", type=int, required=True)
+    parser.add_argument(
+        "--shards",
+        type=int,
+        nargs="*",
+        help="The shards run by this node, defaults to all of them.",
+    )
+    args = parser.parse_args(argv)
+
+    if args.mode == "setup":
+        create_shard_subscriptions(
+            args.project_id,
+            args.shard_topic_id,
+            args.subscription_id,
+            args.num_shards,
+        )
+    elif args.mode == "relay":
+        SpaceShardRelay(
+            args.project_id,
+            args.subscription_id,
+            args.shard_topic_id,
+            args.num_shards,
+        ).run()
+    else:
+        shards = args.shards if args.shards else range(args.num_shards)
+        run_subscriber_workers(args.project_id, args.subscription_id, shards)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+from google.authentication_utils import GoogleClientFactory
+from google.pubsub_publisher import (
+    create_workspaces_subscriptions,
+    list_workspaces_subscriptions,
+    map_rate_limited,
+    parse_workspaces_subscription,
+)
+from redis_dal.watermarks import mark_space_live_since
+from redis_dal.workspace_subscription_store import (
+    get_tracked_workspace_subscriptions,
+    track_workspace_subscriptions,
+    untrack_workspace_subscriptions,
+)
+from googleapiclient.errors import HttpError
+from tools.log.logger import setup_logger
+from google.constants import (
+    CHAT_MESSAGE_EVENT_TYPES,
+    DEFAULT_RENEW_BEFORE_SECONDS,
+    DEFAULT_RENEWAL_INTERVAL_SECONDS,
+    DEFAULT_RENEWAL_BATCH_SIZE,
+    DEFAULT_SUBSCRIBE_MAX_WORKERS,
+    DEFAULT_SUBSCRIBE_REQUESTS_PER_SECOND,
+    RENEWAL_TTL,
+    RECONCILED_SUBSCRIPTIONS_INFO_MSG,
+    RENEWED_SUBSCRIPTIONS_INFO_MSG,
+    RENEW_SUBSCRIPTION_FAILED_ERROR_MSG,
+    RENEWAL_PASS_FAILED_ERROR_MSG,
+)
+import http.client
+import logging
+import threading
+import time
+
+setup_logger()
+
+
+def reconcile_workspace_subscriptions():
+    """
+    Reconciles the subscriptions tracked in Redis with the live Workspace Events list.
+
+    Live subscriptions are (re)tracked with their current expiry. Tracked subscriptions
+    that no longer exist and whose space has no other live subscription have lapsed;
+    they are kept with an expiry of 0 so that the next renewal pass recreates them.
+    Tracked subscriptions whose space is covered by another live subscription are stale
+    and are forgotten. This is how a subscription whose create operation was still
+    pending during a renewal pass gets tracked; if the stale subscription had expired,
+    its space is marked live from now on, with the lapse recorded as a gap.
+
+    Returns:
+        dict: The number of "live", "lapsed" and "stale" subscriptions.
+
+    Raises:
+        googleapiclient.errors.HttpError: If an error occurs during the API call.
+        redis.exceptions.RedisError: If an error occurs during Redis operations.
+    """
+    live = [
+        parse_workspaces_subscription(subscription)
+        for subscription in list_workspaces_subscriptions()
+    ]
+    live_names = {name for name, _, _, _ in live}
+    live_space_ids = {space_id for _, space_id, _, _ in live}
+
+    now = time.time()
+    lapsed = []
+    stale = []
+    tracked = get_tracked_workspace_subscriptions()
+    for name, space_id, pubsub_topic, expire_time in tracked:
+        if name in live_names:
+            continue
+        if space_id in live_space_ids or not space_id or not pubsub_topic:
+            stale.append(name)
+            if space_id in live_space_ids and expire_time <= now:
+                mark_space_live_since(space_id, now, expire_time)
+        else:
+            lapsed.append((name, space_id, pubsub_topic, 0))
+
+    track_workspace_subscriptions(live + lapsed)
+    untrack_workspace_subscriptions(stale)
+
+    result = {"live": len(live), "lapsed": len(lapsed), "stale": len(stale)}
+    logging.info(RECONCILED_SUBSCRIPTIONS_INFO_MSG.format(**result))
+    return result
+
+
+def _recreate_subscription(space_id, pubsub_topic, authorized_http, lapsed_since):
+    """
+    Recreates the subscription of a space whose previous subscription lapsed.
+
+    Real-time events of the space are only complete from now on, and the lapse from
+    `lapsed_since` on is recorded as a gap so that the gap reconciler catches it up.
+    If the create operation is still pending, nothing is recorded yet: the new
+    subscription is tracked, and the lapse recorded, by the next reconciliation.
+
+    Returns:
+        bool: True if the subscription was created, False if its creation is pending.
+    """
+    _, project_id, _, topic_id = pubsub_topic.split("/")
+    operation = create_workspaces_subscriptions(
+        project_id,
+        topic_id,
+        space_id,
+        CHAT_MESSAGE_EVENT_TYPES,
+        authorized_http=authorized_http,
+    )
+    if not operation.get("done"):
+        return False
+    mark_space_live_since(space_id, time.time(), lapsed_since)
+    return True
+
+
+def _renew_subscription(tracked, authorized_http, now):
+    """
+    Extends one tracked subscription to its maximum TTL, recreating it if it lapsed.
+
+    Returns:
+        tuple: (name, outcome, renewed) where outcome is "renewed", "recreated",
+        "pending" or "failed", and renewed is the refreshed tracking tuple of a renewed
+        subscription.
+    """
+    name, space_id, pubsub_topic, expire_time = tracked
+    client = GoogleClientFactory().create_workspaceevents_client()
+    try:
+        if expire_time > now:
+            try:
+                operation = (
+                    client
+                    .subscriptions()
+                    .patch(name=name, updateMask="ttl", body={"ttl": RENEWAL_TTL})
+                    .execute(http=authorized_http)
+                )
+                subscription = operation.get("response")
+                if not operation.get("done") or not subscription:
+                    subscription = (
+                        client
+                        .subscriptions()
+                        .get(name=name)
+                        .execute(http=authorized_http)
+                    )
+                return name, "renewed", parse_workspaces_subscription(subscription)
+            except HttpError as e:
+                if e.resp.status != http.client.NOT_FOUND:
+                    raise
+        if _recreate_subscription(space_id, pubsub_topic, authorized_http, expire_time):
+            return name, "recreated", None
+        return name, "pending", None
+    except Exception as e:
+        logging.error(RENEW_SUBSCRIPTION_FAILED_ERROR_MSG.format(name=name, error=e))
+        return name, "failed", None
+
+
+def renew_expiring_subscriptions(
+    renew_before_seconds=DEFAULT_RENEW_BEFORE_SECONDS,
+    batch_size=DEFAULT_RENEWAL_BATCH_SIZE,
+    max_workers=DEFAULT_SUBSCRIBE_MAX_WORKERS,
+    requests_per_second=DEFAULT_SUBSCRIBE_REQUESTS_PER_SECOND,
+):
+    """
+    Renews every tracked subscription that expires within `renew_before_seconds`.
+
+    Due subscriptions are read from Redis soonest expiry first, in batches of
+    `batch_size`. Each batch is renewed concurrently under a shared rate limit and its
+    new expiry times are written back to Redis in one pipeline. Subscriptions that have
+    already lapsed are recreated for their space and topic. A lapsed subscription whose
+    create operation is still pending stays tracked until
+    `reconcile_workspace_subscriptions` finds its replacement live.
+
+    Args:
+        renew_before_seconds (float): How long before expiry a subscription is renewed.
+        batch_size (int): The number of subscriptions renewed per batch.
+        max_workers (int): The number of concurrent renewal requests.
+        requests_per_second (float): The maximum aggregate renewal request rate.
+
+    Returns:
+        dict: The number of "renewed", "recreated", "pending" and "failed"
+        subscriptions.
+
+    Raises:
+        redis.exceptions.RedisError: If an error occurs during Redis operations.
+    """
+    now = time.time()
+    result = {"renewed": 0, "recreated": 0, "pending": 0, "failed": 0}
+    attempted = set()
+    while True:
+        due = [
+            tracked
+            for tracked in get_tracked_workspace_subscriptions(
+                now + renew_before_seconds, limit=batch_size + len(attempted)
+            )
+            if tracked[0] not in attempted
+        ][:batch_size]
+        if not due:
+            break
+        attempted.update(name for name, _, _, _ in due)
+
+        outcomes = map_rate_limited(
+            lambda tracked, authorized_http: _renew_subscription(
+                tracked, authorized_http, now
+            ),
+            due,
+            max_workers,
+            requests_per_second,
+        )
+        renewed = [tracking for _, outcome, tracking in outcomes if tracking]
+        recreated = [name for name, outcome, _ in outcomes if outcome == "recreated"]
+        track_workspace_subscriptions(renewed)
+        untrack_workspace_subscriptions(recreated)
+
+        result["renewed"] += len(renewed)
+        result["recreated"] += len(recreated)
+        result["pending"] += sum(
+            1 for _, outcome, _ in outcomes if outcome == "pending"
+        )
+        result["failed"] += sum(1 for _, outcome, _ in outcomes if outcome == "failed")
+
+    logging.info(RENEWED_SUBSCRIPTIONS_INFO_MSG.format(**result))
+    return result
+
+
+def run_renewal_scheduler(
+    interval_seconds=DEFAULT_RENEWAL_INTERVAL_SECONDS,
+    renew_before_seconds=DEFAULT_RENEW_BEFORE_SECONDS,
+    stop_event=None,
+):
+    """
+    Keeps Workspace Events subscriptions alive until `stop_event` is set.
+
+    Every `interval_seconds`, the tracked set is reconciled against the live list, which
+    also picks up subscriptions whose create operation was pending, and due
+    subscriptions are renewed. `renew_before_seconds` should be comfortably larger than
+    `interval_seconds` so that no subscription expires between two passes. A pass that
+    fails, e.g. on a transient API or Redis error, is logged and retried on the next
+    one, so the scheduler keeps running.
+
+    Args:
+        interval_seconds (float): The number of seconds between renewal passes.
+        renew_before_seconds (float): How long before expiry a subscription is renewed.
+        stop_event (threading.Event, optional): An event that stops the scheduler.
+
+    Returns:
+        None.
+    """
+    stop_event = stop_event or threading.Event()
+    while True:
+        try:
+            reconcile_workspace_subscriptions()
+            renew_expiring_subscriptions(renew_before_seconds=renew_before_seconds)
+        except Exception as e:
+            logging.exception(
+                RENEWAL_PASS_FAILED_ERROR_MSG.format(interval=interval_seconds, error=e)
+            )
+        if stop_event.wait(interval_seconds):
+            break
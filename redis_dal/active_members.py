@@ -0,0 +1,122 @@
+from redis_dal.redis_client_factory import RedisClientFactory
+from redis_dal.leaderboard import get_period_bucket
+from datetime import date, timedelta
+import time
+from redis_dal.constants import (
+    ACTIVE_MEMBERS_KEY_FORMAT,
+    ACTIVE_SPACES_KEY_FORMAT,
+    LEADERBOARD_GLOBAL_SCOPE,
+    LEADERBOARD_SPACE_SCOPE_FORMAT,
+    PERIOD_DAY,
+    MAX_ACTIVE_DAYS,
+)
+
+
+def _get_scope(space_id):
+    """Returns the key scope of a space, or the global scope."""
+    if space_id:
+        return LEADERBOARD_SPACE_SCOPE_FORMAT.format(space_id=space_id)
+    return LEADERBOARD_GLOBAL_SCOPE
+
+
+def queue_record_activity(pipeline, space_id, sender_ldap, score):
+    """
+    Queues the HyperLogLog updates of one stored message on a Redis pipeline.
+
+    The sender is added to the active members of its space and of all spaces for the
+    UTC day of the message, and the space to the active spaces of that day. Deleting the
+    message does not remove the sender, since a HyperLogLog cannot forget an element.
+
+    Args:
+        pipeline (redis.client.Pipeline): The pipeline to queue the commands on.
+        space_id (str): The ID of the Chat space of the message.
+        sender_ldap (str): The LDAP identifier of the message sender.
+        score (float): The epoch createTime of the message.
+    """
+    day = get_period_bucket(PERIOD_DAY, score)
+    pipeline.pfadd(
+        ACTIVE_MEMBERS_KEY_FORMAT.format(scope=_get_scope(space_id), day=day),
+        sender_ldap,
+    )
+    pipeline.pfadd(
+        ACTIVE_MEMBERS_KEY_FORMAT.format(scope=_get_scope(None), day=day), sender_ldap
+    )
+    pipeline.pfadd(ACTIVE_SPACES_KEY_FORMAT.format(day=day), space_id)
+
+
+def _get_days(start_date, end_date):
+    """
+    Returns the "YYYY-MM-DD" days from start_date to end_date, both included.
+
+    PFCOUNT merges one 12 KB HyperLogLog per day on the Redis thread, so ranges are
+    limited to `MAX_ACTIVE_DAYS` days.
+    """
+    if end_date < start_date:
+        raise ValueError("end_date must not be before start_date.")
+    if (end_date - start_date).days >= MAX_ACTIVE_DAYS:
+        raise ValueError(f"The date range must not exceed {MAX_ACTIVE_DAYS} days.")
+    return [
+        (start_date + timedelta(days=offset)).isoformat()
+        for offset in range((end_date - start_date).days + 1)
+    ]
+
+
+def count_active_members(start_date, end_date=None, space_id=None):
+    """
+    Estimates the number of distinct senders active over a range of UTC days.
+
+    The daily HyperLogLogs of the range are merged by a single PFCOUNT, which has a
+    standard error of 0.81%.
+
+    Args:
+        start_date (datetime.date): The first day of the range.
+        end_date (datetime.date, optional): The last day of the range, included;
+            defaults to start_date.
+        space_id (str, optional): The space to count, or None to count across spaces.
+
+    Returns:
+        int: The estimated number of distinct active senders.
+
+    Raises:
+        ValueError: If end_date is before start_date, or the range is longer than
+            `MAX_ACTIVE_DAYS` days.
+        redis.exceptions.RedisError: If an error occurs during Redis operations.
+    """
+    scope = _get_scope(space_id)
+    keys = [
+        ACTIVE_MEMBERS_KEY_FORMAT.format(scope=scope, day=day)
+        for day in _get_days(start_date, end_date or start_date)
+    ]
+    client_redis = RedisClientFactory().create_redis_client()
+    return client_redis.pfcount(*keys)
+
+
+def count_active_spaces(start_date, end_date=None):
+    """
+    Estimates the number of distinct spaces with messages over a range of UTC days.
+
+    Args:
+        start_date (datetime.date): The first day of the range.
+        end_date (datetime.date, optional): The last day of the range, included;
+            defaults to start_date.
+
+    Returns:
+        int: The estimated number of distinct active spaces.
+
+    Raises:
+        ValueError: If end_date is before start_date, or the range is longer than
+            `MAX_ACTIVE_DAYS` days.
+        redis.exceptions.RedisError: If an error occurs during Redis operations.
+    """
+    keys = [
+        ACTIVE_SPACES_KEY_FORMAT.format(day=day)
+        for day in _get_days(start_date, end_date or start_date)
+    ]
+    client_redis = RedisClientFactory().create_redis_client()
+    return client_redis.pfcount(*keys)
+
+
+def get_default_date_range(days):
+    """Returns the (start_date, end_date) of the last `days` UTC days, with today."""
+    end_date = date.fromisoformat(get_period_bucket(PERIOD_DAY, time.time()))
+    return end_date - timedelta(days=days - 1), end_date
@@ -0,0 +1,149 @@
+from redis_dal.redis_client_factory import RedisClientFactory
+from redis_dal.key_registry import (
+    get_ldap_keys,
+    get_registered_ldaps,
+    parse_message_key,
+)
+from datetime import datetime, timedelta, timezone
+from redis_dal.constants import (
+    GROUP_BY_SPACE,
+    GROUP_BY_DAY,
+    MAX_ACTIVITY_DAYS,
+    MAX_ACTIVITY_DAY_BUCKETS,
+    DEFAULT_ACTIVITY_PIPELINE_SIZE,
+)
+
+
+def _as_utc(value):
+    """Returns an aware datetime, reading a naive one as UTC."""
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _get_day_boundaries(start_time, end_time):
+    """Returns the UTC midnights strictly between two datetimes, framed by both."""
+    day = datetime.combine(
+        start_time.astimezone(timezone.utc).date(), datetime.min.time(), timezone.utc
+    ) + timedelta(days=1)
+    boundaries = [start_time]
+    while day < end_time:
+        boundaries.append(day)
+        day += timedelta(days=1)
+    boundaries.append(end_time)
+    return boundaries
+
+
+def _count_in_intervals(keys, scores):
+    """
+    Returns the ZCOUNT of each key in each [scores[j], scores[j + 1]) interval.
+
+    The counts are pipelined, with at most `DEFAULT_ACTIVITY_PIPELINE_SIZE` commands per
+    round trip so that no single batch holds the Redis thread for long.
+    """
+    intervals = list(zip(scores, scores[1:]))
+    keys_per_pipeline = max(1, DEFAULT_ACTIVITY_PIPELINE_SIZE // len(intervals))
+    client_redis = RedisClientFactory().create_redis_client()
+    key_counts = []
+    for start in range(0, len(keys), keys_per_pipeline):
+        pipeline = client_redis.pipeline(transaction=False)
+        for key in keys[start : start + keys_per_pipeline]:
+            for low, high in intervals:
+                pipeline.zcount(key, low, f"({high}")
+        counts = pipeline.execute()
+        key_counts.extend(
+            counts[offset : offset + len(intervals)]
+            for offset in range(0, len(counts), len(intervals))
+        )
+    return key_counts
+
+
+def get_message_counts(sender_ldaps, start_time, end_time, group_by=()):
+    """
+    Counts the messages of each sender across spaces over a time range.
+
+    The message keys registered for the senders are read in one pipeline, then counted
+    with pipelined ZCOUNTs on their createTime scores. Every key is named by the client,
+    so the commands route to the right node of a cluster.
+
+    Args:
+        sender_ldaps (list): The LDAP identifiers of the senders, or None for every
+            registered sender. Repeated identifiers are counted once.
+        start_time (datetime.datetime): The start of the range, included. Naive
+            datetimes are read as UTC.
+        end_time (datetime.datetime): The end of the range, excluded.
+        group_by (iterable): "space" and/or "day" to also break the counts down by space
+            and by UTC day.
+
+    Returns:
+        dict: A mapping of each LDAP identifier to {"total": int}, with a "spaces"
+        and/or "days" mapping of space IDs or "YYYY-MM-DD" days to counts when grouped.
+
+    Raises:
+        ValueError: If the range is empty or longer than `MAX_ACTIVITY_DAYS` days, it
+            spans more than `MAX_ACTIVITY_DAY_BUCKETS` days when grouped by day, or
+            group_by is not supported.
+        redis.exceptions.RedisError: If an error occurs during Redis operations.
+
+    Example:
+        get_message_counts(["ldap1"], start, end, group_by=["space"])
+        # {"ldap1": {"total": 12, "spaces": {"AAA": 10, "BBB": 2}}}
+    """
+    start_time, end_time = _as_utc(start_time), _as_utc(end_time)
+    if end_time <= start_time:
+        raise ValueError("end_time must be after start_time.")
+    if end_time - start_time > timedelta(days=MAX_ACTIVITY_DAYS):
+        raise ValueError(f"The time range must not exceed {MAX_ACTIVITY_DAYS} days.")
+    unsupported = set(group_by) - {GROUP_BY_SPACE, GROUP_BY_DAY}
+    if unsupported:
+        raise ValueError(f"Unsupported group_by {sorted(unsupported)}.")
+
+    if GROUP_BY_DAY in group_by:
+        boundaries = _get_day_boundaries(start_time, end_time)
+        if len(boundaries) - 1 > MAX_ACTIVITY_DAY_BUCKETS:
+            raise ValueError(
+                f"Grouping by day is limited to {MAX_ACTIVITY_DAY_BUCKETS} days."
+            )
+    else:
+        boundaries = [start_time, end_time]
+    days = [
+        boundary.astimezone(timezone.utc).date().isoformat()
+        for boundary in boundaries[:-1]
+    ]
+
+    sender_ldaps = (
+        get_registered_ldaps()
+        if sender_ldaps is None
+        else list(dict.fromkeys(sender_ldaps))
+    )
+    summary = {ldap: {"total": 0} for ldap in sender_ldaps}
+    for ldap in sender_ldaps:
+        if GROUP_BY_SPACE in group_by:
+            summary[ldap]["spaces"] = {}
+        if GROUP_BY_DAY in group_by:
+            summary[ldap]["days"] = {}
+    if not sender_ldaps:
+        return summary
+
+    ldap_keys = get_ldap_keys(sender_ldaps)
+    keys = [key for ldap in sender_ldaps for key in ldap_keys[ldap]]
+    scores = [boundary.timestamp() for boundary in boundaries]
+    key_counts = dict(zip(keys, _count_in_intervals(keys, scores)))
+
+    for ldap in sender_ldaps:
+        ldap_summary = summary[ldap]
+        for key in ldap_keys[ldap]:
+            counts = key_counts[key]
+            total = sum(counts)
+            if not total:
+                continue
+            space_id, _ = parse_message_key(key)
+            ldap_summary["total"] += total
+            if GROUP_BY_SPACE in group_by:
+                spaces = ldap_summary["spaces"]
+                spaces[space_id] = spaces.get(space_id, 0) + total
+            if GROUP_BY_DAY in group_by:
+                for day, day_count in zip(days, counts):
+                    if day_count:
+                        ldap_summary["days"][day] = (
+                            ldap_summary["days"].get(day, 0) + day_count
+                        )
+    return summary
@@ -0,0 +1,480 @@
+from redis_dal.redis_client_factory import RedisClientFactory
+from redis_dal.key_registry import (
+    get_registered_space_ids,
+    get_space_keys,
+    parse_message_key,
+)
+from tools.log.logger import LazyMessage, setup_logger
+from redis.commands.core import Script
+from datetime import timezone
+import logging
+import threading
+import time
+import numpy as np
+from redis_dal.constants import (
+    DEFAULT_ANALYTICS_BATCH_KEYS,
+    DEFAULT_ANALYTICS_PAGE_SCORES,
+    DEFAULT_ANALYTICS_MAX_AGE_SECONDS,
+    DEFAULT_ANALYTICS_PERCENTILES,
+    DEFAULT_COMPACTION_SCAN_COUNT,
+    SECONDS_PER_DAY,
+    ANALYTICS_REFRESHED_DEBUG_MSG,
+)
+
+setup_logger()
+
+SECONDS_PER_HOUR = 60 * 60
+HOURS_PER_DAY = 24
+DAYS_PER_WEEK = 7
+# 1970-01-01 was a Thursday, weekday 3 counting from Monday as 0.
+_EPOCH_WEEKDAY = 3
+
+# Returns {ZCARD, score, ...} for the sorted set KEYS[1], with the scores of at most
+# ARGV[3] members scored at or above ARGV[1], skipping the first ARGV[2]. Only scores
+# cross the wire, never the message payloads. The script reads a single key, so that
+# every call routes to one cluster node and the work per call is bounded by ARGV[3].
+_SCORES_SCRIPT = Script(
+    None,
+    b"""
+local entry = {redis.call('ZCARD', KEYS[1])}
+local members = redis.call(
+    'ZRANGE', KEYS[1], ARGV[1], '+inf', 'BYSCORE', 'LIMIT', ARGV[2], ARGV[3],
+    'WITHSCORES'
+)
+for j = 2, #members, 2 do
+    entry[#entry + 1] = members[j]
+end
+return entry
+""",
+)
+
+
+def _to_timestamp(value):
+    """Returns the epoch timestamp of a datetime, reading a naive one as UTC."""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    if not value.tzinfo:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+class _KeyState:
+    """The number of cached scores of one message key, and its refresh cursor."""
+
+    __slots__ = ("ldap_code", "space_code", "count", "max_score", "at_max")
+
+    def __init__(self, ldap_code, space_code):
+        self.ldap_code = ldap_code
+        self.space_code = space_code
+        self.reset()
+
+    def reset(self):
+        """Forgets the cached scores of the key."""
+        self.count = 0
+        self.max_score = None
+        self.at_max = 0
+
+    def advance(self, scores):
+        """Moves the cursor past newly cached, sorted scores."""
+        if not len(scores):
+            return
+        last = float(scores[-1])
+        if last != self.max_score:
+            self.max_score, self.at_max = last, 0
+        self.at_max += int(np.count_nonzero(scores == last))
+        self.count += len(scores)
+
+
+class ActivityAnalyticsCache:
+    """
+    An in-memory cache of message timestamps for vectorized activity analytics.
+
+    Every stored message is one (ldap, space, timestamp) triple, held as parallel NumPy
+    arrays of key codes and epoch timestamps, so that histograms, streaks and
+    percentiles are computed with vectorized operations instead of Python loops over
+    decoded members. The timestamps are the ZSET scores, so a refresh reads scores only.
+
+    A refresh only reads the scores after the last score cached for each key, in
+    pages of `page_size` scores per key and call, so no script call scans a whole key.
+    Keys whose cardinality no longer adds up, after an eviction, a deletion or a
+    backfill of older messages, are reloaded in full, and keys gone from the registry
+    are dropped.
+
+    Attributes:
+        max_age_seconds (float): How long a refresh is reused by `ensure_fresh`.
+        batch_keys (int): The number of keys whose scores are read per round trip.
+        page_size (int): The maximum number of scores read per key and call.
+        refreshed_at (float): The monotonic time of the last refresh, or None.
+    """
+
+    def __init__(
+        self,
+        max_age_seconds=DEFAULT_ANALYTICS_MAX_AGE_SECONDS,
+        batch_keys=DEFAULT_ANALYTICS_BATCH_KEYS,
+        page_size=DEFAULT_ANALYTICS_PAGE_SCORES,
+    ):
+        """
+        Initializes an empty cache.
+
+        Args:
+            max_age_seconds (float): How long a refresh is reused by `ensure_fresh`.
+            batch_keys (int): The number of keys whose scores are read per round trip.
+            page_size (int): The maximum number of scores read per key and call.
+        """
+        self.max_age_seconds = max_age_seconds
+        self.batch_keys = batch_keys
+        self.page_size = page_size
+        self.refreshed_at = None
+        self._lock = threading.RLock()
+        self._key_codes_by_key = {}
+        self._keys = []
+        self._states = []
+        self._ldaps = {}
+        self._spaces = {}
+        self._key_ldap_codes = np.empty(0, dtype=np.int32)
+        self._key_space_codes = np.empty(0, dtype=np.int32)
+        self._key_codes = np.empty(0, dtype=np.int32)
+        self._timestamps = np.empty(0, dtype=np.float64)
+
+    def _get_key_code(self, key):
+        """Returns the code of a message key, registering it on first sight."""
+        code = self._key_codes_by_key.get(key)
+        if code is None:
+            space_id, sender_ldap = parse_message_key(key)
+            code = self._key_codes_by_key[key] = len(self._keys)
+            self._keys.append(key)
+            self._states.append(
+                _KeyState(
+                    self._ldaps.setdefault(sender_ldap, len(self._ldaps)),
+                    self._spaces.setdefault(space_id, len(self._spaces)),
+                )
+            )
+        return code
+
+    def _read_scores(self, client_redis, codes, full, chunks):
+        """
+        Reads the new scores of keys, appending them to `chunks`.
+
+        The keys of a batch are read in pipelined pages of `page_size` scores, with
+        the score cursor of `iter_key_members`, until each key returns a short page.
+        The cardinality of a key is read with its last page.
+
+        Returns:
+            list: The codes of the keys whose cached scores no longer add up.
+        """
+        mismatched = []
+        for start in range(0, len(codes), self.batch_keys):
+            batch = codes[start : start + self.batch_keys]
+            cursors = {}
+            for code in batch:
+                state = self._states[code]
+                if full:
+                    state.reset()
+                cursors[code] = (
+                    ("-inf", 0)
+                    if state.max_score is None
+                    else (repr(state.max_score), state.at_max)
+                )
+            pages = {code: [] for code in batch}
+            while cursors:
+                pipeline = client_redis.pipeline(transaction=False)
+                for code, (min_score, offset) in cursors.items():
+                    _SCORES_SCRIPT(
+                        keys=[self._keys[code]],
+                        args=[min_score, offset, self.page_size],
+                        client=pipeline,
+                    )
+                entries = pipeline.execute()
+                for code, (card, *raw_scores) in zip(list(cursors), entries):
+                    scores = np.asarray(raw_scores, dtype=np.bytes_).astype(np.float64)
+                    pages[code].append(scores)
+                    if len(scores) == self.page_size:
+                        min_score, offset = cursors[code]
+                        last = repr(float(scores[-1]))
+                        if last != min_score:
+                            min_score, offset = last, 0
+                        cursors[code] = (
+                            min_score,
+                            offset + int(np.count_nonzero(scores == scores[-1])),
+                        )
+                        continue
+                    del cursors[code]
+                    state = self._states[code]
+                    scores = np.concatenate(pages.pop(code))
+                    if state.count + len(scores) != card:
+                        mismatched.append(code)
+                        continue
+                    state.advance(scores)
+                    chunks.append((np.full(len(scores), code, dtype=np.int32), scores))
+        return mismatched
+
+    def refresh(self, scan_count=DEFAULT_COMPACTION_SCAN_COUNT):
+        """
+        Loads the scores stored since the last refresh.
+
+        Args:
+            scan_count (int): The number of spaces whose keys are read per round trip.
+
+        Returns:
+            dict: The number of timestamps "added", keys "reloaded" and "dropped", and
+            the "total" number of cached timestamps.
+
+        Raises:
+            redis.exceptions.RedisError: If an error occurs during Redis operations.
+        """
+        client_redis = RedisClientFactory().create_redis_client()
+        keys = []
+        space_ids = get_registered_space_ids()
+        for start in range(0, len(space_ids), scan_count):
+            for space_keys in get_space_keys(
+                space_ids[start : start + scan_count]
+            ).values():
+                keys.extend(space_keys)
+
+        with self._lock:
+            codes = [self._get_key_code(key) for key in keys]
+            live = set(codes)
+            dropped = [
+                code
+                for code, state in enumerate(self._states)
+                if code not in live and state.count
+            ]
+            for code in dropped:
+                self._states[code].reset()
+
+            chunks = []
+            reloaded = self._read_scores(client_redis, codes, False, chunks)
+            self._read_scores(client_redis, reloaded, True, chunks)
+
+            keep = ~np.isin(self._key_codes, reloaded + dropped)
+            self._key_codes = np.concatenate(
+                [self._key_codes[keep]] + [key_codes for key_codes, _ in chunks]
+            )
+            self._timestamps = np.concatenate(
+                [self._timestamps[keep]] + [scores for _, scores in chunks]
+            )
+            self._key_ldap_codes = np.array(
+                [state.ldap_code for state in self._states], dtype=np.int32
+            )
+            self._key_space_codes = np.array(
+                [state.space_code for state in self._states], dtype=np.int32
+            )
+            self.refreshed_at = time.monotonic()
+            result = {
+                "added": sum(len(scores) for _, scores in chunks),
+                "reloaded": len(reloaded),
+                "dropped": len(dropped),
+                "total": len(self._timestamps),
+            }
+        logging.debug(LazyMessage(ANALYTICS_REFRESHED_DEBUG_MSG, **result))
+        return result
+
+    def ensure_fresh(self):
+        """
+        Refreshes the cache if it was never loaded or is older than `max_age_seconds`.
+
+        Raises:
+            redis.exceptions.RedisError: If an error occurs during Redis operations.
+        """
+        with self._lock:
+            if (
+                self.refreshed_at is None
+                or time.monotonic() - self.refreshed_at > self.max_age_seconds
+            ):
+                self.refresh()
+
+    def _select(self, ldap=None, space_id=None, start_time=None, end_time=None):
+        """Returns the key codes and timestamps of the messages matching a filter."""
+        with self._lock:
+            key_codes, timestamps = self._key_codes, self._timestamps
+            key_ldap_codes = self._key_ldap_codes
+            key_space_codes = self._key_space_codes
+            ldap_code = self._ldaps.get(ldap, -1)
+            space_code = self._spaces.get(space_id, -1)
+        mask = np.ones(len(timestamps), dtype=bool)
+        if ldap is not None:
+            mask &= key_ldap_codes[key_codes] == ldap_code
+        if space_id is not None:
+            mask &= key_space_codes[key_codes] == space_code
+        if start_time is not None:
+            mask &= timestamps >= _to_timestamp(start_time)
+        if end_time is not None:
+            mask &= timestamps < _to_timestamp(end_time)
+        return key_codes[mask], timestamps[mask]
+
+    def get_hour_histogram(
+        self, ldap=None, space_id=None, start_time=None, end_time=None
+    ):
+        """
+        Counts messages by UTC hour of day.
+
+        Args:
+            ldap (str, optional): Only count the messages of this sender.
+            space_id (str, optional): Only count the messages of this space.
+            start_time (datetime.datetime, optional): The start of the range, included.
+                Naive datetimes are read as UTC.
+            end_time (datetime.datetime, optional): The end of the range, excluded.
+
+        Returns:
+            list: 24 counts, from 00:00 to 23:00 UTC.
+        """
+        _, timestamps = self._select(ldap, space_id, start_time, end_time)
+        hours = (timestamps // SECONDS_PER_HOUR % HOURS_PER_DAY).astype(np.int64)
+        return np.bincount(hours, minlength=HOURS_PER_DAY).tolist()
+
+    def get_weekday_histogram(
+        self, ldap=None, space_id=None, start_time=None, end_time=None
+    ):
+        """
+        Counts messages by UTC day of week.
+
+        Args:
+            ldap (str, optional): Only count the messages of this sender.
+            space_id (str, optional): Only count the messages of this space.
+            start_time (datetime.datetime, optional): The start of the range, included.
+                Naive datetimes are read as UTC.
+            end_time (datetime.datetime, optional): The end of the range, excluded.
+
+        Returns:
+            list: 7 counts, from Monday to Sunday.
+        """
+        _, timestamps = self._select(ldap, space_id, start_time, end_time)
+        days = (timestamps // SECONDS_PER_DAY).astype(np.int64)
+        weekdays = (days + _EPOCH_WEEKDAY) % DAYS_PER_WEEK
+        return np.bincount(weekdays, minlength=DAYS_PER_WEEK).tolist()
+
+    def get_streaks(self, ldap, space_id=None, now=None):
+        """
+        Computes the runs of consecutive UTC days on which a member sent messages.
+
+        Args:
+            ldap (str): The LDAP identifier of the sender.
+            space_id (str, optional): Only consider the messages of this space.
+            now (float, optional): The current epoch timestamp, defaults to time.time().
+
+        Returns:
+            dict: The number of "active_days", the "longest" streak in days, and the
+            "current" streak, which ends today or yesterday, or is 0.
+        """
+        _, timestamps = self._select(ldap, space_id)
+        days = np.unique((timestamps // SECONDS_PER_DAY).astype(np.int64))
+        if not len(days):
+            return {"active_days": 0, "longest": 0, "current": 0}
+        breaks = np.flatnonzero(np.diff(days) != 1) + 1
+        runs = np.diff(np.concatenate(([0], breaks, [len(days)])))
+        today = int((time.time() if now is None else now) // SECONDS_PER_DAY)
+        current = int(runs[-1]) if today - days[-1] <= 1 else 0
+        return {
+            "active_days": len(days),
+            "longest": int(runs.max()),
+            "current": current,
+        }
+
+    def get_count_percentiles(
+        self,
+        percentiles=DEFAULT_ANALYTICS_PERCENTILES,
+        space_id=None,
+        start_time=None,
+        end_time=None,
+    ):
+        """
+        Computes percentiles of the number of messages sent per member.
+
+        Only members with at least one message in range are counted.
+
+        Args:
+            percentiles (iterable): The percentiles to compute, from 0 to 100.
+            space_id (str, optional): Only count the messages of this space.
+            start_time (datetime.datetime, optional): The start of the range, included.
+                Naive datetimes are read as UTC.
+            end_time (datetime.datetime, optional): The end of the range, excluded.
+
+        Returns:
+            dict: A mapping of each percentile to the message count at that percentile.
+        """
+        counts = self._get_member_counts(space_id, start_time, end_time)
+        if not len(counts):
+            return {percentile: 0.0 for percentile in percentiles}
+        values = np.percentile(counts[counts > 0], list(percentiles))
+        return dict(zip(percentiles, values.tolist()))
+
+    def get_member_percentile_rank(
+        self, ldap, space_id=None, start_time=None, end_time=None
+    ):
+        """
+        Returns the percentage of active members who sent fewer messages than `ldap`.
+
+        Args:
+            ldap (str): The LDAP identifier of the sender.
+            space_id (str, optional): Only count the messages of this space.
+            start_time (datetime.datetime, optional): The start of the range, included.
+                Naive datetimes are read as UTC.
+            end_time (datetime.datetime, optional): The end of the range, excluded.
+
+        Returns:
+            float: The percentile rank, from 0 to 100.
+        """
+        counts = self._get_member_counts(space_id, start_time, end_time)
+        ldap_code = self._ldaps.get(ldap)
+        active = counts[counts > 0]
+        if ldap_code is None or not len(active):
+            return 0.0
+        return float(np.count_nonzero(active < counts[ldap_code]) / len(active) * 100)
+
+    def _get_member_counts(self, space_id=None, start_time=None, end_time=None):
+        """Returns the message counts of the members, indexed by LDAP code."""
+        key_codes, _ = self._select(None, space_id, start_time, end_time)
+        with self._lock:
+            key_ldap_codes, ldap_count = self._key_ldap_codes, len(self._ldaps)
+        return np.bincount(key_ldap_codes[key_codes], minlength=ldap_count)
+
+    def get_member_summary(self, ldap, space_id=None, start_time=None, end_time=None):
+        """
+        Summarizes the activity of one member for a dashboard.
+
+        Args:
+            ldap (str): The LDAP identifier of the sender.
+            space_id (str, optional): Only consider the messages of this space.
+            start_time (datetime.datetime, optional): The start of the range, included.
+                Naive datetimes are read as UTC.
+            end_time (datetime.datetime, optional): The end of the range, excluded.
+
+        Returns:
+            dict: The "count" of messages, "hours" and "weekdays" histograms, "streaks"
+            and "percentile_rank" among active members.
+        """
+        _, timestamps = self._select(ldap, space_id, start_time, end_time)
+        return {
+            "ldap": ldap,
+            "count": len(timestamps),
+            "hours": self.get_hour_histogram(ldap, space_id, start_time, end_time),
+            "weekdays": self.get_weekday_histogram(
+                ldap, space_id, start_time, end_time
+            ),
+            "streaks": self.get_streaks(ldap, space_id),
+            "percentile_rank": self.get_member_percentile_rank(
+                ldap, space_id, start_time, end_time
+            ),
+        }
+
+
+_analytics_cache = None
+_analytics_cache_lock = threading.Lock()
+
+
+def get_analytics_cache():
+    """
+    Returns the process-wide analytics cache, refreshed if it is stale.
+
+    Returns:
+        ActivityAnalyticsCache: The shared cache.
+
+    Raises:
+        redis.exceptions.RedisError: If an error occurs during Redis operations.
+    """
+    global _analytics_cache
+    with _analytics_cache_lock:
+        if _analytics_cache is None:
+            _analytics_cache = ActivityAnalyticsCache()
+    _analytics_cache.ensure_fresh()
+    return _analytics_cache
@@ -0,0 +1,173 @@
+"""Benchmarks sorted set member compression on representative Chat payloads."""
+
+from redis_dal.message_codec import decode_member, encode_member, is_compressed_member
+from tools.log.logger import setup_logger
+from redis_dal.constants import (
+    DEFAULT_COMPRESSION_THRESHOLD_BYTES,
+    DEFAULT_COMPRESSION_LEVEL,
+    COMPRESSION_BENCHMARK_RESULT_MSG,
+)
+import argparse
+import logging
+import random
+import time
+
+setup_logger()
+
+WORDS = (
+    "the deploy is green again please review my change before standup lunch "
+    "meeting moved to three the dashboard shows latency spikes on the west cluster "
+    "can someone take a look at the flaky test thanks rolling back now"
+).split()
+
+
+def _chat_message(index, text, cards=None):
+    """Builds a Chat API message resource shaped like the ones we store."""
+    message = {
+        "name": f"spaces/AAAAbCdEfGh/messages/{index:012d}.{index:012d}",
+        "sender": {"name": f"users/1{index:020d}", "type": "HUMAN"},
+        "createTime": "2024-05-13T09:41:07.123456Z",
+        "text": text,
+        "formattedText": text,
+        "thread": {"name": f"spaces/AAAAbCdEfGh/threads/{index:011d}"},
+        "space": {"name": "spaces/AAAAbCdEfGh"},
+        "argumentText": text,
+    }
+    if cards:
+        message["cardsV2"] = cards
+    return message
+
+
+def _card(index, rng):
+    """Builds a cardsV2 entry with a header, a few widgets and buttons."""
+    return {
+        "cardId": f"card-{index}",
+        "card": {
+            "header": {
+                "title": f"Build #{index} finished",
+                "subtitle": "ci-pipeline",
+                "imageUrl": "https://example.com/static/icons/build-status-ok.png",
+            },
+            "sections": [
+                {
+                    "header": "Details",
+                    "widgets": [
+                        {
+                            "decoratedText": {
+                                "topLabel": label,
+                                "text": " ".join(rng.choices(WORDS, k=8)),
+                            }
+                        }
+                        for label in ("Commit", "Author", "Duration", "Tests")
+                    ]
+                    + [
+                        {
+                            "buttonList": {
+                                "buttons": [
+                                    {
+                                        "text": "Open logs",
+                                        "onClick": {
+                                            "openLink": {
+                                                "url": f"https://ci.example.com/builds/{index}"
+                                            }
+                                        },
+                                    }
+                                ]
+                            }
+                        }
+                    ],
+                }
+            ],
+        },
+    }
+
+
+def build_payloads(count, seed=0):
+    """
+    Builds a representative mix of stored members.
+
+    Most Chat messages are short texts; a smaller share are long texts or bot messages
+    with rich cards, which is where most of the memory goes.
+
+    Args:
+        count (int): The number of members to build.
+        seed (int): The random seed, for reproducible runs.
+
+    Returns:
+        dict: Lists of serialized members keyed by payload kind.
+    """
+    rng = random.Random(seed)
+    payloads = {"short text": [], "long text": [], "rich card": []}
+    for index in range(count):
+        kind = rng.choices(list(payloads), weights=(70, 20, 10))[0]
+        if kind == "short text":
+            message = _chat_message(index, " ".join(rng.choices(WORDS, k=12)))
+        elif kind == "long text":
+            message = _chat_message(index, " ".join(rng.choices(WORDS, k=400)))
+        else:
+            message = _chat_message(
+                index, "Build finished", [_card(index, rng) for _ in range(2)]
+            )
+        payloads[kind].append(str({"message": message, "type": "create"}))
+    return payloads
+
+
+def benchmark(members, threshold, level):
+    """
+    Measures the compression ratio and CPU cost of encoding a list of members.
+
+    Args:
+        members (list): The serialized members.
+        threshold (int): The size in bytes above which members are compressed.
+        level (int): The zlib compression level.
+
+    Returns:
+        dict: The sizes, ratio, compressed count and CPU microseconds per message.
+    """
+    start = time.process_time()
+    encoded = [encode_member(member, threshold, level) for member in members]
+    encode_seconds = time.process_time() - start
+
+    start = time.process_time()
+    for raw in encoded:
+        decode_member(raw)
+    decode_seconds = time.process_time() - start
+
+    raw_bytes = sum(len(member.encode("utf-8")) for member in members)
+    stored_bytes = sum(len(raw) for raw in encoded)
+    count = len(members)
+    return {
+        "count": count,
+        "raw_bytes": raw_bytes,
+        "stored_bytes": stored_bytes,
+        "ratio": raw_bytes / stored_bytes if stored_bytes else 1.0,
+        "compressed_count": sum(1 for raw in encoded if is_compressed_member(raw)),
+        "encode_us": encode_seconds * 1e6 / count if count else 0.0,
+        "decode_us": decode_seconds * 1e6 / count if count else 0.0,
+    }
+
+
+def main(argv=None):
+    """Runs the benchmark per payload kind and over the whole mix."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=10000)
+    parser.add_argument(
+        "--threshold", type=int, default=DEFAULT_COMPRESSION_THRESHOLD_BYTES
+    )
+    parser.add_argument("--level", type=int, default=DEFAULT_COMPRESSION_LEVEL)
+    args = parser.parse_args(argv)
+
+    payloads = build_payloads(args.count)
+    results = {}
+    for label, members in list(payloads.items()) + [
+        ("all", [member for members in payloads.values() for member in members])
+    ]:
+        results[label] = benchmark(members, args.threshold, args.level)
+        logging.info(
+            COMPRESSION_BENCHMARK_RESULT_MSG.format(label=label, **results[label])
+        )
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+from redis import Redis
+from redis.cache import CacheConfig, CacheEntryStatus, DefaultCache
+import threading
+from redis_dal.constants import (
+    DEFAULT_CLIENT_CACHE_SIZE,
+    CLIENT_CACHE_COMMANDS,
+    CLIENT_CACHE_KEY_PREFIXES,
+)
+
+
+class HotKeyCacheConfig(CacheConfig):
+    """
+    The client-side cache configuration restricted to small, frequently read keys.
+
+    Only the read commands in `commands` on keys starting with one of `key_prefixes`
+    are cached, so that large reads such as message exports never fill the cache.
+
+    Attributes:
+        commands (tuple): The read commands whose replies are cached.
+        key_prefixes (tuple): The prefixes of the keys whose replies are cached.
+    """
+
+    def __init__(
+        self,
+        max_size=DEFAULT_CLIENT_CACHE_SIZE,
+        commands=CLIENT_CACHE_COMMANDS,
+        key_prefixes=CLIENT_CACHE_KEY_PREFIXES,
+    ):
+        """
+        Initializes the configuration.
+
+        Args:
+            max_size (int): The maximum number of cached replies, evicted LRU first.
+            commands (tuple): The read commands whose replies are cached.
+            key_prefixes (tuple): The prefixes of the keys whose replies are cached.
+        """
+        super().__init__(max_size=max_size, cache_class=HotKeyCache)
+        self.commands = frozenset(commands)
+        self.key_prefixes = tuple(key_prefixes)
+
+    def is_allowed_to_cache(self, command):
+        """Returns True if replies to `command` may be cached."""
+        return command in self.commands
+
+
+class HotKeyCache(DefaultCache):
+    """
+    The bounded LRU reply cache of a RESP3 client, with hit-rate metrics.
+
+    The server tracks the keys read by the client and pushes an invalidation as soon as
+    one of them is written, which drops the cached replies of that key, so reads served
+    from process memory stay coherent with Redis.
+
+    redis-py probes every command with an empty key set before sending it, and creates
+    an in-progress entry for each reply it does not hold, so lookups and misses are
+    counted at those two points, and commands on keys outside of the hot prefixes are
+    not counted at all.
+
+    Attributes:
+        lookups (int): The number of cachable commands on hot keys.
+        misses (int): The number of cachable commands sent to Redis.
+        invalidations (int): The number of replies dropped on a server invalidation.
+    """
+
+    def __init__(self, cache_config):
+        """
+        Initializes an empty cache.
+
+        Args:
+            cache_config (HotKeyCacheConfig): The cache configuration.
+        """
+        super().__init__(cache_config)
+        self.lookups = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._metrics_lock = threading.Lock()
+
+    def is_cachable(self, key):
+        """Returns True if the reply of a command, and of its keys, may be cached."""
+        if not self.config.is_allowed_to_cache(key.command):
+            return False
+        if not key.redis_keys:
+            with self._metrics_lock:
+                self.lookups += 1
+            return True
+        prefixes = getattr(self.config, "key_prefixes", ())
+        return all(
+            (
+                redis_key.decode() if isinstance(redis_key, bytes) else str(redis_key)
+            ).startswith(prefixes)
+            for redis_key in key.redis_keys
+        )
+
+    def set(self, entry):
+        """Caches a reply, counting a miss when a new reply is requested."""
+        is_new = (
+            entry.status == CacheEntryStatus.IN_PROGRESS
+            and self.collection.get(entry.cache_key) is None
+        )
+        cached = super().set(entry)
+        if is_new:
+            with self._metrics_lock:
+                if cached:
+                    self.misses += 1
+                else:
+                    # A key outside of the hot prefixes, not a cache lookup.
+                    self.lookups -= 1
+        return cached
+
+    def delete_by_redis_keys(self, redis_keys):
+        """Drops the cached replies of keys written on the server."""
+        deleted = super().delete_by_redis_keys(redis_keys)
+        with self._metrics_lock:
+            self.invalidations += len(deleted)
+        return deleted
+
+    def get_metrics(self):
+        """
+        Returns the hit and miss counters of the cache.
+
+        Returns:
+            dict: The hits, misses, hit rate, invalidations and number of entries.
+        """
+        with self._metrics_lock:
+            hits = max(self.lookups - self.misses, 0)
+            return {
+                "hits": hits,
+                "misses": self.misses,
+                "hit_rate": hits / self.lookups if self.lookups else 0.0,
+                "invalidations": self.invalidations,
+                "size": self.size,
+            }
+
+
+class HotKeyCacheRedis(Redis):
+    """
+    A RESP3 client that caches single reads of hot keys and sends pipelines without
+    cache.
+
+    In redis-py 5.2, the cache proxy of a connection remembers the cache key of the last
+    command it sent and only resets it in `send_command`. Pipelines go through
+    `send_packed_command`, so a pipeline sent on a pooled connection right after a
+    cached read would be answered from the cache with the reply of that read instead of
+    its own replies. Pipelines, and the transactions and scripts run in them, are
+    therefore sent by a second client with its own connection pool and no cache.
+
+    Attributes:
+        pipeline_client (redis.Redis): The client without cache sending the pipelines.
+    """
+
+    def __init__(self, pipeline_client, **kwargs):
+        """
+        Initializes the client.
+
+        Args:
+            pipeline_client (redis.Redis): The client without cache sending the
+                pipelines.
+            **kwargs: The arguments of `redis.Redis`, including `cache_config`.
+        """
+        super().__init__(**kwargs)
+        self.pipeline_client = pipeline_client
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        """Returns a pipeline of the client without cache."""
+        return self.pipeline_client.pipeline(
+            transaction=transaction, shard_hint=shard_hint
+        )
+
+    def close(self):
+        """Closes the connection pools of both clients."""
+        super().close()
+        self.pipeline_client.close()
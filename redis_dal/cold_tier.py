@@ -0,0 +1,391 @@
+"""Moves old messages out of Redis into a local Parquet cold tier, and queries both."""
+
+from redis_dal.redis_client_factory import RedisClientFactory
+from redis_dal.key_registry import (
+    get_registered_space_ids,
+    get_space_keys,
+    parse_message_key,
+)
+from redis_dal.message_codec import parse_member
+from redis_dal.query_versions import queue_bump_global_version, queue_bump_versions
+from redis_dal.message_export import get_export_keys, iter_key_members, iter_key_records
+from tools.log.logger import setup_logger
+from datetime import datetime, timezone
+import heapq
+import itertools
+import json
+import logging
+import os
+import time
+import uuid
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from redis_dal.constants import (
+    REDIS_MESSAGE_INDEX_KEY,
+    REGISTRY_SPACE_KEYS_FORMAT,
+    REGISTRY_LDAP_KEYS_FORMAT,
+    COLD_TIER_DIR,
+    DEFAULT_COLD_TIER_DIR,
+    COLD_TIER_FILE_FORMAT,
+    DEFAULT_COMPACTION_SCAN_COUNT,
+    DEFAULT_EXPORT_BATCH_SIZE,
+    DEFAULT_QUERY_LIMIT,
+    MAX_QUERY_LIMIT,
+    DEFAULT_TIER_AGE_DAYS,
+    DEFAULT_TIER_FILE_ROWS,
+    DEFAULT_TIER_SCRIPT_MEMBERS,
+    SECONDS_PER_DAY,
+    TIERED_MESSAGES_INFO_MSG,
+)
+
+setup_logger()
+
+COLD_TIER_SCHEMA = pa.schema([
+    ("create_time", pa.timestamp("us", tz="UTC")),
+    ("space_id", pa.string()),
+    ("sender_ldap", pa.string()),
+    ("message_id", pa.string()),
+    ("type", pa.string()),
+    ("message", pa.string()),
+])
+
+# Removes the ARGV members from KEYS[1]. A key left empty no longer exists and is
+# removed from the KEYS[2] and KEYS[3] registry sets. Members are removed one by one
+# rather than by score range, so that a message stored below the cutoff after it was
+# read is never removed without being archived.
+_TIER_SCRIPT = """
+local removed = redis.call('ZREM', KEYS[1], unpack(ARGV))
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    redis.call('SREM', KEYS[2], KEYS[1])
+    redis.call('SREM', KEYS[3], KEYS[1])
+end
+return removed
+"""
+
+
+def get_cold_tier_dir():
+    """Returns the cold tier directory, from the `COLD_TIER_DIR` variable, if set."""
+    return os.environ.get(COLD_TIER_DIR, DEFAULT_COLD_TIER_DIR)
+
+
+def _write_cold_file(path, rows):
+    """Writes rows to a Parquet file, renamed into place once complete."""
+    table = pa.Table.from_pylist(rows, schema=COLD_TIER_SCHEMA)
+    # Readers ignore files starting with "_", so a partial file is never read.
+    partial_path = os.path.join(os.path.dirname(path), "_" + os.path.basename(path))
+    pq.write_table(table, partial_path, compression="zstd")
+    os.replace(partial_path, path)
+
+
+def _remove_tiered(client_redis, remove, pending):
+    """
+    Removes the members of a written cold file from Redis, and their index entries.
+
+    The query versions of the spaces and senders are bumped like retention does, since
+    their results now come from the cold tier.
+    """
+    pipeline = client_redis.pipeline(transaction=False)
+    for key, members, names in pending:
+        space_id, sender_ldap = parse_message_key(key)
+        queue_bump_versions(pipeline, space_id, sender_ldap)
+        for start in range(0, len(members), DEFAULT_TIER_SCRIPT_MEMBERS):
+            remove(
+                keys=[
+                    key,
+                    REGISTRY_SPACE_KEYS_FORMAT.format(space_id=space_id),
+                    REGISTRY_LDAP_KEYS_FORMAT.format(sender_ldap=sender_ldap),
+                ],
+                args=members[start : start + DEFAULT_TIER_SCRIPT_MEMBERS],
+                client=pipeline,
+            )
+        if names:
+            pipeline.hdel(REDIS_MESSAGE_INDEX_KEY, *names)
+    queue_bump_global_version(pipeline)
+    pipeline.execute()
+
+
+def tier_messages(
+    older_than_days=DEFAULT_TIER_AGE_DAYS,
+    now=None,
+    directory=None,
+    file_rows=DEFAULT_TIER_FILE_ROWS,
+    scan_count=DEFAULT_COMPACTION_SCAN_COUNT,
+):
+    """
+    Moves the messages older than `older_than_days` from Redis to the cold tier.
+
+    Message keys are enumerated from the key registry and their old members are read
+    in score order. Whenever at least `file_rows` messages have been read, they are
+    written to a new zstd-compressed Parquet file with timestamp, space, sender, message
+    ID, type and payload columns, and only once the file is complete are those members
+    removed from Redis, so a failed run never loses messages. Leaderboards and active
+    member counts are left untouched, since the messages still exist. File names carry
+    a random run ID, so concurrent runs in other processes never overwrite each other.
+
+    Args:
+        older_than_days (float): The age in days above which messages are moved.
+        now (float, optional): The current epoch timestamp, defaults to time.time().
+        directory (str, optional): The cold tier directory, defaults to
+            `get_cold_tier_dir()`.
+        file_rows (int): The number of messages from which a Parquet file is written.
+        scan_count (int): The number of spaces whose keys are read per round trip.
+
+    Returns:
+        dict: The number of "keys_scanned", "keys_tiered", "tiered" messages and
+        "files" written.
+
+    Raises:
+        ValueError: If older_than_days is not positive.
+        OSError: If a cold tier file cannot be written.
+        redis.exceptions.RedisError: If an error occurs during Redis operations.
+    """
+    if older_than_days <= 0:
+        raise ValueError("older_than_days must be positive.")
+    now = time.time() if now is None else now
+    cutoff = now - older_than_days * SECONDS_PER_DAY
+    directory = directory or get_cold_tier_dir()
+    os.makedirs(directory, exist_ok=True)
+    run = datetime.fromtimestamp(now, timezone.utc).strftime("%Y%m%dT%H%M%S")
+    run_id = uuid.uuid4().hex
+
+    client_redis = RedisClientFactory().create_redis_client()
+    remove = client_redis.register_script(_TIER_SCRIPT)
+    result = {"keys_scanned": 0, "keys_tiered": 0, "tiered": 0, "files": 0}
+    rows = []
+    pending = []
+
+    def flush():
+        if not rows:
+            return
+        path = os.path.join(
+            directory,
+            COLD_TIER_FILE_FORMAT.format(run=run, run_id=run_id, part=result["files"]),
+        )
+        _write_cold_file(path, rows)
+        _remove_tiered(client_redis, remove, pending)
+        result["files"] += 1
+        result["tiered"] += len(rows)
+        rows.clear()
+        pending.clear()
+
+    space_ids = get_registered_space_ids()
+    for start in range(0, len(space_ids), scan_count):
+        for keys in get_space_keys(space_ids[start : start + scan_count]).values():
+            for key in keys:
+                result["keys_scanned"] += 1
+                space_id, sender_ldap = parse_message_key(key)
+                members, names = [], []
+                for member, score in iter_key_members(key, "-inf", f"({cutoff}"):
+                    stored = parse_member(member)
+                    message = stored.get("message") or {}
+                    members.append(member)
+                    if message.get("name"):
+                        names.append(message["name"])
+                    rows.append({
+                        "create_time": datetime.fromtimestamp(score, timezone.utc),
+                        "space_id": space_id,
+                        "sender_ldap": sender_ldap,
+                        "message_id": message.get("name"),
+                        "type": stored.get("type"),
+                        "message": json.dumps(message, ensure_ascii=False),
+                    })
+                if members:
+                    result["keys_tiered"] += 1
+                    pending.append((key, members, names))
+                if len(rows) >= file_rows:
+                    flush()
+    flush()
+
+    logging.info(
+        TIERED_MESSAGES_INFO_MSG.format(
+            cutoff=datetime.fromtimestamp(cutoff, timezone.utc).isoformat(), **result
+        )
+    )
+    return result
+
+
+def iter_cold_records(
+    space_id=None, sender_ldap=None, start_time=None, end_time=None, directory=None
+):
+    """
+    Iterates over the cold tier messages matching a space, sender and time filter.
+
+    The filter is pushed down to the Parquet reader, so row groups outside of it are
+    skipped without being decompressed.
+
+    Args:
+        space_id (str, optional): Only read messages of this Chat space.
+        sender_ldap (str, optional): Only read messages of this sender.
+        start_time (datetime.datetime, optional): The earliest createTime, included.
+        end_time (datetime.datetime, optional): The latest createTime, included.
+        directory (str, optional): The cold tier directory, defaults to
+            `get_cold_tier_dir()`.
+
+    Yields:
+        dict: {"space_id", "sender_ldap", "create_time", "type", "message"} records, as
+        yielded by `iter_export_records`.
+    """
+    directory = directory or get_cold_tier_dir()
+    if not os.path.isdir(directory):
+        return
+    dataset = ds.dataset(
+        directory,
+        schema=COLD_TIER_SCHEMA,
+        format="parquet",
+    )
+    time_type = COLD_TIER_SCHEMA.field("create_time").type
+    filters = []
+    if space_id:
+        filters.append(ds.field("space_id") == space_id)
+    if sender_ldap:
+        filters.append(ds.field("sender_ldap") == sender_ldap)
+    if start_time:
+        filters.append(ds.field("create_time") >= pa.scalar(start_time, time_type))
+    if end_time:
+        filters.append(ds.field("create_time") <= pa.scalar(end_time, time_type))
+    expression = None
+    for condition in filters:
+        expression = condition if expression is None else expression & condition
+
+    for batch in dataset.to_batches(filter=expression):
+        for row in batch.to_pylist():
+            yield {
+                "space_id": row["space_id"],
+                "sender_ldap": row["sender_ldap"],
+                "create_time": row["create_time"].timestamp(),
+                "type": row["type"],
+                "message": json.loads(row["message"]),
+            }
+
+
+def _iter_not_in_redis(client_redis, records, batch_size):
+    """
+    Drops the records whose message is still in Redis, per the message index.
+
+    The names are looked up with one HMGET per `batch_size` records. Records without a
+    message name are kept.
+
+    Args:
+        client_redis (redis.Redis): The Redis client.
+        records (iterable): The cold tier records to filter.
+        batch_size (int): The number of names looked up at a time.
+
+    Yields:
+        dict: The records whose message is not in the message index.
+    """
+    records = iter(records)
+    while True:
+        batch = list(itertools.islice(records, batch_size))
+        if not batch:
+            return
+        names = [(record["message"] or {}).get("name") for record in batch]
+        looked_up = [name for name in names if name]
+        indexed = set()
+        if looked_up:
+            entries = client_redis.hmget(REDIS_MESSAGE_INDEX_KEY, looked_up)
+            indexed = {name for name, entry in zip(looked_up, entries) if entry}
+        for record, name in zip(batch, names):
+            if name not in indexed:
+                yield record
+
+
+def _get_create_time(record):
+    """Returns the createTime of a query record, the key records are merged on."""
+    return record["create_time"]
+
+
+def _parse_cursor(cursor):
+    """Returns the (create_time, offset) of a "<create_time>:<offset>" query cursor."""
+    create_time, _, offset = cursor.rpartition(":")
+    try:
+        create_time, offset = float(create_time), int(offset)
+    except ValueError:
+        raise ValueError(f"Invalid cursor {cursor}.") from None
+    if offset < 0:
+        raise ValueError(f"Invalid cursor {cursor}.")
+    return create_time, offset
+
+
+def query_messages(
+    space_id=None,
+    sender_ldap=None,
+    start_time=None,
+    end_time=None,
+    directory=None,
+    limit=DEFAULT_QUERY_LIMIT,
+    cursor=None,
+):
+    """
+    Returns a page of the messages of a space and/or sender from both tiers.
+
+    Results are merged in createTime order. A message found in both tiers, for example
+    restored after it was moved, is returned once, from Redis: cold records are dropped
+    when the message index still has their name, wherever the Redis copy falls in the
+    range. At most `limit` records are returned, with a cursor to pass to the next
+    call, like the score cursor of `iter_key_members`: the createTime of the last
+    record and the number of records already returned at that createTime. The message
+    keys are merged lazily, so Redis reads are bounded by the page size, and the cold
+    tier scan only keeps the earliest records of the page.
+
+    Args:
+        space_id (str, optional): The ID of the Chat space to query.
+        sender_ldap (str, optional): The LDAP identifier of the sender to query.
+        start_time (datetime.datetime, optional): The earliest createTime, included.
+        end_time (datetime.datetime, optional): The latest createTime, included.
+        directory (str, optional): The cold tier directory, defaults to
+            `get_cold_tier_dir()`.
+        limit (int): The maximum number of records returned, up to `MAX_QUERY_LIMIT`.
+        cursor (str, optional): The cursor returned by the previous page.
+
+    Returns:
+        tuple: (records, next_cursor) where records is a list of {"space_id",
+        "sender_ldap", "create_time", "type", "message"} records and next_cursor is
+        None on the last page.
+
+    Raises:
+        ValueError: If neither space_id nor sender_ldap is given, or the limit or
+            cursor is not valid.
+        redis.exceptions.RedisError: If an error occurs during Redis operations.
+    """
+    if not 0 < limit <= MAX_QUERY_LIMIT:
+        raise ValueError(f"limit must be between 1 and {MAX_QUERY_LIMIT}.")
+    skip = 0
+    if cursor:
+        cursor_time, skip = _parse_cursor(cursor)
+        start_time = datetime.fromtimestamp(cursor_time, timezone.utc)
+    keys = get_export_keys(space_id, sender_ldap)
+    window = skip + limit + 1
+    min_score = start_time.timestamp() if start_time else "-inf"
+    max_score = end_time.timestamp() if end_time else "+inf"
+    batch_size = min(window, DEFAULT_EXPORT_BATCH_SIZE)
+
+    hot_streams = [
+        iter_key_records(key, min_score, max_score, batch_size) for key in keys
+    ]
+    hot = list(
+        itertools.islice(heapq.merge(*hot_streams, key=_get_create_time), window)
+    )
+    client_redis = RedisClientFactory().create_redis_client()
+    cold = heapq.nsmallest(
+        window,
+        _iter_not_in_redis(
+            client_redis,
+            iter_cold_records(space_id, sender_ldap, start_time, end_time, directory),
+            DEFAULT_EXPORT_BATCH_SIZE,
+        ),
+        key=_get_create_time,
+    )
+    records = list(heapq.merge(hot, cold, key=_get_create_time))[:window]
+
+    page = records[skip : skip + limit]
+    next_cursor = None
+    if len(records) > skip + limit:
+        last_time = page[-1]["create_time"]
+        offset = sum(
+            1
+            for record in records[: skip + limit]
+            if record["create_time"] == last_time
+        )
+        next_cursor = f"{last_time!r}:{offset}"
+    return page, next_cursor
@@ -7,3 +7,152 @@ REDIS_MESSAGE_STORED_DEBUG_MSG = "Stored message in Redis: {redis_key}, score: {
 HOST = "REDIS_HOST"
 PORT = "REDIS_PORT"
 PASSWORD = "REDIS_PASSWORD"
+CLIENT_CACHE_SIZE = "REDIS_CLIENT_CACHE_SIZE"
+
+REDIS_MESSAGE_INDEX_KEY = "messages:index"
+REDIS_MESSAGE_DELETED_DEBUG_MSG = (
+    "Deleted message from Redis: {redis_key}, score: {score}"
+)
+REDIS_MESSAGE_NOT_INDEXED_DEBUG_MSG = (
+    "Message {message_name} not found in the message index, tombstone it."
+)
+REDIS_MESSAGE_TOMBSTONED_DEBUG_MSG = (
+    "Message {message_name} was deleted before it was stored, skip storing."
+)
+TOMBSTONE_KEY_FORMAT = "tombstones:{message_name}"
+DEFAULT_TOMBSTONE_SECONDS = 60 * 60
+REDIS_BATCH_STORED_DEBUG_MSG = "Committed {count} message events to Redis."
+
+MESSAGE_TYPE_DELETE = "delete"
+
+DEDUP_KEY_FORMAT = "dedup:{event_key}"
+DEFAULT_DEDUP_LRU_SIZE = 100000
+DEFAULT_DEDUP_WINDOW_SECONDS = 24 * 60 * 60
+DUPLICATE_EVENT_DEBUG_MSG = "Dropping duplicate event {event_key} ({source} hit)."
+DEDUP_METRICS_INFO_MSG = (
+    "Dedup metrics: {local_hits} local hits, {redis_hits} Redis hits, "
+    "{misses} misses, hit rate {hit_rate:.2%}."
+)
+
+WORKSPACE_SUBSCRIPTION_EXPIRY_KEY = "workspaces:subscriptions:expiry"
+WORKSPACE_SUBSCRIPTION_INFO_KEY = "workspaces:subscriptions:info"
+
+WATERMARK_REALTIME_KEY = "watermarks:realtime"
+WATERMARK_BACKFILL_KEY = "watermarks:backfill"
+WATERMARK_LIVE_SINCE_KEY = "watermarks:live_since"
+WATERMARK_GAPS_KEY = "watermarks:gaps"
+SUBSCRIBER_HEARTBEAT_KEY = "watermarks:subscribers:heartbeat"
+SUBSCRIBER_LIVE_SINCE_KEY = "watermarks:subscribers:live_since"
+
+COMPRESSED_MEMBER_PREFIX = b"\x00zlib\x00"
+DEFAULT_COMPRESSION_THRESHOLD_BYTES = 1024
+DEFAULT_COMPRESSION_LEVEL = 6
+COMPRESSION_BENCHMARK_RESULT_MSG = (
+    "{label}: {count} messages, {raw_bytes} -> {stored_bytes} bytes "
+    "(ratio {ratio:.2f}), {compressed_count} compressed, "
+    "encode {encode_us:.1f} us/msg, decode {decode_us:.1f} us/msg."
+)
+
+MESSAGE_KEY_PREFIX = "spaces/"
+MESSAGE_KEY_LDAP_SEPARATOR = ":ldap:"
+MESSAGE_KEY_SCAN_PATTERN = "spaces/*:ldap:*"
+RETENTION_POLICY_KEY = "retention:policy"
+RETENTION_DEFAULT_FIELD = "*"
+DEFAULT_COMPACTION_SCAN_COUNT = 500
+DEFAULT_COMPACTION_BATCH_SIZE = 100
+DEFAULT_COMPACTION_KEYS_PER_SECOND = 500
+DEFAULT_COMPACTION_INTERVAL_SECONDS = 60 * 60
+SECONDS_PER_DAY = 24 * 60 * 60
+COMPACTION_INFO_MSG = (
+    "Compacted {keys_compacted} of {keys_scanned} message keys: "
+    "evicted {evicted} messages and {index_evicted} index entries."
+)
+COMPACTION_FAILED_ERROR_MSG = (
+    "Compaction pass failed, retrying in {interval} seconds: {error}"
+)
+
+REGISTRY_SPACES_KEY = "registry:spaces"
+REGISTRY_LDAPS_KEY = "registry:ldaps"
+REGISTRY_SPACE_KEYS_FORMAT = "registry:spaces/{space_id}:keys"
+REGISTRY_LDAP_KEYS_FORMAT = "registry:ldap:{sender_ldap}:keys"
+REGISTRY_REBUILT_INFO_MSG = "Registered {count} message keys from a keyspace scan."
+
+LEADERBOARD_KEY_FORMAT = "leaderboard:{scope}"
+LEADERBOARD_BUCKET_KEY_FORMAT = "leaderboard:{scope}:{period}:{bucket}"
+LEADERBOARD_GLOBAL_SCOPE = "global"
+LEADERBOARD_SPACE_SCOPE_FORMAT = "spaces/{space_id}"
+PERIOD_DAY = "day"
+PERIOD_WEEK = "week"
+PERIOD_MONTH = "month"
+PERIOD_BUCKET_FORMATS = {
+    PERIOD_DAY: "%Y-%m-%d",
+    PERIOD_WEEK: "%G-W%V",
+    PERIOD_MONTH: "%Y-%m",
+}
+DEFAULT_LEADERBOARD_SIZE = 10
+
+ACTIVE_MEMBERS_KEY_FORMAT = "active:members:{scope}:day:{day}"
+ACTIVE_SPACES_KEY_FORMAT = "active:spaces:day:{day}"
+DEFAULT_ACTIVE_DAYS = 7
+MAX_ACTIVE_DAYS = 92
+
+GROUP_BY_SPACE = "space"
+GROUP_BY_DAY = "day"
+MAX_ACTIVITY_DAYS = 366
+MAX_ACTIVITY_DAY_BUCKETS = 92
+DEFAULT_ACTIVITY_PIPELINE_SIZE = 1000
+
+DEFAULT_EXPORT_BATCH_SIZE = 500
+EXPORT_COMPLETED_INFO_MSG = "Exported {count} messages from {key_count} keys."
+
+DIRECTORY_PEOPLE_KEY = "directory:people"
+
+COLD_TIER_DIR = "COLD_TIER_DIR"
+DEFAULT_COLD_TIER_DIR = "cold_tier"
+COLD_TIER_FILE_FORMAT = "messages-{run}-{run_id}-{part:05d}.parquet"
+DEFAULT_QUERY_LIMIT = 500
+MAX_QUERY_LIMIT = 5000
+DEFAULT_TIER_AGE_DAYS = 90
+DEFAULT_TIER_FILE_ROWS = 100000
+DEFAULT_TIER_SCRIPT_MEMBERS = 1000
+TIERED_MESSAGES_INFO_MSG = (
+    "Moved {tiered} messages of {keys_tiered} keys older than {cutoff} "
+    "to {files} cold tier files."
+)
+
+DEFAULT_ANALYTICS_BATCH_KEYS = 100
+DEFAULT_ANALYTICS_PAGE_SCORES = 10000
+DEFAULT_ANALYTICS_MAX_AGE_SECONDS = 60
+DEFAULT_ANALYTICS_PERCENTILES = (50, 90, 99)
+ANALYTICS_REFRESHED_DEBUG_MSG = (
+    "Refreshed the analytics cache: {added} timestamps added, {reloaded} keys "
+    "reloaded, {dropped} keys dropped, {total} timestamps cached."
+)
+
+QUERY_VERSIONS_KEY = "versions:queries"
+VERSION_GLOBAL_SCOPE = "global"
+VERSION_SPACE_SCOPE_FORMAT = "spaces/{space_id}"
+VERSION_LDAP_SCOPE_FORMAT = "ldap:{sender_ldap}"
+
+DEFAULT_CLIENT_CACHE_SIZE = 10000
+# ZREVRANGE is left out: redis-py 5.2 passes its key as a string, which the cache splits
+# into characters, so a cached leaderboard would never be invalidated.
+CLIENT_CACHE_COMMANDS = (
+    "GET",
+    "HGET",
+    "HGETALL",
+    "HMGET",
+    "SMEMBERS",
+    "ZSCORE",
+)
+CLIENT_CACHE_KEY_PREFIXES = (
+    "directory:",
+    "leaderboard:",
+    "registry:",
+    "retention:",
+    "watermarks:",
+)
+CLIENT_CACHE_METRICS_NAME = "redis_client"
+CLIENT_CACHE_UNSUPPORTED_WARNING_MSG = (
+    "Redis client-side caching is not available, using a client without cache: {error}"
+)
@@ -0,0 +1,37 @@
+from redis_dal.redis_client_factory import RedisClientFactory
+from redis_dal.constants import DIRECTORY_PEOPLE_KEY
+
+
+def save_directory_people(people):
+    """
+    Replaces the cached directory of sender IDs to LDAP identifiers.
+
+    Args:
+        people (dict): A mapping of sender IDs to LDAP identifiers.
+
+    Raises:
+        redis.exceptions.RedisError: If an error occurs during Redis operations.
+    """
+    client_redis = RedisClientFactory().create_redis_client()
+    pipeline = client_redis.pipeline()
+    pipeline.delete(DIRECTORY_PEOPLE_KEY)
+    if people:
+        pipeline.hset(DIRECTORY_PEOPLE_KEY, mapping=people)
+    pipeline.execute()
+
+
+def load_directory_people():
+    """
+    Reads the cached directory of sender IDs to LDAP identifiers.
+
+    Returns:
+        dict: A mapping of sender IDs to LDAP identifiers, empty if nothing is cached.
+
+    Raises:
+        redis.exceptions.RedisError: If an error occurs during Redis operations.
+    """
+    client_redis = RedisClientFactory().create_redis_client()
+    return {
+        sender_id.decode(): ldap.decode()
+        for sender_id, ldap in client_redis.hgetall(DIRECTORY_PEOPLE_KEY).items()
+    }
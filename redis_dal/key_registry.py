@@ -0,0 +1,158 @@
+from redis_dal.redis_client_factory import RedisClientFactory
+from tools.log.logger import setup_logger
+import logging
+from redis_dal.constants import (
+    MESSAGE_KEY_PREFIX,
+    MESSAGE_KEY_LDAP_SEPARATOR,
+    MESSAGE_KEY_SCAN_PATTERN,
+    REGISTRY_SPACES_KEY,
+    REGISTRY_LDAPS_KEY,
+    REGISTRY_SPACE_KEYS_FORMAT,
+    REGISTRY_LDAP_KEYS_FORMAT,
+    REGISTRY_REBUILT_INFO_MSG,
+    DEFAULT_COMPACTION_SCAN_COUNT,
+)
+
+setup_logger()
+
+
+def _decode(value):
+    """Returns a Redis reply as a str."""
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def parse_message_key(key):
+    """
+    Splits a message key into its space ID and sender LDAP.
+
+    Args:
+        key (bytes | str): A key in the `spaces/{space_id}:ldap:{sender_ldap}` format.
+
+    Returns:
+        tuple: (space_id, sender_ldap).
+    """
+    space_id, _, sender_ldap = _decode(key)[len(MESSAGE_KEY_PREFIX) :].partition(
+        MESSAGE_KEY_LDAP_SEPARATOR
+    )
+    return space_id, sender_ldap
+
+
+def queue_register_key(pipeline, space_id, sender_ldap, redis_key):
+    """
+    Queues the commands that record a message key in the registry on a Redis pipeline.
+
+    Args:
+        pipeline (redis.client.Pipeline): The pipeline to queue the commands on.
+        space_id (str): The ID of the Chat space of the key.
+        sender_ldap (str): The LDAP identifier of the sender of the key.
+        redis_key (str): The message key.
+    """
+    pipeline.sadd(REGISTRY_SPACES_KEY, space_id)
+    pipeline.sadd(REGISTRY_LDAPS_KEY, sender_ldap)
+    pipeline.sadd(REGISTRY_SPACE_KEYS_FORMAT.format(space_id=space_id), redis_key)
+    pipeline.sadd(REGISTRY_LDAP_KEYS_FORMAT.format(sender_ldap=sender_ldap), redis_key)
+
+
+def get_registered_space_ids():
+    """
+    Returns the IDs of every space with stored messages.
+
+    Raises:
+        redis.exceptions.RedisError: If an error occurs during Redis operations.
+    """
+    client_redis = RedisClientFactory().create_redis_client()
+    return sorted(
+        _decode(space_id) for space_id in client_redis.smembers(REGISTRY_SPACES_KEY)
+    )
+
+
+def get_registered_ldaps():
+    """
+    Returns the LDAP identifiers of every sender with stored messages.
+
+    Raises:
+        redis.exceptions.RedisError: If an error occurs during Redis operations.
+    """
+    client_redis = RedisClientFactory().create_redis_client()
+    return sorted(_decode(ldap) for ldap in client_redis.smembers(REGISTRY_LDAPS_KEY))
+
+
+def _get_registered_keys(registry_keys):
+    """Reads several registry sets in one pipeline."""
+    client_redis = RedisClientFactory().create_redis_client()
+    pipeline = client_redis.pipeline(transaction=False)
+    for registry_key in registry_keys:
+        pipeline.smembers(registry_key)
+    return [sorted(_decode(key) for key in keys) for keys in pipeline.execute()]
+
+
+def get_space_keys(space_ids):
+    """
+    Returns the message keys of some spaces.
+
+    Args:
+        space_ids (list): The IDs of the Chat spaces.
+
+    Returns:
+        dict: A mapping of space IDs to the list of their message keys.
+
+    Raises:
+        redis.exceptions.RedisError: If an error occurs during Redis operations.
+    """
+    space_ids = list(space_ids)
+    registry_keys = [
+        REGISTRY_SPACE_KEYS_FORMAT.format(space_id=space_id) for space_id in space_ids
+    ]
+    return dict(zip(space_ids, _get_registered_keys(registry_keys)))
+
+
+def get_ldap_keys(sender_ldaps):
+    """
+    Returns the message keys of some senders, across all spaces.
+
+    Args:
+        sender_ldaps (list): The LDAP identifiers of the senders.
+
+    Returns:
+        dict: A mapping of LDAP identifiers to the list of their message keys.
+
+    Raises:
+        redis.exceptions.RedisError: If an error occurs during Redis operations.
+    """
+    sender_ldaps = list(sender_ldaps)
+    registry_keys = [
+        REGISTRY_LDAP_KEYS_FORMAT.format(sender_ldap=sender_ldap)
+        for sender_ldap in sender_ldaps
+    ]
+    return dict(zip(sender_ldaps, _get_registered_keys(registry_keys)))
+
+
+def rebuild_key_registry(scan_count=DEFAULT_COMPACTION_SCAN_COUNT):
+    """
+    Registers message keys written before the registry existed.
+
+    This walks the keyspace once with SCAN and is only needed after upgrading an
+    existing dataset; new keys are registered by `store_messages`.
+
+    Args:
+        scan_count (int): The SCAN COUNT hint, also used as the pipeline batch size.
+
+    Returns:
+        int: The number of message keys registered.
+
+    Raises:
+        redis.exceptions.RedisError: If an error occurs during Redis operations.
+    """
+    client_redis = RedisClientFactory().create_redis_client()
+    pipeline = client_redis.pipeline(transaction=False)
+    count = 0
+    for key in client_redis.scan_iter(match=MESSAGE_KEY_SCAN_PATTERN, count=scan_count):
+        key = _decode(key)
+        space_id, sender_ldap = parse_message_key(key)
+        queue_register_key(pipeline, space_id, sender_ldap, key)
+        count += 1
+        if count % scan_count == 0:
+            pipeline.execute()
+    pipeline.execute()
+    logging.info(REGISTRY_REBUILT_INFO_MSG.format(count=count))
+    return count
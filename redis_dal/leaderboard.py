@@ -0,0 +1,182 @@
+from redis_dal.redis_client_factory import RedisClientFactory
+from redis.commands.core import Script
+from datetime import datetime, timezone
+import time
+from redis_dal.constants import (
+    LEADERBOARD_KEY_FORMAT,
+    LEADERBOARD_BUCKET_KEY_FORMAT,
+    LEADERBOARD_GLOBAL_SCOPE,
+    LEADERBOARD_SPACE_SCOPE_FORMAT,
+    PERIOD_BUCKET_FORMATS,
+    DEFAULT_LEADERBOARD_SIZE,
+)
+
+# The scripts are created once and run on the pipeline given to each call. Their
+# source is passed as bytes, so no client is needed to compute the SHA1.
+
+# Increments ARGV[2] in the leaderboards KEYS[2..n] unless the member ARGV[1] is
+# already in the message sorted set KEYS[1], so that storing the same message twice,
+# e.g. when a backfill overlaps real-time ingestion, counts it once.
+_INCREMENT_SCRIPT = Script(
+    None,
+    b"""
+if redis.call('ZSCORE', KEYS[1], ARGV[1]) then
+    return 0
+end
+for i = 2, #KEYS do
+    redis.call('ZINCRBY', KEYS[i], 1, ARGV[2])
+end
+return 1
+""",
+)
+
+# Decrements ARGV[2] in the leaderboards KEYS[2..n] if the member ARGV[1] is still in
+# the message sorted set KEYS[1], removing senders whose count drops to 0, so that a
+# delete applied twice is counted once.
+_DECREMENT_SCRIPT = Script(
+    None,
+    b"""
+if not redis.call('ZSCORE', KEYS[1], ARGV[1]) then
+    return 0
+end
+for i = 2, #KEYS do
+    if tonumber(redis.call('ZINCRBY', KEYS[i], -1, ARGV[2])) <= 0 then
+        redis.call('ZREM', KEYS[i], ARGV[2])
+    end
+end
+return 1
+""",
+)
+
+
+def get_period_bucket(period, timestamp):
+    """
+    Returns the bucket of a day, week or month period containing a timestamp.
+
+    Args:
+        period (str): "day", "week" or "month".
+        timestamp (float): An epoch timestamp.
+
+    Returns:
+        str: The bucket in UTC, e.g. "2024-05-13", "2024-W20" or "2024-05".
+
+    Raises:
+        ValueError: If the period is not supported.
+    """
+    if period not in PERIOD_BUCKET_FORMATS:
+        raise ValueError(f"Unsupported period {period}.")
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime(
+        PERIOD_BUCKET_FORMATS[period]
+    )
+
+
+def get_leaderboard_key(space_id=None, period=None, timestamp=None):
+    """
+    Returns the key of a leaderboard.
+
+    Args:
+        space_id (str, optional): The space of the leaderboard, or None for the global
+            leaderboard across spaces.
+        period (str, optional): "day", "week" or "month" for a time-bucketed
+            leaderboard, or None for all time.
+        timestamp (float, optional): A timestamp within the bucket, defaults to now.
+
+    Returns:
+        str: The leaderboard key.
+    """
+    scope = (
+        LEADERBOARD_SPACE_SCOPE_FORMAT.format(space_id=space_id)
+        if space_id
+        else LEADERBOARD_GLOBAL_SCOPE
+    )
+    if period is None:
+        return LEADERBOARD_KEY_FORMAT.format(scope=scope)
+    bucket = get_period_bucket(period, time.time() if timestamp is None else timestamp)
+    return LEADERBOARD_BUCKET_KEY_FORMAT.format(
+        scope=scope, period=period, bucket=bucket
+    )
+
+
+def _get_message_leaderboard_keys(space_id, score):
+    """Returns every leaderboard a message created at `score` counts towards."""
+    return [
+        get_leaderboard_key(scope_space_id, period, score)
+        for scope_space_id in (space_id, None)
+        for period in (None, *PERIOD_BUCKET_FORMATS)
+    ]
+
+
+def queue_increment_leaderboards(
+    pipeline, redis_key, member, space_id, sender_ldap, score
+):
+    """
+    Queues the increment of a new message's leaderboards on a Redis pipeline.
+
+    Must be queued before the ZADD of the message, which it checks for.
+
+    Args:
+        pipeline (redis.client.Pipeline): The pipeline to queue the commands on.
+        redis_key (str): The sorted set key the message is added to.
+        member (bytes): The encoded sorted set member of the message.
+        space_id (str): The ID of the Chat space of the message.
+        sender_ldap (str): The LDAP identifier of the message sender.
+        score (float): The epoch createTime of the message.
+    """
+    _INCREMENT_SCRIPT(
+        keys=[redis_key, *_get_message_leaderboard_keys(space_id, score)],
+        args=[member, sender_ldap],
+        client=pipeline,
+    )
+
+
+def queue_decrement_leaderboards(
+    pipeline, redis_key, member, space_id, sender_ldap, score
+):
+    """
+    Queues the correction of a deleted message's leaderboards on a Redis pipeline.
+
+    Must be queued before the removal of the message, which it checks for.
+
+    Args:
+        pipeline (redis.client.Pipeline): The pipeline to queue the commands on.
+        redis_key (str): The sorted set key the message is removed from.
+        member (bytes): The encoded sorted set member of the message.
+        space_id (str): The ID of the Chat space of the message.
+        sender_ldap (str): The LDAP identifier of the message sender.
+        score (float): The epoch createTime of the message.
+    """
+    _DECREMENT_SCRIPT(
+        keys=[redis_key, *_get_message_leaderboard_keys(space_id, score)],
+        args=[member, sender_ldap],
+        client=pipeline,
+    )
+
+
+def get_top_senders(
+    k=DEFAULT_LEADERBOARD_SIZE, space_id=None, period=None, timestamp=None
+):
+    """
+    Returns the most active senders of a space or across spaces.
+
+    Args:
+        k (int): The number of senders to return.
+        space_id (str, optional): The space to rank, or None to rank across spaces.
+        period (str, optional): "day", "week" or "month" to rank within the bucket
+            containing `timestamp`, or None to rank over all time.
+        timestamp (float, optional): A timestamp within the bucket, defaults to now.
+
+    Returns:
+        list: (sender_ldap, message_count) tuples, most active first.
+
+    Raises:
+        ValueError: If the period is not supported.
+        redis.exceptions.RedisError: If an error occurs during Redis operations.
+    """
+    client_redis = RedisClientFactory().create_redis_client()
+    top = client_redis.zrevrange(
+        get_leaderboard_key(space_id, period, timestamp), 0, k - 1, withscores=True
+    )
+    return [
+        (ldap.decode() if isinstance(ldap, bytes) else ldap, int(count))
+        for ldap, count in top
+    ]
@@ -0,0 +1,100 @@
+import ast
+import hashlib
+import zlib
+from redis_dal.constants import (
+    COMPRESSED_MEMBER_PREFIX,
+    DEFAULT_COMPRESSION_THRESHOLD_BYTES,
+    DEFAULT_COMPRESSION_LEVEL,
+)
+
+
+def encode_member(
+    member,
+    threshold=DEFAULT_COMPRESSION_THRESHOLD_BYTES,
+    level=DEFAULT_COMPRESSION_LEVEL,
+):
+    """
+    Encodes a sorted set member, compressing it if it is larger than `threshold`.
+
+    Compressed members are zlib data behind `COMPRESSED_MEMBER_PREFIX`. The prefix
+    starts with a NUL byte, which never starts a plain member, so the encoding is
+    self-describing and plain members written before compression existed stay readable.
+    Small members are stored as they are, since compression would barely shrink them.
+
+    Args:
+        member (str): The serialized member.
+        threshold (int): The size in bytes above which the member is compressed.
+        level (int): The zlib compression level, from 1 (fastest) to 9 (smallest).
+
+    Returns:
+        bytes: The encoded member.
+    """
+    raw = member.encode("utf-8")
+    if len(raw) <= threshold:
+        return raw
+    compressed = COMPRESSED_MEMBER_PREFIX + zlib.compress(raw, level)
+    return compressed if len(compressed) < len(raw) else raw
+
+
+def get_member_digest(raw):
+    """
+    Returns the digest of an encoded member, stored in the message index.
+
+    The digest identifies one member among the messages of a sender created in the same
+    second, without storing the member twice.
+
+    Args:
+        raw (bytes): The encoded member, as returned by `encode_member` or Redis.
+
+    Returns:
+        str: The hex SHA-1 digest of the member.
+    """
+    return hashlib.sha1(raw).hexdigest()
+
+
+def is_compressed_member(raw):
+    """Returns True if a member read from Redis is compressed."""
+    return raw.startswith(COMPRESSED_MEMBER_PREFIX)
+
+
+def decode_member(raw):
+    """
+    Decodes a sorted set member read from Redis, decompressing it if needed.
+
+    Args:
+        raw (bytes | str): The member as returned by Redis.
+
+    Returns:
+        str: The serialized member.
+
+    Raises:
+        zlib.error: If a compressed member is corrupted.
+    """
+    if isinstance(raw, str):
+        return raw
+    if is_compressed_member(raw):
+        raw = zlib.decompress(raw[len(COMPRESSED_MEMBER_PREFIX) :])
+    return raw.decode("utf-8")
+
+
+def parse_member(raw):
+    """
+    Parses a sorted set member read from Redis back into the stored dictionary.
+
+    Members are the `str()` of {"message": ..., "type": ...} dictionaries, so they are
+    parsed as Python literals rather than JSON.
+
+    Args:
+        raw (bytes | str): The member as returned by Redis.
+
+    Returns:
+        dict: The stored {"message": dict, "type": str} dictionary.
+
+    Raises:
+        ValueError: If the member is not a valid Python literal.
+        zlib.error: If a compressed member is corrupted.
+    """
+    try:
+        return ast.literal_eval(decode_member(raw))
+    except SyntaxError as e:
+        raise ValueError(f"Invalid stored member: {e}") from e
@@ -0,0 +1,154 @@
+from redis_dal.redis_client_factory import RedisClientFactory
+from collections import OrderedDict
+from tools.log.logger import LazyMessage, setup_logger
+import logging
+import threading
+from redis_dal.constants import (
+    DEDUP_KEY_FORMAT,
+    DEFAULT_DEDUP_LRU_SIZE,
+    DEFAULT_DEDUP_WINDOW_SECONDS,
+    DUPLICATE_EVENT_DEBUG_MSG,
+    DEDUP_METRICS_INFO_MSG,
+)
+
+setup_logger()
+
+
+class MessageDeduplicator:
+    """
+    Drops redelivered events before they reach the Redis write pipeline.
+
+    Pub/Sub delivers at least once and the Workspace Events API may publish the same
+    event more than once. Every event key is checked against a bounded in-process LRU
+    first, and then against a Redis marker so that duplicates are also detected across
+    processes and restarts within the dedup window.
+
+    An event is marked as seen only once it is committed: `queue_mark_seen` queues the
+    markers on the pipeline that stores the events, and `remember` adds them to the LRU
+    after the pipeline succeeded. An event whose commit failed, or whose process died
+    before committing, is therefore processed again when it is redelivered. Redeliveries
+    of an event still in flight are not detected, which is harmless since storing an
+    event is idempotent.
+
+    Attributes:
+        lru_size (int): The maximum number of event keys remembered in process.
+        window_seconds (int): How long a committed event key is remembered in Redis.
+        local_hits (int): The number of duplicates detected by the in-process LRU.
+        redis_hits (int): The number of duplicates detected by Redis.
+        misses (int): The number of events seen for the first time.
+    """
+
+    def __init__(
+        self,
+        lru_size=DEFAULT_DEDUP_LRU_SIZE,
+        window_seconds=DEFAULT_DEDUP_WINDOW_SECONDS,
+    ):
+        """
+        Initializes the deduplicator.
+
+        Args:
+            lru_size (int): The maximum number of event keys remembered in process.
+            window_seconds (int): How long a committed event key is remembered in Redis.
+        """
+        self.lru_size = lru_size
+        self.window_seconds = window_seconds
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self._seen = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, event_key):
+        """Records an event key in the LRU, evicting the least recently used one."""
+        self._seen[event_key] = None
+        self._seen.move_to_end(event_key)
+        if len(self._seen) > self.lru_size:
+            self._seen.popitem(last=False)
+
+    def is_duplicate(self, event_key):
+        """
+        Checks whether an event was already committed.
+
+        Args:
+            event_key (str): The key identifying the event, e.g. the event type and the
+                Chat message name.
+
+        Returns:
+            bool: True if the event is a duplicate and should be dropped.
+
+        Raises:
+            redis.exceptions.RedisError: If an error occurs during Redis operations.
+        """
+        with self._lock:
+            if event_key in self._seen:
+                self._seen.move_to_end(event_key)
+                self.local_hits += 1
+                logging.debug(
+                    LazyMessage(
+                        DUPLICATE_EVENT_DEBUG_MSG, event_key=event_key, source="local"
+                    )
+                )
+                return True
+
+        client_redis = RedisClientFactory().create_redis_client()
+        committed = client_redis.exists(DEDUP_KEY_FORMAT.format(event_key=event_key))
+
+        with self._lock:
+            if committed:
+                self._remember(event_key)
+                self.redis_hits += 1
+                logging.debug(
+                    LazyMessage(
+                        DUPLICATE_EVENT_DEBUG_MSG, event_key=event_key, source="Redis"
+                    )
+                )
+                return True
+            self.misses += 1
+            return False
+
+    def queue_mark_seen(self, pipeline, event_keys):
+        """
+        Queues the Redis markers of events on the pipeline that commits them.
+
+        Args:
+            pipeline (redis.client.Pipeline): The pipeline storing the events.
+            event_keys (list): The keys of the events.
+        """
+        for event_key in event_keys:
+            pipeline.set(
+                DEDUP_KEY_FORMAT.format(event_key=event_key),
+                1,
+                ex=self.window_seconds,
+            )
+
+    def remember(self, event_keys):
+        """
+        Adds committed events to the in-process LRU.
+
+        Args:
+            event_keys (list): The keys of the committed events.
+        """
+        with self._lock:
+            for event_key in event_keys:
+                self._remember(event_key)
+
+    def get_metrics(self):
+        """
+        Returns the hit and miss counters of the deduplicator.
+
+        Returns:
+            dict: The local hits, Redis hits, misses and overall hit rate.
+        """
+        with self._lock:
+            total = self.local_hits + self.redis_hits + self.misses
+            hits = self.local_hits + self.redis_hits
+            return {
+                "local_hits": self.local_hits,
+                "redis_hits": self.redis_hits,
+                "misses": self.misses,
+                "hit_rate": hits / total if total else 0.0,
+            }
+
+    def log_metrics(self):
+        """Logs the hit and miss counters of the deduplicator."""
+        logging.info(DEDUP_METRICS_INFO_MSG.format(**self.get_metrics()))
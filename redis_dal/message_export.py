@@ -0,0 +1,215 @@
+"""Streams stored messages out of Redis as NDJSON."""
+
+from redis_dal.redis_client_factory import RedisClientFactory
+from redis_dal.key_registry import get_ldap_keys, get_space_keys, parse_message_key
+from redis_dal.message_codec import parse_member
+from tools.log.logger import setup_logger
+from datetime import datetime
+import argparse
+import json
+import logging
+import sys
+import zlib
+from redis_dal.constants import (
+    REDIS_KEY_FORMAT,
+    DEFAULT_EXPORT_BATCH_SIZE,
+    EXPORT_COMPLETED_INFO_MSG,
+)
+
+setup_logger()
+
+# wbits for a gzip container around the deflate stream.
+_GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+def get_export_keys(space_id=None, sender_ldap=None):
+    """
+    Returns the message keys of a space, of a sender, or of one sender in one space.
+
+    Args:
+        space_id (str, optional): The ID of the Chat space to export.
+        sender_ldap (str, optional): The LDAP identifier of the sender to export.
+
+    Returns:
+        list: The message keys.
+
+    Raises:
+        ValueError: If neither space_id nor sender_ldap is given.
+        redis.exceptions.RedisError: If an error occurs during Redis operations.
+    """
+    if space_id and sender_ldap:
+        return [REDIS_KEY_FORMAT.format(space_id=space_id, sender_ldap=sender_ldap)]
+    if space_id:
+        return get_space_keys([space_id])[space_id]
+    if sender_ldap:
+        return get_ldap_keys([sender_ldap])[sender_ldap]
+    raise ValueError("space_id or sender_ldap must be provided.")
+
+
+def iter_key_members(
+    key, min_score="-inf", max_score="+inf", batch_size=DEFAULT_EXPORT_BATCH_SIZE
+):
+    """
+    Iterates over the members of a sorted set in score order, one batch at a time.
+
+    The cursor is the last score read plus the number of members already read at that
+    score, so each batch is a `ZRANGE ... BYSCORE LIMIT` that costs O(log N + batch)
+    regardless of how far into the key the export is, and only one batch is held in
+    memory.
+
+    Args:
+        key (str): The sorted set key.
+        min_score (float | str): The lowest score to read, included.
+        max_score (float | str): The highest score to read, included.
+        batch_size (int): The number of members read per round trip.
+
+    Yields:
+        tuple: (member, score) pairs as returned by Redis.
+
+    Raises:
+        redis.exceptions.RedisError: If an error occurs during Redis operations.
+    """
+    client_redis = RedisClientFactory().create_redis_client()
+    offset = 0
+    while True:
+        batch = client_redis.zrange(
+            key,
+            min_score,
+            max_score,
+            byscore=True,
+            offset=offset,
+            num=batch_size,
+            withscores=True,
+        )
+        yield from batch
+        if len(batch) < batch_size:
+            return
+        last_score = batch[-1][1]
+        if last_score != min_score:
+            min_score, offset = last_score, 0
+        offset += sum(1 for _, score in batch if score == last_score)
+
+
+def iter_key_records(
+    key, min_score="-inf", max_score="+inf", batch_size=DEFAULT_EXPORT_BATCH_SIZE
+):
+    """
+    Iterates over the stored messages of one message key in createTime order.
+
+    Args:
+        key (str): The message key.
+        min_score (float | str): The earliest createTime to read, included.
+        max_score (float | str): The latest createTime to read, included.
+        batch_size (int): The number of members read per round trip.
+
+    Yields:
+        dict: {"space_id", "sender_ldap", "create_time", "type", "message"} records.
+
+    Raises:
+        redis.exceptions.RedisError: If an error occurs during Redis operations.
+    """
+    space_id, sender_ldap = parse_message_key(key)
+    for member, score in iter_key_members(key, min_score, max_score, batch_size):
+        stored = parse_member(member)
+        yield {
+            "space_id": space_id,
+            "sender_ldap": sender_ldap,
+            "create_time": score,
+            "type": stored.get("type"),
+            "message": stored.get("message"),
+        }
+
+
+def iter_export_records(
+    space_id=None,
+    sender_ldap=None,
+    start_time=None,
+    end_time=None,
+    batch_size=DEFAULT_EXPORT_BATCH_SIZE,
+):
+    """
+    Iterates over the stored messages of a space and/or sender, key by key.
+
+    Args:
+        space_id (str, optional): The ID of the Chat space to export.
+        sender_ldap (str, optional): The LDAP identifier of the sender to export.
+        start_time (datetime.datetime, optional): The earliest createTime, included.
+        end_time (datetime.datetime, optional): The latest createTime, included.
+        batch_size (int): The number of members read per round trip.
+
+    Yields:
+        dict: {"space_id", "sender_ldap", "create_time", "type", "message"} records.
+
+    Raises:
+        ValueError: If neither space_id nor sender_ldap is given.
+        redis.exceptions.RedisError: If an error occurs during Redis operations.
+    """
+    min_score = start_time.timestamp() if start_time else "-inf"
+    max_score = end_time.timestamp() if end_time else "+inf"
+    keys = get_export_keys(space_id, sender_ldap)
+    count = 0
+    for key in keys:
+        for record in iter_key_records(key, min_score, max_score, batch_size):
+            count += 1
+            yield record
+    logging.info(EXPORT_COMPLETED_INFO_MSG.format(count=count, key_count=len(keys)))
+
+
+def iter_ndjson(records, batch_size=DEFAULT_EXPORT_BATCH_SIZE, compress=False):
+    """
+    Serializes records as NDJSON chunks of up to `batch_size` lines.
+
+    Args:
+        records (iterable): The records to serialize.
+        batch_size (int): The number of lines per chunk.
+        compress (bool): Whether to gzip the stream.
+
+    Yields:
+        bytes: The next chunk of the (optionally gzipped) NDJSON stream.
+    """
+    compressor = zlib.compressobj(wbits=_GZIP_WBITS) if compress else None
+    lines = []
+
+    def encode(chunk):
+        return compressor.compress(chunk) if compressor else chunk
+
+    for record in records:
+        lines.append(json.dumps(record, ensure_ascii=False))
+        if len(lines) >= batch_size:
+            chunk = encode(("\n".join(lines) + "\n").encode("utf-8"))
+            lines = []
+            if chunk:
+                yield chunk
+    tail = encode(("\n".join(lines) + "\n").encode("utf-8")) if lines else b""
+    if compressor:
+        tail += compressor.flush()
+    if tail:
+        yield tail
+
+
+def main(argv=None):
+    """Command line entry point writing an export to a file or stdout."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--space-id")
+    parser.add_argument("--ldap")
+    parser.add_argument("--start-time", type=datetime.fromisoformat)
+    parser.add_argument("--end-time", type=datetime.fromisoformat)
+    parser.add_argument("--gzip", action="store_true")
+    parser.add_argument("--output", help="The output file, defaults to stdout.")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_EXPORT_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    records = iter_export_records(
+        args.space_id, args.ldap, args.start_time, args.end_time, args.batch_size
+    )
+    output = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for chunk in iter_ndjson(records, args.batch_size, args.gzip):
+            output.write(chunk)
+    finally:
+        if args.output:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
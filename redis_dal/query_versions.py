@@ -0,0 +1,84 @@
+from redis_dal.redis_client_factory import RedisClientFactory
+from redis_dal.constants import (
+    QUERY_VERSIONS_KEY,
+    VERSION_GLOBAL_SCOPE,
+    VERSION_SPACE_SCOPE_FORMAT,
+    VERSION_LDAP_SCOPE_FORMAT,
+)
+
+
+def get_version_scopes(space_id=None, sender_ldaps=None):
+    """
+    Returns the version scopes a query over a space and/or senders depends on.
+
+    Args:
+        space_id (str, optional): The ID of the Chat space queried.
+        sender_ldaps (iterable, optional): The LDAP identifiers of the senders queried.
+
+    Returns:
+        list: The space and sender scopes, or the global scope for unscoped queries.
+    """
+    scopes = []
+    if space_id:
+        scopes.append(VERSION_SPACE_SCOPE_FORMAT.format(space_id=space_id))
+    for sender_ldap in sorted(sender_ldaps or ()):
+        scopes.append(VERSION_LDAP_SCOPE_FORMAT.format(sender_ldap=sender_ldap))
+    return scopes or [VERSION_GLOBAL_SCOPE]
+
+
+def queue_bump_versions(pipeline, space_id=None, sender_ldap=None):
+    """
+    Queues the version bumps of a write on a Redis pipeline.
+
+    The versions of the space and the sender written to are bumped, so that cached
+    results depending on either are invalidated. Unscoped results depend on every
+    write: the writer also bumps the global version, once per pipeline, with
+    `queue_bump_global_version`.
+
+    Args:
+        pipeline (redis.client.Pipeline): The pipeline to queue the commands on.
+        space_id (str, optional): The ID of the Chat space written to.
+        sender_ldap (str, optional): The LDAP identifier of the sender written to.
+    """
+    if space_id:
+        pipeline.hincrby(
+            QUERY_VERSIONS_KEY, VERSION_SPACE_SCOPE_FORMAT.format(space_id=space_id), 1
+        )
+    if sender_ldap:
+        pipeline.hincrby(
+            QUERY_VERSIONS_KEY,
+            VERSION_LDAP_SCOPE_FORMAT.format(sender_ldap=sender_ldap),
+            1,
+        )
+
+
+def queue_bump_global_version(pipeline):
+    """
+    Queues the bump of the global version on a Redis pipeline.
+
+    Queued once by every pipeline that writes messages, whether a batch of ingested
+    events or a bulk job such as retention compaction or tiering, to invalidate the
+    cached unscoped results.
+
+    Args:
+        pipeline (redis.client.Pipeline): The pipeline to queue the command on.
+    """
+    pipeline.hincrby(QUERY_VERSIONS_KEY, VERSION_GLOBAL_SCOPE, 1)
+
+
+def get_versions(scopes):
+    """
+    Reads the current versions of scopes in one round trip.
+
+    Args:
+        scopes (list): The version scopes, see `get_version_scopes`.
+
+    Returns:
+        tuple: The version of each scope, 0 for scopes never written to.
+
+    Raises:
+        redis.exceptions.RedisError: If an error occurs during Redis operations.
+    """
+    client_redis = RedisClientFactory().create_redis_client()
+    versions = client_redis.hmget(QUERY_VERSIONS_KEY, scopes)
+    return tuple(int(version or 0) for version in versions)
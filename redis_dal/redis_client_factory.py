@@ -1,4 +1,7 @@
 from redis import Redis
+from redis.exceptions import ConnectionError
+from redis_dal.client_cache import HotKeyCacheConfig, HotKeyCacheRedis
+from tools.metrics.metrics import track_cache
 import os
 from tools.log.logger import setup_logger
 import logging
@@ -8,6 +11,9 @@ from redis_dal.constants import (
     HOST,
     PASSWORD,
     PORT,
+    CLIENT_CACHE_SIZE,
+    CLIENT_CACHE_METRICS_NAME,
+    CLIENT_CACHE_UNSUPPORTED_WARNING_MSG,
 )
 
 setup_logger()
@@ -21,6 +27,19 @@ class RedisClientFactory:
     It retrieves Redis connection parameters from environment variables and handles client creation
     and error handling.
 
+    When `REDIS_CLIENT_CACHE_SIZE` is set, the client speaks RESP3 and keeps up to that
+    many replies of hot keys (leaderboards, registries, the directory, ...) in a
+    client-side cache that the server invalidates on writes, see
+    `redis_dal.client_cache`. Its hit and miss counters are exported on `/metrics` as
+    `purrf_cache_stats{cache="redis_client"}`. Pipelines never go through the cache:
+    they are sent on a second connection pool, see `HotKeyCacheRedis`.
+
+    redis-py only supports client-side caching against Redis 7.4 or later and refuses
+    to connect to older servers with a `ConnectionError`. The cached client is therefore
+    probed with a PING when it is created; if the probe fails with a `ConnectionError`,
+    for an old server or an unreachable one, the factory logs a warning and falls back
+    to a client without cache.
+
     Attributes:
         _instance (RedisClientFactory): The singleton instance of the factory.
         _redis_client (redis.Redis): The created Redis client instance.
@@ -77,11 +96,53 @@ class RedisClientFactory:
             if not redis_host or not redis_port:
                 raise ValueError(REDIS_HOST_PORT_ERROR_MSG)
 
-            self._redis_client = Redis(
-                host=redis_host, port=redis_port, password=redis_password, ssl=True
-            )
+            connection_kwargs = {
+                "host": redis_host,
+                "port": redis_port,
+                "password": redis_password,
+                "ssl": True,
+            }
+            cache_size = os.environ.get(CLIENT_CACHE_SIZE)
+            if cache_size:
+                self._redis_client = self._create_cached_client(
+                    connection_kwargs, int(cache_size)
+                )
+            else:
+                self._redis_client = Redis(**connection_kwargs)
             logging.info(
                 REDIS_CLIENT_CREATED_MSG.format(redis_client=self._redis_client)
             )
 
         return self._redis_client
+
+    @staticmethod
+    def _create_cached_client(connection_kwargs, cache_size):
+        """
+        Creates a RESP3 client with a client-side cache, or a plain client if the server
+        does not support client-side caching.
+
+        Pipelines of the cached client are sent on a separate pool without cache, see
+        `HotKeyCacheRedis`.
+
+        Args:
+            connection_kwargs (dict): The connection parameters of the client.
+            cache_size (int): The maximum number of cached replies.
+
+        Returns:
+            redis.Redis: The Redis client instance.
+        """
+        pipeline_client = Redis(**connection_kwargs)
+        client = HotKeyCacheRedis(
+            pipeline_client=pipeline_client,
+            protocol=3,
+            cache_config=HotKeyCacheConfig(max_size=cache_size),
+            **connection_kwargs,
+        )
+        try:
+            client.ping()
+        except ConnectionError as e:
+            logging.warning(CLIENT_CACHE_UNSUPPORTED_WARNING_MSG.format(error=e))
+            client.close()
+            return pipeline_client
+        track_cache(CLIENT_CACHE_METRICS_NAME, client.get_cache())
+        return client
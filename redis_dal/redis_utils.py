@@ -1,10 +1,159 @@
 from redis_dal.redis_client_factory import RedisClientFactory
+from redis_dal.message_codec import encode_member, get_member_digest, parse_member
+from redis_dal.key_registry import queue_register_key
+from redis_dal.active_members import queue_record_activity
+from redis_dal.query_versions import queue_bump_global_version, queue_bump_versions
+from redis_dal.leaderboard import (
+    queue_decrement_leaderboards,
+    queue_increment_leaderboards,
+)
 from datetime import datetime
-from tools.log.logger import setup_logger
+from tools.log.logger import LazyMessage, setup_logger
+from tools.metrics.metrics import (
+    MESSAGES_STORED,
+    REDIS_PIPELINE_BATCH_SIZE,
+    REDIS_PIPELINE_SECONDS,
+)
+from tools.tracing.tracing import get_tracer
+import json
 import logging
-from redis_dal.constants import REDIS_KEY_FORMAT, REDIS_MESSAGE_STORED_DEBUG_MSG
+import zlib
+from redis_dal.constants import (
+    REDIS_KEY_FORMAT,
+    REDIS_MESSAGE_STORED_DEBUG_MSG,
+    REDIS_MESSAGE_INDEX_KEY,
+    REDIS_MESSAGE_DELETED_DEBUG_MSG,
+    REDIS_MESSAGE_NOT_INDEXED_DEBUG_MSG,
+    REDIS_MESSAGE_TOMBSTONED_DEBUG_MSG,
+    TOMBSTONE_KEY_FORMAT,
+    DEFAULT_TOMBSTONE_SECONDS,
+    REDIS_BATCH_STORED_DEBUG_MSG,
+    MESSAGE_TYPE_DELETE,
+)
 
 setup_logger()
+tracer = get_tracer(__name__)
+
+
+def _queue_store_message(pipeline, sender_ldap, message, message_type):
+    """
+    Queues the commands that store one message on a Redis pipeline.
+
+    The message is added to the sender's sorted set, scored by its creation timestamp,
+    and recorded in the message index so that a later delete event can locate it. The
+    key is recorded in the key registry so that readers never have to SCAN for it, and
+    the sender's leaderboards are incremented if the message is new. The sender and
+    space are added to the daily active member and space HyperLogLogs, and the query
+    versions of the space and sender are bumped to invalidate cached results. Large
+    members are compressed, see `redis_dal.message_codec`. The index entry records the
+    digest of the member, so that a delete removes this member only and not the other
+    messages the sender created in the same second.
+
+    Args:
+        pipeline (redis.client.Pipeline): The pipeline to queue the commands on.
+        sender_ldap (str): The LDAP identifier of the message sender.
+        message (dict): The message object (dictionary) to be stored.
+        message_type (str): The type of the message (e.g., "create").
+
+    Returns:
+        tuple: (index_entry, member) where index_entry is the
+        [space_id, sender_ldap, score, member_digest] index entry of the stored message
+        and member the encoded sorted set member.
+
+    Raises:
+        ValueError: If the 'createTime' in the message is not in a valid ISO format.
+    """
+    create_time = message.get("createTime")
+    space_id = message.get("space", {}).get("name").split("/")[1]
+    score = datetime.fromisoformat(create_time).timestamp()
+    redis_key = REDIS_KEY_FORMAT.format(space_id=space_id, sender_ldap=sender_ldap)
+    redis_member = encode_member(str({"message": message, "type": message_type}))
+    queue_increment_leaderboards(
+        pipeline, redis_key, redis_member, space_id, sender_ldap, score
+    )
+    pipeline.zadd(redis_key, {redis_member: score})
+    queue_register_key(pipeline, space_id, sender_ldap, redis_key)
+    queue_record_activity(pipeline, space_id, sender_ldap, score)
+    queue_bump_versions(pipeline, space_id, sender_ldap)
+
+    index_entry = [space_id, sender_ldap, score, get_member_digest(redis_member)]
+    message_name = message.get("name")
+    if message_name:
+        pipeline.hset(REDIS_MESSAGE_INDEX_KEY, message_name, json.dumps(index_entry))
+    logging.debug(
+        LazyMessage(REDIS_MESSAGE_STORED_DEBUG_MSG, redis_key=redis_key, score=score)
+    )
+    return index_entry, redis_member
+
+
+def _is_indexed_member(raw, message_name, member_digest):
+    """Returns True if a sorted set member is the one of an indexed message."""
+    if member_digest:
+        return get_member_digest(raw) == member_digest
+    # Index entries written before member digests were recorded.
+    try:
+        return parse_member(raw)["message"].get("name") == message_name
+    except (ValueError, KeyError, TypeError, zlib.error):
+        return False
+
+
+def _resolve_indexed_members(client_redis, index_entries):
+    """
+    Reads the sorted set members of indexed messages in one pipeline round trip.
+
+    Args:
+        client_redis (redis.Redis): The Redis client.
+        index_entries (dict): The index entries of the messages, by message name.
+
+    Returns:
+        dict: The encoded members of the messages still stored, by message name.
+    """
+    if not index_entries:
+        return {}
+    pipeline = client_redis.pipeline(transaction=False)
+    for space_id, sender_ldap, score, *_ in index_entries.values():
+        redis_key = REDIS_KEY_FORMAT.format(space_id=space_id, sender_ldap=sender_ldap)
+        pipeline.zrangebyscore(redis_key, score, score)
+    members = {}
+    for (message_name, index_entry), candidates in zip(
+        index_entries.items(), pipeline.execute()
+    ):
+        member_digest = index_entry[3] if len(index_entry) > 3 else None
+        for raw in candidates:
+            if _is_indexed_member(raw, message_name, member_digest):
+                members[message_name] = raw
+                break
+    return members
+
+
+def _queue_delete_message(pipeline, message_name, index_entry, member):
+    """
+    Queues the commands that remove one indexed message on a Redis pipeline.
+
+    The member is removed with ZREM, so messages the sender created in the same second
+    are kept. The sender's leaderboards are decremented if the member is still stored,
+    and the query versions of the space and sender are bumped.
+
+    Args:
+        pipeline (redis.client.Pipeline): The pipeline to queue the commands on.
+        message_name (str): The resource name of the deleted message.
+        index_entry (list): The index entry [space_id, sender_ldap, score, ...] of the
+            message.
+        member (bytes): The encoded sorted set member of the message, or None if it is
+            no longer stored, in which case only the index entry is removed.
+    """
+    space_id, sender_ldap, score, *_ = index_entry
+    redis_key = REDIS_KEY_FORMAT.format(space_id=space_id, sender_ldap=sender_ldap)
+    if member is not None:
+        queue_decrement_leaderboards(
+            pipeline, redis_key, member, space_id, sender_ldap, score
+        )
+        pipeline.zrem(redis_key, member)
+    pipeline.hdel(REDIS_MESSAGE_INDEX_KEY, message_name)
+    queue_bump_versions(pipeline, space_id, sender_ldap)
+    logging.debug(
+        LazyMessage(REDIS_MESSAGE_DELETED_DEBUG_MSG, redis_key=redis_key, score=score)
+    )
 
 
 def store_messages(sender_ldap, message, message_type):
@@ -28,13 +177,133 @@ def store_messages(sender_ldap, message, message_type):
         store_messages("name", {"createTime": "2023-10-27T10:00:00Z", "space": {"name": "MySpace"}, ...}, "create")
     """
 
+    store_messages_batch([(sender_ldap, message, message_type)])
+
+
+def store_messages_batch(entries, queue_commands=None):
+    """
+    Applies a batch of message events to Redis in a single pipeline round trip.
+
+    Create events are stored the same way as `store_messages`. Delete events are
+    resolved through the message index, which is read once for the whole batch, and
+    remove the original member from the sender's sorted set, found by its digest in one
+    more round trip. Events are applied in the given order, so a create followed by a
+    delete of the same message within one batch cancels out.
+
+    Pub/Sub does not order deliveries, so the delete of a message may arrive before its
+    create. A delete of a message that is not indexed leaves a tombstone for
+    `DEFAULT_TOMBSTONE_SECONDS`, and a create of a tombstoned message, in the same or a
+    later batch, is skipped.
+
+    Args:
+        entries (list): A list of (sender_ldap, message, message_type) tuples. The
+            sender_ldap of a delete event is ignored and may be None.
+        queue_commands (callable, optional): Called with the pipeline before it is
+            executed, to queue more commands committed in the same transaction as the
+            batch, e.g. `MessageDeduplicator.queue_mark_seen`.
+
+    Returns:
+        int: The number of events committed to Redis.
+
+    Raises:
+        ValueError: If the 'createTime' of a created message is not in a valid ISO
+            format.
+        redis.exceptions.RedisError: If an error occurs during Redis operations.
+
+    Example:
+        store_messages_batch([
+            ("ldap1", {"name": "spaces/AAA/messages/BBB", "createTime": ...}, "create"),
+            (None, {"name": "spaces/AAA/messages/CCC"}, "delete"),
+        ])
+    """
     client_redis = RedisClientFactory().create_redis_client()
-    create_time = message.get("createTime")
-    space_id = message.get("space", {}).get("name").split("/")[1]
-    score = datetime.fromisoformat(create_time).timestamp()
-    redis_key = REDIS_KEY_FORMAT.format(space_id=space_id, sender_ldap=sender_ldap)
-    redis_member = {"message": message, "type": message_type}
-    client_redis.zadd(redis_key, {str(redis_member): score})
-    logging.debug(
-        REDIS_MESSAGE_STORED_DEBUG_MSG.format(redis_key=redis_key, score=score)
-    )
+
+    delete_names = [
+        message.get("name")
+        for _, message, message_type in entries
+        if message_type == MESSAGE_TYPE_DELETE
+    ]
+    create_names = [
+        message.get("name")
+        for _, message, message_type in entries
+        if message_type != MESSAGE_TYPE_DELETE and message.get("name")
+    ]
+    index_entries = {}
+    if delete_names:
+        raw_entries = client_redis.hmget(REDIS_MESSAGE_INDEX_KEY, delete_names)
+        index_entries = {
+            name: json.loads(raw)
+            for name, raw in zip(delete_names, raw_entries)
+            if raw is not None
+        }
+    tombstoned = set()
+    if create_names:
+        tombstones = client_redis.mget([
+            TOMBSTONE_KEY_FORMAT.format(message_name=name) for name in create_names
+        ])
+        tombstoned = {
+            name
+            for name, tombstone in zip(create_names, tombstones)
+            if tombstone is not None
+        }
+    members = _resolve_indexed_members(client_redis, index_entries)
+
+    pipeline = client_redis.pipeline()
+    committed_count = 0
+    for sender_ldap, message, message_type in entries:
+        message_name = message.get("name")
+        if message_type == MESSAGE_TYPE_DELETE:
+            index_entry = index_entries.pop(message_name, None)
+            if index_entry is None:
+                logging.debug(
+                    LazyMessage(
+                        REDIS_MESSAGE_NOT_INDEXED_DEBUG_MSG, message_name=message_name
+                    )
+                )
+                pipeline.set(
+                    TOMBSTONE_KEY_FORMAT.format(message_name=message_name),
+                    1,
+                    ex=DEFAULT_TOMBSTONE_SECONDS,
+                )
+                tombstoned.add(message_name)
+            else:
+                _queue_delete_message(
+                    pipeline, message_name, index_entry, members.pop(message_name, None)
+                )
+        elif message_name in tombstoned:
+            logging.debug(
+                LazyMessage(
+                    REDIS_MESSAGE_TOMBSTONED_DEBUG_MSG, message_name=message_name
+                )
+            )
+            continue
+        else:
+            index_entry, member = _queue_store_message(
+                pipeline, sender_ldap, message, message_type
+            )
+            if message_name:
+                index_entries[message_name] = index_entry
+                members[message_name] = member
+        committed_count += 1
+    if committed_count:
+        queue_bump_global_version(pipeline)
+    if queue_commands is not None:
+        queue_commands(pipeline)
+
+    with (
+        tracer.start_as_current_span(
+            "redis.pipeline",
+            attributes={
+                "db.system": "redis",
+                "db.operation.name": "store_batch",
+                "batch_size": len(entries),
+                "committed_count": committed_count,
+            },
+        ),
+        REDIS_PIPELINE_SECONDS.labels(operation="store_batch").time(),
+    ):
+        pipeline.execute()
+    REDIS_PIPELINE_BATCH_SIZE.labels(operation="store_batch").observe(committed_count)
+    MESSAGES_STORED.inc(committed_count)
+    logging.debug(LazyMessage(REDIS_BATCH_STORED_DEBUG_MSG, count=committed_count))
+    return committed_count
@@ -0,0 +1,245 @@
+from redis_dal.redis_client_factory import RedisClientFactory
+from redis_dal.key_registry import (
+    get_registered_space_ids,
+    get_space_keys,
+    parse_message_key,
+)
+from redis_dal.query_versions import queue_bump_global_version, queue_bump_versions
+from tools.log.logger import setup_logger
+from tools.rate_limiter.rate_limiter import RateLimiter
+import json
+import logging
+import threading
+import time
+from redis_dal.constants import (
+    REDIS_MESSAGE_INDEX_KEY,
+    RETENTION_POLICY_KEY,
+    RETENTION_DEFAULT_FIELD,
+    REGISTRY_SPACE_KEYS_FORMAT,
+    REGISTRY_LDAP_KEYS_FORMAT,
+    DEFAULT_COMPACTION_SCAN_COUNT,
+    DEFAULT_COMPACTION_BATCH_SIZE,
+    DEFAULT_COMPACTION_KEYS_PER_SECOND,
+    DEFAULT_COMPACTION_INTERVAL_SECONDS,
+    SECONDS_PER_DAY,
+    COMPACTION_INFO_MSG,
+    COMPACTION_FAILED_ERROR_MSG,
+)
+
+setup_logger()
+
+# Evicts the members of KEYS[1] scored below ARGV[1]. A key left empty no longer
+# exists and is removed from the KEYS[2] and KEYS[3] registry sets.
+_EVICT_SCRIPT = """
+local evicted = redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', '(' .. ARGV[1])
+if evicted > 0 and redis.call('EXISTS', KEYS[1]) == 0 then
+    redis.call('SREM', KEYS[2], KEYS[1])
+    redis.call('SREM', KEYS[3], KEYS[1])
+end
+return evicted
+"""
+
+
+def set_retention_days(days, space_id=None):
+    """
+    Sets how many days of raw messages are kept, globally or for one space.
+
+    Args:
+        days (float | None): The retention in days, or None to remove the policy so that
+            the space falls back to the global policy, or the global policy to keep
+            messages forever.
+        space_id (str, optional): The space the policy applies to, or None for the
+            global policy.
+
+    Raises:
+        ValueError: If days is not positive.
+        redis.exceptions.RedisError: If an error occurs during Redis operations.
+    """
+    field = space_id or RETENTION_DEFAULT_FIELD
+    client_redis = RedisClientFactory().create_redis_client()
+    if days is None:
+        client_redis.hdel(RETENTION_POLICY_KEY, field)
+        return
+    if days <= 0:
+        raise ValueError("Retention days must be positive.")
+    client_redis.hset(RETENTION_POLICY_KEY, field, days)
+
+
+def get_retention_policy():
+    """
+    Reads the retention policy.
+
+    Returns:
+        tuple: (default_days, space_days) where default_days is the global retention in
+        days or None to keep messages forever, and space_days maps space IDs to their
+        own retention in days.
+
+    Raises:
+        redis.exceptions.RedisError: If an error occurs during Redis operations.
+    """
+    client_redis = RedisClientFactory().create_redis_client()
+    policy = {
+        (field.decode() if isinstance(field, bytes) else field): float(days)
+        for field, days in client_redis.hgetall(RETENTION_POLICY_KEY).items()
+    }
+    return policy.pop(RETENTION_DEFAULT_FIELD, None), policy
+
+
+def _get_cutoffs(now):
+    """Returns the global and per-space eviction cutoffs as epoch timestamps."""
+    default_days, space_days = get_retention_policy()
+    default_cutoff = now - default_days * SECONDS_PER_DAY if default_days else None
+    space_cutoffs = {
+        space_id: now - days * SECONDS_PER_DAY for space_id, days in space_days.items()
+    }
+    return default_cutoff, space_cutoffs
+
+
+def _compact_message_index(
+    client_redis, default_cutoff, space_cutoffs, scan_count, rate_limiter
+):
+    """Removes the index entries of messages older than their space's cutoff."""
+    evicted = 0
+    names = []
+    # Each HDEL acquires one token per name, so a chunk never exceeds the burst.
+    chunk_size = max(1, min(scan_count, int(rate_limiter.burst)))
+
+    def flush():
+        if names:
+            rate_limiter.acquire(len(names))
+            client_redis.hdel(REDIS_MESSAGE_INDEX_KEY, *names)
+            names.clear()
+
+    for name, raw in client_redis.hscan_iter(REDIS_MESSAGE_INDEX_KEY, count=scan_count):
+        space_id, _, score, *_ = json.loads(raw)
+        cutoff = space_cutoffs.get(space_id, default_cutoff)
+        if cutoff is not None and score < cutoff:
+            names.append(name)
+            evicted += 1
+            if len(names) >= chunk_size:
+                flush()
+    flush()
+    return evicted
+
+
+def compact_messages(
+    now=None,
+    scan_count=DEFAULT_COMPACTION_SCAN_COUNT,
+    batch_size=DEFAULT_COMPACTION_BATCH_SIZE,
+    keys_per_second=DEFAULT_COMPACTION_KEYS_PER_SECOND,
+):
+    """
+    Evicts raw messages older than the retention policy of their space.
+
+    Message keys are enumerated from the key registry, `scan_count` spaces per round
+    trip, and each batch of `batch_size` keys is compacted with one pipelined
+    ZREMRANGEBYSCORE per key. Batches are rate limited to `keys_per_second` so that
+    compaction never competes with the write path for the Redis event loop. The query
+    versions of the compacted spaces and senders are bumped, and the message index
+    entries of evicted messages are removed as well. The all-time leaderboards are not
+    decremented on eviction, so they keep lifetime message counts.
+
+    Args:
+        now (float, optional): The current epoch timestamp, defaults to time.time().
+        scan_count (int): The number of spaces whose keys are read per round trip, also
+            the HSCAN COUNT hint of the message index pass.
+        batch_size (int): The number of keys compacted per pipeline.
+        keys_per_second (float): The maximum number of keys compacted per second.
+
+    Returns:
+        dict: The number of "keys_scanned", "keys_compacted", "evicted" messages and
+        "index_evicted" entries.
+
+    Raises:
+        redis.exceptions.RedisError: If an error occurs during Redis operations.
+    """
+    now = time.time() if now is None else now
+    result = {"keys_scanned": 0, "keys_compacted": 0, "evicted": 0, "index_evicted": 0}
+    default_cutoff, space_cutoffs = _get_cutoffs(now)
+    if default_cutoff is None and not space_cutoffs:
+        logging.info(COMPACTION_INFO_MSG.format(**result))
+        return result
+
+    client_redis = RedisClientFactory().create_redis_client()
+    evict = client_redis.register_script(_EVICT_SCRIPT)
+    rate_limiter = RateLimiter(keys_per_second, burst=max(keys_per_second, batch_size))
+    batch = []
+
+    def flush():
+        if not batch:
+            return
+        rate_limiter.acquire(len(batch))
+        pipeline = client_redis.pipeline(transaction=False)
+        for key, cutoff in batch:
+            space_id, sender_ldap = parse_message_key(key)
+            evict(
+                keys=[
+                    key,
+                    REGISTRY_SPACE_KEYS_FORMAT.format(space_id=space_id),
+                    REGISTRY_LDAP_KEYS_FORMAT.format(sender_ldap=sender_ldap),
+                ],
+                args=[cutoff],
+                client=pipeline,
+            )
+        evicted_counts = pipeline.execute()
+        result["keys_compacted"] += sum(1 for count in evicted_counts if count)
+        result["evicted"] += sum(evicted_counts)
+        if any(evicted_counts):
+            pipeline = client_redis.pipeline(transaction=False)
+            for (key, _), count in zip(batch, evicted_counts):
+                if count:
+                    queue_bump_versions(pipeline, *parse_message_key(key))
+            queue_bump_global_version(pipeline)
+            pipeline.execute()
+        batch.clear()
+
+    space_ids = [
+        space_id
+        for space_id in get_registered_space_ids()
+        if space_cutoffs.get(space_id, default_cutoff) is not None
+    ]
+    for start in range(0, len(space_ids), scan_count):
+        space_keys = get_space_keys(space_ids[start : start + scan_count])
+        for space_id, keys in space_keys.items():
+            cutoff = space_cutoffs.get(space_id, default_cutoff)
+            for key in keys:
+                result["keys_scanned"] += 1
+                batch.append((key, cutoff))
+                if len(batch) >= batch_size:
+                    flush()
+    flush()
+
+    result["index_evicted"] = _compact_message_index(
+        client_redis, default_cutoff, space_cutoffs, scan_count, rate_limiter
+    )
+    logging.info(COMPACTION_INFO_MSG.format(**result))
+    return result
+
+
+def run_compactor(
+    interval_seconds=DEFAULT_COMPACTION_INTERVAL_SECONDS,
+    stop_event=None,
+):
+    """
+    Runs a compaction pass every `interval_seconds` until `stop_event` is set.
+
+    A pass that fails, e.g. on a Redis timeout, is logged and retried on the next one,
+    so the compactor keeps running.
+
+    Args:
+        interval_seconds (float): The number of seconds between compaction passes.
+        stop_event (threading.Event, optional): An event that stops the compactor.
+
+    Returns:
+        None.
+    """
+    stop_event = stop_event or threading.Event()
+    while True:
+        try:
+            compact_messages()
+        except Exception as e:
+            logging.exception(
+                COMPACTION_FAILED_ERROR_MSG.format(interval=interval_seconds, error=e)
+            )
+        if stop_event.wait(interval_seconds):
+            break
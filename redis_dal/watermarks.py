@@ -0,0 +1,207 @@
+from redis_dal.redis_client_factory import RedisClientFactory
+from redis_dal.workspace_subscription_store import get_tracked_workspace_subscriptions
+from tools.log.logger import setup_logger
+import json
+from redis_dal.constants import (
+    WATERMARK_REALTIME_KEY,
+    WATERMARK_BACKFILL_KEY,
+    WATERMARK_LIVE_SINCE_KEY,
+    WATERMARK_GAPS_KEY,
+    SUBSCRIBER_HEARTBEAT_KEY,
+    SUBSCRIBER_LIVE_SINCE_KEY,
+)
+
+setup_logger()
+
+# Sets a hash field to ARGV[2] unless it already holds a larger value, so that
+# watermarks never move backwards when events are committed out of order.
+_HSET_MAX_SCRIPT = """
+local current = redis.call('HGET', KEYS[1], ARGV[1])
+if not current or tonumber(current) < tonumber(ARGV[2]) then
+    redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+end
+"""
+
+
+def _update_watermarks(key, watermarks):
+    """Raises the per-space watermarks stored in a hash in one pipeline."""
+    if not watermarks:
+        return
+    client_redis = RedisClientFactory().create_redis_client()
+    hset_max = client_redis.register_script(_HSET_MAX_SCRIPT)
+    pipeline = client_redis.pipeline()
+    for space_id, timestamp in watermarks.items():
+        hset_max(keys=[key], args=[space_id, timestamp], client=pipeline)
+    pipeline.execute()
+
+
+def update_realtime_watermarks(watermarks):
+    """
+    Raises the per-space watermarks of the real-time subscriber.
+
+    Args:
+        watermarks (dict): A mapping of space IDs to the epoch createTime of the latest
+            event seen by the subscriber.
+
+    Raises:
+        redis.exceptions.RedisError: If an error occurs during Redis operations.
+    """
+    _update_watermarks(WATERMARK_REALTIME_KEY, watermarks)
+
+
+def update_backfill_watermarks(watermarks):
+    """
+    Raises the per-space watermarks of the backfill.
+
+    Args:
+        watermarks (dict): A mapping of space IDs to the epoch timestamp up to which all
+            messages of the space have been backfilled.
+
+    Raises:
+        redis.exceptions.RedisError: If an error occurs during Redis operations.
+    """
+    _update_watermarks(WATERMARK_BACKFILL_KEY, watermarks)
+
+
+def _queue_record_gaps(pipeline, gaps):
+    """Queues the recording of gaps on a Redis pipeline."""
+    if gaps:
+        pipeline.sadd(WATERMARK_GAPS_KEY, *[json.dumps(list(gap)) for gap in gaps])
+
+
+def clear_recorded_gaps(gaps):
+    """
+    Forgets recorded gaps once they have been backfilled.
+
+    Args:
+        gaps (list): The (space_id, start_time, end_time) gaps, as returned by
+            `get_watermarks`. Gaps that were not recorded are ignored.
+
+    Raises:
+        redis.exceptions.RedisError: If an error occurs during Redis operations.
+    """
+    if not gaps:
+        return
+    client_redis = RedisClientFactory().create_redis_client()
+    client_redis.srem(WATERMARK_GAPS_KEY, *[json.dumps(list(gap)) for gap in gaps])
+
+
+def mark_space_live_since(space_id, timestamp, lapsed_since=None):
+    """
+    Records that real-time events of a space are only complete from `timestamp` on.
+
+    This is called when the Workspace Events subscription of a space is recreated after
+    it lapsed. The lapse is recorded as a gap that is kept until it is reconciled, so
+    that later real-time events of the space do not hide it.
+
+    Args:
+        space_id (str): The ID of the Chat space.
+        timestamp (float): The epoch timestamp the new subscription started at.
+        lapsed_since (float, optional): The epoch timestamp the previous subscription
+            expired at, defaults to the time the space was last covered up to.
+
+    Raises:
+        redis.exceptions.RedisError: If an error occurs during Redis operations.
+    """
+    client_redis = RedisClientFactory().create_redis_client()
+    if not lapsed_since:
+        pipeline = client_redis.pipeline()
+        pipeline.hget(WATERMARK_REALTIME_KEY, space_id)
+        pipeline.hget(WATERMARK_BACKFILL_KEY, space_id)
+        covered = [float(value) for value in pipeline.execute() if value is not None]
+        lapsed_since = max(covered) if covered else None
+    pipeline = client_redis.pipeline()
+    pipeline.hset(WATERMARK_LIVE_SINCE_KEY, space_id, timestamp)
+    _queue_record_gaps(pipeline, [(space_id, lapsed_since, timestamp)])
+    pipeline.execute()
+
+
+def record_subscriber_heartbeat(subscription, timestamp, tolerance_seconds):
+    """
+    Records that the real-time subscriber of a Pub/Sub subscription is alive.
+
+    Each subscription, e.g. each shard of the subscriber workers, has its own heartbeat.
+    If the previous heartbeat is missing or older than `tolerance_seconds`, the
+    subscriber was down in between and its continuous coverage restarts at `timestamp`.
+    The downtime since the previous heartbeat is then recorded as a gap of every space
+    with a tracked Workspace Events subscription, kept until it is reconciled.
+
+    Args:
+        subscription (str): The Pub/Sub subscription path of the subscriber.
+        timestamp (float): The current epoch timestamp.
+        tolerance_seconds (float): The maximum gap between heartbeats of a live
+            subscriber.
+
+    Raises:
+        redis.exceptions.RedisError: If an error occurs during Redis operations.
+    """
+    client_redis = RedisClientFactory().create_redis_client()
+    previous = client_redis.hget(SUBSCRIBER_HEARTBEAT_KEY, subscription)
+    pipeline = client_redis.pipeline()
+    if previous is None or timestamp - float(previous) > tolerance_seconds:
+        pipeline.hset(SUBSCRIBER_LIVE_SINCE_KEY, subscription, timestamp)
+        if previous is not None:
+            space_ids = {
+                space_id
+                for _, space_id, _, _ in get_tracked_workspace_subscriptions()
+                if space_id
+            }
+            _queue_record_gaps(
+                pipeline,
+                [(space_id, float(previous), timestamp) for space_id in space_ids],
+            )
+    pipeline.hset(SUBSCRIBER_HEARTBEAT_KEY, subscription, timestamp)
+    pipeline.execute()
+
+
+def get_watermarks(space_ids):
+    """
+    Reads the watermarks, recorded gaps and subscriber liveness in one round trip.
+
+    Args:
+        space_ids (list): The IDs of the Chat spaces.
+
+    Returns:
+        dict: A mapping with "realtime", "backfill" and "live_since" dicts from space ID
+        to epoch timestamp (None if unset), "gaps", the recorded (space_id, start_time,
+        end_time) gaps of the spaces, and "subscriber_heartbeats" and
+        "subscriber_live_since" dicts from subscription path to epoch timestamp.
+
+    Raises:
+        redis.exceptions.RedisError: If an error occurs during Redis operations.
+    """
+    client_redis = RedisClientFactory().create_redis_client()
+    pipeline = client_redis.pipeline()
+    pipeline.hmget(WATERMARK_REALTIME_KEY, space_ids)
+    pipeline.hmget(WATERMARK_BACKFILL_KEY, space_ids)
+    pipeline.hmget(WATERMARK_LIVE_SINCE_KEY, space_ids)
+    pipeline.smembers(WATERMARK_GAPS_KEY)
+    pipeline.hgetall(SUBSCRIBER_HEARTBEAT_KEY)
+    pipeline.hgetall(SUBSCRIBER_LIVE_SINCE_KEY)
+    realtime, backfill, live_since, gaps, heartbeats, subscriber_live_since = (
+        pipeline.execute()
+    )
+
+    def to_float(value):
+        return float(value) if value is not None else None
+
+    def to_str(value):
+        return value.decode() if isinstance(value, bytes) else value
+
+    wanted = set(space_ids)
+    recorded_gaps = sorted(
+        (gap for gap in map(tuple, map(json.loads, gaps)) if gap[0] in wanted),
+        key=lambda gap: (gap[0], gap[1] or 0, gap[2]),
+    )
+    return {
+        "realtime": dict(zip(space_ids, map(to_float, realtime))),
+        "backfill": dict(zip(space_ids, map(to_float, backfill))),
+        "live_since": dict(zip(space_ids, map(to_float, live_since))),
+        "gaps": recorded_gaps,
+        "subscriber_heartbeats": {
+            to_str(name): float(value) for name, value in heartbeats.items()
+        },
+        "subscriber_live_since": {
+            to_str(name): float(value) for name, value in subscriber_live_since.items()
+        },
+    }
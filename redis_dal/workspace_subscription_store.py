@@ -0,0 +1,99 @@
+from redis_dal.redis_client_factory import RedisClientFactory
+from tools.log.logger import setup_logger
+import json
+from redis_dal.constants import (
+    WORKSPACE_SUBSCRIPTION_EXPIRY_KEY,
+    WORKSPACE_SUBSCRIPTION_INFO_KEY,
+)
+
+setup_logger()
+
+
+def track_workspace_subscriptions(subscriptions):
+    """
+    Records the expiry of Workspace Events subscriptions in Redis.
+
+    Expiry times are kept in a sorted set scored by the expiry epoch, so that the
+    subscriptions due for renewal can be read with a single range query. The space and
+    Pub/Sub topic of each subscription are kept in a hash, so that a lapsed subscription
+    can be recreated.
+
+    Args:
+        subscriptions (list): A list of (name, space_id, pubsub_topic, expire_time)
+            tuples, where expire_time is an epoch timestamp in seconds.
+
+    Raises:
+        redis.exceptions.RedisError: If an error occurs during Redis operations.
+    """
+    if not subscriptions:
+        return
+    client_redis = RedisClientFactory().create_redis_client()
+    pipeline = client_redis.pipeline()
+    for name, space_id, pubsub_topic, expire_time in subscriptions:
+        pipeline.zadd(WORKSPACE_SUBSCRIPTION_EXPIRY_KEY, {name: expire_time})
+        pipeline.hset(
+            WORKSPACE_SUBSCRIPTION_INFO_KEY,
+            name,
+            json.dumps({"space_id": space_id, "pubsub_topic": pubsub_topic}),
+        )
+    pipeline.execute()
+
+
+def untrack_workspace_subscriptions(names):
+    """
+    Removes Workspace Events subscriptions from the tracked set.
+
+    Args:
+        names (list): The resource names of the subscriptions to forget.
+
+    Raises:
+        redis.exceptions.RedisError: If an error occurs during Redis operations.
+    """
+    if not names:
+        return
+    client_redis = RedisClientFactory().create_redis_client()
+    pipeline = client_redis.pipeline()
+    pipeline.zrem(WORKSPACE_SUBSCRIPTION_EXPIRY_KEY, *names)
+    pipeline.hdel(WORKSPACE_SUBSCRIPTION_INFO_KEY, *names)
+    pipeline.execute()
+
+
+def get_tracked_workspace_subscriptions(max_expire_time="+inf", limit=None):
+    """
+    Reads tracked Workspace Events subscriptions, soonest expiry first.
+
+    Args:
+        max_expire_time (float or str): Only subscriptions expiring at or before this
+            epoch timestamp are returned, defaults to all of them.
+        limit (int, optional): The maximum number of subscriptions to return.
+
+    Returns:
+        list: A list of (name, space_id, pubsub_topic, expire_time) tuples.
+
+    Raises:
+        redis.exceptions.RedisError: If an error occurs during Redis operations.
+    """
+    client_redis = RedisClientFactory().create_redis_client()
+    range_kwargs = {"start": 0, "num": limit} if limit else {}
+    expiring = client_redis.zrangebyscore(
+        WORKSPACE_SUBSCRIPTION_EXPIRY_KEY,
+        "-inf",
+        max_expire_time,
+        withscores=True,
+        **range_kwargs,
+    )
+    if not expiring:
+        return []
+
+    names = [name.decode() if isinstance(name, bytes) else name for name, _ in expiring]
+    infos = client_redis.hmget(WORKSPACE_SUBSCRIPTION_INFO_KEY, names)
+    result = []
+    for name, (_, expire_time), raw_info in zip(names, expiring, infos):
+        info = json.loads(raw_info) if raw_info else {}
+        result.append((
+            name,
+            info.get("space_id"),
+            info.get("pubsub_topic"),
+            expire_time,
+        ))
+    return result
@@ -0,0 +1,153 @@
+from unittest import TestCase, main
+from unittest.mock import Mock, patch
+import asyncio
+import threading
+from google.async_paginator import (
+    AsyncPaginator,
+    fetch_all_pages,
+    get_fetch_concurrency,
+    iter_pages,
+)
+from google.constants import FETCH_CONCURRENCY
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+    InMemorySpanExporter,
+)
+
+PAGE_1 = {"items": [1, 2], "nextPageToken": "token2"}
+PAGE_2 = {"items": [3], "nextPageToken": "token3"}
+PAGE_3 = {"items": [4]}
+PAGES = {None: PAGE_1, "token2": PAGE_2, "token3": PAGE_3}
+
+
+def make_list_request(pages):
+    """Returns a `make_request` callable serving the given pages by page token."""
+
+    def make_request(page_token):
+        request = Mock()
+        request.execute.return_value = pages[page_token]
+        return request
+
+    return Mock(side_effect=make_request)
+
+
+@patch(
+    "google.authentication_utils.GoogleClientFactory.create_authorized_http",
+    Mock(return_value="http"),
+)
+class TestAsyncPaginator(TestCase):
+    @patch.dict("os.environ", {FETCH_CONCURRENCY: "4"})
+    def test_get_fetch_concurrency(self):
+        self.assertEqual(get_fetch_concurrency(), 4)
+
+    @patch.dict("os.environ", {FETCH_CONCURRENCY: "0"})
+    def test_get_fetch_concurrency_disabled(self):
+        self.assertIsNone(get_fetch_concurrency())
+
+    @patch.dict("os.environ", {}, clear=True)
+    def test_iter_pages_blocking(self):
+        make_request = make_list_request(PAGES)
+
+        pages = list(iter_pages(make_request))
+
+        self.assertEqual(pages, [PAGE_1, PAGE_2, PAGE_3])
+        self.assertEqual(
+            [c.args[0] for c in make_request.call_args_list], [None, "token2", "token3"]
+        )
+
+    @patch.dict("os.environ", {FETCH_CONCURRENCY: "2"})
+    def test_iter_pages_yields_pages_as_they_arrive(self):
+        make_request = make_list_request(PAGES)
+
+        pages = iter_pages(make_request)
+
+        self.assertEqual(next(pages), PAGE_1)
+        self.assertEqual(make_request.call_count, 1)
+        self.assertEqual(list(pages), [PAGE_2, PAGE_3])
+
+    def test_iter_pages_in_running_loop(self):
+        async def consume():
+            return list(iter_pages(make_list_request(PAGES)))
+
+        self.assertEqual(asyncio.run(consume()), [PAGE_1, PAGE_2, PAGE_3])
+
+    def test_fetch_all_pages_streams(self):
+        other_pages = {None: {"items": [5]}}
+        on_page = Mock()
+
+        pages = fetch_all_pages(
+            {"a": make_list_request(PAGES), "b": make_list_request(other_pages)},
+            concurrency=2,
+            on_page=on_page,
+        )
+
+        self.assertEqual(pages, {"a": [PAGE_1, PAGE_2, PAGE_3], "b": [{"items": [5]}]})
+        self.assertEqual(on_page.call_count, 4)
+        on_page.assert_any_call("b", {"items": [5]})
+
+    def test_fetch_all_pages_executes_with_authorized_http(self):
+        request = Mock()
+        request.execute.return_value = PAGE_3
+
+        fetch_all_pages({"a": Mock(return_value=request)}, concurrency=1)
+
+        request.execute.assert_called_once_with(http="http")
+
+    def test_iter_pages_prefetches_next_page(self):
+        second_page_started = threading.Event()
+
+        def make_request(page_token):
+            request = Mock()
+            if page_token:
+                request.execute.side_effect = lambda http: (
+                    second_page_started.set() or PAGE_3
+                )
+            else:
+                request.execute.return_value = {"nextPageToken": "token2"}
+            return request
+
+        async def consume():
+            paginator = AsyncPaginator(concurrency=2)
+            started_while_processing = []
+            try:
+                async for _ in paginator.iter_pages(make_request):
+                    await asyncio.get_running_loop().run_in_executor(
+                        None, second_page_started.wait, 5
+                    )
+                    started_while_processing.append(second_page_started.is_set())
+                    break
+            finally:
+                paginator.close()
+            return started_while_processing
+
+        self.assertEqual(asyncio.run(consume()), [True])
+
+    def test_page_spans_are_children_of_stream_span(self):
+        exporter = InMemorySpanExporter()
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(exporter))
+
+        with patch("google.async_paginator.tracer", provider.get_tracer("test")):
+            fetch_all_pages({"a": make_list_request(PAGES)}, concurrency=2)
+
+        spans = exporter.get_finished_spans()
+        (stream,) = [span for span in spans if span.name == "google_api.stream"]
+        pages = [span for span in spans if span.name == "google_api.page"]
+        self.assertEqual(stream.attributes["page.count"], 3)
+        self.assertEqual(
+            [page.attributes["page.item_count"] for page in pages], [2, 1, 1]
+        )
+        for page in pages:
+            self.assertEqual(page.parent.span_id, stream.context.span_id)
+
+    def test_fetch_all_pages_raises_stream_error(self):
+        request = Mock()
+        request.execute.side_effect = RuntimeError("boom")
+
+        with self.assertRaises(RuntimeError):
+            fetch_all_pages({"a": Mock(return_value=request)}, concurrency=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,7 @@ import logging
 from io import StringIO
 from google.fetch_history_chat_message import (
     fetch_messages_by_spaces_id,
+    fetch_messages_by_spaces_ids,
     fetch_history_messages,
 )
 from google.constants import (
@@ -17,6 +18,7 @@ from google.constants import (
     SENDER_LDAP_NOT_FOUND_DEBUG_MSG,
     MESSAGE_TYPE_CREATE,
     STORED_MESSAGES_INFO_MSG,
+    FETCH_CONCURRENCY,
 )
 
 TEST_SPACE_ID = "fhsdlfrp.dhiwqeq"
@@ -95,7 +97,8 @@ class TestChatUtils(TestCase):
             NO_CLIENT_ERROR_MSG.format(client_name=CHAT_API_NAME),
         )
 
-    @patch("google.fetch_history_chat_message.store_messages")
+    @patch("google.fetch_history_chat_message.update_backfill_watermarks")
+    @patch("google.fetch_history_chat_message.store_messages_batch")
     @patch("google.fetch_history_chat_message.list_directory_all_people_ldap")
     @patch("google.fetch_history_chat_message.fetch_messages_by_spaces_id")
     @patch("google.fetch_history_chat_message.get_chat_spaces")
@@ -104,21 +107,29 @@ class TestChatUtils(TestCase):
         mock_get_spaces,
         mock_fetch_messages,
         mock_list_ldap,
-        mock_store_messages,
+        mock_store_messages_batch,
+        mock_update_backfill_watermarks,
     ):
         mock_get_spaces.return_value = MOCK_SPACES
         mock_fetch_messages.side_effect = [[MOCK_MESSAGE_1], [MOCK_MESSAGE_2]]
         mock_list_ldap.return_value = MOCK_LDAP
-        mock_store_messages.return_value = None
 
         fetch_history_messages()
 
         mock_get_spaces.assert_called_once()
-        mock_fetch_messages.assert_any_call(SPACE_ID_1)
-        mock_fetch_messages.assert_any_call(SPACE_ID_2)
+        mock_fetch_messages.assert_any_call(SPACE_ID_1, archive=None)
+        mock_fetch_messages.assert_any_call(SPACE_ID_2, archive=None)
         self.assertEqual(mock_fetch_messages.call_count, 2)
         mock_list_ldap.assert_called_once()
-        self.assertEqual(mock_store_messages.call_count, 2)
+        mock_store_messages_batch.assert_called_once_with([
+            (LDAP_1, MOCK_MESSAGE_1, MESSAGE_TYPE_CREATE),
+            (LDAP_2, MOCK_MESSAGE_2, MESSAGE_TYPE_CREATE),
+        ])
+        mock_update_backfill_watermarks.assert_called_once()
+        self.assertEqual(
+            set(mock_update_backfill_watermarks.call_args[0][0]),
+            {SPACE_ID_1, SPACE_ID_2},
+        )
 
         log_output = self.log_capture_string.getvalue()
         self.assertIn(
@@ -138,7 +149,8 @@ class TestChatUtils(TestCase):
             log_output,
         )
 
-    @patch("google.fetch_history_chat_message.store_messages")
+    @patch("google.fetch_history_chat_message.update_backfill_watermarks")
+    @patch("google.fetch_history_chat_message.store_messages_batch")
     @patch("google.fetch_history_chat_message.list_directory_all_people_ldap")
     @patch("google.fetch_history_chat_message.fetch_messages_by_spaces_id")
     @patch("google.fetch_history_chat_message.get_chat_spaces")
@@ -147,7 +159,8 @@ class TestChatUtils(TestCase):
         mock_get_spaces,
         mock_fetch_messages,
         mock_list_ldap,
-        mock_store_messages,
+        mock_store_messages_batch,
+        mock_update_backfill_watermarks,
     ):
         mock_get_spaces.return_value = MOCK_SPACES
         mock_fetch_messages.side_effect = [
@@ -155,16 +168,15 @@ class TestChatUtils(TestCase):
             [MOCK_MESSAGE_UNKNOWN],
         ]
         mock_list_ldap.return_value = MOCK_LDAP_PARTIAL
-        mock_store_messages.return_value = None
 
         fetch_history_messages()
 
         mock_get_spaces.assert_called_once()
-        mock_fetch_messages.assert_any_call(SPACE_ID_1)
-        mock_fetch_messages.assert_any_call(SPACE_ID_2)
+        mock_fetch_messages.assert_any_call(SPACE_ID_1, archive=None)
+        mock_fetch_messages.assert_any_call(SPACE_ID_2, archive=None)
         self.assertEqual(mock_fetch_messages.call_count, 2)
         mock_list_ldap.assert_called_once()
-        mock_store_messages.assert_not_called()
+        mock_store_messages_batch.assert_not_called()
 
         log_output = self.log_capture_string.getvalue()
         self.assertIn(
@@ -177,6 +189,101 @@ class TestChatUtils(TestCase):
             STORED_MESSAGES_INFO_MSG.format(stored_count=0, total_count=2), log_output
         )
 
+    @patch("google.authentication_utils.GoogleClientFactory.create_chat_client")
+    def test_fetch_messages_by_spaces_id_time_window(self, mock_client):
+        mock_list = (
+            mock_client.return_value.spaces.return_value.messages.return_value.list
+        )
+        mock_list.return_value.execute.return_value = MOCK_MESSAGES_RESPONSE
+
+        fetch_messages_by_spaces_id(TEST_SPACE_ID, start_time=0, end_time=60)
+
+        mock_list.assert_called_once_with(
+            parent=f"spaces/{TEST_SPACE_ID}",
+            pageSize=DEFAULT_PAGE_SIZE,
+            pageToken=None,
+            filter='createTime > "1970-01-01T00:00:00+00:00" AND '
+            'createTime < "1970-01-01T00:01:00+00:00"',
+        )
+
+    @patch("google.authentication_utils.GoogleClientFactory.create_chat_client")
+    def test_fetch_messages_by_spaces_id_archives_pages(self, mock_client):
+        mock_list = (
+            mock_client.return_value.spaces.return_value.messages.return_value.list
+        )
+        mock_list.return_value.execute.return_value = MOCK_MESSAGES_RESPONSE
+        mock_archive = Mock()
+
+        fetch_messages_by_spaces_id(TEST_SPACE_ID, archive=mock_archive)
+
+        mock_archive.append_page.assert_called_once_with(
+            TEST_SPACE_ID, MOCK_MESSAGES_RESPONSE
+        )
+
+    @patch(
+        "google.authentication_utils.GoogleClientFactory.create_authorized_http",
+        Mock(),
+    )
+    @patch("google.authentication_utils.GoogleClientFactory.create_chat_client")
+    def test_fetch_messages_by_spaces_ids(self, mock_client):
+        mock_list = (
+            mock_client.return_value.spaces.return_value.messages.return_value.list
+        )
+        mock_list.return_value.execute.return_value = MOCK_MESSAGES_RESPONSE
+        mock_archive = Mock()
+
+        result = fetch_messages_by_spaces_ids(
+            [SPACE_ID_1, SPACE_ID_2], concurrency=2, archive=mock_archive
+        )
+
+        self.assertEqual(
+            result,
+            {
+                SPACE_ID_1: MOCK_MESSAGES_RESPONSE["messages"],
+                SPACE_ID_2: MOCK_MESSAGES_RESPONSE["messages"],
+            },
+        )
+        mock_list.assert_any_call(
+            parent=f"spaces/{SPACE_ID_1}", pageSize=DEFAULT_PAGE_SIZE, pageToken=None
+        )
+        mock_archive.append_page.assert_any_call(SPACE_ID_2, MOCK_MESSAGES_RESPONSE)
+
+    @patch.dict("os.environ", {FETCH_CONCURRENCY: "4"})
+    @patch("google.fetch_history_chat_message.DEFAULT_BACKFILL_BATCH_SIZE", 1)
+    @patch("google.fetch_history_chat_message.update_backfill_watermarks")
+    @patch("google.fetch_history_chat_message.store_messages_batch")
+    @patch("google.fetch_history_chat_message.list_directory_all_people_ldap")
+    @patch("google.fetch_history_chat_message.fetch_messages_by_spaces_ids")
+    @patch("google.fetch_history_chat_message.get_chat_spaces")
+    def test_fetch_history_messages_concurrent(
+        self,
+        mock_get_spaces,
+        mock_fetch_messages,
+        mock_list_ldap,
+        mock_store_messages_batch,
+        mock_update_backfill_watermarks,
+    ):
+        mock_get_spaces.return_value = MOCK_SPACES
+        mock_fetch_messages.return_value = {
+            SPACE_ID_1: [MOCK_MESSAGE_1],
+            SPACE_ID_2: [MOCK_MESSAGE_2],
+        }
+        mock_list_ldap.return_value = MOCK_LDAP
+
+        fetch_history_messages()
+
+        mock_fetch_messages.assert_called_once_with(
+            [SPACE_ID_1, SPACE_ID_2], 4, archive=None
+        )
+        mock_store_messages_batch.assert_any_call([
+            (LDAP_2, MOCK_MESSAGE_2, MESSAGE_TYPE_CREATE)
+        ])
+        self.assertEqual(mock_store_messages_batch.call_count, 2)
+        self.assertEqual(
+            set(mock_update_backfill_watermarks.call_args[0][0]),
+            {SPACE_ID_1, SPACE_ID_2},
+        )
+
 
 if __name__ == "__main__":
     main()
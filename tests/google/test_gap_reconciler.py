@@ -0,0 +1,148 @@
+import unittest
+from unittest.mock import patch
+from google.gap_reconciler import find_gaps, reconcile_gaps
+from google.constants import MESSAGE_TYPE_CREATE
+
+NOW = 1000.0
+TEST_TOPIC = "projects/test-project/topics/test-topic"
+
+
+def make_watermarks(
+    realtime, backfill, live_since, heartbeat, subscriber_live_since, gaps=()
+):
+    return {
+        "realtime": realtime,
+        "backfill": backfill,
+        "live_since": live_since,
+        "gaps": list(gaps),
+        "subscriber_heartbeats": {"sub1": heartbeat},
+        "subscriber_live_since": {"sub1": subscriber_live_since},
+    }
+
+
+class TestGapReconciler(unittest.TestCase):
+    @patch("google.gap_reconciler.get_tracked_workspace_subscriptions")
+    @patch("google.gap_reconciler.get_watermarks")
+    def test_find_gaps_with_live_subscriber(self, mock_get_watermarks, mock_tracked):
+        spaces = ["covered", "lapsed", "resubscribed", "new", "unsubscribed"]
+        mock_get_watermarks.return_value = make_watermarks(
+            realtime={
+                "covered": 900.0,
+                "lapsed": 300.0,
+                "resubscribed": 400.0,
+                "new": None,
+                "unsubscribed": None,
+            },
+            backfill={
+                "covered": 100.0,
+                "lapsed": 200.0,
+                "resubscribed": None,
+                "new": None,
+                "unsubscribed": 500.0,
+            },
+            live_since={
+                "covered": None,
+                "lapsed": None,
+                "resubscribed": 800.0,
+                "new": None,
+                "unsubscribed": None,
+            },
+            heartbeat=990.0,
+            subscriber_live_since=50.0,
+        )
+        mock_tracked.return_value = [
+            ("subscriptions/1", "covered", TEST_TOPIC, 2000.0),
+            ("subscriptions/2", "lapsed", TEST_TOPIC, 500.0),
+            ("subscriptions/3", "resubscribed", TEST_TOPIC, 2000.0),
+            ("subscriptions/4", "new", TEST_TOPIC, 2000.0),
+        ]
+
+        gaps = find_gaps(spaces, now=NOW, heartbeat_tolerance=60)
+
+        self.assertEqual(
+            gaps,
+            [
+                ("lapsed", 300.0, NOW),
+                ("resubscribed", 400.0, 800.0),
+                ("new", None, 50.0),
+                ("unsubscribed", 500.0, NOW),
+            ],
+        )
+
+    @patch("google.gap_reconciler.get_tracked_workspace_subscriptions")
+    @patch("google.gap_reconciler.get_watermarks")
+    def test_find_gaps_with_stale_subscriber(self, mock_get_watermarks, mock_tracked):
+        mock_get_watermarks.return_value = make_watermarks(
+            realtime={"space1": 900.0},
+            backfill={"space1": None},
+            live_since={"space1": None},
+            heartbeat=100.0,
+            subscriber_live_since=50.0,
+        )
+        mock_tracked.return_value = [("subscriptions/1", "space1", TEST_TOPIC, 2000.0)]
+
+        self.assertEqual(
+            find_gaps(["space1"], now=NOW, heartbeat_tolerance=60),
+            [("space1", 900.0, NOW)],
+        )
+
+    @patch("google.gap_reconciler.get_tracked_workspace_subscriptions")
+    @patch("google.gap_reconciler.get_watermarks")
+    def test_find_gaps_returns_recorded_outage(self, mock_get_watermarks, mock_tracked):
+        watermarks = make_watermarks(
+            realtime={"space1": 900.0},
+            backfill={"space1": None},
+            live_since={"space1": None},
+            heartbeat=990.0,
+            subscriber_live_since=600.0,
+            gaps=[("space1", 400.0, 600.0)],
+        )
+        watermarks["subscriber_heartbeats"]["retired"] = 100.0
+        mock_get_watermarks.return_value = watermarks
+        mock_tracked.return_value = [("subscriptions/1", "space1", TEST_TOPIC, 2000.0)]
+
+        self.assertEqual(
+            find_gaps(["space1"], now=NOW, heartbeat_tolerance=60),
+            [("space1", 400.0, 600.0)],
+        )
+
+    @patch("google.gap_reconciler.clear_recorded_gaps")
+    @patch("google.gap_reconciler.update_backfill_watermarks")
+    @patch("google.gap_reconciler.store_messages_batch")
+    @patch("google.gap_reconciler.fetch_messages_by_spaces_id")
+    @patch("google.gap_reconciler.list_directory_all_people_ldap")
+    @patch("google.gap_reconciler.find_gaps")
+    def test_reconcile_gaps(
+        self,
+        mock_find_gaps,
+        mock_list_ldap,
+        mock_fetch,
+        mock_store_batch,
+        mock_update_backfill,
+        mock_clear_gaps,
+    ):
+        message = {"sender": {"name": "users/id1"}}
+        external = {"sender": {"name": "users/external"}}
+        mock_find_gaps.return_value = [("space1", 300.0, NOW)]
+        mock_list_ldap.return_value = {"id1": "ldap1"}
+        mock_fetch.return_value = [message, external]
+
+        gaps = reconcile_gaps(space_ids=["space1", "space2"])
+
+        self.assertEqual(gaps, [("space1", 300.0, NOW)])
+        mock_fetch.assert_called_once_with("space1", start_time=300.0, end_time=NOW)
+        mock_store_batch.assert_called_once_with([
+            ("ldap1", message, MESSAGE_TYPE_CREATE)
+        ])
+        mock_update_backfill.assert_called_once_with({"space1": NOW})
+        mock_clear_gaps.assert_called_once_with([("space1", 300.0, NOW)])
+
+    @patch("google.gap_reconciler.list_directory_all_people_ldap")
+    @patch("google.gap_reconciler.find_gaps", return_value=[])
+    def test_reconcile_without_gaps(self, mock_find_gaps, mock_list_ldap):
+        self.assertEqual(reconcile_gaps(space_ids=["space1"]), [])
+        mock_list_ldap.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from google.message_restore import (
+    resolve_directory,
+    restore_lines,
+    restore_messages,
+    split_ranges,
+    to_store_entry,
+)
+from google.constants import MESSAGE_TYPE_CREATE
+
+TEST_PEOPLE = {"id1": "ldap1"}
+TEST_MESSAGE = {
+    "name": "spaces/space1/messages/msg1",
+    "sender": {"name": "users/id1"},
+    "createTime": "2023-10-27T10:00:00Z",
+    "space": {"name": "spaces/space1"},
+}
+
+
+class TestMessageRestore(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "dump.ndjson")
+
+    def write_lines(self, lines):
+        with open(self.path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+
+    @patch("google.message_restore.save_directory_people")
+    @patch("google.message_restore.list_directory_all_people_ldap")
+    @patch("google.message_restore.load_directory_people")
+    def test_resolve_directory_uses_cache(self, mock_load, mock_list, mock_save):
+        mock_load.return_value = TEST_PEOPLE
+        self.assertEqual(resolve_directory(), TEST_PEOPLE)
+        mock_list.assert_not_called()
+
+        mock_load.return_value = {}
+        mock_list.return_value = TEST_PEOPLE
+        self.assertEqual(resolve_directory(), TEST_PEOPLE)
+        mock_save.assert_called_once_with(TEST_PEOPLE)
+
+    def test_to_store_entry(self):
+        exported = {"sender_ldap": "ldap2", "type": "create", "message": TEST_MESSAGE}
+
+        self.assertEqual(
+            to_store_entry(exported, TEST_PEOPLE), ("ldap2", TEST_MESSAGE, "create")
+        )
+        self.assertEqual(
+            to_store_entry(TEST_MESSAGE, TEST_PEOPLE),
+            ("ldap1", TEST_MESSAGE, MESSAGE_TYPE_CREATE),
+        )
+        self.assertIsNone(
+            to_store_entry(dict(TEST_MESSAGE, sender={"name": "users/x"}), TEST_PEOPLE)
+        )
+
+    def test_to_store_entry_invalid_message(self):
+        for message in (
+            dict(TEST_MESSAGE, createTime="invalid_time"),
+            dict(TEST_MESSAGE, createTime=None),
+            dict(TEST_MESSAGE, space={"name": "MySpace"}),
+            {key: value for key, value in TEST_MESSAGE.items() if key != "space"},
+        ):
+            with self.subTest(message=message), self.assertRaises(ValueError):
+                to_store_entry(message, TEST_PEOPLE)
+
+    def test_split_ranges_align_on_lines(self):
+        self.write_lines([json.dumps({"n": n}) for n in range(10)])
+
+        ranges = split_ranges(self.path, 3)
+
+        self.assertEqual(ranges[0][0], 0)
+        self.assertEqual(ranges[-1][1], os.path.getsize(self.path))
+        with open(self.path, "rb") as f:
+            data = f.read()
+        for start, end in ranges:
+            self.assertTrue(start == 0 or data[start - 1 : start] == b"\n")
+            self.assertEqual(data[end - 1 : end], b"\n")
+
+    @patch("google.message_restore.store_messages_batch")
+    def test_restore_lines_batches_and_skips_invalid(self, mock_store_batch):
+        mock_store_batch.side_effect = len
+        bad_time = json.dumps(dict(TEST_MESSAGE, createTime="invalid_time"))
+        lines = [(0, json.dumps(TEST_MESSAGE).encode())] * 3 + [
+            (1, b"not json"),
+            (2, bad_time.encode()),
+        ]
+
+        result = restore_lines(lines, TEST_PEOPLE, batch_size=2)
+
+        self.assertEqual(result, (3, 2))
+        self.assertEqual(mock_store_batch.call_count, 2)
+
+    @patch("google.message_restore.store_messages_batch", side_effect=len)
+    @patch("google.message_restore.resolve_directory", return_value=TEST_PEOPLE)
+    def test_restore_messages_single_worker(self, _, mock_store_batch):
+        self.write_lines([json.dumps(TEST_MESSAGE)] * 5)
+
+        result = restore_messages(self.path, workers=1, batch_size=2)
+
+        self.assertEqual(result, {"restored": 5, "skipped": 0})
+        self.assertEqual(mock_store_batch.call_count, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
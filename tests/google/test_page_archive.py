@@ -0,0 +1,93 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from google.page_archive import (
+    PageArchive,
+    iter_archived_pages,
+    read_index,
+    replay_archive,
+)
+
+TEST_PEOPLE = {"id1": "ldap1"}
+
+
+def make_message(space_id, number, create_time):
+    return {
+        "name": f"spaces/{space_id}/messages/msg{number}",
+        "sender": {"name": "users/id1"},
+        "createTime": create_time,
+        "space": {"name": f"spaces/{space_id}"},
+    }
+
+
+PAGE_1 = {
+    "messages": [
+        make_message("space1", 1, "2024-05-13T10:00:00Z"),
+        make_message("space1", 2, "2024-05-13T11:00:00Z"),
+    ],
+    "nextPageToken": "token",
+}
+PAGE_2 = {"messages": [make_message("space1", 3, "2024-05-14T10:00:00Z")]}
+PAGE_3 = {"messages": [make_message("space2", 4, "2024-05-13T10:30:00Z")]}
+TIMESTAMP_2024_05_14 = 1715644800.0
+
+
+class TestPageArchive(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def archive_pages(self, **kwargs):
+        archive = PageArchive(self.directory, **kwargs)
+        archive.append_page("space1", PAGE_1)
+        archive.append_page("space1", PAGE_2)
+        archive.append_page("space2", PAGE_3)
+        return archive
+
+    def test_append_and_read_pages(self):
+        self.archive_pages()
+
+        pages = list(iter_archived_pages(self.directory))
+
+        self.assertEqual(
+            pages, [("space1", PAGE_1), ("space1", PAGE_2), ("space2", PAGE_3)]
+        )
+
+    def test_read_index_filters_space_and_time(self):
+        self.archive_pages()
+
+        self.assertEqual(
+            [entry["count"] for entry in read_index(self.directory, ["space1"])],
+            [2, 1],
+        )
+        entries = read_index(self.directory, end_time=TIMESTAMP_2024_05_14)
+        self.assertEqual([entry["space_id"] for entry in entries], ["space1", "space2"])
+
+    def test_segments_rotate_and_archive_reopens(self):
+        self.archive_pages(segment_bytes=1)
+        PageArchive(self.directory).append_page("space2", PAGE_3)
+
+        segments = sorted(
+            name for name in os.listdir(self.directory) if name.startswith("segment")
+        )
+        self.assertEqual(len(segments), 3)
+        self.assertEqual(len(list(iter_archived_pages(self.directory))), 4)
+
+    @patch("google.page_archive.store_messages_batch", side_effect=len)
+    @patch("google.page_archive.resolve_directory", return_value=TEST_PEOPLE)
+    def test_replay_archive(self, _, mock_store_batch):
+        self.archive_pages()
+
+        result = replay_archive(
+            self.directory, ["space1"], end_time=TIMESTAMP_2024_05_14, batch_size=1
+        )
+
+        self.assertEqual(result, {"replayed": 2, "skipped": 0})
+        self.assertEqual(mock_store_batch.call_count, 2)
+        self.assertEqual(mock_store_batch.call_args[0][0][0][0], "ldap1")
+
+
+if __name__ == "__main__":
+    unittest.main()
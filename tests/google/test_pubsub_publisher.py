@@ -2,12 +2,21 @@ import unittest
 from unittest.mock import Mock, patch
 import logging
 from io import StringIO
-from google.pubsub_publisher import create_subscription
+from google.api_core.exceptions import AlreadyExists
+from googleapiclient.errors import HttpError
+from google.pubsub_publisher import (
+    create_pubsub_topic,
+    create_subscription,
+    list_subscribed_space_ids,
+    subscribe_chat_spaces,
+)
 from google.constants import (
     NO_CLIENT_ERROR_MSG,
     RETRIEVED_SPACES_INFO_MSG,
     DEFAULT_PAGE_SIZE,
     DEFAULT_SPACE_TYPE,
+    CHAT_MESSAGE_EVENT_TYPES,
+    TOPIC_EXISTS_INFO_MSG,
 )
 
 space_type = DEFAULT_SPACE_TYPE
@@ -66,6 +75,145 @@ class TestPubsubPublisher(unittest.TestCase):
             request=expected_request
         )
 
+    @patch("google.pubsub_publisher.GoogleClientFactory")
+    def test_create_subscription_with_filter(self, mock_client_factory):
+        mock_subscriber = Mock()
+        mock_subscriber.topic_path.return_value = EXPECTED_TOPIC_PATH
+        mock_subscriber.subscription_path.return_value = EXPECTED_SUBSCRIPTION_PATH
+        mock_client_factory.return_value.create_subscriber_client.return_value = (
+            mock_subscriber
+        )
+
+        create_subscription(
+            TEST_PROJECT_ID,
+            TEST_TOPIC_ID,
+            TEST_SUBSCRIPTION_ID,
+            filter_expression='attributes.shard = "0"',
+        )
+
+        mock_subscriber.create_subscription.assert_called_once_with(
+            request={
+                "name": EXPECTED_SUBSCRIPTION_PATH,
+                "topic": EXPECTED_TOPIC_PATH,
+                "filter": 'attributes.shard = "0"',
+            }
+        )
+
+    @patch("google.pubsub_publisher.GoogleClientFactory")
+    def test_create_subscription_already_exists(self, mock_client_factory):
+        mock_subscriber = Mock()
+        mock_subscriber.topic_path.return_value = EXPECTED_TOPIC_PATH
+        mock_subscriber.subscription_path.return_value = EXPECTED_SUBSCRIPTION_PATH
+        mock_subscriber.create_subscription.side_effect = AlreadyExists("exists")
+        mock_client_factory.return_value.create_subscriber_client.return_value = (
+            mock_subscriber
+        )
+
+        result = create_subscription(
+            TEST_PROJECT_ID, TEST_TOPIC_ID, TEST_SUBSCRIPTION_ID
+        )
+
+        self.assertEqual(result, EXPECTED_SUBSCRIPTION_PATH)
+
+    @patch("google.pubsub_publisher.GoogleClientFactory")
+    def test_create_pubsub_topic_already_exists(self, mock_client_factory):
+        mock_publisher = Mock()
+        mock_publisher.topic_path.return_value = EXPECTED_TOPIC_PATH
+        mock_publisher.create_topic.side_effect = AlreadyExists("exists")
+        mock_client_factory.return_value.create_publisher_client.return_value = (
+            mock_publisher
+        )
+
+        self.assertIsNone(create_pubsub_topic(TEST_PROJECT_ID, TEST_TOPIC_ID))
+        self.assertIn(
+            TOPIC_EXISTS_INFO_MSG.format(topic_path=EXPECTED_TOPIC_PATH),
+            self.log_capture_string.getvalue(),
+        )
+
+    @patch("google.pubsub_publisher.GoogleClientFactory")
+    def test_list_subscribed_space_ids(self, mock_client_factory):
+        client = mock_client_factory.return_value.create_workspaceevents_client
+        mock_list = client.return_value.subscriptions.return_value.list
+        pages = [
+            {
+                "subscriptions": [
+                    {
+                        "targetResource": "//chat.googleapis.com/spaces/space1",
+                        "notificationEndpoint": {"pubsubTopic": EXPECTED_TOPIC_PATH},
+                    }
+                ],
+                "nextPageToken": "next",
+            },
+            {
+                "subscriptions": [
+                    {
+                        "targetResource": "//chat.googleapis.com/spaces/space2",
+                        "notificationEndpoint": {"pubsubTopic": "projects/p/topics/t"},
+                    }
+                ]
+            },
+        ]
+        mock_list.return_value.execute.side_effect = pages
+
+        self.assertEqual(list_subscribed_space_ids(), {"space1", "space2"})
+        self.assertEqual(mock_list.call_count, 2)
+
+        mock_list.return_value.execute.side_effect = pages
+        self.assertEqual(list_subscribed_space_ids(EXPECTED_TOPIC_PATH), {"space1"})
+
+    @patch("google.pubsub_publisher.create_workspaces_subscriptions")
+    @patch("google.pubsub_publisher.list_subscribed_space_ids")
+    @patch("google.pubsub_publisher.create_subscription")
+    @patch("google.pubsub_publisher.create_pubsub_topic")
+    @patch("google.pubsub_publisher.GoogleClientFactory")
+    def test_subscribe_chat_spaces(
+        self,
+        mock_client_factory,
+        mock_create_topic,
+        mock_create_subscription,
+        mock_list_subscribed,
+        mock_create_workspaces,
+    ):
+        mock_list_subscribed.return_value = {"space1"}
+        conflict = HttpError(Mock(status=409), b"exists")
+        failure = HttpError(Mock(status=500), b"boom")
+
+        def create(project_id, topic_id, space_id, event_types, authorized_http=None):
+            self.assertEqual(event_types, CHAT_MESSAGE_EVENT_TYPES)
+            self.assertIsNotNone(authorized_http)
+            if space_id == "space3":
+                raise conflict
+            if space_id == "space4":
+                raise failure
+            if space_id == "space5":
+                raise TimeoutError("timed out")
+            return {}
+
+        mock_create_workspaces.side_effect = create
+
+        result = subscribe_chat_spaces(
+            TEST_PROJECT_ID,
+            TEST_SUBSCRIPTION_ID,
+            TEST_TOPIC_ID,
+            space_ids=iter(["space1", "space2", "space3", "space4", "space5"]),
+            requests_per_second=1000,
+        )
+
+        mock_create_topic.assert_called_once_with(TEST_PROJECT_ID, TEST_TOPIC_ID)
+        mock_create_subscription.assert_called_once_with(
+            TEST_PROJECT_ID, TEST_TOPIC_ID, TEST_SUBSCRIPTION_ID
+        )
+        mock_list_subscribed.assert_called_once_with(EXPECTED_TOPIC_PATH)
+        self.assertEqual(mock_create_workspaces.call_count, 4)
+        self.assertEqual(result["created"], ["space2"])
+        self.assertEqual(result["skipped"], ["space1", "space3"])
+        self.assertEqual(list(result["failed"]), ["space4", "space5"])
+        self.assertEqual(result["failed"]["space5"], "timed out")
+
+    def test_subscribe_chat_spaces_requires_ids(self):
+        with self.assertRaises(ValueError):
+            subscribe_chat_spaces(TEST_PROJECT_ID, None, TEST_TOPIC_ID, space_ids=[])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,256 @@
+import json
+import logging
+import unittest
+from io import StringIO
+from unittest.mock import ANY, Mock, patch
+from google.pubsub_subscriber_store import ChatEventSubscriber, pull_messages
+from google.constants import (
+    CE_TYPE_ATTRIBUTE,
+    CE_TIME_ATTRIBUTE,
+    EVENT_TYPE_MESSAGE_CREATED,
+    EVENT_TYPE_MESSAGE_DELETED,
+    MESSAGE_TYPE_CREATE,
+    COMMITTED_BATCH_INFO_MSG,
+)
+from redis_dal.constants import MESSAGE_TYPE_DELETE
+
+TEST_PROJECT_ID = "test-project"
+TEST_SUBSCRIPTION_ID = "test-subscription"
+TEST_SUBSCRIPTION_PATH = (
+    f"projects/{TEST_PROJECT_ID}/subscriptions/{TEST_SUBSCRIPTION_ID}"
+)
+TEST_LDAP = "ldap1"
+TEST_MESSAGE = {
+    "name": "spaces/space1/messages/msg1",
+    "sender": {"name": "users/id1"},
+    "createTime": "2023-10-27T10:00:00Z",
+    "space": {"name": "spaces/space1"},
+    "text": "Hello",
+}
+TEST_DELETED_MESSAGE = {"name": "spaces/space1/messages/msg1"}
+
+
+def make_pubsub_message(event_type, data, message_id="1"):
+    pubsub_message = Mock()
+    pubsub_message.attributes = {CE_TYPE_ATTRIBUTE: event_type}
+    pubsub_message.data = json.dumps(data).encode("utf-8")
+    pubsub_message.message_id = message_id
+    return pubsub_message
+
+
+class TestChatEventSubscriber(unittest.TestCase):
+    def setUp(self):
+        self.log_capture_string = StringIO()
+        ch = logging.StreamHandler(self.log_capture_string)
+        from tools.log.logger import setup_logger
+
+        setup_logger()
+        root_logger = logging.getLogger()
+        ch.setFormatter(root_logger.handlers[0].formatter)
+        logging.getLogger().addHandler(ch)
+        logging.getLogger().setLevel(logging.DEBUG)
+
+        factory_patcher = patch("google.pubsub_subscriber_store.GoogleClientFactory")
+        self.mock_client_factory = factory_patcher.start()
+        self.addCleanup(factory_patcher.stop)
+        self.mock_subscriber = Mock()
+        self.mock_subscriber.subscription_path.return_value = TEST_SUBSCRIPTION_PATH
+        self.mock_client_factory.return_value.create_subscriber_client.return_value = (
+            self.mock_subscriber
+        )
+
+        people_patcher = patch(
+            "google.pubsub_subscriber_store.list_directory_all_people_ldap",
+            return_value={"id1": TEST_LDAP},
+        )
+        self.mock_list_ldap = people_patcher.start()
+        self.addCleanup(people_patcher.stop)
+
+        dedup_patcher = patch("google.pubsub_subscriber_store.MessageDeduplicator")
+        self.mock_deduplicator = dedup_patcher.start().return_value
+        self.addCleanup(dedup_patcher.stop)
+        self.mock_deduplicator.is_duplicate.return_value = False
+
+        watermarks_patcher = patch(
+            "google.pubsub_subscriber_store.update_realtime_watermarks"
+        )
+        self.mock_update_watermarks = watermarks_patcher.start()
+        self.addCleanup(watermarks_patcher.stop)
+        heartbeat_patcher = patch(
+            "google.pubsub_subscriber_store.record_subscriber_heartbeat"
+        )
+        self.mock_heartbeat = heartbeat_patcher.start()
+        self.addCleanup(heartbeat_patcher.stop)
+
+    def tearDown(self):
+        logging.getLogger().handlers = []
+
+    def test_init_requires_ids(self):
+        with self.assertRaises(ValueError):
+            ChatEventSubscriber(TEST_PROJECT_ID, None)
+
+    def test_decode_created_event(self):
+        subscriber = ChatEventSubscriber(TEST_PROJECT_ID, TEST_SUBSCRIPTION_ID)
+        pubsub_message = make_pubsub_message(
+            EVENT_TYPE_MESSAGE_CREATED, {"message": TEST_MESSAGE}
+        )
+
+        entry = subscriber.decode_event(pubsub_message)
+
+        self.assertEqual(entry, (TEST_LDAP, TEST_MESSAGE, MESSAGE_TYPE_CREATE))
+        self.mock_list_ldap.assert_called_once()
+
+    def test_decode_deleted_event(self):
+        subscriber = ChatEventSubscriber(TEST_PROJECT_ID, TEST_SUBSCRIPTION_ID)
+        pubsub_message = make_pubsub_message(
+            EVENT_TYPE_MESSAGE_DELETED, {"message": TEST_DELETED_MESSAGE}
+        )
+
+        entry = subscriber.decode_event(pubsub_message)
+
+        self.assertEqual(entry, (None, TEST_DELETED_MESSAGE, MESSAGE_TYPE_DELETE))
+        self.mock_list_ldap.assert_not_called()
+
+    def test_decode_unknown_sender_and_unsupported_event(self):
+        subscriber = ChatEventSubscriber(TEST_PROJECT_ID, TEST_SUBSCRIPTION_ID)
+        external_message = dict(TEST_MESSAGE, sender={"name": "users/external"})
+
+        self.assertIsNone(
+            subscriber.decode_event(
+                make_pubsub_message(
+                    EVENT_TYPE_MESSAGE_CREATED, {"message": external_message}
+                )
+            )
+        )
+        self.assertIsNone(
+            subscriber.decode_event(make_pubsub_message("other.event", {}))
+        )
+
+    @patch("google.pubsub_subscriber_store.store_messages_batch")
+    def test_callback_flushes_full_batch_and_acks(self, mock_store_batch):
+        mock_store_batch.return_value = 2
+        subscriber = ChatEventSubscriber(
+            TEST_PROJECT_ID, TEST_SUBSCRIPTION_ID, batch_size=2
+        )
+        created = make_pubsub_message(
+            EVENT_TYPE_MESSAGE_CREATED, {"message": TEST_MESSAGE}, "1"
+        )
+        deleted = make_pubsub_message(
+            EVENT_TYPE_MESSAGE_DELETED, {"message": TEST_DELETED_MESSAGE}, "2"
+        )
+
+        subscriber.callback(created)
+        mock_store_batch.assert_not_called()
+        created.ack.assert_not_called()
+
+        subscriber.callback(deleted)
+        mock_store_batch.assert_called_once_with(
+            [
+                (TEST_LDAP, TEST_MESSAGE, MESSAGE_TYPE_CREATE),
+                (None, TEST_DELETED_MESSAGE, MESSAGE_TYPE_DELETE),
+            ],
+            queue_commands=ANY,
+        )
+        event_keys = [
+            f"{MESSAGE_TYPE_CREATE}:{TEST_MESSAGE['name']}",
+            f"{MESSAGE_TYPE_DELETE}:{TEST_DELETED_MESSAGE['name']}",
+        ]
+        pipeline = Mock()
+        mock_store_batch.call_args.kwargs["queue_commands"](pipeline)
+        self.mock_deduplicator.queue_mark_seen.assert_called_once_with(
+            pipeline, event_keys=event_keys
+        )
+        self.mock_deduplicator.remember.assert_called_once_with(event_keys)
+        created.ack.assert_called_once()
+        deleted.ack.assert_called_once()
+        self.mock_update_watermarks.assert_called_once_with({"space1": 1698400800.0})
+        self.assertIn(
+            COMMITTED_BATCH_INFO_MSG.format(count=2, acked=2),
+            self.log_capture_string.getvalue(),
+        )
+
+    @patch("google.pubsub_subscriber_store.store_messages_batch")
+    def test_flush_applies_events_in_event_time_order(self, mock_store_batch):
+        subscriber = ChatEventSubscriber(TEST_PROJECT_ID, TEST_SUBSCRIPTION_ID)
+        deleted = make_pubsub_message(
+            EVENT_TYPE_MESSAGE_DELETED, {"message": TEST_DELETED_MESSAGE}, "1"
+        )
+        deleted.attributes[CE_TIME_ATTRIBUTE] = "2023-10-27T10:00:05Z"
+        created = make_pubsub_message(
+            EVENT_TYPE_MESSAGE_CREATED, {"message": TEST_MESSAGE}, "2"
+        )
+        created.attributes[CE_TIME_ATTRIBUTE] = "2023-10-27T10:00:00Z"
+
+        subscriber.callback(deleted)
+        subscriber.callback(created)
+        subscriber.flush()
+
+        mock_store_batch.assert_called_once_with(
+            [
+                (TEST_LDAP, TEST_MESSAGE, MESSAGE_TYPE_CREATE),
+                (None, TEST_DELETED_MESSAGE, MESSAGE_TYPE_DELETE),
+            ],
+            queue_commands=ANY,
+        )
+
+    @patch("google.pubsub_subscriber_store.store_messages_batch")
+    def test_flush_failure_nacks_batch(self, mock_store_batch):
+        mock_store_batch.side_effect = Exception("redis down")
+        subscriber = ChatEventSubscriber(TEST_PROJECT_ID, TEST_SUBSCRIPTION_ID)
+        created = make_pubsub_message(
+            EVENT_TYPE_MESSAGE_CREATED, {"message": TEST_MESSAGE}
+        )
+        subscriber.callback(created)
+
+        self.assertEqual(subscriber.flush(), 0)
+
+        created.nack.assert_called_once()
+        created.ack.assert_not_called()
+        self.mock_deduplicator.remember.assert_not_called()
+
+    @patch("google.pubsub_subscriber_store.store_messages_batch")
+    def test_duplicate_event_is_acked_without_store(self, mock_store_batch):
+        self.mock_deduplicator.is_duplicate.return_value = True
+        subscriber = ChatEventSubscriber(TEST_PROJECT_ID, TEST_SUBSCRIPTION_ID)
+        duplicate = make_pubsub_message(
+            EVENT_TYPE_MESSAGE_DELETED, {"message": TEST_DELETED_MESSAGE}
+        )
+
+        subscriber.callback(duplicate)
+        subscriber.flush()
+
+        self.mock_deduplicator.is_duplicate.assert_called_once_with(
+            f"{MESSAGE_TYPE_DELETE}:{TEST_DELETED_MESSAGE['name']}"
+        )
+        duplicate.ack.assert_called_once()
+        mock_store_batch.assert_not_called()
+
+    @patch("google.pubsub_subscriber_store.store_messages_batch")
+    def test_invalid_event_is_acked_without_store(self, mock_store_batch):
+        subscriber = ChatEventSubscriber(TEST_PROJECT_ID, TEST_SUBSCRIPTION_ID)
+        invalid = make_pubsub_message(EVENT_TYPE_MESSAGE_CREATED, {"message": {}})
+
+        subscriber.callback(invalid)
+        subscriber.flush()
+
+        invalid.ack.assert_called_once()
+        mock_store_batch.assert_not_called()
+
+    def test_pull_messages_uses_flow_control(self):
+        streaming_pull_future = Mock()
+        streaming_pull_future.done.return_value = True
+        self.mock_subscriber.subscribe.return_value = streaming_pull_future
+
+        pull_messages(
+            TEST_PROJECT_ID, TEST_SUBSCRIPTION_ID, max_messages=10, max_bytes=1024
+        )
+
+        _, kwargs = self.mock_subscriber.subscribe.call_args
+        self.assertEqual(kwargs["flow_control"].max_messages, 10)
+        self.assertEqual(kwargs["flow_control"].max_bytes, 1024)
+        streaming_pull_future.cancel.assert_called_once()
+        self.mock_heartbeat.assert_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import http.client
+import unittest
+from unittest.mock import Mock, patch
+from flask import Flask, jsonify
+from werkzeug.datastructures import MultiDict
+from google.result_cache import ResultCache, cached_response, normalize_query
+
+
+class TestResultCache(unittest.TestCase):
+    def test_get_requires_matching_versions(self):
+        cache = ResultCache()
+        cache.put("key", (1, 2), "value")
+
+        self.assertEqual(cache.get("key", (1, 2)), "value")
+        self.assertIsNone(cache.get("key", (1, 3)))
+        self.assertEqual(cache.get_metrics()["hits"], 1)
+        self.assertEqual(cache.get_metrics()["misses"], 1)
+
+    @patch("google.result_cache.time.monotonic")
+    def test_entries_expire(self, mock_monotonic):
+        cache = ResultCache(ttl_seconds=10)
+        mock_monotonic.return_value = 100
+        cache.put("key", (), "value")
+
+        mock_monotonic.return_value = 111
+
+        self.assertIsNone(cache.get("key", ()))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = ResultCache(max_size=2)
+        cache.put("a", (), 1)
+        cache.put("b", (), 2)
+        cache.get("a", ())
+        cache.put("c", (), 3)
+
+        self.assertIsNone(cache.get("b", ()))
+        self.assertEqual(cache.get("a", ()), 1)
+        self.assertEqual(cache.get("c", ()), 3)
+
+    def test_entries_are_evicted_over_the_byte_budget(self):
+        cache = ResultCache(max_bytes=10)
+        cache.put("a", (), 1, size=4)
+        cache.put("b", (), 2, size=4)
+        cache.put("c", (), 3, size=4)
+        cache.put("large", (), 4, size=11)
+
+        self.assertIsNone(cache.get("a", ()))
+        self.assertIsNone(cache.get("large", ()))
+        self.assertEqual(cache.get("c", ()), 3)
+        self.assertEqual(cache.get_metrics()["bytes"], 8)
+
+    def test_normalize_query_ignores_order(self):
+        self.assertEqual(
+            normalize_query("/p", MultiDict([("b", "y, x"), ("a", "1")])),
+            normalize_query("/p", MultiDict([("a", "1"), ("b", "x,y")])),
+        )
+
+
+class TestCachedResponse(unittest.TestCase):
+    def setUp(self):
+        self.compute = Mock(return_value={"count": 1})
+        self.cache = ResultCache()
+        patcher = patch("google.result_cache.result_cache", self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = patch("google.result_cache.get_versions", return_value=(1,))
+        self.mock_get_versions = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        app = Flask(__name__)
+
+        @app.route("/count")
+        @cached_response(lambda args: ["global"])
+        def count():
+            return jsonify(self.compute()), http.client.OK
+
+        self.client = app.test_client()
+
+    def test_results_are_cached_until_versions_change(self):
+        first = self.client.get("/count")
+        second = self.client.get("/count")
+
+        self.assertEqual(first.get_json(), {"count": 1})
+        self.assertEqual(second.get_json(), {"count": 1})
+        self.assertEqual(self.compute.call_count, 1)
+        self.mock_get_versions.assert_called_with(["global"])
+
+        self.mock_get_versions.return_value = (2,)
+        self.client.get("/count")
+
+        self.assertEqual(self.compute.call_count, 2)
+
+    def test_if_none_match_returns_not_modified(self):
+        etag = self.client.get("/count").headers["ETag"]
+
+        response = self.client.get("/count", headers={"If-None-Match": etag})
+
+        self.assertEqual(response.status_code, http.client.NOT_MODIFIED)
+        self.assertEqual(response.data, b"")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,150 @@
+import json
+import unittest
+from collections import Counter
+from unittest.mock import Mock, call, patch
+from google.subscriber_workers import (
+    HashRing,
+    SpaceShardRelay,
+    create_shard_subscriptions,
+    get_event_space_id,
+    run_subscriber_workers,
+    shard_subscription_id,
+)
+from google.constants import CE_SUBJECT_ATTRIBUTE, CE_TYPE_ATTRIBUTE, SHARD_ATTRIBUTE
+
+TEST_PROJECT_ID = "test-project"
+TEST_SUBSCRIPTION_ID = "test-subscription"
+TEST_SHARD_TOPIC_ID = "test-shard-topic"
+TEST_SUBJECT = "//chat.googleapis.com/spaces/space1"
+
+
+def make_pubsub_message(attributes, data=None):
+    pubsub_message = Mock()
+    pubsub_message.attributes = attributes
+    pubsub_message.data = json.dumps(data or {}).encode("utf-8")
+    pubsub_message.message_id = "1"
+    return pubsub_message
+
+
+class TestHashRing(unittest.TestCase):
+    def test_get_shard_is_stable_and_balanced(self):
+        ring = HashRing(4)
+        space_ids = [f"space{i}" for i in range(4000)]
+
+        shards = [ring.get_shard(space_id) for space_id in space_ids]
+
+        self.assertEqual(shards, [HashRing(4).get_shard(s) for s in space_ids])
+        counts = Counter(shards)
+        self.assertEqual(set(counts), {0, 1, 2, 3})
+        self.assertTrue(all(600 < count < 1400 for count in counts.values()))
+
+    def test_adding_shard_moves_few_spaces(self):
+        space_ids = [f"space{i}" for i in range(4000)]
+        before = HashRing(4)
+        after = HashRing(5)
+
+        moved = sum(
+            1
+            for space_id in space_ids
+            if before.get_shard(space_id) != after.get_shard(space_id)
+        )
+
+        self.assertLess(moved, len(space_ids) * 0.35)
+
+    def test_requires_positive_shards(self):
+        with self.assertRaises(ValueError):
+            HashRing(0)
+
+
+class TestSubscriberWorkers(unittest.TestCase):
+    def test_get_event_space_id(self):
+        self.assertEqual(
+            get_event_space_id(
+                make_pubsub_message({CE_SUBJECT_ATTRIBUTE: TEST_SUBJECT})
+            ),
+            "space1",
+        )
+        self.assertEqual(
+            get_event_space_id(
+                make_pubsub_message(
+                    {}, {"message": {"name": "spaces/space2/messages/msg1"}}
+                )
+            ),
+            "space2",
+        )
+
+    @patch("google.subscriber_workers.create_subscription")
+    @patch("google.subscriber_workers.create_pubsub_topic")
+    def test_create_shard_subscriptions(self, mock_create_topic, mock_create_sub):
+        create_shard_subscriptions(
+            TEST_PROJECT_ID, TEST_SHARD_TOPIC_ID, TEST_SUBSCRIPTION_ID, 2
+        )
+
+        mock_create_topic.assert_called_once_with(TEST_PROJECT_ID, TEST_SHARD_TOPIC_ID)
+        mock_create_sub.assert_has_calls([
+            call(
+                TEST_PROJECT_ID,
+                TEST_SHARD_TOPIC_ID,
+                shard_subscription_id(TEST_SUBSCRIPTION_ID, 0),
+                filter_expression=f'attributes.{SHARD_ATTRIBUTE} = "0"',
+            ),
+            call(
+                TEST_PROJECT_ID,
+                TEST_SHARD_TOPIC_ID,
+                shard_subscription_id(TEST_SUBSCRIPTION_ID, 1),
+                filter_expression=f'attributes.{SHARD_ATTRIBUTE} = "1"',
+            ),
+        ])
+
+    @patch("google.subscriber_workers.GoogleClientFactory")
+    def test_relay_tags_shard_and_acks_after_publish(self, mock_client_factory):
+        mock_publisher = Mock()
+        mock_publisher.topic_path.return_value = "topic-path"
+        mock_client_factory.return_value.create_publisher_client.return_value = (
+            mock_publisher
+        )
+        relay = SpaceShardRelay(
+            TEST_PROJECT_ID, TEST_SUBSCRIPTION_ID, TEST_SHARD_TOPIC_ID, 4
+        )
+        attributes = {CE_SUBJECT_ATTRIBUTE: TEST_SUBJECT, CE_TYPE_ATTRIBUTE: "t"}
+        pubsub_message = make_pubsub_message(attributes)
+
+        relay.callback(pubsub_message)
+
+        mock_publisher.publish.assert_called_once_with(
+            "topic-path",
+            pubsub_message.data,
+            **attributes,
+            **{SHARD_ATTRIBUTE: str(relay.hash_ring.get_shard("space1"))},
+        )
+        publish_future = mock_publisher.publish.return_value
+        on_published = publish_future.add_done_callback.call_args[0][0]
+        on_published(publish_future)
+        pubsub_message.ack.assert_called_once()
+
+        publish_future.result.side_effect = Exception("publish failed")
+        on_published(publish_future)
+        pubsub_message.nack.assert_called_once()
+
+    @patch("google.subscriber_workers.multiprocessing")
+    def test_run_subscriber_workers_spawns_one_process_per_shard(
+        self, mock_multiprocessing
+    ):
+        context = mock_multiprocessing.get_context.return_value
+
+        run_subscriber_workers(TEST_PROJECT_ID, TEST_SUBSCRIPTION_ID, [1, 3])
+
+        mock_multiprocessing.get_context.assert_called_once_with("spawn")
+        self.assertEqual(context.Process.call_count, 2)
+        self.assertEqual(
+            [kwargs["args"][1] for _, kwargs in context.Process.call_args_list],
+            [
+                shard_subscription_id(TEST_SUBSCRIPTION_ID, 1),
+                shard_subscription_id(TEST_SUBSCRIPTION_ID, 3),
+            ],
+        )
+        self.assertEqual(context.Process.return_value.join.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
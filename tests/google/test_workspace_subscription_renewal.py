@@ -0,0 +1,150 @@
+import unittest
+from redis.exceptions import RedisError
+from unittest.mock import Mock, patch
+from googleapiclient.errors import HttpError
+from google.workspace_subscription_renewal import (
+    reconcile_workspace_subscriptions,
+    renew_expiring_subscriptions,
+    run_renewal_scheduler,
+)
+
+TEST_TOPIC = "projects/test-project/topics/test-topic"
+LIVE_SUBSCRIPTION = {
+    "name": "subscriptions/live",
+    "targetResource": "//chat.googleapis.com/spaces/space1",
+    "notificationEndpoint": {"pubsubTopic": TEST_TOPIC},
+    "expireTime": "2030-01-01T00:00:00Z",
+}
+
+
+def run_inline(func, items, max_workers, requests_per_second):
+    return [func(item, Mock()) for item in items]
+
+
+class TestWorkspaceSubscriptionRenewal(unittest.TestCase):
+    @patch("google.workspace_subscription_renewal.mark_space_live_since")
+    @patch("google.workspace_subscription_renewal.untrack_workspace_subscriptions")
+    @patch("google.workspace_subscription_renewal.track_workspace_subscriptions")
+    @patch("google.workspace_subscription_renewal.get_tracked_workspace_subscriptions")
+    @patch("google.workspace_subscription_renewal.list_workspaces_subscriptions")
+    @patch("google.workspace_subscription_renewal.time.time", return_value=1000.0)
+    def test_reconcile(
+        self,
+        mock_time,
+        mock_list_live,
+        mock_get_tracked,
+        mock_track,
+        mock_untrack,
+        mock_mark_live_since,
+    ):
+        mock_list_live.return_value = [LIVE_SUBSCRIPTION]
+        mock_get_tracked.return_value = [
+            ("subscriptions/live", "space1", TEST_TOPIC, 1.0),
+            ("subscriptions/lapsed", "space2", TEST_TOPIC, 1.0),
+            ("subscriptions/stale", "space1", TEST_TOPIC, 1.0),
+        ]
+
+        result = reconcile_workspace_subscriptions()
+
+        self.assertEqual(result, {"live": 1, "lapsed": 1, "stale": 1})
+        tracked = mock_track.call_args[0][0]
+        self.assertEqual(tracked[0][:3], ("subscriptions/live", "space1", TEST_TOPIC))
+        self.assertEqual(tracked[1], ("subscriptions/lapsed", "space2", TEST_TOPIC, 0))
+        mock_untrack.assert_called_once_with(["subscriptions/stale"])
+        mock_mark_live_since.assert_called_once_with("space1", 1000.0, 1.0)
+
+    @patch("google.workspace_subscription_renewal.mark_space_live_since")
+    @patch("google.workspace_subscription_renewal.map_rate_limited", run_inline)
+    @patch("google.workspace_subscription_renewal.create_workspaces_subscriptions")
+    @patch("google.workspace_subscription_renewal.GoogleClientFactory")
+    @patch("google.workspace_subscription_renewal.untrack_workspace_subscriptions")
+    @patch("google.workspace_subscription_renewal.track_workspace_subscriptions")
+    @patch("google.workspace_subscription_renewal.get_tracked_workspace_subscriptions")
+    @patch("google.workspace_subscription_renewal.time.time", return_value=1000.0)
+    def test_renew_expiring_subscriptions(
+        self,
+        mock_time,
+        mock_get_tracked,
+        mock_track,
+        mock_untrack,
+        mock_client_factory,
+        mock_create,
+        mock_mark_live_since,
+    ):
+        due = [
+            ("subscriptions/lapsed", "space2", TEST_TOPIC, 0),
+            ("subscriptions/live", "space1", TEST_TOPIC, 1500.0),
+            ("subscriptions/gone", "space3", TEST_TOPIC, 1600.0),
+        ]
+        mock_get_tracked.side_effect = [due, due]
+        client = mock_client_factory.return_value.create_workspaceevents_client
+        mock_subscriptions = client.return_value.subscriptions.return_value
+
+        def patch_subscription(name, updateMask, body):
+            request = Mock()
+            if name == "subscriptions/gone":
+                request.execute.side_effect = HttpError(Mock(status=404), b"gone")
+            else:
+                request.execute.return_value = {
+                    "done": True,
+                    "response": LIVE_SUBSCRIPTION,
+                }
+            return request
+
+        mock_subscriptions.patch.side_effect = patch_subscription
+        mock_create.side_effect = lambda project_id, topic_id, space_id, *_, **__: {
+            "done": space_id != "space4"
+        }
+        due.append(("subscriptions/pending", "space4", TEST_TOPIC, 0))
+
+        result = renew_expiring_subscriptions(renew_before_seconds=1800, batch_size=10)
+
+        self.assertEqual(
+            result, {"renewed": 1, "recreated": 2, "pending": 1, "failed": 0}
+        )
+        mock_get_tracked.assert_any_call(2800.0, limit=10)
+        self.assertEqual(mock_create.call_count, 3)
+        mock_create.assert_any_call(
+            "test-project",
+            "test-topic",
+            "space2",
+            unittest.mock.ANY,
+            authorized_http=unittest.mock.ANY,
+        )
+        mock_track.assert_called_once()
+        mock_mark_live_since.assert_any_call("space2", 1000.0, 0)
+        mock_mark_live_since.assert_any_call("space3", 1000.0, 1600.0)
+        self.assertEqual(mock_mark_live_since.call_count, 2)
+        mock_untrack.assert_called_once_with([
+            "subscriptions/lapsed",
+            "subscriptions/gone",
+        ])
+
+    @patch("google.workspace_subscription_renewal.renew_expiring_subscriptions")
+    @patch("google.workspace_subscription_renewal.reconcile_workspace_subscriptions")
+    def test_scheduler_reconciles_every_pass(self, mock_reconcile, mock_renew):
+        stop_event = Mock()
+        stop_event.wait.side_effect = [False, True]
+
+        run_renewal_scheduler(interval_seconds=0, stop_event=stop_event)
+
+        self.assertEqual(mock_reconcile.call_count, 2)
+        self.assertEqual(mock_renew.call_count, 2)
+
+    @patch("google.workspace_subscription_renewal.renew_expiring_subscriptions")
+    @patch("google.workspace_subscription_renewal.reconcile_workspace_subscriptions")
+    def test_scheduler_survives_a_failed_pass(self, mock_reconcile, mock_renew):
+        stop_event = Mock()
+        stop_event.wait.side_effect = [False, True]
+        mock_reconcile.side_effect = [RedisError("connection reset"), None]
+
+        with self.assertLogs(level="ERROR") as logs:
+            run_renewal_scheduler(interval_seconds=0, stop_event=stop_event)
+
+        self.assertEqual(mock_reconcile.call_count, 2)
+        mock_renew.assert_called_once()
+        self.assertIn("connection reset", logs.output[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
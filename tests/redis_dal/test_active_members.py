@@ -0,0 +1,69 @@
+import unittest
+from datetime import date
+from unittest.mock import Mock, call, patch
+from redis_dal.active_members import (
+    count_active_members,
+    count_active_spaces,
+    get_default_date_range,
+    queue_record_activity,
+)
+
+TEST_TIMESTAMP = 1715594400.0  # 2024-05-13T10:00:00Z
+
+
+class TestActiveMembers(unittest.TestCase):
+    def setUp(self):
+        patcher = patch(
+            "redis_dal.redis_client_factory.RedisClientFactory.create_redis_client"
+        )
+        self.mock_redis_client = Mock()
+        patcher.start().return_value = self.mock_redis_client
+        self.addCleanup(patcher.stop)
+
+    def test_queue_record_activity(self):
+        pipeline = Mock()
+
+        queue_record_activity(pipeline, "space1", "ldap1", TEST_TIMESTAMP)
+
+        pipeline.pfadd.assert_has_calls([
+            call("active:members:spaces/space1:day:2024-05-13", "ldap1"),
+            call("active:members:global:day:2024-05-13", "ldap1"),
+            call("active:spaces:day:2024-05-13", "space1"),
+        ])
+
+    def test_count_active_members_merges_days(self):
+        self.mock_redis_client.pfcount.return_value = 42
+
+        result = count_active_members(date(2024, 5, 12), date(2024, 5, 14), "space1")
+
+        self.assertEqual(result, 42)
+        self.mock_redis_client.pfcount.assert_called_once_with(
+            "active:members:spaces/space1:day:2024-05-12",
+            "active:members:spaces/space1:day:2024-05-13",
+            "active:members:spaces/space1:day:2024-05-14",
+        )
+
+    def test_count_active_spaces_single_day(self):
+        count_active_spaces(date(2024, 5, 13))
+
+        self.mock_redis_client.pfcount.assert_called_once_with(
+            "active:spaces:day:2024-05-13"
+        )
+
+    def test_invalid_range(self):
+        with self.assertRaises(ValueError):
+            count_active_members(date(2024, 5, 13), date(2024, 5, 12))
+
+    def test_range_too_long(self):
+        with self.assertRaises(ValueError):
+            count_active_spaces(date(2024, 1, 1), date(2024, 12, 31))
+        self.mock_redis_client.pfcount.assert_not_called()
+
+    def test_get_default_date_range(self):
+        start_date, end_date = get_default_date_range(7)
+
+        self.assertEqual((end_date - start_date).days, 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
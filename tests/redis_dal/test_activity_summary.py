@@ -0,0 +1,120 @@
+import unittest
+from datetime import datetime, timezone
+from unittest.mock import Mock, call, patch
+from redis_dal.activity_summary import get_message_counts
+
+START_TIME = datetime(2024, 5, 13, 12, tzinfo=timezone.utc)
+END_TIME = datetime(2024, 5, 15, tzinfo=timezone.utc)
+
+
+class TestActivitySummary(unittest.TestCase):
+    def setUp(self):
+        patcher = patch(
+            "redis_dal.redis_client_factory.RedisClientFactory.create_redis_client"
+        )
+        self.mock_redis_client = Mock()
+        patcher.start().return_value = self.mock_redis_client
+        self.addCleanup(patcher.stop)
+        patcher = patch("redis_dal.activity_summary.get_ldap_keys")
+        self.mock_get_ldap_keys = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.mock_pipeline = self.mock_redis_client.pipeline.return_value
+
+    def test_totals_with_pipelined_counts(self):
+        self.mock_get_ldap_keys.return_value = {
+            "ldap1": ["spaces/space1:ldap:ldap1", "spaces/space2:ldap:ldap1"],
+            "ldap2": ["spaces/space1:ldap:ldap2"],
+        }
+        self.mock_pipeline.execute.return_value = [3, 2, 0]
+
+        result = get_message_counts(["ldap1", "ldap2"], START_TIME, END_TIME)
+
+        self.assertEqual(result, {"ldap1": {"total": 5}, "ldap2": {"total": 0}})
+        self.mock_get_ldap_keys.assert_called_once_with(["ldap1", "ldap2"])
+        self.mock_redis_client.pipeline.assert_called_once_with(transaction=False)
+        self.assertEqual(self.mock_pipeline.zcount.call_count, 3)
+        self.mock_pipeline.zcount.assert_any_call(
+            "spaces/space1:ldap:ldap2",
+            START_TIME.timestamp(),
+            f"({END_TIME.timestamp()}",
+        )
+        self.mock_redis_client.register_script.assert_not_called()
+
+    def test_repeated_ldaps_are_counted_once(self):
+        self.mock_get_ldap_keys.return_value = {
+            "ldap1": ["spaces/space1:ldap:ldap1"],
+            "ldap2": ["spaces/space1:ldap:ldap2"],
+        }
+        self.mock_pipeline.execute.return_value = [3, 1]
+
+        result = get_message_counts(["ldap2", "ldap1", "ldap2"], START_TIME, END_TIME)
+
+        self.assertEqual(list(result), ["ldap2", "ldap1"])
+        self.assertEqual(result, {"ldap2": {"total": 3}, "ldap1": {"total": 1}})
+        self.mock_get_ldap_keys.assert_called_once_with(["ldap2", "ldap1"])
+        self.assertEqual(self.mock_pipeline.zcount.call_count, 2)
+
+    @patch("redis_dal.activity_summary.DEFAULT_ACTIVITY_PIPELINE_SIZE", 2)
+    def test_counts_are_pipelined_in_chunks(self):
+        self.mock_get_ldap_keys.return_value = {
+            "ldap1": ["spaces/space1:ldap:ldap1", "spaces/space2:ldap:ldap1"],
+        }
+        self.mock_pipeline.execute.side_effect = [[1, 2], [0, 4]]
+
+        result = get_message_counts(["ldap1"], START_TIME, END_TIME, group_by=["day"])
+
+        self.assertEqual(
+            result, {"ldap1": {"total": 7, "days": {"2024-05-13": 1, "2024-05-14": 6}}}
+        )
+        self.assertEqual(self.mock_pipeline.execute.call_count, 2)
+
+    def test_group_by_space_and_day(self):
+        self.mock_get_ldap_keys.return_value = {
+            "ldap1": ["spaces/space1:ldap:ldap1", "spaces/space2:ldap:ldap1"],
+        }
+        self.mock_pipeline.execute.return_value = [1, 2, 0, 4]
+
+        result = get_message_counts(
+            ["ldap1"], START_TIME, END_TIME, group_by=["space", "day"]
+        )
+
+        self.assertEqual(
+            result,
+            {
+                "ldap1": {
+                    "total": 7,
+                    "spaces": {"space1": 3, "space2": 4},
+                    "days": {"2024-05-13": 1, "2024-05-14": 6},
+                }
+            },
+        )
+        midnight = datetime(2024, 5, 14, tzinfo=timezone.utc).timestamp()
+        self.mock_pipeline.zcount.assert_has_calls([
+            call("spaces/space1:ldap:ldap1", START_TIME.timestamp(), f"({midnight}"),
+            call("spaces/space1:ldap:ldap1", midnight, f"({END_TIME.timestamp()}"),
+        ])
+
+    @patch("redis_dal.activity_summary.get_registered_ldaps", return_value=[])
+    def test_all_registered_senders(self, mock_get_ldaps):
+        self.assertEqual(get_message_counts(None, START_TIME, END_TIME), {})
+        mock_get_ldaps.assert_called_once()
+        self.mock_get_ldap_keys.assert_not_called()
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            get_message_counts(["ldap1"], END_TIME, START_TIME)
+        with self.assertRaises(ValueError):
+            get_message_counts(["ldap1"], START_TIME, END_TIME, group_by=["thread"])
+
+    def test_range_limits(self):
+        with self.assertRaises(ValueError):
+            get_message_counts(["ldap1"], datetime(2020, 1, 1), datetime(2024, 1, 1))
+        with self.assertRaises(ValueError):
+            get_message_counts(
+                ["ldap1"], datetime(2024, 1, 1), datetime(2024, 7, 1), group_by=["day"]
+            )
+        self.mock_get_ldap_keys.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
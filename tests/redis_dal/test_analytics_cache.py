@@ -0,0 +1,130 @@
+import unittest
+from datetime import datetime, timezone
+from unittest.mock import patch
+from redis_dal.analytics_cache import ActivityAnalyticsCache
+
+KEY_A = "spaces/space1:ldap:ldap1"
+KEY_B = "spaces/space1:ldap:ldap2"
+DAY = 24 * 60 * 60
+MONDAY_10AM = 1715594400.0  # 2024-05-13T10:00:00Z
+
+
+class FakeScores:
+    """Answers the scores script from an in-memory {key: [score]} mapping."""
+
+    def __init__(self, scores):
+        self.scores = scores
+        self.calls = []
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    """Queues script calls on a `FakeScores` and answers them on execute."""
+
+    def __init__(self, fake):
+        self.fake = fake
+        self.results = []
+
+    def evalsha(self, sha, numkeys, key, min_score, offset, count):
+        self.fake.calls.append((key, min_score, offset, count))
+        scores = sorted(self.fake.scores.get(key, []))
+        selected = [score for score in scores if score >= float(min_score)]
+        page = selected[offset : offset + count]
+        self.results.append([len(scores)] + [repr(score).encode() for score in page])
+
+    def execute(self):
+        return self.results
+
+
+class TestActivityAnalyticsCache(unittest.TestCase):
+    def setUp(self):
+        patcher = patch(
+            "redis_dal.redis_client_factory.RedisClientFactory.create_redis_client"
+        )
+        self.scores = FakeScores({
+            KEY_A: [MONDAY_10AM, MONDAY_10AM + DAY, MONDAY_10AM + 2 * DAY + 3600],
+            KEY_B: [MONDAY_10AM],
+        })
+        patcher.start().return_value = self.scores
+        self.addCleanup(patcher.stop)
+        for target, value in (
+            ("get_registered_space_ids", ["space1"]),
+            ("get_space_keys", {"space1": [KEY_A, KEY_B]}),
+        ):
+            patcher = patch(f"redis_dal.analytics_cache.{target}", return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.cache = ActivityAnalyticsCache()
+        self.cache.refresh()
+
+    def test_histograms(self):
+        hours = self.cache.get_hour_histogram("ldap1")
+        weekdays = self.cache.get_weekday_histogram()
+
+        self.assertEqual((hours[10], hours[11], sum(hours)), (2, 1, 3))
+        self.assertEqual(weekdays, [2, 1, 1, 0, 0, 0, 0])
+
+    def test_time_range(self):
+        hours = self.cache.get_hour_histogram(
+            start_time=datetime(2024, 5, 14),
+            end_time=datetime(2024, 5, 15, tzinfo=timezone.utc),
+        )
+
+        self.assertEqual(sum(hours), 1)
+
+    def test_streaks(self):
+        self.assertEqual(
+            self.cache.get_streaks("ldap1", now=MONDAY_10AM + 3 * DAY),
+            {"active_days": 3, "longest": 3, "current": 3},
+        )
+        self.assertEqual(
+            self.cache.get_streaks("ldap1", now=MONDAY_10AM + 5 * DAY)["current"], 0
+        )
+        self.assertEqual(self.cache.get_streaks("unknown")["active_days"], 0)
+
+    def test_percentiles(self):
+        self.assertEqual(
+            self.cache.get_count_percentiles((0, 50, 100)),
+            {
+                0: 1.0,
+                50: 2.0,
+                100: 3.0,
+            },
+        )
+        self.assertEqual(self.cache.get_member_percentile_rank("ldap1"), 50.0)
+        self.assertEqual(self.cache.get_member_percentile_rank("ldap2"), 0.0)
+
+    def test_refresh_is_incremental(self):
+        self.scores.scores[KEY_B].append(MONDAY_10AM)
+
+        result = self.cache.refresh()
+
+        self.assertEqual(result, {"added": 1, "reloaded": 0, "dropped": 0, "total": 5})
+
+    def test_refresh_reloads_keys_that_lost_members(self):
+        self.scores.scores[KEY_A].pop(0)
+        self.scores.scores[KEY_A].append(MONDAY_10AM + 3 * DAY)
+
+        result = self.cache.refresh()
+
+        self.assertEqual(result["reloaded"], 1)
+        self.assertEqual(result["total"], 4)
+        self.assertEqual(self.cache.get_member_summary("ldap1")["count"], 3)
+
+    def test_refresh_reads_pages(self):
+        self.scores.scores[KEY_B] = [MONDAY_10AM, MONDAY_10AM, MONDAY_10AM + 1]
+        cache = ActivityAnalyticsCache(page_size=2)
+        self.scores.calls.clear()
+
+        result = cache.refresh()
+
+        self.assertEqual(result["total"], 6)
+        self.assertEqual(cache.get_member_summary("ldap2")["count"], 3)
+        self.assertIn((KEY_B, repr(MONDAY_10AM), 2, 2), self.scores.calls)
+        self.assertTrue(all(count == 2 for *_, count in self.scores.calls))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,167 @@
+import collections
+import os
+import unittest
+from unittest.mock import patch
+from redis import Redis
+from redis.cache import CacheConfig
+from redis.connection import Connection
+from redis_dal.client_cache import HotKeyCacheRedis
+from redis_dal.redis_client_factory import RedisClientFactory
+from redis_dal.constants import HOST, PORT, CLIENT_CACHE_SIZE
+
+
+class ScriptedConnection(Connection):
+    """
+    A connection answering from an in-memory store instead of a socket.
+
+    It completes the handshake as a Redis 7.4 server, so redis-py wraps it in its real
+    client-side cache proxy, and it answers the replies of the commands it was sent in
+    order, like a socket would.
+    """
+
+    def __init__(self, store, **kwargs):
+        super().__init__(**{
+            key: value for key, value in kwargs.items() if not key.startswith("ssl")
+        })
+        self.store = store
+        self.pending = collections.deque()
+        self.multi = None
+
+    def connect(self):
+        self.handshake_metadata = {b"server": b"redis", b"version": b"7.4.0"}
+
+    def disconnect(self, *args):
+        self.pending.clear()
+
+    def can_read(self, timeout=0):
+        return False
+
+    def send_command(self, *args, **kwargs):
+        self.send_packed_command([args])
+
+    def pack_commands(self, commands):
+        return [tuple(args) for args in commands]
+
+    def send_packed_command(self, command, check_health=True):
+        self.store.commands.extend(args[0] for args in command)
+        self.pending.extend(command)
+
+    def read_response(self, disable_decoding=False, **kwargs):
+        command, *args = self.pending.popleft()
+        command = command.upper()
+        if command == "MULTI":
+            self.multi = []
+            return b"OK"
+        if command == "EXEC":
+            replies, self.multi = self.multi, None
+            return replies
+        reply = self.store.execute(command, *args)
+        if self.multi is not None:
+            self.multi.append(reply)
+            return b"QUEUED"
+        return reply
+
+
+class Store:
+    """The keys of a scripted Redis server, with the few commands the tests send."""
+
+    def __init__(self):
+        self.values = {}
+        self.commands = []
+
+    def execute(self, command, *args):
+        if command == "PING":
+            return b"PONG"
+        if command == "SET":
+            self.values[args[0]] = str(args[1]).encode()
+            return b"OK"
+        if command == "GET":
+            return self.values.get(args[0])
+        if command == "ZADD":
+            self.values.setdefault(args[0], {}).update({
+                args[i + 1].encode(): float(args[i]) for i in range(1, len(args), 2)
+            })
+            return len(args) // 2
+        if command == "ZREVRANGE":
+            members = self.values.get(args[0], {})
+            return sorted(members, key=members.get, reverse=True)
+        raise ValueError(f"Unsupported command {command}")
+
+
+class TestHotKeyCacheRedis(unittest.TestCase):
+    def setUp(self):
+        self.store = Store()
+        store = self.store
+
+        class StoreConnection(ScriptedConnection):
+            def __init__(self, **kwargs):
+                super().__init__(store, **kwargs)
+
+        patcher = patch("redis.client.SSLConnection", StoreConnection)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(setattr, RedisClientFactory, "_instance", None)
+        self.addCleanup(setattr, RedisClientFactory, "_redis_client", None)
+        RedisClientFactory._instance = None
+        RedisClientFactory._redis_client = None
+        environ = {HOST: "localhost", PORT: "6379", CLIENT_CACHE_SIZE: "100"}
+        with patch.dict(os.environ, environ):
+            self.client = RedisClientFactory().create_redis_client()
+        self.addCleanup(self.client.close)
+
+    def test_hot_keys_are_cached_and_counted(self):
+        self.client.set("watermarks:realtime", 1)
+
+        for _ in range(3):
+            self.assertEqual(self.client.get("watermarks:realtime"), b"1")
+
+        metrics = self.client.get_cache().get_metrics()
+        self.assertEqual((metrics["hits"], metrics["misses"]), (2, 1))
+        self.assertAlmostEqual(metrics["hit_rate"], 2 / 3)
+        self.assertEqual(self.store.commands.count("GET"), 1)
+
+    def test_other_keys_and_commands_are_not_cached(self):
+        self.client.set("messages:index", 1)
+        self.client.zadd("leaderboard:global", {"alice": 3})
+
+        for _ in range(2):
+            self.client.get("messages:index")
+            self.client.zrevrange("leaderboard:global", 0, -1)
+
+        self.assertEqual(self.client.get_cache().size, 0)
+        self.assertEqual(self.client.get_cache().get_metrics()["misses"], 0)
+        self.assertEqual(self.store.commands.count("GET"), 2)
+        self.assertEqual(self.store.commands.count("ZREVRANGE"), 2)
+
+    def test_pipeline_after_cached_read(self):
+        self.client.set("watermarks:realtime", 1)
+        self.client.get("watermarks:realtime")
+        self.client.get("watermarks:realtime")
+
+        for transaction in (False, True):
+            pipeline = self.client.pipeline(transaction=transaction)
+            pipeline.set("counter", 2)
+            pipeline.get("counter")
+            self.assertEqual(pipeline.execute(), [True, b"2"])
+        self.assertEqual(self.client.get_cache().get_metrics()["hits"], 1)
+
+    def test_cached_pool_desyncs_pipelines(self):
+        """Shows the redis-py behavior `HotKeyCacheRedis` works around."""
+        client = Redis(
+            host="localhost", ssl=True, protocol=3, cache_config=CacheConfig()
+        )
+        self.addCleanup(client.close)
+        client.set("watermarks:realtime", 1)
+        client.get("watermarks:realtime")
+        client.get("watermarks:realtime")
+
+        pipeline = client.pipeline(transaction=False)
+        pipeline.set("counter", 2)
+
+        # The SET is answered with the cached b"1" of the GET, which is not "OK".
+        self.assertEqual(pipeline.execute(), [False])
+        self.assertIsInstance(self.client, HotKeyCacheRedis)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,212 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timezone
+from unittest.mock import Mock, patch
+from redis_dal.cold_tier import (
+    _write_cold_file,
+    iter_cold_records,
+    query_messages,
+    tier_messages,
+)
+
+TEST_KEY = "spaces/space1:ldap:ldap1"
+TEST_NOW = 1715594400.0  # 2024-05-13T10:00:00Z
+OLD_SCORE = TEST_NOW - 100 * 24 * 60 * 60
+
+
+def make_member(number):
+    message = {"name": f"spaces/space1/messages/msg{number}", "text": "hi"}
+    return str({"message": message, "type": "create"}).encode()
+
+
+def make_row(number, create_time, space_id="space1", sender_ldap="ldap1"):
+    return {
+        "create_time": datetime.fromtimestamp(create_time, timezone.utc),
+        "space_id": space_id,
+        "sender_ldap": sender_ldap,
+        "message_id": f"spaces/{space_id}/messages/msg{number}",
+        "type": "create",
+        "message": f'{{"name": "spaces/{space_id}/messages/msg{number}"}}',
+    }
+
+
+class TestColdTier(unittest.TestCase):
+    def setUp(self):
+        patcher = patch(
+            "redis_dal.redis_client_factory.RedisClientFactory.create_redis_client"
+        )
+        self.mock_redis_client = Mock()
+        patcher.start().return_value = self.mock_redis_client
+        self.addCleanup(patcher.stop)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    @patch("redis_dal.cold_tier.iter_key_members")
+    @patch("redis_dal.cold_tier.get_space_keys")
+    @patch("redis_dal.cold_tier.get_registered_space_ids")
+    def test_tier_messages_writes_then_removes(
+        self, mock_space_ids, mock_space_keys, mock_members
+    ):
+        mock_space_ids.return_value = ["space1"]
+        mock_space_keys.return_value = {"space1": [TEST_KEY]}
+        members = [(make_member(1), OLD_SCORE), (make_member(2), OLD_SCORE + 1)]
+        mock_members.return_value = iter(members)
+        mock_remove = self.mock_redis_client.register_script.return_value
+        mock_pipeline = self.mock_redis_client.pipeline.return_value
+
+        result = tier_messages(90, now=TEST_NOW, directory=self.directory)
+
+        self.assertEqual(
+            result, {"keys_scanned": 1, "keys_tiered": 1, "tiered": 2, "files": 1}
+        )
+        self.assertEqual(mock_members.call_args[0][2], f"({TEST_NOW - 90 * 86400}")
+        mock_remove.assert_called_once_with(
+            keys=[TEST_KEY, "registry:spaces/space1:keys", "registry:ldap:ldap1:keys"],
+            args=[member for member, _ in members],
+            client=mock_pipeline,
+        )
+        mock_pipeline.hdel.assert_called_once_with(
+            "messages:index",
+            "spaces/space1/messages/msg1",
+            "spaces/space1/messages/msg2",
+        )
+        mock_pipeline.hincrby.assert_any_call("versions:queries", "spaces/space1", 1)
+        mock_pipeline.hincrby.assert_any_call("versions:queries", "global", 1)
+        self.assertEqual(len(os.listdir(self.directory)), 1)
+        records = list(iter_cold_records(directory=self.directory))
+        self.assertEqual(
+            [record["create_time"] for record in records],
+            [
+                OLD_SCORE,
+                OLD_SCORE + 1,
+            ],
+        )
+
+    def test_tier_messages_invalid_age(self):
+        with self.assertRaises(ValueError):
+            tier_messages(0, directory=self.directory)
+
+    def test_iter_cold_records_filters(self):
+        _write_cold_file(
+            os.path.join(self.directory, "messages.parquet"),
+            [
+                make_row(1, OLD_SCORE),
+                make_row(2, OLD_SCORE + 10),
+                make_row(3, OLD_SCORE, sender_ldap="ldap2"),
+            ],
+        )
+
+        records = list(
+            iter_cold_records(
+                sender_ldap="ldap1",
+                start_time=datetime.fromtimestamp(OLD_SCORE + 5, timezone.utc),
+                directory=self.directory,
+            )
+        )
+
+        self.assertEqual(
+            [record["message"]["name"] for record in records],
+            ["spaces/space1/messages/msg2"],
+        )
+
+    def test_iter_cold_records_without_directory(self):
+        missing = os.path.join(self.directory, "missing")
+        self.assertEqual(list(iter_cold_records(directory=missing)), [])
+
+    @patch("redis_dal.cold_tier.get_export_keys", return_value=[TEST_KEY])
+    @patch("redis_dal.cold_tier.iter_key_records")
+    def test_query_messages_merges_tiers(self, mock_hot, _):
+        _write_cold_file(
+            os.path.join(self.directory, "messages.parquet"),
+            [make_row(1, OLD_SCORE), make_row(2, OLD_SCORE + 10)],
+        )
+        hot_record = {
+            "space_id": "space1",
+            "sender_ldap": "ldap1",
+            "create_time": OLD_SCORE + 10,
+            "type": "create",
+            "message": {"name": "spaces/space1/messages/msg2", "text": "restored"},
+        }
+        mock_hot.return_value = iter([hot_record])
+        self.mock_redis_client.hmget.return_value = [None, b"{}"]
+
+        records, next_cursor = query_messages("space1", directory=self.directory)
+
+        self.assertEqual(len(records), 2)
+        self.assertEqual(records[0]["message"]["name"], "spaces/space1/messages/msg1")
+        self.assertEqual(records[1], hot_record)
+        self.assertIsNone(next_cursor)
+
+    @patch("redis_dal.cold_tier.get_export_keys", return_value=[TEST_KEY])
+    @patch("redis_dal.cold_tier.iter_key_records")
+    def test_query_messages_drops_cold_records_in_redis_outside_the_page(
+        self, mock_hot, _
+    ):
+        _write_cold_file(
+            os.path.join(self.directory, "messages.parquet"),
+            [make_row(number, OLD_SCORE + number) for number in range(3)],
+        )
+        hot_records = [
+            {
+                "space_id": "space1",
+                "sender_ldap": "ldap1",
+                "create_time": OLD_SCORE + number,
+                "type": "create",
+                "message": {"name": f"spaces/space1/messages/msg{number}"},
+            }
+            for number in (10, 11)
+        ]
+        mock_hot.return_value = iter(hot_records)
+        self.mock_redis_client.hmget.return_value = [b"{}", None, None]
+
+        records, next_cursor = query_messages(
+            "space1", directory=self.directory, limit=2
+        )
+
+        self.mock_redis_client.hmget.assert_called_once_with(
+            "messages:index",
+            [f"spaces/space1/messages/msg{number}" for number in range(3)],
+        )
+        self.assertEqual(
+            [record["message"]["name"] for record in records],
+            ["spaces/space1/messages/msg1", "spaces/space1/messages/msg2"],
+        )
+        self.assertIsNotNone(next_cursor)
+
+    @patch("redis_dal.cold_tier.get_export_keys", return_value=[TEST_KEY])
+    @patch("redis_dal.cold_tier.iter_key_records")
+    def test_query_messages_pages_with_cursor(self, mock_hot, _):
+        _write_cold_file(
+            os.path.join(self.directory, "messages.parquet"),
+            [make_row(number, OLD_SCORE + number // 2) for number in range(5)],
+        )
+        mock_hot.side_effect = lambda *args: iter([])
+        self.mock_redis_client.hmget.side_effect = lambda key, names: (
+            [None] * len(names)
+        )
+
+        names = []
+        cursor = None
+        while True:
+            records, cursor = query_messages(
+                "space1", directory=self.directory, limit=2, cursor=cursor
+            )
+            names.extend(record["message"]["name"] for record in records)
+            if cursor is None:
+                break
+
+        self.assertEqual(
+            names, [f"spaces/space1/messages/msg{number}" for number in range(5)]
+        )
+
+    def test_query_messages_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            query_messages("space1", limit=0)
+        with self.assertRaises(ValueError):
+            query_messages("space1", cursor="invalid")
+
+
+if __name__ == "__main__":
+    unittest.main()
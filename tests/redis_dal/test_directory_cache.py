@@ -0,0 +1,33 @@
+import unittest
+from unittest.mock import Mock, patch
+from redis_dal.directory_cache import load_directory_people, save_directory_people
+from redis_dal.constants import DIRECTORY_PEOPLE_KEY
+
+
+class TestDirectoryCache(unittest.TestCase):
+    def setUp(self):
+        patcher = patch(
+            "redis_dal.redis_client_factory.RedisClientFactory.create_redis_client"
+        )
+        self.mock_redis_client = Mock()
+        patcher.start().return_value = self.mock_redis_client
+        self.addCleanup(patcher.stop)
+
+    def test_save_directory_people_replaces_cache(self):
+        save_directory_people({"id1": "ldap1"})
+
+        mock_pipeline = self.mock_redis_client.pipeline.return_value
+        mock_pipeline.delete.assert_called_once_with(DIRECTORY_PEOPLE_KEY)
+        mock_pipeline.hset.assert_called_once_with(
+            DIRECTORY_PEOPLE_KEY, mapping={"id1": "ldap1"}
+        )
+        mock_pipeline.execute.assert_called_once()
+
+    def test_load_directory_people(self):
+        self.mock_redis_client.hgetall.return_value = {b"id1": b"ldap1"}
+
+        self.assertEqual(load_directory_people(), {"id1": "ldap1"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+from unittest.mock import Mock, call, patch
+from redis_dal.key_registry import (
+    get_ldap_keys,
+    get_registered_space_ids,
+    get_space_keys,
+    parse_message_key,
+    queue_register_key,
+    rebuild_key_registry,
+)
+from redis_dal.constants import (
+    REGISTRY_SPACES_KEY,
+    REGISTRY_LDAPS_KEY,
+    REGISTRY_SPACE_KEYS_FORMAT,
+    REGISTRY_LDAP_KEYS_FORMAT,
+)
+
+TEST_KEY = "spaces/space1:ldap:ldap1"
+
+
+class TestKeyRegistry(unittest.TestCase):
+    def setUp(self):
+        patcher = patch(
+            "redis_dal.redis_client_factory.RedisClientFactory.create_redis_client"
+        )
+        self.mock_redis_client = Mock()
+        patcher.start().return_value = self.mock_redis_client
+        self.addCleanup(patcher.stop)
+        self.mock_pipeline = self.mock_redis_client.pipeline.return_value
+
+    def test_parse_message_key(self):
+        self.assertEqual(parse_message_key(TEST_KEY.encode()), ("space1", "ldap1"))
+
+    def test_queue_register_key(self):
+        pipeline = Mock()
+
+        queue_register_key(pipeline, "space1", "ldap1", TEST_KEY)
+
+        pipeline.sadd.assert_has_calls([
+            call(REGISTRY_SPACES_KEY, "space1"),
+            call(REGISTRY_LDAPS_KEY, "ldap1"),
+            call(REGISTRY_SPACE_KEYS_FORMAT.format(space_id="space1"), TEST_KEY),
+            call(REGISTRY_LDAP_KEYS_FORMAT.format(sender_ldap="ldap1"), TEST_KEY),
+        ])
+
+    def test_get_registered_space_ids(self):
+        self.mock_redis_client.smembers.return_value = {b"space2", b"space1"}
+
+        self.assertEqual(get_registered_space_ids(), ["space1", "space2"])
+
+    def test_get_space_and_ldap_keys_read_in_one_pipeline(self):
+        self.mock_pipeline.execute.return_value = [{TEST_KEY.encode()}, set()]
+
+        result = get_space_keys(["space1", "space2"])
+
+        self.assertEqual(result, {"space1": [TEST_KEY], "space2": []})
+        self.mock_pipeline.smembers.assert_has_calls([
+            call(REGISTRY_SPACE_KEYS_FORMAT.format(space_id="space1")),
+            call(REGISTRY_SPACE_KEYS_FORMAT.format(space_id="space2")),
+        ])
+
+        self.mock_pipeline.execute.return_value = [{TEST_KEY.encode()}]
+        self.assertEqual(get_ldap_keys(["ldap1"]), {"ldap1": [TEST_KEY]})
+
+    def test_rebuild_key_registry(self):
+        self.mock_redis_client.scan_iter.return_value = iter([TEST_KEY.encode()])
+
+        self.assertEqual(rebuild_key_registry(), 1)
+
+        self.mock_pipeline.sadd.assert_any_call(
+            REGISTRY_SPACE_KEYS_FORMAT.format(space_id="space1"), TEST_KEY
+        )
+        self.mock_pipeline.execute.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
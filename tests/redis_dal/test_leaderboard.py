@@ -0,0 +1,90 @@
+import unittest
+from unittest.mock import Mock, patch
+from redis_dal.leaderboard import (
+    _DECREMENT_SCRIPT,
+    _INCREMENT_SCRIPT,
+    get_leaderboard_key,
+    get_period_bucket,
+    get_top_senders,
+    queue_decrement_leaderboards,
+    queue_increment_leaderboards,
+)
+
+TEST_TIMESTAMP = 1715594400.0  # 2024-05-13T10:00:00Z
+TEST_KEY = "spaces/space1:ldap:ldap1"
+EXPECTED_LEADERBOARD_KEYS = [
+    "leaderboard:spaces/space1",
+    "leaderboard:spaces/space1:day:2024-05-13",
+    "leaderboard:spaces/space1:week:2024-W20",
+    "leaderboard:spaces/space1:month:2024-05",
+    "leaderboard:global",
+    "leaderboard:global:day:2024-05-13",
+    "leaderboard:global:week:2024-W20",
+    "leaderboard:global:month:2024-05",
+]
+
+
+class TestLeaderboard(unittest.TestCase):
+    def test_get_period_bucket(self):
+        self.assertEqual(get_period_bucket("day", TEST_TIMESTAMP), "2024-05-13")
+        self.assertEqual(get_period_bucket("week", TEST_TIMESTAMP), "2024-W20")
+        self.assertEqual(get_period_bucket("month", TEST_TIMESTAMP), "2024-05")
+        with self.assertRaises(ValueError):
+            get_period_bucket("year", TEST_TIMESTAMP)
+
+    def test_get_leaderboard_key(self):
+        self.assertEqual(get_leaderboard_key(), "leaderboard:global")
+        self.assertEqual(
+            get_leaderboard_key("space1", "day", TEST_TIMESTAMP),
+            "leaderboard:spaces/space1:day:2024-05-13",
+        )
+
+    def test_queue_increment_leaderboards(self):
+        pipeline = Mock()
+
+        queue_increment_leaderboards(
+            pipeline, TEST_KEY, b"member", "space1", "ldap1", TEST_TIMESTAMP
+        )
+
+        pipeline.evalsha.assert_called_once_with(
+            _INCREMENT_SCRIPT.sha,
+            len(EXPECTED_LEADERBOARD_KEYS) + 1,
+            TEST_KEY,
+            *EXPECTED_LEADERBOARD_KEYS,
+            b"member",
+            "ldap1",
+        )
+        pipeline.register_script.assert_not_called()
+
+    def test_queue_decrement_leaderboards(self):
+        pipeline = Mock()
+
+        queue_decrement_leaderboards(
+            pipeline, TEST_KEY, b"member", "space1", "ldap1", TEST_TIMESTAMP
+        )
+
+        pipeline.evalsha.assert_called_once_with(
+            _DECREMENT_SCRIPT.sha,
+            len(EXPECTED_LEADERBOARD_KEYS) + 1,
+            TEST_KEY,
+            *EXPECTED_LEADERBOARD_KEYS,
+            b"member",
+            "ldap1",
+        )
+        pipeline.register_script.assert_not_called()
+
+    @patch("redis_dal.redis_client_factory.RedisClientFactory.create_redis_client")
+    def test_get_top_senders(self, mock_create_redis_client):
+        mock_redis_client = mock_create_redis_client.return_value
+        mock_redis_client.zrevrange.return_value = [(b"ldap1", 5.0), (b"ldap2", 2.0)]
+
+        result = get_top_senders(2, "space1", "month", TEST_TIMESTAMP)
+
+        self.assertEqual(result, [("ldap1", 5), ("ldap2", 2)])
+        mock_redis_client.zrevrange.assert_called_once_with(
+            "leaderboard:spaces/space1:month:2024-05", 0, 1, withscores=True
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
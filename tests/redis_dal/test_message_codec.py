@@ -0,0 +1,50 @@
+import base64
+import os
+import unittest
+from redis_dal.benchmark_compression import benchmark, build_payloads
+from redis_dal.constants import COMPRESSED_MEMBER_PREFIX
+from redis_dal.message_codec import decode_member, encode_member, is_compressed_member
+
+SMALL_MEMBER = str({"message": {"text": "hi"}, "type": "create"})
+LARGE_MEMBER = str({"message": {"text": "lorem ipsum " * 500}, "type": "create"})
+
+
+class TestMessageCodec(unittest.TestCase):
+    def test_small_member_is_stored_plain(self):
+        encoded = encode_member(SMALL_MEMBER)
+
+        self.assertEqual(encoded, SMALL_MEMBER.encode("utf-8"))
+        self.assertFalse(is_compressed_member(encoded))
+        self.assertEqual(decode_member(encoded), SMALL_MEMBER)
+
+    def test_large_member_is_compressed(self):
+        encoded = encode_member(LARGE_MEMBER)
+
+        self.assertTrue(encoded.startswith(COMPRESSED_MEMBER_PREFIX))
+        self.assertLess(len(encoded), len(LARGE_MEMBER) / 10)
+        self.assertEqual(decode_member(encoded), LARGE_MEMBER)
+
+    def test_incompressible_member_is_stored_plain(self):
+        member = base64.b64encode(os.urandom(30)).decode()
+
+        encoded = encode_member(member, threshold=10)
+
+        self.assertEqual(encoded, member.encode("utf-8"))
+        self.assertEqual(decode_member(encoded), member)
+
+    def test_decode_accepts_str(self):
+        self.assertEqual(decode_member(SMALL_MEMBER), SMALL_MEMBER)
+
+    def test_benchmark_reports_ratio_and_cpu(self):
+        payloads = build_payloads(50)
+
+        result = benchmark(payloads["long text"], threshold=1024, level=6)
+
+        self.assertEqual(result["count"], len(payloads["long text"]))
+        self.assertEqual(result["compressed_count"], result["count"])
+        self.assertGreater(result["ratio"], 1)
+        self.assertGreaterEqual(result["encode_us"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
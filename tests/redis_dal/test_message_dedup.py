@@ -0,0 +1,80 @@
+import unittest
+from unittest.mock import Mock, patch
+from redis_dal.message_dedup import MessageDeduplicator
+from redis_dal.constants import DEDUP_KEY_FORMAT
+
+TEST_EVENT_KEY = "create:spaces/space1/messages/msg1"
+TEST_WINDOW_SECONDS = 60
+
+
+class TestMessageDeduplicator(unittest.TestCase):
+    def setUp(self):
+        patcher = patch(
+            "redis_dal.redis_client_factory.RedisClientFactory.create_redis_client"
+        )
+        self.mock_create_redis_client = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.mock_redis_client = Mock()
+        self.mock_create_redis_client.return_value = self.mock_redis_client
+
+    def test_first_event_is_not_marked(self):
+        self.mock_redis_client.exists.return_value = 0
+        deduplicator = MessageDeduplicator()
+
+        self.assertFalse(deduplicator.is_duplicate(TEST_EVENT_KEY))
+        self.assertFalse(deduplicator.is_duplicate(TEST_EVENT_KEY))
+
+        self.mock_redis_client.exists.assert_called_with(
+            DEDUP_KEY_FORMAT.format(event_key=TEST_EVENT_KEY)
+        )
+        self.mock_redis_client.set.assert_not_called()
+        self.assertEqual(deduplicator.get_metrics()["misses"], 2)
+
+    def test_queue_mark_seen(self):
+        pipeline = Mock()
+        deduplicator = MessageDeduplicator(window_seconds=TEST_WINDOW_SECONDS)
+
+        deduplicator.queue_mark_seen(pipeline, [TEST_EVENT_KEY])
+
+        pipeline.set.assert_called_once_with(
+            DEDUP_KEY_FORMAT.format(event_key=TEST_EVENT_KEY),
+            1,
+            ex=TEST_WINDOW_SECONDS,
+        )
+
+    def test_local_hit_after_commit_skips_redis(self):
+        self.mock_redis_client.exists.return_value = 0
+        deduplicator = MessageDeduplicator()
+
+        deduplicator.is_duplicate(TEST_EVENT_KEY)
+        deduplicator.remember([TEST_EVENT_KEY])
+        self.assertTrue(deduplicator.is_duplicate(TEST_EVENT_KEY))
+
+        self.mock_redis_client.exists.assert_called_once()
+        metrics = deduplicator.get_metrics()
+        self.assertEqual(metrics["local_hits"], 1)
+        self.assertEqual(metrics["hit_rate"], 0.5)
+
+    def test_redis_hit(self):
+        self.mock_redis_client.exists.return_value = 1
+        deduplicator = MessageDeduplicator()
+
+        self.assertTrue(deduplicator.is_duplicate(TEST_EVENT_KEY))
+        self.assertTrue(deduplicator.is_duplicate(TEST_EVENT_KEY))
+
+        self.mock_redis_client.exists.assert_called_once()
+        self.assertEqual(deduplicator.get_metrics()["redis_hits"], 1)
+
+    def test_lru_is_bounded(self):
+        self.mock_redis_client.exists.return_value = 0
+        deduplicator = MessageDeduplicator(lru_size=1)
+
+        deduplicator.remember(["key1", "key2"])
+        self.assertTrue(deduplicator.is_duplicate("key2"))
+        self.assertFalse(deduplicator.is_duplicate("key1"))
+
+        self.mock_redis_client.exists.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import gzip
+import json
+import unittest
+from unittest.mock import Mock, patch
+from redis_dal.message_export import (
+    get_export_keys,
+    iter_export_records,
+    iter_key_members,
+    iter_ndjson,
+)
+from redis_dal.message_codec import encode_member
+
+TEST_KEY = "spaces/space1:ldap:ldap1"
+TEST_MESSAGE = {"name": "spaces/space1/messages/msg1", "text": "Hello"}
+
+
+class TestMessageExport(unittest.TestCase):
+    def setUp(self):
+        patcher = patch(
+            "redis_dal.redis_client_factory.RedisClientFactory.create_redis_client"
+        )
+        self.mock_redis_client = Mock()
+        patcher.start().return_value = self.mock_redis_client
+        self.addCleanup(patcher.stop)
+
+    @patch("redis_dal.message_export.get_ldap_keys")
+    @patch("redis_dal.message_export.get_space_keys")
+    def test_get_export_keys(self, mock_get_space_keys, mock_get_ldap_keys):
+        mock_get_space_keys.return_value = {"space1": [TEST_KEY]}
+        mock_get_ldap_keys.return_value = {"ldap1": [TEST_KEY]}
+
+        self.assertEqual(get_export_keys("space1", "ldap1"), [TEST_KEY])
+        self.assertEqual(get_export_keys(space_id="space1"), [TEST_KEY])
+        self.assertEqual(get_export_keys(sender_ldap="ldap1"), [TEST_KEY])
+        with self.assertRaises(ValueError):
+            get_export_keys()
+
+    def test_iter_key_members_pages_with_score_cursor(self):
+        self.mock_redis_client.zrange.side_effect = [
+            [(b"a", 1.0), (b"b", 2.0)],
+            [(b"c", 2.0), (b"d", 2.0)],
+            [(b"e", 3.0)],
+        ]
+
+        members = list(iter_key_members(TEST_KEY, batch_size=2))
+
+        self.assertEqual(
+            [member for member, _ in members], [b"a", b"b", b"c", b"d", b"e"]
+        )
+        cursors = [
+            (call_args[0][1], call_args[1]["offset"])
+            for call_args in self.mock_redis_client.zrange.call_args_list
+        ]
+        self.assertEqual(cursors, [("-inf", 0), (2.0, 1), (2.0, 3)])
+
+    @patch("redis_dal.message_export.get_export_keys", return_value=[TEST_KEY])
+    def test_iter_export_records_decodes_members(self, _):
+        member = encode_member(str({"message": TEST_MESSAGE, "type": "create"}))
+        self.mock_redis_client.zrange.return_value = [(member, 10.0)]
+
+        records = list(iter_export_records(space_id="space1"))
+
+        self.assertEqual(
+            records,
+            [
+                {
+                    "space_id": "space1",
+                    "sender_ldap": "ldap1",
+                    "create_time": 10.0,
+                    "type": "create",
+                    "message": TEST_MESSAGE,
+                }
+            ],
+        )
+
+    def test_iter_ndjson_chunks_and_gzip(self):
+        records = [{"n": n} for n in range(5)]
+
+        chunks = list(iter_ndjson(iter(records), batch_size=2))
+        self.assertEqual(len(chunks), 3)
+        lines = b"".join(chunks).decode().splitlines()
+        self.assertEqual([json.loads(line) for line in lines], records)
+
+        compressed = b"".join(iter_ndjson(iter(records), batch_size=2, compress=True))
+        self.assertEqual(gzip.decompress(compressed), b"".join(chunks))
+
+
+if __name__ == "__main__":
+    unittest.main()
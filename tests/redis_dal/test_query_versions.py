@@ -0,0 +1,48 @@
+import unittest
+from unittest.mock import Mock, call, patch
+from redis_dal.query_versions import (
+    get_version_scopes,
+    get_versions,
+    queue_bump_global_version,
+    queue_bump_versions,
+)
+from redis_dal.constants import QUERY_VERSIONS_KEY
+
+
+class TestQueryVersions(unittest.TestCase):
+    def test_get_version_scopes(self):
+        self.assertEqual(get_version_scopes(), ["global"])
+        self.assertEqual(
+            get_version_scopes("space1", ["ldap2", "ldap1"]),
+            ["spaces/space1", "ldap:ldap1", "ldap:ldap2"],
+        )
+
+    def test_queue_bump_versions(self):
+        pipeline = Mock()
+
+        queue_bump_versions(pipeline, "space1", "ldap1")
+
+        self.assertEqual(
+            pipeline.hincrby.call_args_list,
+            [
+                call(QUERY_VERSIONS_KEY, "spaces/space1", 1),
+                call(QUERY_VERSIONS_KEY, "ldap:ldap1", 1),
+            ],
+        )
+
+    def test_queue_bump_global_version(self):
+        pipeline = Mock()
+
+        queue_bump_global_version(pipeline)
+
+        pipeline.hincrby.assert_called_once_with(QUERY_VERSIONS_KEY, "global", 1)
+
+    @patch("redis_dal.redis_client_factory.RedisClientFactory.create_redis_client")
+    def test_get_versions(self, mock_create_redis_client):
+        mock_create_redis_client.return_value.hmget.return_value = [b"3", None]
+
+        self.assertEqual(get_versions(["global", "ldap:ldap1"]), (3, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,6 @@
 import unittest
 from unittest.mock import patch
+from redis.exceptions import ConnectionError
 import os
 from redis_dal.redis_client_factory import RedisClientFactory
 from redis_dal.constants import (
@@ -8,6 +9,8 @@ from redis_dal.constants import (
     HOST,
     PASSWORD,
     PORT,
+    CLIENT_CACHE_SIZE,
+    CLIENT_CACHE_METRICS_NAME,
 )
 from io import StringIO
 import logging
@@ -31,6 +34,7 @@ class TestRedisClientFactory(unittest.TestCase):
         os.environ.pop(HOST, None)
         os.environ.pop(PORT, None)
         os.environ.pop(PASSWORD, None)
+        os.environ.pop(CLIENT_CACHE_SIZE, None)
         RedisClientFactory._instance = None
         RedisClientFactory._redis_client = None
 
@@ -54,6 +58,51 @@ class TestRedisClientFactory(unittest.TestCase):
 
         self.assertIsNotNone(client)
 
+    @patch("redis_dal.redis_client_factory.track_cache")
+    @patch("redis_dal.redis_client_factory.HotKeyCacheRedis")
+    @patch("redis_dal.redis_client_factory.Redis")
+    def test_create_redis_client_with_client_cache(
+        self, mock_redis, mock_cached_redis, mock_track_cache
+    ):
+        os.environ[HOST] = TEST_HOST
+        os.environ[PORT] = TEST_PORT
+        os.environ[CLIENT_CACHE_SIZE] = "100"
+
+        factory = RedisClientFactory()
+        client = factory.create_redis_client()
+
+        self.assertIs(client, mock_cached_redis.return_value)
+        self.assertNotIn("cache_config", mock_redis.call_args.kwargs)
+        kwargs = mock_cached_redis.call_args.kwargs
+        self.assertIs(kwargs["pipeline_client"], mock_redis.return_value)
+        self.assertEqual(kwargs["protocol"], 3)
+        self.assertEqual(kwargs["cache_config"].get_max_size(), 100)
+        client.ping.assert_called_once()
+        mock_track_cache.assert_called_once_with(
+            CLIENT_CACHE_METRICS_NAME, client.get_cache.return_value
+        )
+
+    @patch("redis_dal.redis_client_factory.track_cache")
+    @patch("redis_dal.redis_client_factory.HotKeyCacheRedis")
+    @patch("redis_dal.redis_client_factory.Redis")
+    def test_create_redis_client_client_cache_unsupported(
+        self, mock_redis, mock_cached_redis, mock_track_cache
+    ):
+        os.environ[HOST] = TEST_HOST
+        os.environ[PORT] = TEST_PORT
+        os.environ[CLIENT_CACHE_SIZE] = "100"
+        cached_client = mock_cached_redis.return_value
+        cached_client.ping.side_effect = ConnectionError("Redis 7.4 or later")
+
+        factory = RedisClientFactory()
+        client = factory.create_redis_client()
+
+        self.assertIs(client, mock_redis.return_value)
+        self.assertNotIn("cache_config", mock_redis.call_args.kwargs)
+        cached_client.close.assert_called_once()
+        mock_track_cache.assert_not_called()
+        self.assertIn("Redis 7.4 or later", self.log_capture_string.getvalue())
+
     def test_create_redis_client_missing_host(self):
         os.environ[PASSWORD] = TEST_PASSWORD
         factory = RedisClientFactory()
@@ -1,14 +1,29 @@
 import unittest
-from unittest.mock import patch, Mock
+from unittest.mock import patch, Mock, ANY
 from redis_dal.constants import (
     REDIS_KEY_FORMAT,
     REDIS_MESSAGE_STORED_DEBUG_MSG,
+    REDIS_MESSAGE_INDEX_KEY,
+    MESSAGE_TYPE_DELETE,
+    REGISTRY_SPACE_KEYS_FORMAT,
+    TOMBSTONE_KEY_FORMAT,
+    DEFAULT_TOMBSTONE_SECONDS,
+    QUERY_VERSIONS_KEY,
+    VERSION_GLOBAL_SCOPE,
 )
 from io import StringIO
 import logging
 from tools.log.logger import setup_logger
-from redis_dal.redis_utils import store_messages
+from redis_dal.redis_utils import store_messages, store_messages_batch
+from redis_dal.message_codec import (
+    decode_member,
+    encode_member,
+    get_member_digest,
+    is_compressed_member,
+)
 from datetime import datetime
+from prometheus_client import REGISTRY
+import json
 
 
 class TestStoreMessages(unittest.TestCase):
@@ -42,9 +57,18 @@ class TestStoreMessages(unittest.TestCase):
         space_id = message["space"]["name"].split("/")[1]
         redis_key = REDIS_KEY_FORMAT.format(space_id=space_id, sender_ldap=sender_ldap)
         score = datetime.fromisoformat(message["createTime"]).timestamp()
-        redis_member = str({"message": message, "type": message_type})
+        redis_member = str({"message": message, "type": message_type}).encode()
 
-        mock_redis_client.zadd.assert_called_once_with(redis_key, {redis_member: score})
+        mock_pipeline = mock_redis_client.pipeline.return_value
+        mock_pipeline.zadd.assert_called_once_with(redis_key, {redis_member: score})
+        mock_pipeline.sadd.assert_any_call(
+            REGISTRY_SPACE_KEYS_FORMAT.format(space_id=space_id), redis_key
+        )
+        mock_pipeline.hset.assert_not_called()
+        mock_pipeline.hincrby.assert_any_call(
+            QUERY_VERSIONS_KEY, VERSION_GLOBAL_SCOPE, 1
+        )
+        mock_pipeline.execute.assert_called_once()
 
         log_output = self.log_capture_string.getvalue()
         self.assertIn(
@@ -60,6 +84,208 @@ class TestStoreMessages(unittest.TestCase):
         with self.assertRaises(ValueError):
             store_messages(sender_ldap, message, message_type)
 
+    @patch("redis_dal.redis_client_factory.RedisClientFactory.create_redis_client")
+    def test_store_messages_batch_create_then_delete(self, mock_create_redis_client):
+        mock_redis_client = Mock()
+        mock_create_redis_client.return_value = mock_redis_client
+        mock_redis_client.hmget.return_value = [None, None]
+        mock_redis_client.mget.return_value = [None]
+        mock_pipeline = mock_redis_client.pipeline.return_value
+
+        message_name = "spaces/space1/messages/msg1"
+        message = {
+            "name": message_name,
+            "createTime": "2023-10-27T10:00:00Z",
+            "space": {"name": "spaces/space1"},
+        }
+        unknown_message = {"name": "spaces/space1/messages/unknown"}
+        stored_before = REGISTRY.get_sample_value("purrf_messages_stored_total")
+
+        committed = store_messages_batch([
+            ("test_user", message, "create"),
+            (None, {"name": message_name}, MESSAGE_TYPE_DELETE),
+            (None, unknown_message, MESSAGE_TYPE_DELETE),
+        ])
+
+        self.assertEqual(committed, 3)
+        global_bumps = [
+            c
+            for c in mock_pipeline.hincrby.call_args_list
+            if c.args == (QUERY_VERSIONS_KEY, VERSION_GLOBAL_SCOPE, 1)
+        ]
+        self.assertEqual(len(global_bumps), 1)
+        mock_redis_client.hmget.assert_called_once_with(
+            REDIS_MESSAGE_INDEX_KEY, [message_name, unknown_message["name"]]
+        )
+        mock_redis_client.mget.assert_called_once_with([
+            TOMBSTONE_KEY_FORMAT.format(message_name=message_name)
+        ])
+        mock_pipeline.set.assert_called_once_with(
+            TOMBSTONE_KEY_FORMAT.format(message_name=unknown_message["name"]),
+            1,
+            ex=DEFAULT_TOMBSTONE_SECONDS,
+        )
+        redis_key = REDIS_KEY_FORMAT.format(space_id="space1", sender_ldap="test_user")
+        score = datetime.fromisoformat(message["createTime"]).timestamp()
+        member = str({"message": message, "type": "create"}).encode()
+        mock_pipeline.hset.assert_called_once_with(
+            REDIS_MESSAGE_INDEX_KEY,
+            message_name,
+            json.dumps(["space1", "test_user", score, get_member_digest(member)]),
+        )
+        mock_pipeline.zrem.assert_called_once_with(redis_key, member)
+        mock_pipeline.zrangebyscore.assert_not_called()
+        mock_pipeline.hdel.assert_called_once_with(
+            REDIS_MESSAGE_INDEX_KEY, message_name
+        )
+        mock_pipeline.execute.assert_called_once()
+        self.assertEqual(
+            REGISTRY.get_sample_value("purrf_messages_stored_total"), stored_before + 3
+        )
+
+    @patch("redis_dal.redis_client_factory.RedisClientFactory.create_redis_client")
+    def test_store_messages_batch_skips_tombstoned_create(
+        self, mock_create_redis_client
+    ):
+        mock_redis_client = Mock()
+        mock_create_redis_client.return_value = mock_redis_client
+        mock_redis_client.mget.return_value = [b"1", None]
+        mock_pipeline = mock_redis_client.pipeline.return_value
+        deleted = {
+            "name": "spaces/space1/messages/deleted",
+            "createTime": "2023-10-27T10:00:00Z",
+            "space": {"name": "spaces/space1"},
+        }
+        kept = dict(deleted, name="spaces/space1/messages/kept")
+
+        committed = store_messages_batch([
+            ("test_user", deleted, "create"),
+            ("test_user", kept, "create"),
+        ])
+
+        self.assertEqual(committed, 1)
+        mock_redis_client.hmget.assert_not_called()
+        mock_pipeline.zadd.assert_called_once()
+        mock_pipeline.hset.assert_called_once_with(
+            REDIS_MESSAGE_INDEX_KEY, kept["name"], ANY
+        )
+
+    @patch("redis_dal.redis_client_factory.RedisClientFactory.create_redis_client")
+    def test_store_messages_batch_delete_then_create(self, mock_create_redis_client):
+        mock_redis_client = Mock()
+        mock_create_redis_client.return_value = mock_redis_client
+        mock_redis_client.hmget.return_value = [None]
+        mock_redis_client.mget.return_value = [None]
+        mock_pipeline = mock_redis_client.pipeline.return_value
+        message = {
+            "name": "spaces/space1/messages/msg1",
+            "createTime": "2023-10-27T10:00:00Z",
+            "space": {"name": "spaces/space1"},
+        }
+
+        committed = store_messages_batch([
+            (None, {"name": message["name"]}, MESSAGE_TYPE_DELETE),
+            ("test_user", message, "create"),
+        ])
+
+        self.assertEqual(committed, 1)
+        mock_pipeline.set.assert_called_once()
+        mock_pipeline.zadd.assert_not_called()
+        mock_pipeline.hset.assert_not_called()
+
+    @patch("redis_dal.redis_client_factory.RedisClientFactory.create_redis_client")
+    def test_store_messages_batch_delete_indexed(self, mock_create_redis_client):
+        mock_redis_client = Mock()
+        mock_create_redis_client.return_value = mock_redis_client
+        member = encode_member(str({"message": {"name": "m1"}, "type": "create"}))
+        same_second = encode_member(str({"message": {"name": "m2"}, "type": "create"}))
+        mock_redis_client.hmget.return_value = [
+            json.dumps(["space1", "user", 12.5, get_member_digest(member)])
+        ]
+        mock_pipeline = mock_redis_client.pipeline.return_value
+        mock_pipeline.execute.side_effect = [[[same_second, member]], []]
+        redis_key = REDIS_KEY_FORMAT.format(space_id="space1", sender_ldap="user")
+
+        committed = store_messages_batch([(None, {"name": "m1"}, MESSAGE_TYPE_DELETE)])
+
+        self.assertEqual(committed, 1)
+        mock_pipeline.zrangebyscore.assert_called_once_with(redis_key, 12.5, 12.5)
+        mock_pipeline.zrem.assert_called_once_with(redis_key, member)
+        mock_pipeline.zadd.assert_not_called()
+
+    @patch("redis_dal.redis_client_factory.RedisClientFactory.create_redis_client")
+    def test_store_messages_batch_queue_commands(self, mock_create_redis_client):
+        mock_pipeline = mock_create_redis_client.return_value.pipeline.return_value
+        queue_commands = Mock(
+            side_effect=lambda pipeline: mock_pipeline.execute.assert_not_called()
+        )
+        message = {
+            "createTime": "2023-10-27T10:00:00Z",
+            "space": {"name": "spaces/space1"},
+        }
+
+        store_messages_batch(
+            [("test_user", message, "create")], queue_commands=queue_commands
+        )
+
+        queue_commands.assert_called_once_with(mock_pipeline)
+        mock_pipeline.execute.assert_called_once()
+
+    @patch("redis_dal.redis_client_factory.RedisClientFactory.create_redis_client")
+    def test_store_messages_batch_delete_legacy_index_entry(
+        self, mock_create_redis_client
+    ):
+        mock_redis_client = Mock()
+        mock_create_redis_client.return_value = mock_redis_client
+        member = encode_member(str({"message": {"name": "m1"}, "type": "create"}))
+        same_second = encode_member(str({"message": {"name": "m2"}, "type": "create"}))
+        mock_redis_client.hmget.return_value = [json.dumps(["space1", "user", 12.5])]
+        mock_pipeline = mock_redis_client.pipeline.return_value
+        mock_pipeline.execute.side_effect = [[[same_second, member]], []]
+
+        store_messages_batch([(None, {"name": "m1"}, MESSAGE_TYPE_DELETE)])
+
+        mock_pipeline.zrem.assert_called_once_with(
+            REDIS_KEY_FORMAT.format(space_id="space1", sender_ldap="user"), member
+        )
+
+    @patch("redis_dal.redis_client_factory.RedisClientFactory.create_redis_client")
+    def test_store_messages_batch_delete_already_removed(
+        self, mock_create_redis_client
+    ):
+        mock_redis_client = Mock()
+        mock_create_redis_client.return_value = mock_redis_client
+        mock_redis_client.hmget.return_value = [
+            json.dumps(["space1", "user", 12.5, "digest"])
+        ]
+        mock_pipeline = mock_redis_client.pipeline.return_value
+        mock_pipeline.execute.side_effect = [[[]], []]
+
+        store_messages_batch([(None, {"name": "m1"}, MESSAGE_TYPE_DELETE)])
+
+        mock_pipeline.zrem.assert_not_called()
+        mock_pipeline.hdel.assert_called_once_with(REDIS_MESSAGE_INDEX_KEY, "m1")
+
+    @patch("redis_dal.redis_client_factory.RedisClientFactory.create_redis_client")
+    def test_store_messages_compresses_large_member(self, mock_create_redis_client):
+        mock_redis_client = Mock()
+        mock_create_redis_client.return_value = mock_redis_client
+        message = {
+            "createTime": "2023-10-27T10:00:00Z",
+            "space": {"name": "spaces/space1"},
+            "text": "Hello, world! " * 200,
+        }
+
+        store_messages("test_user", message, "create")
+
+        mock_pipeline = mock_redis_client.pipeline.return_value
+        _, members = mock_pipeline.zadd.call_args[0]
+        (stored_member,) = members
+        self.assertTrue(is_compressed_member(stored_member))
+        self.assertEqual(
+            decode_member(stored_member), str({"message": message, "type": "create"})
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,155 @@
+import json
+import threading
+import unittest
+from unittest.mock import Mock, patch
+from redis.exceptions import RedisError
+from redis_dal.retention import (
+    compact_messages,
+    get_retention_policy,
+    run_compactor,
+    set_retention_days,
+)
+from redis_dal.constants import (
+    REDIS_MESSAGE_INDEX_KEY,
+    QUERY_VERSIONS_KEY,
+    RETENTION_POLICY_KEY,
+    RETENTION_DEFAULT_FIELD,
+    REGISTRY_SPACE_KEYS_FORMAT,
+    REGISTRY_LDAP_KEYS_FORMAT,
+    SECONDS_PER_DAY,
+)
+
+NOW = 100 * SECONDS_PER_DAY
+
+
+class TestRetention(unittest.TestCase):
+    def setUp(self):
+        patcher = patch(
+            "redis_dal.redis_client_factory.RedisClientFactory.create_redis_client"
+        )
+        self.mock_redis_client = Mock()
+        patcher.start().return_value = self.mock_redis_client
+        self.addCleanup(patcher.stop)
+        self.mock_pipeline = self.mock_redis_client.pipeline.return_value
+        self.mock_evict = self.mock_redis_client.register_script.return_value
+
+    def test_set_retention_days(self):
+        set_retention_days(30)
+        set_retention_days(7, "space1")
+        set_retention_days(None, "space1")
+
+        self.mock_redis_client.hset.assert_any_call(
+            RETENTION_POLICY_KEY, RETENTION_DEFAULT_FIELD, 30
+        )
+        self.mock_redis_client.hset.assert_any_call(RETENTION_POLICY_KEY, "space1", 7)
+        self.mock_redis_client.hdel.assert_called_once_with(
+            RETENTION_POLICY_KEY, "space1"
+        )
+        with self.assertRaises(ValueError):
+            set_retention_days(0)
+
+    def test_get_retention_policy(self):
+        self.mock_redis_client.hgetall.return_value = {b"*": b"30", b"space1": b"7"}
+
+        self.assertEqual(get_retention_policy(), (30.0, {"space1": 7.0}))
+
+    def test_compact_messages_without_policy_is_noop(self):
+        self.mock_redis_client.hgetall.return_value = {}
+
+        result = compact_messages(now=NOW)
+
+        self.assertEqual(result["evicted"], 0)
+        self.mock_redis_client.register_script.assert_not_called()
+
+    @patch("redis_dal.retention.get_space_keys")
+    @patch("redis_dal.retention.get_registered_space_ids")
+    def test_compact_messages_uses_space_and_global_cutoffs(
+        self, mock_get_space_ids, mock_get_space_keys
+    ):
+        self.mock_redis_client.hgetall.return_value = {b"*": b"30", b"space1": b"7"}
+        mock_get_space_ids.return_value = ["space1", "space2"]
+        mock_get_space_keys.return_value = {
+            "space1": ["spaces/space1:ldap:ldap1", "spaces/space1:ldap:ldap2"],
+            "space2": ["spaces/space2:ldap:ldap1"],
+        }
+        self.mock_pipeline.execute.side_effect = [[3, 0], [], [2], []]
+        self.mock_redis_client.hscan_iter.return_value = iter([
+            (b"spaces/space1/messages/old", json.dumps(["space1", "ldap1", 1.0])),
+            (b"spaces/space2/messages/new", json.dumps(["space2", "ldap1", NOW])),
+        ])
+
+        result = compact_messages(now=NOW, batch_size=2)
+
+        self.assertEqual(
+            result,
+            {"keys_scanned": 3, "keys_compacted": 2, "evicted": 5, "index_evicted": 1},
+        )
+        mock_get_space_keys.assert_called_once_with(["space1", "space2"])
+        self.mock_evict.assert_any_call(
+            keys=[
+                "spaces/space1:ldap:ldap1",
+                REGISTRY_SPACE_KEYS_FORMAT.format(space_id="space1"),
+                REGISTRY_LDAP_KEYS_FORMAT.format(sender_ldap="ldap1"),
+            ],
+            args=[NOW - 7 * SECONDS_PER_DAY],
+            client=self.mock_pipeline,
+        )
+        self.mock_evict.assert_any_call(
+            keys=[
+                "spaces/space2:ldap:ldap1",
+                REGISTRY_SPACE_KEYS_FORMAT.format(space_id="space2"),
+                REGISTRY_LDAP_KEYS_FORMAT.format(sender_ldap="ldap1"),
+            ],
+            args=[NOW - 30 * SECONDS_PER_DAY],
+            client=self.mock_pipeline,
+        )
+        self.assertEqual(self.mock_pipeline.execute.call_count, 4)
+        self.mock_pipeline.hincrby.assert_any_call(QUERY_VERSIONS_KEY, "ldap:ldap1", 1)
+        self.assertEqual(self.mock_pipeline.hincrby.call_count, 6)
+        self.mock_redis_client.hdel.assert_called_once_with(
+            REDIS_MESSAGE_INDEX_KEY, b"spaces/space1/messages/old"
+        )
+
+    @patch("tools.rate_limiter.rate_limiter.time.sleep")
+    @patch("redis_dal.retention.get_registered_space_ids", Mock(return_value=[]))
+    def test_compact_message_index_in_burst_sized_chunks(self, mock_sleep):
+        self.mock_redis_client.hgetall.return_value = {b"*": b"30"}
+        self.mock_redis_client.hscan_iter.return_value = iter([
+            (f"spaces/space1/messages/{i}".encode(), json.dumps(["space1", "l", 1.0]))
+            for i in range(5)
+        ])
+
+        result = compact_messages(
+            now=NOW, scan_count=500, batch_size=2, keys_per_second=2
+        )
+
+        self.assertEqual(result["index_evicted"], 5)
+        self.assertEqual(
+            [len(c.args) - 1 for c in self.mock_redis_client.hdel.call_args_list],
+            [2, 2, 1],
+        )
+
+    @patch("redis_dal.retention.compact_messages")
+    def test_run_compactor_stops_on_event(self, mock_compact):
+        stop_event = threading.Event()
+        stop_event.set()
+
+        run_compactor(interval_seconds=0, stop_event=stop_event)
+
+        mock_compact.assert_called_once()
+
+    @patch("redis_dal.retention.compact_messages")
+    def test_run_compactor_survives_a_failed_pass(self, mock_compact):
+        stop_event = Mock()
+        stop_event.wait.side_effect = [False, True]
+        mock_compact.side_effect = [RedisError("timeout"), {}]
+
+        with self.assertLogs(level="ERROR") as logs:
+            run_compactor(interval_seconds=0, stop_event=stop_event)
+
+        self.assertEqual(mock_compact.call_count, 2)
+        self.assertIn("timeout", logs.output[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+import unittest
+import json
+from unittest.mock import Mock, patch
+from redis_dal.watermarks import (
+    clear_recorded_gaps,
+    get_watermarks,
+    mark_space_live_since,
+    record_subscriber_heartbeat,
+    update_backfill_watermarks,
+    update_realtime_watermarks,
+)
+from redis_dal.constants import (
+    WATERMARK_REALTIME_KEY,
+    WATERMARK_BACKFILL_KEY,
+    WATERMARK_LIVE_SINCE_KEY,
+    WATERMARK_GAPS_KEY,
+    SUBSCRIBER_HEARTBEAT_KEY,
+    SUBSCRIBER_LIVE_SINCE_KEY,
+)
+
+
+class TestWatermarks(unittest.TestCase):
+    def setUp(self):
+        patcher = patch(
+            "redis_dal.redis_client_factory.RedisClientFactory.create_redis_client"
+        )
+        self.mock_redis_client = Mock()
+        patcher.start().return_value = self.mock_redis_client
+        self.addCleanup(patcher.stop)
+        self.mock_pipeline = self.mock_redis_client.pipeline.return_value
+
+    def test_update_realtime_watermarks(self):
+        hset_max = self.mock_redis_client.register_script.return_value
+
+        update_realtime_watermarks({"space1": 10.0})
+
+        hset_max.assert_called_once_with(
+            keys=[WATERMARK_REALTIME_KEY],
+            args=["space1", 10.0],
+            client=self.mock_pipeline,
+        )
+        self.mock_pipeline.execute.assert_called_once()
+
+    def test_update_backfill_watermarks(self):
+        hset_max = self.mock_redis_client.register_script.return_value
+
+        update_backfill_watermarks({"space1": 10.0})
+        update_backfill_watermarks({})
+
+        hset_max.assert_called_once_with(
+            keys=[WATERMARK_BACKFILL_KEY],
+            args=["space1", 10.0],
+            client=self.mock_pipeline,
+        )
+
+    def test_mark_space_live_since_records_lapse(self):
+        mark_space_live_since("space1", 5.0, lapsed_since=2.0)
+
+        self.mock_pipeline.hset.assert_called_once_with(
+            WATERMARK_LIVE_SINCE_KEY, "space1", 5.0
+        )
+        self.mock_pipeline.sadd.assert_called_once_with(
+            WATERMARK_GAPS_KEY, json.dumps(["space1", 2.0, 5.0])
+        )
+
+    def test_mark_space_live_since_defaults_to_covered_time(self):
+        self.mock_pipeline.execute.side_effect = [[b"3", b"4"], []]
+
+        mark_space_live_since("space1", 5.0)
+
+        self.mock_pipeline.sadd.assert_called_once_with(
+            WATERMARK_GAPS_KEY, json.dumps(["space1", 4.0, 5.0])
+        )
+
+    def test_clear_recorded_gaps(self):
+        clear_recorded_gaps([("space1", None, 5.0)])
+
+        self.mock_redis_client.srem.assert_called_once_with(
+            WATERMARK_GAPS_KEY, json.dumps(["space1", None, 5.0])
+        )
+
+    @patch("redis_dal.watermarks.get_tracked_workspace_subscriptions")
+    def test_heartbeat_after_downtime_records_gaps(self, mock_tracked):
+        self.mock_redis_client.hget.return_value = b"100"
+        mock_tracked.return_value = [("subscriptions/1", "space1", "topic", 2000.0)]
+
+        record_subscriber_heartbeat("sub1", 200.0, tolerance_seconds=60)
+
+        self.mock_redis_client.hget.assert_called_once_with(
+            SUBSCRIBER_HEARTBEAT_KEY, "sub1"
+        )
+        self.mock_pipeline.hset.assert_any_call(
+            SUBSCRIBER_LIVE_SINCE_KEY, "sub1", 200.0
+        )
+        self.mock_pipeline.hset.assert_any_call(SUBSCRIBER_HEARTBEAT_KEY, "sub1", 200.0)
+        self.mock_pipeline.sadd.assert_called_once_with(
+            WATERMARK_GAPS_KEY, json.dumps(["space1", 100.0, 200.0])
+        )
+
+    @patch("redis_dal.watermarks.get_tracked_workspace_subscriptions")
+    def test_first_heartbeat_records_no_gap(self, mock_tracked):
+        self.mock_redis_client.hget.return_value = None
+
+        record_subscriber_heartbeat("sub1", 200.0, tolerance_seconds=60)
+
+        self.mock_pipeline.hset.assert_any_call(
+            SUBSCRIBER_LIVE_SINCE_KEY, "sub1", 200.0
+        )
+        self.mock_pipeline.sadd.assert_not_called()
+        mock_tracked.assert_not_called()
+
+    def test_fresh_heartbeat_keeps_live_since(self):
+        self.mock_redis_client.hget.return_value = b"190"
+
+        record_subscriber_heartbeat("sub1", 200.0, tolerance_seconds=60)
+
+        self.mock_pipeline.hset.assert_called_once_with(
+            SUBSCRIBER_HEARTBEAT_KEY, "sub1", 200.0
+        )
+
+    def test_get_watermarks(self):
+        self.mock_pipeline.execute.return_value = [
+            [b"10", None],
+            [None, b"20"],
+            [None, None],
+            {
+                json.dumps(["space2", 5.0, 8.0]).encode(),
+                json.dumps(["space3", 5.0, 8.0]).encode(),
+            },
+            {b"sub1": b"30"},
+            {},
+        ]
+
+        result = get_watermarks(["space1", "space2"])
+
+        self.assertEqual(result["realtime"], {"space1": 10.0, "space2": None})
+        self.assertEqual(result["backfill"], {"space1": None, "space2": 20.0})
+        self.assertEqual(result["live_since"], {"space1": None, "space2": None})
+        self.assertEqual(result["gaps"], [("space2", 5.0, 8.0)])
+        self.assertEqual(result["subscriber_heartbeats"], {"sub1": 30.0})
+        self.assertEqual(result["subscriber_live_since"], {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import json
+import unittest
+from unittest.mock import Mock, patch
+from redis_dal.workspace_subscription_store import (
+    get_tracked_workspace_subscriptions,
+    track_workspace_subscriptions,
+    untrack_workspace_subscriptions,
+)
+from redis_dal.constants import (
+    WORKSPACE_SUBSCRIPTION_EXPIRY_KEY,
+    WORKSPACE_SUBSCRIPTION_INFO_KEY,
+)
+
+TEST_NAME = "subscriptions/chat-spaces-abc"
+TEST_SPACE_ID = "space1"
+TEST_TOPIC = "projects/test-project/topics/test-topic"
+TEST_EXPIRE_TIME = 1700000000.0
+
+
+class TestWorkspaceSubscriptionStore(unittest.TestCase):
+    def setUp(self):
+        patcher = patch(
+            "redis_dal.redis_client_factory.RedisClientFactory.create_redis_client"
+        )
+        self.mock_redis_client = Mock()
+        patcher.start().return_value = self.mock_redis_client
+        self.addCleanup(patcher.stop)
+        self.mock_pipeline = self.mock_redis_client.pipeline.return_value
+
+    def test_track_workspace_subscriptions(self):
+        track_workspace_subscriptions([
+            (TEST_NAME, TEST_SPACE_ID, TEST_TOPIC, TEST_EXPIRE_TIME)
+        ])
+
+        self.mock_pipeline.zadd.assert_called_once_with(
+            WORKSPACE_SUBSCRIPTION_EXPIRY_KEY, {TEST_NAME: TEST_EXPIRE_TIME}
+        )
+        self.mock_pipeline.hset.assert_called_once_with(
+            WORKSPACE_SUBSCRIPTION_INFO_KEY,
+            TEST_NAME,
+            json.dumps({"space_id": TEST_SPACE_ID, "pubsub_topic": TEST_TOPIC}),
+        )
+        self.mock_pipeline.execute.assert_called_once()
+
+    def test_track_and_untrack_empty(self):
+        track_workspace_subscriptions([])
+        untrack_workspace_subscriptions([])
+
+        self.mock_redis_client.pipeline.assert_not_called()
+
+    def test_untrack_workspace_subscriptions(self):
+        untrack_workspace_subscriptions([TEST_NAME])
+
+        self.mock_pipeline.zrem.assert_called_once_with(
+            WORKSPACE_SUBSCRIPTION_EXPIRY_KEY, TEST_NAME
+        )
+        self.mock_pipeline.hdel.assert_called_once_with(
+            WORKSPACE_SUBSCRIPTION_INFO_KEY, TEST_NAME
+        )
+
+    def test_get_tracked_workspace_subscriptions(self):
+        self.mock_redis_client.zrangebyscore.return_value = [
+            (TEST_NAME.encode(), TEST_EXPIRE_TIME)
+        ]
+        self.mock_redis_client.hmget.return_value = [
+            json.dumps({"space_id": TEST_SPACE_ID, "pubsub_topic": TEST_TOPIC})
+        ]
+
+        result = get_tracked_workspace_subscriptions(TEST_EXPIRE_TIME, limit=10)
+
+        self.assertEqual(
+            result, [(TEST_NAME, TEST_SPACE_ID, TEST_TOPIC, TEST_EXPIRE_TIME)]
+        )
+        self.mock_redis_client.zrangebyscore.assert_called_once_with(
+            WORKSPACE_SUBSCRIPTION_EXPIRY_KEY,
+            "-inf",
+            TEST_EXPIRE_TIME,
+            withscores=True,
+            start=0,
+            num=10,
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,19 +1,49 @@
+import json
 import logging
 import os
 import unittest
 from unittest.mock import patch
-from tools.log.logger import setup_logger
+from tools.log import logger
+from tools.log.logger import (
+    DebugSampler,
+    DeferredQueueHandler,
+    LazyMessage,
+    setup_logger,
+    shutdown_logger,
+)
+from tools.log.constants import LOG_ASYNC, LOG_DEBUG_SAMPLE_EVERY, LOG_FORMAT
 from io import StringIO
 
 
+class CountingValue:
+    """A value that counts how many times it is formatted."""
+
+    def __init__(self):
+        self.formatted = 0
+
+    def __format__(self, spec):
+        self.formatted += 1
+        return "value"
+
+
 class TestLogger(unittest.TestCase):
     def setUp(self):
         logging.getLogger().handlers = []
         logging.getLogger().setLevel(logging.NOTSET)
 
     def tearDown(self):
+        shutdown_logger()
         logging.getLogger().handlers = []
 
+    def capture_root_handler(self):
+        """Redirects the stream handler set up by setup_logger to a string buffer."""
+        log_capture_string = StringIO()
+        handler = logging.getLogger().handlers[0]
+        if logger._listener is not None:
+            handler = logger._listener.handlers[0]
+        handler.stream = log_capture_string
+        return log_capture_string
+
     def test_default_log_level(self):
         setup_logger()
         self.assertEqual(logging.getLogger().getEffectiveLevel(), logging.INFO)
@@ -46,6 +76,75 @@ class TestLogger(unittest.TestCase):
             )
             self.assertRegex(log_contents, expected_format)
 
+    def test_lazy_message_not_formatted_when_disabled(self):
+        setup_logger()
+        value = CountingValue()
+
+        logging.debug(LazyMessage("Debug {value}", value=value))
+
+        self.assertEqual(value.formatted, 0)
+
+    def test_lazy_message_formatted_when_emitted(self):
+        setup_logger()
+        log_capture_string = self.capture_root_handler()
+        value = CountingValue()
+
+        logging.info(LazyMessage("Info {value}", value=value))
+
+        self.assertIn("INFO - Info value", log_capture_string.getvalue())
+        self.assertEqual(value.formatted, 1)
+
+    def test_json_format(self):
+        with patch.dict(os.environ, {LOG_FORMAT: "json"}):
+            setup_logger()
+        log_capture_string = self.capture_root_handler()
+
+        logging.warning(LazyMessage("Stored {count} messages", count=3))
+
+        entry = json.loads(log_capture_string.getvalue())
+        self.assertEqual(entry["level"], "WARNING")
+        self.assertEqual(entry["message"], "Stored 3 messages")
+        self.assertEqual(entry["fields"], {"count": 3})
+
+    def test_debug_sampling(self):
+        with patch.dict(
+            os.environ, {"LOG_LEVEL": "DEBUG", LOG_DEBUG_SAMPLE_EVERY: "3"}
+        ):
+            setup_logger()
+        log_capture_string = self.capture_root_handler()
+
+        for i in range(6):
+            logging.debug(LazyMessage("Sampled {i}", i=i))
+            logging.info(LazyMessage("Kept {i}", i=i))
+
+        log_contents = log_capture_string.getvalue()
+        self.assertEqual(log_contents.count("Sampled"), 2)
+        self.assertIn("Sampled 0", log_contents)
+        self.assertIn("Sampled 3", log_contents)
+        self.assertEqual(log_contents.count("Kept"), 6)
+
+    def test_debug_sampler_is_per_template(self):
+        sampler = DebugSampler(2)
+        records = [
+            logging.LogRecord("test", logging.DEBUG, "", 0, LazyMessage(t), None, None)
+            for t in ("a", "b", "a", "b")
+        ]
+
+        self.assertEqual(
+            [sampler.filter(r) for r in records], [True, True, False, False]
+        )
+
+    def test_async_writer(self):
+        with patch.dict(os.environ, {LOG_ASYNC: "true"}):
+            setup_logger()
+        self.assertIsInstance(logging.getLogger().handlers[0], DeferredQueueHandler)
+        log_capture_string = self.capture_root_handler()
+
+        logging.info(LazyMessage("Queued {count}", count=1))
+        shutdown_logger()
+
+        self.assertRegex(log_capture_string.getvalue(), r" - INFO - Queued 1\n")
+
 
 if __name__ == "__main__":
     unittest.main()
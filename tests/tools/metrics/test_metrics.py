@@ -0,0 +1,95 @@
+from unittest import TestCase, main
+from unittest.mock import Mock
+from concurrent.futures import ThreadPoolExecutor
+import threading
+from flask import Flask
+from prometheus_client import REGISTRY
+from tools.metrics.metrics import register_metrics, track_cache, track_executor
+
+ROUTE = "/items/<item_id>"
+
+
+def get_request_count(route, status):
+    """Returns the number of requests recorded for a route and status."""
+    return (
+        REGISTRY.get_sample_value(
+            "purrf_http_request_seconds_count",
+            {"route": route, "method": "GET", "status": status},
+        )
+        or 0
+    )
+
+
+class TestMetrics(TestCase):
+    def setUp(self):
+        app = Flask(__name__)
+        app.add_url_rule(ROUTE, "item", lambda item_id: item_id)
+        register_metrics(app)
+        self.client = app.test_client()
+
+    def test_requests_are_timed_by_route(self):
+        before = get_request_count(ROUTE, "200")
+
+        self.client.get("/items/1")
+        self.client.get("/items/2")
+
+        self.assertEqual(get_request_count(ROUTE, "200"), before + 2)
+
+    def test_unmatched_requests(self):
+        before = get_request_count("unmatched", "404")
+
+        self.client.get("/missing")
+
+        self.assertEqual(get_request_count("unmatched", "404"), before + 1)
+
+    def test_metrics_endpoint(self):
+        self.client.get("/items/1")
+
+        response = self.client.get("/metrics")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("text/plain", response.content_type)
+        self.assertIn(b'purrf_http_request_seconds_count{method="GET"', response.data)
+
+    def test_track_executor(self):
+        executor = ThreadPoolExecutor(max_workers=1)
+        started, release = threading.Event(), threading.Event()
+        try:
+            track_executor("test", executor)
+            executor.submit(lambda: started.set() or release.wait())
+            started.wait(5)
+            executor.submit(release.wait)
+            executor.submit(release.wait)
+
+            depth = REGISTRY.get_sample_value(
+                "purrf_executor_queue_depth", {"executor": "test"}
+            )
+
+            self.assertEqual(depth, 2)
+        finally:
+            release.set()
+            executor.shutdown()
+
+    def test_track_cache(self):
+        cache = Mock()
+        cache.get_metrics.return_value = {"hits": 3, "hit_rate": 0.75}
+
+        track_cache("test", cache)
+        cache.get_metrics.return_value = {"hits": 4, "hit_rate": 0.8}
+
+        self.assertEqual(
+            REGISTRY.get_sample_value(
+                "purrf_cache_stats", {"cache": "test", "stat": "hits"}
+            ),
+            4,
+        )
+        self.assertEqual(
+            REGISTRY.get_sample_value(
+                "purrf_cache_stats", {"cache": "test", "stat": "hit_rate"}
+            ),
+            0.8,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+from unittest import TestCase, main
+from unittest.mock import patch
+import os
+import pstats
+import tempfile
+import time
+from flask import Flask
+from tools.profiling.profiler import (
+    ProfileRun,
+    ProfilingConfig,
+    get_profiling_config,
+    profiled,
+    register_profiling,
+)
+from tools.profiling.constants import (
+    DEFAULT_PROFILE_SAMPLE_RATE,
+    PROFILE_ADMIN_TOKEN,
+    PROFILE_DIR,
+    PROFILE_MAX_FILES,
+    PROFILE_SAMPLE_RATE,
+)
+
+ADMIN_TOKEN = "secret"
+
+
+def busy_loop(seconds):
+    """Burns CPU for a number of seconds."""
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        sum(range(100))
+
+
+class TestProfiler(TestCase):
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.directory = temp_dir.name
+        environ = {
+            PROFILE_DIR: self.directory,
+            PROFILE_SAMPLE_RATE: "1",
+            PROFILE_MAX_FILES: "3",
+        }
+        with patch.dict(os.environ, environ):
+            config = ProfilingConfig()
+        patcher = patch("tools.profiling.profiler._config", config)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_enabled_by_environment(self):
+        config = get_profiling_config()
+
+        self.assertTrue(config.enabled)
+        self.assertEqual(config.directory, self.directory)
+
+    @patch.dict(os.environ, {}, clear=True)
+    def test_default_sample_rate(self):
+        config = ProfilingConfig()
+
+        self.assertFalse(config.enabled)
+        self.assertEqual(config.sample_rate, DEFAULT_PROFILE_SAMPLE_RATE)
+        self.assertLess(config.sample_rate, 0.1)
+
+    def test_sampling_profile_writes_collapsed_stacks(self):
+        get_profiling_config().configure(interval=0.001)
+
+        with ProfileRun("backfill") as run:
+            busy_loop(0.05)
+
+        self.assertTrue(run.path.endswith(".folded"))
+        self.assertEqual(os.path.dirname(run.path), self.directory)
+        with open(run.path, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        self.assertTrue(lines)
+        stack, count = lines[0].rsplit(" ", 1)
+        self.assertGreater(int(count), 0)
+        self.assertTrue(any("busy_loop" in line for line in lines))
+
+    def test_cprofile_profile(self):
+        get_profiling_config().configure(mode="cprofile")
+
+        with ProfileRun("request GET /api/chat/activity") as run:
+            busy_loop(0.01)
+
+        self.assertRegex(
+            os.path.basename(run.path), r"^request_GET_api_chat_activity-.*\.prof$"
+        )
+        stats = pstats.Stats(run.path)
+        self.assertTrue(any(function == "busy_loop" for _, _, function in stats.stats))
+
+    def test_disabled(self):
+        get_profiling_config().configure(enabled=False)
+
+        with ProfileRun("backfill") as run:
+            pass
+
+        self.assertIsNone(run.path)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_sample_rate_zero(self):
+        get_profiling_config().configure(sample_rate=0)
+
+        with ProfileRun("backfill") as run:
+            pass
+
+        self.assertIsNone(run.path)
+
+    def test_nested_runs_are_part_of_the_outer_run(self):
+        with ProfileRun("outer") as outer:
+            with ProfileRun("inner") as inner:
+                pass
+
+        self.assertIsNone(inner.path)
+        self.assertIsNotNone(outer.path)
+        self.assertEqual(len(os.listdir(self.directory)), 1)
+
+    def test_profiled_decorator(self):
+        @profiled("job")
+        def job(value):
+            return value * 2
+
+        self.assertEqual(job(21), 42)
+        (name,) = os.listdir(self.directory)
+        self.assertTrue(name.startswith("job-"))
+
+    def test_oldest_profiles_are_removed(self):
+        paths = []
+        for _ in range(5):
+            with ProfileRun("job") as run:
+                pass
+            paths.append(run.path)
+            os.utime(run.path, (len(paths), len(paths)))
+
+        self.assertEqual(
+            sorted(os.listdir(self.directory)),
+            sorted(os.path.basename(path) for path in paths[2:]),
+        )
+
+    def test_configure_invalid(self):
+        config = get_profiling_config()
+        with self.assertRaises(ValueError):
+            config.configure(mode="perf")
+        with self.assertRaises(ValueError):
+            config.configure(sample_rate=2)
+        with self.assertRaises(ValueError):
+            config.configure(interval=0)
+
+    def create_client(self):
+        """Returns a test client of an app with profiling registered."""
+        app = Flask(__name__)
+        app.add_url_rule("/items/<item_id>", "item", lambda item_id: item_id)
+        register_profiling(app)
+        return app.test_client()
+
+    @patch.dict(os.environ, {PROFILE_ADMIN_TOKEN: ADMIN_TOKEN})
+    def test_admin_endpoint_and_request_profiles(self):
+        get_profiling_config().configure(enabled=False)
+        client = self.create_client()
+
+        response = client.post(
+            "/api/admin/profiling",
+            json={"enabled": True, "mode": "cprofile", "sample_rate": 1},
+            headers={"Authorization": f"Bearer {ADMIN_TOKEN}"},
+        )
+        client.get("/items/1")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json["mode"], "cprofile")
+        self.assertTrue(response.json["enabled"])
+        self.assertTrue(
+            any(
+                name.startswith("request-GET-items_item_id-") and name.endswith(".prof")
+                for name in os.listdir(self.directory)
+            )
+        )
+
+    @patch.dict(os.environ, {PROFILE_ADMIN_TOKEN: ADMIN_TOKEN})
+    def test_admin_endpoint_get_does_not_change_settings(self):
+        get_profiling_config().configure(enabled=False)
+        client = self.create_client()
+
+        response = client.get(
+            "/api/admin/profiling?enabled=true",
+            headers={"Authorization": f"Bearer {ADMIN_TOKEN}"},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.json["enabled"])
+        self.assertFalse(get_profiling_config().enabled)
+
+    @patch.dict(os.environ, {PROFILE_ADMIN_TOKEN: ADMIN_TOKEN})
+    def test_admin_endpoint_requires_token(self):
+        client = self.create_client()
+
+        missing = client.post("/api/admin/profiling", json={"enabled": False})
+        wrong = client.post(
+            "/api/admin/profiling",
+            json={"enabled": False},
+            headers={"Authorization": "Bearer wrong"},
+        )
+
+        self.assertEqual(missing.status_code, 401)
+        self.assertEqual(wrong.status_code, 401)
+        self.assertTrue(get_profiling_config().enabled)
+
+    @patch.dict(os.environ, {}, clear=True)
+    def test_admin_endpoint_disabled_without_token(self):
+        response = self.create_client().post(
+            "/api/admin/profiling",
+            json={"enabled": False},
+            headers={"Authorization": "Bearer "},
+        )
+
+        self.assertEqual(response.status_code, 403)
+        self.assertTrue(get_profiling_config().enabled)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+import unittest
+from unittest.mock import patch
+from tools.rate_limiter.rate_limiter import RateLimiter
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_invalid_rate(self):
+        with self.assertRaises(ValueError):
+            RateLimiter(0)
+
+    @patch("tools.rate_limiter.rate_limiter.time.sleep")
+    def test_acquire_more_than_burst(self, mock_sleep):
+        limiter = RateLimiter(rate=2, burst=2)
+
+        with self.assertRaises(ValueError):
+            limiter.acquire(3)
+        mock_sleep.assert_not_called()
+
+    @patch("tools.rate_limiter.rate_limiter.time.sleep")
+    @patch("tools.rate_limiter.rate_limiter.time.monotonic", return_value=100.0)
+    def test_burst_then_wait(self, mock_monotonic, mock_sleep):
+        limiter = RateLimiter(rate=2, burst=2)
+
+        self.assertEqual(limiter.acquire(), 0.0)
+        self.assertEqual(limiter.acquire(), 0.0)
+        mock_sleep.assert_not_called()
+
+        mock_sleep.side_effect = lambda delay: mock_monotonic.configure_mock(
+            return_value=mock_monotonic.return_value + delay
+        )
+        self.assertEqual(limiter.acquire(), 0.5)
+        mock_sleep.assert_called_once_with(0.5)
+
+    @patch("tools.rate_limiter.rate_limiter.time.monotonic")
+    def test_refill_is_capped_at_burst(self, mock_monotonic):
+        mock_monotonic.return_value = 0.0
+        limiter = RateLimiter(rate=1, burst=1)
+        limiter.acquire()
+
+        mock_monotonic.return_value = 100.0
+        self.assertEqual(limiter.acquire(), 0.0)
+        self.assertLess(limiter._tokens, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
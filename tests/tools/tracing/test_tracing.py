@@ -0,0 +1,118 @@
+from unittest import TestCase, main
+from unittest.mock import patch
+import json
+import os
+import tempfile
+from flask import Flask
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+    InMemorySpanExporter,
+)
+from opentelemetry.trace import StatusCode
+from tools.tracing.tracing import (
+    create_span_exporter,
+    register_tracing,
+    setup_tracing,
+)
+from tools.tracing.constants import TRACE_EXPORTER, TRACE_FILE
+
+
+def create_test_provider(exporter):
+    """Returns a tracer provider exporting spans synchronously to an exporter."""
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    return provider
+
+
+class TestTracing(TestCase):
+    def test_file_exporter_writes_json_lines(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "traces.jsonl")
+            exporter = create_span_exporter("file", path)
+            tracer = create_test_provider(exporter).get_tracer("test")
+
+            with tracer.start_as_current_span("one", attributes={"space_id": "AAA"}):
+                pass
+            with tracer.start_as_current_span("two"):
+                pass
+            exporter.shutdown()
+
+            with open(path, encoding="utf-8") as f:
+                spans = [json.loads(line) for line in f]
+        self.assertEqual([span["name"] for span in spans], ["one", "two"])
+        self.assertEqual(spans[0]["attributes"], {"space_id": "AAA"})
+
+    def test_unsupported_exporter(self):
+        with self.assertRaises(ValueError):
+            create_span_exporter("zipkin")
+
+    @patch.dict(os.environ, {TRACE_EXPORTER: "console"})
+    @patch("tools.tracing.tracing._setup_done", False)
+    @patch("tools.tracing.tracing.trace.set_tracer_provider")
+    def test_setup_tracing_from_environment(self, mock_set_provider):
+        setup_tracing()
+        setup_tracing()
+
+        mock_set_provider.assert_called_once()
+        self.assertIsInstance(mock_set_provider.call_args[0][0], TracerProvider)
+
+    @patch.dict(os.environ, {TRACE_EXPORTER: "file", TRACE_FILE: os.devnull})
+    @patch("tools.tracing.tracing._setup_done", True)
+    @patch("tools.tracing.tracing.trace.set_tracer_provider")
+    def test_setup_tracing_runs_once(self, mock_set_provider):
+        setup_tracing()
+
+        mock_set_provider.assert_not_called()
+
+    @patch.dict(os.environ, {}, clear=True)
+    @patch("tools.tracing.tracing._setup_done", False)
+    @patch("tools.tracing.tracing.trace.set_tracer_provider")
+    def test_setup_tracing_disabled(self, mock_set_provider):
+        setup_tracing()
+
+        mock_set_provider.assert_not_called()
+
+
+class TestRegisterTracing(TestCase):
+    def setUp(self):
+        self.exporter = InMemorySpanExporter()
+        tracer = create_test_provider(self.exporter).get_tracer("test")
+        patcher = patch("tools.tracing.tracing.tracer", tracer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        app = Flask(__name__)
+
+        @app.route("/items/<item_id>")
+        def item(item_id):
+            with tracer.start_as_current_span("child"):
+                return item_id
+
+        @app.route("/error")
+        def error():
+            raise RuntimeError("boom")
+
+        register_tracing(app)
+        self.client = app.test_client()
+
+    def test_request_span(self):
+        self.client.get("/items/1?full=true")
+
+        child, request_span = self.exporter.get_finished_spans()
+        self.assertEqual(request_span.name, "GET /items/<item_id>")
+        self.assertEqual(request_span.attributes["http.route"], "/items/<item_id>")
+        self.assertEqual(request_span.attributes["url.query"], "full=true")
+        self.assertEqual(request_span.attributes["http.response.status_code"], 200)
+        self.assertEqual(child.parent.span_id, request_span.context.span_id)
+
+    def test_request_span_error(self):
+        self.client.get("/error")
+
+        (request_span,) = self.exporter.get_finished_spans()
+        self.assertEqual(request_span.status.status_code, StatusCode.ERROR)
+        self.assertEqual(request_span.attributes["http.response.status_code"], 500)
+
+
+if __name__ == "__main__":
+    main()
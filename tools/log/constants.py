@@ -0,0 +1,6 @@
+LOG_LEVEL = "LOG_LEVEL"
+LOG_FORMAT = "LOG_FORMAT"
+LOG_ASYNC = "LOG_ASYNC"
+LOG_DEBUG_SAMPLE_EVERY = "LOG_DEBUG_SAMPLE_EVERY"
+LOG_FORMAT_JSON = "json"
+TEXT_LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
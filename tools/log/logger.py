@@ -1,19 +1,122 @@
+from logging.handlers import QueueHandler, QueueListener
+from datetime import datetime, timezone
+import atexit
+import json
 import logging
 import os
+import queue
+import threading
+from tools.log.constants import (
+    LOG_LEVEL,
+    LOG_FORMAT,
+    LOG_ASYNC,
+    LOG_DEBUG_SAMPLE_EVERY,
+    LOG_FORMAT_JSON,
+    TEXT_LOG_FORMAT,
+)
+
+_listener = None
+
+
+class LazyMessage:
+    """
+    A log message formatted only if a handler emits it.
+
+    The `*_MSG` templates use `str.format` fields, which logging cannot defer on its
+    own. Passing `LazyMessage(TEMPLATE, field=value)` instead of
+    `TEMPLATE.format(field=value)` keeps the fields unformatted until a handler calls
+    `str()` on the message, so a disabled or sampled-out debug event costs no
+    formatting, and the JSON formatter can emit the fields as structured data.
+
+    Example:
+        logging.debug(LazyMessage(REDIS_BATCH_STORED_DEBUG_MSG, count=count))
+    """
+
+    __slots__ = ("template", "fields")
+
+    def __init__(self, template, **fields):
+        self.template = template
+        self.fields = fields
+
+    def __str__(self):
+        return self.template.format(**self.fields)
+
+
+class DebugSampler(logging.Filter):
+    """
+    Keeps one in `every` debug records of each message template.
+
+    Records above DEBUG are always kept. Sampling is per template, so a flood of one
+    high-volume event does not hide the other debug events.
+    """
+
+    def __init__(self, every):
+        """
+        Args:
+            every (int): Keep the 1st, (every + 1)th, ... debug record of each template.
+        """
+        super().__init__()
+        self.every = every
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG:
+            return True
+        key = getattr(record.msg, "template", record.msg)
+        with self._lock:
+            count = self._counts.get(key, 0)
+            self._counts[key] = count + 1
+        return count % self.every == 0
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line, with the fields of lazy messages."""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if isinstance(record.msg, LazyMessage):
+            entry["fields"] = record.msg.fields
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    A queue handler that leaves the formatting to the listener thread.
+
+    `QueueHandler.prepare` formats the message in the logging thread so records can be
+    pickled; the queue here is in-process, so records are enqueued as they are and the
+    logging thread only pays for the enqueue.
+    """
+
+    def prepare(self, record):
+        return record
 
 
 def setup_logger():
     """
     Configure and set up the logging system with environment-specified log level.
 
-    This function initializes the basic configuration for Python's logging module.
-    It retrieves the log level from the 'LOG_LEVEL' environment variable (defaulting to 'INFO'
-    if not set), and sets up a standard logging format including timestamp, log level,
-    and message.
+    This function initializes the root logger once, like `logging.basicConfig`: it does
+    nothing if the root logger already has handlers. It retrieves the log level from the
+    'LOG_LEVEL' environment variable (defaulting to 'INFO' if not set), and sets up a
+    standard logging format including timestamp, log level, and message.
 
     Environment Variables:
         LOG_LEVEL (str): The desired logging level (e.g., 'DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL').
                         Case-insensitive. Defaults to 'INFO' if not specified.
+        LOG_FORMAT (str): 'json' to write one JSON object per record instead of text.
+        LOG_ASYNC (str): 'true' to enqueue records and write them from a background
+                        `QueueListener` thread.
+        LOG_DEBUG_SAMPLE_EVERY (int): Keep only one in this many debug records of each
+                        message template. Defaults to 1, which keeps every record.
 
     Returns:
         None
@@ -23,6 +126,39 @@ def setup_logger():
         os.environ['LOG_LEVEL'] = 'DEBUG'
         setup_logger()
     """
-    log_level = os.environ.get("LOG_LEVEL", "INFO").upper()
+    global _listener
+    root_logger = logging.getLogger()
+    if root_logger.handlers:
+        return
+
+    log_level = os.environ.get(LOG_LEVEL, "INFO").upper()
     level = getattr(logging, log_level, logging.INFO)
-    logging.basicConfig(level=level, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    handler = logging.StreamHandler()
+    if os.environ.get(LOG_FORMAT, "").lower() == LOG_FORMAT_JSON:
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(TEXT_LOG_FORMAT))
+
+    if os.environ.get(LOG_ASYNC, "").lower() in ("1", "true", "yes"):
+        shutdown_logger()
+        _listener = QueueListener(queue.SimpleQueue(), handler)
+        _listener.start()
+        atexit.unregister(shutdown_logger)
+        atexit.register(shutdown_logger)
+        handler = DeferredQueueHandler(_listener.queue)
+
+    sample_every = int(os.environ.get(LOG_DEBUG_SAMPLE_EVERY) or 1)
+    if sample_every > 1:
+        handler.addFilter(DebugSampler(sample_every))
+
+    root_logger.addHandler(handler)
+    root_logger.setLevel(level)
+
+
+def shutdown_logger():
+    """Writes the queued records and stops the background writer, if any."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
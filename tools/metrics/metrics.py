@@ -0,0 +1,131 @@
+"""Prometheus metrics of the ingestion and API hot paths."""
+
+from flask import Response, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+import time
+
+# Every metric is updated once per page, pipeline or request rather than once per
+# message, and prometheus_client updates are a lock and an addition, so the
+# instrumentation stays on in the ingestion loops.
+
+GOOGLE_API_PAGE_SECONDS = Histogram(
+    "purrf_google_api_page_seconds",
+    "Latency of one page of a Google API list call.",
+    ["method"],
+)
+MESSAGES_FETCHED = Counter(
+    "purrf_messages_fetched",
+    "Messages fetched from the Chat API.",
+    ["source"],
+)
+MESSAGES_STORED = Counter(
+    "purrf_messages_stored",
+    "Message events committed to Redis.",
+)
+SKIPPED_SENDERS = Counter(
+    "purrf_skipped_senders",
+    "Messages skipped because their sender is not in the directory.",
+    ["source"],
+)
+REDIS_PIPELINE_SECONDS = Histogram(
+    "purrf_redis_pipeline_seconds",
+    "Latency of one Redis pipeline round trip.",
+    ["operation"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+REDIS_PIPELINE_BATCH_SIZE = Histogram(
+    "purrf_redis_pipeline_batch_size",
+    "Number of message events written by one Redis pipeline.",
+    ["operation"],
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500),
+)
+EXECUTOR_QUEUE_DEPTH = Gauge(
+    "purrf_executor_queue_depth",
+    "Tasks waiting for a worker thread of an executor.",
+    ["executor"],
+)
+CACHE_STATS = Gauge(
+    "purrf_cache_stats",
+    "Hit and miss counters of an in-process cache.",
+    ["cache", "stat"],
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "purrf_http_request_seconds",
+    "Latency of the Flask routes.",
+    ["route", "method", "status"],
+)
+
+
+def track_executor(name, executor):
+    """
+    Exposes the queue depth of a thread pool executor as a gauge.
+
+    The depth is read when the metrics are scraped, so tracking adds no cost to the
+    submitting code.
+
+    Args:
+        name (str): The value of the "executor" label.
+        executor (concurrent.futures.ThreadPoolExecutor): The tracked executor.
+    """
+    EXECUTOR_QUEUE_DEPTH.labels(executor=name).set_function(executor._work_queue.qsize)
+
+
+def track_cache(name, cache):
+    """
+    Exposes the counters of a cache's `get_metrics` as gauges.
+
+    Each key of the metrics dictionary becomes a "stat" label, e.g. "hits", "misses"
+    or "hit_rate". The counters are read when the metrics are scraped, so tracking
+    adds no cost to the cache lookups.
+
+    Args:
+        name (str): The value of the "cache" label.
+        cache: The tracked cache, with a `get_metrics()` method returning numbers.
+    """
+    for stat in cache.get_metrics():
+        CACHE_STATS.labels(cache=name, stat=stat).set_function(
+            lambda stat=stat: cache.get_metrics()[stat]
+        )
+
+
+def _start_request_timer():
+    """Records the start time of the current request."""
+    g.metrics_started_at = time.perf_counter()
+
+
+def _observe_request(response):
+    """Records the latency of the current request under its route template."""
+    started_at = g.pop("metrics_started_at", None)
+    if started_at is not None:
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        HTTP_REQUEST_SECONDS.labels(
+            route=route, method=request.method, status=response.status_code
+        ).observe(time.perf_counter() - started_at)
+    return response
+
+
+def metrics():
+    """Returns the metrics in the Prometheus text exposition format."""
+    return Response(generate_latest(REGISTRY), mimetype=CONTENT_TYPE_LATEST)
+
+
+def register_metrics(app):
+    """
+    Times every request of a Flask app and serves the metrics on `/metrics`.
+
+    Requests are labeled with their route template, e.g. "/api/chat/activity", rather
+    than their path, so the number of series stays bounded.
+
+    Args:
+        app (flask.Flask): The Flask application instance.
+    """
+    app.before_request(_start_request_timer)
+    app.after_request(_observe_request)
+    app.add_url_rule("/metrics", "metrics", metrics)
@@ -0,0 +1,21 @@
+PROFILE_DIR = "PROFILE_DIR"
+PROFILE_MODE = "PROFILE_MODE"
+PROFILE_SAMPLE_RATE = "PROFILE_SAMPLE_RATE"
+PROFILE_INTERVAL_SECONDS = "PROFILE_INTERVAL_SECONDS"
+PROFILE_MAX_FILES = "PROFILE_MAX_FILES"
+PROFILE_ADMIN_TOKEN = "PROFILE_ADMIN_TOKEN"
+DEFAULT_PROFILE_DIR = "profiles"
+DEFAULT_PROFILE_SAMPLE_RATE = 0.01
+DEFAULT_PROFILE_MAX_FILES = 200
+DEFAULT_PROFILE_INTERVAL_SECONDS = 0.005
+MODE_CPROFILE = "cprofile"
+MODE_SAMPLING = "sampling"
+PROFILE_EXTENSIONS = (".folded", ".prof")
+PROFILE_WRITTEN_INFO_MSG = "Wrote the {mode} profile of {name} to {path}."
+PROFILE_WRITE_ERROR_MSG = "Failed to write the profile of {name}: {error}"
+PROFILING_CONFIGURED_INFO_MSG = "Profiling configured: {config}."
+PROFILE_REMOVE_ERROR_MSG = "Failed to remove the old profile {path}: {error}"
+PROFILING_ADMIN_DISABLED_MSG = (
+    "The profiling admin endpoint is disabled, set PROFILE_ADMIN_TOKEN to enable it."
+)
+PROFILING_ADMIN_UNAUTHORIZED_MSG = "A valid admin bearer token is required."
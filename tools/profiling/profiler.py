@@ -0,0 +1,431 @@
+"""Opt-in profiling of jobs, requests and subscriber batches."""
+
+from flask import g, jsonify, request
+from tools.log.logger import LazyMessage, setup_logger
+from collections import Counter
+from datetime import datetime, timezone
+import cProfile
+import functools
+import hmac
+import http.client
+import itertools
+import logging
+import os
+import random
+import re
+import sys
+import threading
+from tools.profiling.constants import (
+    PROFILE_DIR,
+    PROFILE_MODE,
+    PROFILE_SAMPLE_RATE,
+    PROFILE_INTERVAL_SECONDS,
+    PROFILE_MAX_FILES,
+    PROFILE_ADMIN_TOKEN,
+    DEFAULT_PROFILE_DIR,
+    DEFAULT_PROFILE_SAMPLE_RATE,
+    DEFAULT_PROFILE_INTERVAL_SECONDS,
+    DEFAULT_PROFILE_MAX_FILES,
+    MODE_CPROFILE,
+    MODE_SAMPLING,
+    PROFILE_EXTENSIONS,
+    PROFILE_WRITTEN_INFO_MSG,
+    PROFILE_WRITE_ERROR_MSG,
+    PROFILE_REMOVE_ERROR_MSG,
+    PROFILING_CONFIGURED_INFO_MSG,
+    PROFILING_ADMIN_DISABLED_MSG,
+    PROFILING_ADMIN_UNAUTHORIZED_MSG,
+)
+
+setup_logger()
+
+
+class ProfilingConfig:
+    """
+    The runtime switch of the profiler.
+
+    Profiling is enabled at startup when the `PROFILE_DIR` environment variable is set,
+    and can be turned on and off at runtime through `configure`, e.g. from the admin
+    endpoint. The profile directory and the maximum number of profiles kept in it are
+    only read from the environment, so the endpoint cannot make the service write
+    elsewhere or fill the disk.
+
+    Attributes:
+        enabled (bool): Whether runs are profiled.
+        directory (str): The directory profiles are written to.
+        mode (str): "sampling" to sample stacks every `interval` seconds, or "cprofile"
+            for the deterministic profiler.
+        sample_rate (float): The fraction of runs profiled, from 0 to 1. Defaults to
+            1%, so that turning profiling on under load does not profile every request.
+        interval (float): The sampling interval of the "sampling" mode, in seconds.
+        max_files (int): The number of profiles kept in the directory, the oldest
+            are removed first.
+    """
+
+    def __init__(self):
+        self.enabled = bool(os.environ.get(PROFILE_DIR))
+        self.directory = os.environ.get(PROFILE_DIR) or DEFAULT_PROFILE_DIR
+        self.mode = MODE_SAMPLING
+        self.sample_rate = DEFAULT_PROFILE_SAMPLE_RATE
+        self.interval = DEFAULT_PROFILE_INTERVAL_SECONDS
+        self.max_files = int(
+            os.environ.get(PROFILE_MAX_FILES) or DEFAULT_PROFILE_MAX_FILES
+        )
+        self._lock = threading.Lock()
+        self.configure(
+            mode=os.environ.get(PROFILE_MODE),
+            sample_rate=os.environ.get(PROFILE_SAMPLE_RATE),
+            interval=os.environ.get(PROFILE_INTERVAL_SECONDS),
+        )
+
+    def configure(self, enabled=None, mode=None, sample_rate=None, interval=None):
+        """
+        Updates the settings that are given, validating them all first.
+
+        Args:
+            enabled (bool, optional): Whether runs are profiled.
+            mode (str, optional): "sampling" or "cprofile".
+            sample_rate (float | str, optional): The fraction of runs profiled.
+            interval (float | str, optional): The sampling interval, in seconds.
+
+        Returns:
+            dict: The resulting settings.
+
+        Raises:
+            ValueError: If a setting is not valid.
+        """
+        if mode is not None and mode not in (MODE_SAMPLING, MODE_CPROFILE):
+            raise ValueError(
+                f"mode must be {MODE_SAMPLING} or {MODE_CPROFILE}, got {mode}."
+            )
+        if sample_rate is not None:
+            sample_rate = float(sample_rate)
+            if not 0 <= sample_rate <= 1:
+                raise ValueError("sample_rate must be between 0 and 1.")
+        if interval is not None:
+            interval = float(interval)
+            if interval <= 0:
+                raise ValueError("interval must be positive.")
+
+        with self._lock:
+            if enabled is not None:
+                self.enabled = enabled
+            if mode is not None:
+                self.mode = mode
+            if sample_rate is not None:
+                self.sample_rate = sample_rate
+            if interval is not None:
+                self.interval = interval
+            return self.to_dict()
+
+    def to_dict(self):
+        """Returns the settings as a dictionary."""
+        return {
+            "enabled": self.enabled,
+            "directory": self.directory,
+            "mode": self.mode,
+            "sample_rate": self.sample_rate,
+            "interval": self.interval,
+            "max_files": self.max_files,
+        }
+
+
+_config = None
+_config_lock = threading.Lock()
+
+
+def get_profiling_config():
+    """Returns the process-wide `ProfilingConfig`, created on first use."""
+    global _config
+    if _config is None:
+        with _config_lock:
+            if _config is None:
+                _config = ProfilingConfig()
+    return _config
+
+
+class StackSampler:
+    """
+    Samples the stack of one thread at a fixed interval.
+
+    A daemon thread reads the frame of the profiled thread from `sys._current_frames`,
+    so the profiled code runs unmodified and the overhead is bounded by the interval
+    rather than by the number of calls. Stacks are counted in the collapsed format of
+    flame graph tools, "module:function;module:function count", root first.
+    """
+
+    def __init__(self, thread_id, interval):
+        """
+        Args:
+            thread_id (int): The identifier of the profiled thread.
+            interval (float): The sampling interval, in seconds.
+        """
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _sample(self):
+        """Counts the current stack of the profiled thread."""
+        frame = sys._current_frames().get(self.thread_id)
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_name}")
+            frame = frame.f_back
+        if stack:
+            self.stacks[";".join(reversed(stack))] += 1
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def collapsed(self):
+        """Returns the sampled stacks in the collapsed flame graph format."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.items())
+
+
+_active = threading.local()
+_run_numbers = itertools.count()
+_rotate_lock = threading.Lock()
+
+
+def _remove_old_profiles(directory, max_files):
+    """
+    Removes the oldest profiles of a directory beyond the `max_files` newest ones.
+
+    Args:
+        directory (str): The profile directory.
+        max_files (int): The number of profiles kept.
+    """
+    with _rotate_lock:
+        try:
+            with os.scandir(directory) as entries:
+                profiles = [
+                    (entry.stat().st_mtime, entry.path)
+                    for entry in entries
+                    if entry.is_file() and entry.name.endswith(PROFILE_EXTENSIONS)
+                ]
+        except OSError as e:
+            logging.error(PROFILE_REMOVE_ERROR_MSG.format(path=directory, error=e))
+            return
+        profiles.sort()
+        for _, path in profiles[: max(len(profiles) - max_files, 0)]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logging.error(PROFILE_REMOVE_ERROR_MSG.format(path=path, error=e))
+
+
+class ProfileRun:
+    """
+    Profiles one run of a job, request or batch, if the profiler selects it.
+
+    Runs are selected with probability `sample_rate` while profiling is enabled. Runs
+    nested in a profiled run of the same thread are part of it and not profiled on
+    their own. A profiled run writes, under the profile directory:
+
+    - "sampling" mode: `<name>-<time>-<pid>-<n>.folded`, collapsed stacks for
+      flamegraph.pl, speedscope or inferno.
+    - "cprofile" mode: `<name>-<time>-<pid>-<n>.prof`, a pstats dump for pstats,
+      snakeviz or flameprof.
+
+    Only the `max_files` newest profiles of the directory are kept.
+    """
+
+    def __init__(self, name):
+        """
+        Args:
+            name (str): The name of the run, used in the file name.
+        """
+        self.name = re.sub(r"[^A-Za-z0-9_.-]+", "_", name).strip("_") or "run"
+        self.path = None
+        self._profiler = None
+        self._config = None
+        self._started_at = None
+
+    def start(self):
+        """Starts profiling if the run is selected."""
+        config = get_profiling_config()
+        if (
+            not config.enabled
+            or getattr(_active, "run", None) is not None
+            or random.random() >= config.sample_rate
+        ):
+            return
+        self._config = config.to_dict()
+        self._started_at = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        if self._config["mode"] == MODE_CPROFILE:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        else:
+            self._profiler = StackSampler(
+                threading.get_ident(), self._config["interval"]
+            )
+            self._profiler.start()
+        _active.run = self
+
+    def stop(self):
+        """
+        Stops profiling and writes the profile of a selected run.
+
+        Returns:
+            str: The path of the written profile, or None.
+        """
+        if self._profiler is None:
+            return None
+        _active.run = None
+        mode = self._config["mode"]
+        if mode == MODE_CPROFILE:
+            self._profiler.disable()
+        else:
+            self._profiler.stop()
+
+        directory = self._config["directory"]
+        base = f"{self.name}-{self._started_at}-{os.getpid()}-{next(_run_numbers)}"
+        try:
+            os.makedirs(directory, exist_ok=True)
+            if mode == MODE_CPROFILE:
+                self.path = os.path.join(directory, f"{base}.prof")
+                self._profiler.dump_stats(self.path)
+            else:
+                self.path = os.path.join(directory, f"{base}.folded")
+                with open(self.path, "w", encoding="utf-8") as f:
+                    f.write(self._profiler.collapsed())
+        except OSError as e:
+            logging.error(PROFILE_WRITE_ERROR_MSG.format(name=self.name, error=e))
+            self.path = None
+        else:
+            logging.info(
+                LazyMessage(
+                    PROFILE_WRITTEN_INFO_MSG, mode=mode, name=self.name, path=self.path
+                )
+            )
+            _remove_old_profiles(directory, self._config["max_files"])
+        self._profiler = None
+        return self.path
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def profiled(name):
+    """
+    Decorates a function so that each call is a `ProfileRun`.
+
+    Args:
+        name (str): The name of the runs.
+
+    Returns:
+        callable: The decorator.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with ProfileRun(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _start_request_profile():
+    """Starts the profile run of the current request."""
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    run = ProfileRun(f"request-{request.method}-{route.strip('/')}")
+    run.start()
+    g.profile_run = run
+
+
+def _stop_request_profile(error=None):
+    """Stops the profile run of the current request."""
+    run = g.pop("profile_run", None)
+    if run is not None:
+        run.stop()
+
+
+def _check_admin_token():
+    """
+    Checks the bearer token of the current request against `PROFILE_ADMIN_TOKEN`.
+
+    Returns:
+        tuple: The error response, or None if the request is authorized.
+    """
+    token = os.environ.get(PROFILE_ADMIN_TOKEN)
+    if not token:
+        return jsonify({"error": PROFILING_ADMIN_DISABLED_MSG}), http.client.FORBIDDEN
+    authorization = request.headers.get("Authorization", "")
+    scheme, _, credentials = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(
+        credentials.encode(), token.encode()
+    ):
+        return jsonify({
+            "error": PROFILING_ADMIN_UNAUTHORIZED_MSG
+        }), http.client.UNAUTHORIZED
+    return None
+
+
+def profiling():
+    """
+    Admin endpoint to read or change the profiler settings.
+
+    The endpoint is disabled unless `PROFILE_ADMIN_TOKEN` is set, and every request
+    must carry it as an "Authorization: Bearer <token>" header. GET returns the current
+    settings. POST updates the settings given in its JSON body, among "enabled" (bool),
+    "mode", "sample_rate" and "interval", and returns the resulting settings.
+
+    Raises:
+        ValueError: If a setting is not valid.
+    """
+    error = _check_admin_token()
+    if error:
+        return error
+    config = get_profiling_config()
+    if request.method == "GET":
+        return jsonify(config.to_dict()), http.client.OK
+
+    settings = request.get_json(silent=True) or {}
+    enabled = settings.get("enabled")
+    if enabled is not None and not isinstance(enabled, bool):
+        raise ValueError("enabled must be true or false.")
+    updated = config.configure(
+        enabled=enabled,
+        mode=settings.get("mode"),
+        sample_rate=settings.get("sample_rate"),
+        interval=settings.get("interval"),
+    )
+    logging.info(PROFILING_CONFIGURED_INFO_MSG.format(config=updated))
+    return jsonify(updated), http.client.OK
+
+
+def register_profiling(app):
+    """
+    Profiles the requests of a Flask app and serves the admin endpoint.
+
+    The endpoint is `/api/admin/profiling`, protected by `PROFILE_ADMIN_TOKEN`. While
+    profiling is disabled, the request hooks only read the switch.
+
+    Args:
+        app (flask.Flask): The Flask application instance.
+    """
+    app.before_request(_start_request_profile)
+    app.teardown_request(_stop_request_profile)
+    app.add_url_rule(
+        "/api/admin/profiling", "profiling", profiling, methods=["GET", "POST"]
+    )
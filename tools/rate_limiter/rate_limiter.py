@@ -0,0 +1,69 @@
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    A thread-safe token bucket that limits how often an operation may run.
+
+    Tokens are refilled continuously at `rate` tokens per second, up to `burst` tokens.
+    Each call to `acquire` consumes tokens, blocking until enough are available. The
+    limiter is shared between worker threads to cap the aggregate request rate against
+    an API quota or a Redis instance.
+
+    Attributes:
+        rate (float): The number of tokens added per second.
+        burst (float): The maximum number of tokens the bucket can hold.
+    """
+
+    def __init__(self, rate, burst=None):
+        """
+        Initializes the rate limiter with a full bucket.
+
+        Args:
+            rate (float): The number of tokens added per second.
+            burst (float, optional): The bucket capacity, defaults to `rate`.
+
+        Raises:
+            ValueError: If rate is not positive.
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive.")
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate, 1)
+        self._tokens = self.burst
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """
+        Blocks until the requested number of tokens is available and consumes them.
+
+        Args:
+            tokens (float): The number of tokens to consume.
+
+        Returns:
+            float: The number of seconds spent waiting.
+
+        Raises:
+            ValueError: If more tokens are requested than the bucket can hold, since
+                they could never become available.
+        """
+        if tokens > self.burst:
+            raise ValueError(
+                f"cannot acquire {tokens} tokens, the burst is {self.burst}."
+            )
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.burst, self._tokens + (now - self._updated_at) * self.rate
+                )
+                self._updated_at = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
@@ -0,0 +1,11 @@
+TRACE_EXPORTER = "TRACE_EXPORTER"
+TRACE_FILE = "TRACE_FILE"
+DEFAULT_TRACE_FILE = "traces.jsonl"
+TRACE_SERVICE_NAME = "purrf"
+EXPORTER_CONSOLE = "console"
+EXPORTER_FILE = "file"
+TRACING_ENABLED_INFO_MSG = "Tracing enabled with the {exporter} exporter."
+UNSUPPORTED_EXPORTER_ERROR_MSG = (
+    "Unsupported trace exporter {exporter}, expected one of {supported}; "
+    "tracing is disabled."
+)
@@ -0,0 +1,164 @@
+"""OpenTelemetry tracing of the backfill, Google API and Redis calls."""
+
+from flask import g, request
+from opentelemetry import context, trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+from opentelemetry.trace import SpanKind, Status, StatusCode
+from tools.log.logger import setup_logger
+import logging
+import os
+import threading
+from tools.tracing.constants import (
+    TRACE_EXPORTER,
+    TRACE_FILE,
+    DEFAULT_TRACE_FILE,
+    TRACE_SERVICE_NAME,
+    EXPORTER_CONSOLE,
+    EXPORTER_FILE,
+    TRACING_ENABLED_INFO_MSG,
+    UNSUPPORTED_EXPORTER_ERROR_MSG,
+)
+
+setup_logger()
+
+_setup_lock = threading.Lock()
+_setup_done = False
+
+
+def create_span_exporter(exporter, trace_file=DEFAULT_TRACE_FILE):
+    """
+    Creates a span exporter for offline use.
+
+    Args:
+        exporter (str): "console" to print spans to stdout, or "file" to append them to
+            `trace_file` as one JSON document per line.
+        trace_file (str): The file of the "file" exporter.
+
+    Returns:
+        opentelemetry.sdk.trace.export.SpanExporter: The span exporter.
+
+    Raises:
+        ValueError: If the exporter is not supported.
+    """
+    if exporter == EXPORTER_CONSOLE:
+        return ConsoleSpanExporter()
+    if exporter == EXPORTER_FILE:
+        return ConsoleSpanExporter(
+            out=open(trace_file, "a", encoding="utf-8"),
+            formatter=lambda span: span.to_json(indent=None) + "\n",
+        )
+    raise ValueError(
+        UNSUPPORTED_EXPORTER_ERROR_MSG.format(
+            exporter=exporter, supported=[EXPORTER_CONSOLE, EXPORTER_FILE]
+        )
+    )
+
+
+def setup_tracing():
+    """
+    Installs the global tracer provider configured by the environment, once.
+
+    Tracing is off unless the `TRACE_EXPORTER` environment variable is set to "console"
+    or "file", in which case spans are exported in the background by a batch span
+    processor; the "file" exporter writes to `TRACE_FILE`, "traces.jsonl" by default.
+    While tracing is off, spans are non-recording and cost next to nothing.
+
+    Environment Variables:
+        TRACE_EXPORTER (str): "console" or "file". Unset disables tracing.
+        TRACE_FILE (str): The file of the "file" exporter.
+    """
+    global _setup_done
+    with _setup_lock:
+        if _setup_done:
+            return
+        _setup_done = True
+        exporter = os.environ.get(TRACE_EXPORTER)
+        if not exporter:
+            return
+        try:
+            span_exporter = create_span_exporter(
+                exporter.lower(), os.environ.get(TRACE_FILE, DEFAULT_TRACE_FILE)
+            )
+        except ValueError as e:
+            logging.error(str(e))
+            return
+        provider = TracerProvider(
+            resource=Resource.create({"service.name": TRACE_SERVICE_NAME})
+        )
+        provider.add_span_processor(BatchSpanProcessor(span_exporter))
+        trace.set_tracer_provider(provider)
+        logging.info(TRACING_ENABLED_INFO_MSG.format(exporter=exporter))
+
+
+def get_tracer(name):
+    """
+    Returns the tracer of a module, setting tracing up on first use.
+
+    Args:
+        name (str): The name of the instrumented module, usually `__name__`.
+
+    Returns:
+        opentelemetry.trace.Tracer: The tracer.
+    """
+    setup_tracing()
+    return trace.get_tracer(name)
+
+
+tracer = get_tracer(__name__)
+
+
+def _start_request_span():
+    """Starts the server span of the current request and makes it current."""
+    route = request.url_rule.rule if request.url_rule else request.path
+    span = tracer.start_span(
+        f"{request.method} {route}",
+        kind=SpanKind.SERVER,
+        attributes={
+            "http.request.method": request.method,
+            "http.route": route,
+            "url.query": request.query_string.decode("utf-8", "replace"),
+        },
+    )
+    g.trace_span = span
+    g.trace_token = context.attach(trace.set_span_in_context(span))
+
+
+def _record_response(response):
+    """Records the status code of the current request on its span."""
+    span = g.get("trace_span")
+    if span is not None:
+        span.set_attribute("http.response.status_code", response.status_code)
+        if response.status_code >= 500:
+            span.set_status(Status(StatusCode.ERROR))
+    return response
+
+
+def _end_request_span(error=None):
+    """Ends the span of the current request."""
+    span = g.pop("trace_span", None)
+    token = g.pop("trace_token", None)
+    if span is None:
+        return
+    if error is not None:
+        span.record_exception(error)
+        span.set_status(Status(StatusCode.ERROR, str(error)))
+    span.end()
+    context.detach(token)
+
+
+def register_tracing(app):
+    """
+    Wraps every request of a Flask app in a server span.
+
+    Spans are named after the route template, e.g. "GET /api/chat/activity", and the
+    backfill, API page and Redis pipeline spans started while serving the request are
+    its children.
+
+    Args:
+        app (flask.Flask): The Flask application instance.
+    """
+    app.before_request(_start_request_span)
+    app.after_request(_record_response)
+    app.teardown_request(_end_request_span)